@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""Generate synthetic AcroForm PDFs for performance tests, reproducibly from a seed.
+
+Built from the PoC steps (run_poc.py): every page gets the Lorem ipsum form text of step 1
+(_add_text_to_page_simple) and widgets are created as in step 2 (_create_widget). On top of that
+a document can have:
+
+  --pages N / --widgets M   N pages with M text widgets each (named f{page}_{index}, laid out in
+                            4 columns, values from Lorem ipsum words or empty)
+  --depth D [--fanout F]    widgets grouped under D levels of non-terminal parent fields
+                            (g{level}_{index}, F kids each), as in forms with dotted names
+  --noise K                 K non-widget annotations per page (Text, Link, Square, FreeText)
+                            mixed into /Annots
+  --da shared|widget        one /DA on the AcroForm dictionary (default) or one per widget with
+                            its own font size
+  --image-kb KB             one incompressible RGB image XObject of about KB kilobytes per page
+
+The same arguments and seed always give the same bytes (pypdf derives /ID from the content; no
+dates are written), so sizes and timings can be compared across machines and releases as long
+as the pypdf version is the same. --corpus DIR writes the standard set CORPUS plus a
+manifest.json with each document's parameters, size and SHA-256 (and the pypdf version) to check
+that two machines benchmark the same files.
+
+Usage:
+  python3 .scripts/PoC/generate_corpus.py --output form.pdf --pages 20 --widgets 100 --seed 1
+  python3 .scripts/PoC/generate_corpus.py --output deep.pdf --pages 5 --widgets 50 --depth 3 --noise 20
+  python3 .scripts/PoC/generate_corpus.py --corpus corpus/ [--seed 1]
+
+Requires: pypdf.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from run_poc import _add_text_to_page_simple, _create_widget  # noqa: E402
+
+# name -> generate_document() keyword arguments
+CORPUS = {
+    "flat-small": {"pages": 5, "widgets": 20},
+    "flat-large": {"pages": 100, "widgets": 100},
+    "deep": {"pages": 20, "widgets": 50, "depth": 3},
+    "noisy": {"pages": 20, "widgets": 50, "noise": 50},
+    "widget-da": {"pages": 20, "widgets": 100, "da": "widget"},
+    "images": {"pages": 5, "widgets": 20, "image_kb": 2048},
+}
+DA_MODES = ("shared", "widget")
+LOREM_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua"
+).split()
+_NOISE_SUBTYPES = ("/Text", "/Link", "/Square", "/FreeText")
+
+
+def _layout(widgets: int) -> tuple[int, float]:
+    """(columns, row height) fitting widgets in 4 columns between y 60 and 780."""
+    rows = max(1, math.ceil(widgets / 4))
+    return 4, min(24.0, 720.0 / rows)
+
+
+def _add_noise(writer, rng: random.Random, count: int) -> list:
+    """count non-widget annotations at random positions; return their references."""
+    from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, NumberObject, TextStringObject
+
+    n = NameObject
+    refs = []
+    for i in range(count):
+        subtype = _NOISE_SUBTYPES[i % len(_NOISE_SUBTYPES)]
+        x, y = rng.uniform(20, 500), rng.uniform(20, 780)
+        annot = DictionaryObject(
+            {
+                n("/Type"): n("/Annot"),
+                n("/Subtype"): n(subtype),
+                n("/Rect"): ArrayObject([FloatObject(round(v, 2)) for v in (x, y, x + rng.uniform(10, 80), y + rng.uniform(10, 40))]),
+                n("/F"): NumberObject(4),
+            }
+        )
+        if subtype in ("/Text", "/FreeText"):
+            annot[n("/Contents")] = TextStringObject(" ".join(rng.choices(LOREM_WORDS, k=6)))
+        if subtype == "/FreeText":
+            annot[n("/DA")] = TextStringObject("/Helv 9 Tf 0 g")
+        if subtype == "/Link":
+            annot[n("/Border")] = ArrayObject([NumberObject(0), NumberObject(0), NumberObject(0)])
+        refs.append(writer._add_object(annot))
+    return refs
+
+
+def _add_image(writer, page, rng: random.Random, kilobytes: int, name: str) -> None:
+    """Draw an RGB image of about kilobytes KB of random (incompressible) samples across the page."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, StreamObject
+
+    n = NameObject
+    side = max(1, int(math.sqrt(kilobytes * 1024 / 3)))
+    image = StreamObject()
+    image._data = rng.randbytes(side * side * 3)
+    image.update(
+        {
+            n("/Type"): n("/XObject"),
+            n("/Subtype"): n("/Image"),
+            n("/Width"): NumberObject(side),
+            n("/Height"): NumberObject(side),
+            n("/ColorSpace"): n("/DeviceRGB"),
+            n("/BitsPerComponent"): NumberObject(8),
+        }
+    )
+    resources = page[n("/Resources")]
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        xobjects = resources[n("/XObject")] = DictionaryObject()
+    xobjects[n(name)] = writer._add_object(image)
+    draw = StreamObject()
+    draw._data = f"q 455 0 0 455 70 200 cm {name} Do Q\n".encode("ascii")
+    # raw_get keeps the reference: streams must stay indirect inside the /Contents array
+    contents = page.raw_get("/Contents") if "/Contents" in page else None
+    if isinstance(contents, IndirectObject) and isinstance(contents.get_object(), ArrayObject):
+        contents = contents.get_object()
+    prev = list(contents) if isinstance(contents, ArrayObject) else [contents] if contents is not None else []
+    page[n("/Contents")] = ArrayObject(prev + [writer._add_object(draw)])
+
+
+def generate_document(
+    pages: int = 1,
+    widgets: int = 10,
+    seed: int = 0,
+    depth: int = 0,
+    fanout: int = 4,
+    noise: int = 0,
+    da: str = "shared",
+    image_kb: int = 0,
+) -> bytes:
+    """Build one synthetic form and return its PDF bytes (same arguments, same bytes).
+
+    Args:
+        pages: Number of pages.
+        widgets: Text widgets per page.
+        seed: Seed for values, jitter, font sizes, noise positions and image samples.
+        depth: Levels of non-terminal parent fields above each widget (0 = flat /Fields).
+        fanout: Kids per parent field when depth > 0.
+        noise: Non-widget annotations per page.
+        da: "shared" (/DA on the AcroForm dictionary) or "widget" (one /DA per widget).
+        image_kb: Size of the image drawn on each page in KB (0 = none).
+
+    Raises:
+        ValueError: Negative counts, fanout below 1 or unknown da.
+    """
+    if min(pages, widgets, depth, noise, image_kb) < 0 or fanout < 1:
+        raise ValueError("pages, widgets, depth, noise and image_kb must be >= 0 and fanout >= 1")
+    if da not in DA_MODES:
+        raise ValueError(f"Unknown da: {da} (expected one of {', '.join(DA_MODES)})")
+    from pypdf import PdfWriter
+    from pypdf.generic import (
+        ArrayObject,
+        BooleanObject,
+        DictionaryObject,
+        NameObject,
+        NumberObject,
+        TextStringObject,
+    )
+
+    n = NameObject
+    rng = random.Random(seed)
+    writer = PdfWriter()
+    fields = ArrayObject()
+    groups: dict[tuple[int, int], DictionaryObject] = {}
+
+    def parent_of(level: int, index: int):
+        """Reference of group (level, index), created with its own parents on first use."""
+        key = (level, index)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = DictionaryObject({n("/T"): TextStringObject(f"g{level}_{index}"), n("/Kids"): ArrayObject()})
+            ref = writer._add_object(group)
+            if level == 1:
+                fields.append(ref)
+            else:
+                parent = parent_of(level - 1, index // fanout)
+                group[n("/Parent")] = parent
+                parent.get_object()[n("/Kids")].append(ref)
+        return group.indirect_reference
+
+    columns, row_height = _layout(widgets)
+    serial = 0
+    for page_num in range(1, pages + 1):
+        page = writer.add_blank_page(width=595, height=842)
+        _add_text_to_page_simple(writer, page)
+        annots = ArrayObject()
+        for idx in range(widgets):
+            row, col = divmod(idx, columns)
+            x = 40 + col * 135 + rng.uniform(-2, 2)
+            y = 780 - (row + 1) * row_height + rng.uniform(0, row_height * 0.1)
+            value = " ".join(rng.choices(LOREM_WORDS, k=rng.randint(1, 4))) if rng.random() < 0.5 else ""
+            ref = _create_widget(writer, f"f{page_num}_{idx}", [round(x, 2), round(y, 2), round(x + 120, 2), round(y + row_height * 0.8, 2)], value)
+            widget = ref.get_object()
+            widget[n("/Type")] = n("/Annot")
+            widget[n("/F")] = NumberObject(4)
+            widget[n("/P")] = page.indirect_reference
+            if da == "widget":
+                widget[n("/DA")] = TextStringObject(f"/Helv {rng.choice((8, 9, 10, 11, 12))} Tf 0 g")
+            if depth:
+                parent = parent_of(depth, serial // fanout)
+                widget[n("/Parent")] = parent
+                parent.get_object()[n("/Kids")].append(ref)
+            else:
+                fields.append(ref)
+            annots.append(ref)
+            serial += 1
+        for ref in _add_noise(writer, rng, noise):
+            annots.insert(rng.randint(0, len(annots)), ref)
+        if annots:
+            page[n("/Annots")] = annots
+        if image_kb:
+            _add_image(writer, page, rng, image_kb, f"/Im{page_num}")
+
+    acroform = DictionaryObject(
+        {
+            n("/Fields"): fields,
+            n("/NeedAppearances"): BooleanObject(True),
+            n("/DR"): DictionaryObject(
+                {
+                    n("/Font"): DictionaryObject(
+                        {
+                            n("/Helv"): DictionaryObject(
+                                {n("/Type"): n("/Font"), n("/Subtype"): n("/Type1"), n("/BaseFont"): n("/Helvetica")}
+                            )
+                        }
+                    )
+                }
+            ),
+        }
+    )
+    if da == "shared":
+        acroform[n("/DA")] = TextStringObject("/Helv 10 Tf 0 g")
+    writer.root_object[n("/AcroForm")] = writer._add_object(acroform)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def generate_corpus(directory: str | Path, seed: int = 0) -> dict:
+    """Write the CORPUS documents and manifest.json to directory; return the manifest."""
+    import pypdf
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    documents = {}
+    for name, params in CORPUS.items():
+        data = generate_document(seed=seed, **params)
+        (directory / f"{name}.pdf").write_bytes(data)
+        documents[name] = {"params": params, "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    manifest = {"seed": seed, "pypdf": pypdf.__version__, "documents": documents}
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Generate synthetic AcroForm PDFs (seeded, reproducible)")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="Write one document to this path")
+    target.add_argument("--corpus", metavar="DIR", help="Write the standard corpus and manifest.json to DIR")
+    ap.add_argument("--pages", type=int, default=1, help="Pages (default 1)")
+    ap.add_argument("--widgets", type=int, default=10, help="Widgets per page (default 10)")
+    ap.add_argument("--seed", type=int, default=0, help="Random seed (default 0)")
+    ap.add_argument("--depth", type=int, default=0, help="Parent field levels above each widget (default 0)")
+    ap.add_argument("--fanout", type=int, default=4, help="Kids per parent field with --depth (default 4)")
+    ap.add_argument("--noise", type=int, default=0, help="Non-widget annotations per page (default 0)")
+    ap.add_argument("--da", choices=DA_MODES, default="shared", help="Shared AcroForm /DA or one per widget")
+    ap.add_argument("--image-kb", type=int, default=0, help="Image of about KB kilobytes per page (default none)")
+    args = ap.parse_args()
+    try:
+        if args.corpus:
+            manifest = generate_corpus(args.corpus, args.seed)
+            print(json.dumps({name: doc["sha256"] for name, doc in manifest["documents"].items()}, indent=2))
+            return 0
+        data = generate_document(
+            args.pages, args.widgets, args.seed, args.depth, args.fanout, args.noise, args.da, args.image_kb
+        )
+    except ValueError as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        return 2
+    Path(args.output).write_bytes(data)
+    print(json.dumps({"output": args.output, "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
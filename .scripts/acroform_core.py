@@ -0,0 +1,345 @@
+"""Shared field descriptor and patch model for the AcroForm scripts (extract, apply).
+
+FieldDescriptor is what extract_acroform_fields.py produces for each Widget; FieldPatch is one
+entry of the patches JSON read by apply_acroform_patches.py. Both use __slots__ so large
+inventories and patch sets stay small in memory, and FieldPatch resolves the camelCase /
+snake_case aliases (fieldId/field_id, fontSize/font_size, ...) once when it is loaded instead of
+on every access.
+
+No pypdf import here: the model is plain Python so it can be loaded before (or without) pypdf.
+"""
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping
+from pathlib import Path
+
+# Field descriptor keys in output order (row objects and columnar "columns" share it).
+FIELD_KEYS = (
+    "id",
+    "rect",
+    "width",
+    "height",
+    "fieldType",
+    "value",
+    "page",
+    "subtype",
+    "fieldName",
+    "fontSize",
+    "maxLen",
+    "flags",
+)
+
+_DESCRIPTOR_SLOTS = (
+    "id",
+    "rect",
+    "width",
+    "height",
+    "field_type",
+    "value",
+    "page",
+    "subtype",
+    "field_name",
+    "font_size",
+    "max_len",
+    "flags",
+)
+_SLOT_BY_KEY = dict(zip(FIELD_KEYS, _DESCRIPTOR_SLOTS))
+
+
+class FieldDescriptor(Mapping):
+    """One extracted Widget field (see FIELD_KEYS for the JSON keys).
+
+    Read-only Mapping keyed by the JSON names, so code written against the former dict
+    descriptors (field["id"], "rect" in field, field == {...}) keeps working. json.dumps()
+    needs default=json_default (or to_dict()) to serialize it.
+    """
+
+    __slots__ = _DESCRIPTOR_SLOTS
+
+    def __init__(
+        self,
+        id: str,
+        rect: list[float],
+        width: float,
+        height: float,
+        field_type: str,
+        value: str,
+        page: int,
+        subtype: str,
+        field_name: str,
+        font_size: float | None,
+        max_len: int | None,
+        flags: int | None,
+    ) -> None:
+        self.id = id
+        self.rect = rect
+        self.width = width
+        self.height = height
+        self.field_type = field_type
+        self.value = value
+        self.page = page
+        self.subtype = subtype
+        self.field_name = field_name
+        self.font_size = font_size
+        self.max_len = max_len
+        self.flags = flags
+
+    def __getitem__(self, key: str):
+        slot = _SLOT_BY_KEY.get(key)
+        if slot is None:
+            raise KeyError(key)
+        return getattr(self, slot)
+
+    def __iter__(self):
+        return iter(FIELD_KEYS)
+
+    def __len__(self) -> int:
+        return len(FIELD_KEYS)
+
+    def __repr__(self) -> str:
+        return f"FieldDescriptor({self.to_dict()!r})"
+
+    def values_tuple(self) -> tuple:
+        """Return the values in FIELD_KEYS order (used by the columnar encoder)."""
+        return (
+            self.id,
+            self.rect,
+            self.width,
+            self.height,
+            self.field_type,
+            self.value,
+            self.page,
+            self.subtype,
+            self.field_name,
+            self.font_size,
+            self.max_len,
+            self.flags,
+        )
+
+    def to_dict(self) -> dict:
+        """Return the descriptor as a plain dict with the JSON keys."""
+        return dict(zip(FIELD_KEYS, self.values_tuple()))
+
+
+def json_default(obj):
+    """json.dumps(default=...) hook: serialize FieldDescriptor / FieldPatch objects."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _pdf_font_name(font_family: str | None) -> str:
+    """Map CSS/common font family names to PDF base font name (no leading slash).
+    Uses only the 14 standard PDF fonts so no embedding is required.
+    """
+    if not font_family or not isinstance(font_family, str):
+        return "Helvetica"
+    name = font_family.strip().lower()
+    if name in ("times", "times new roman", "times-new-roman", "serif"):
+        return "Times-Roman"
+    if name in ("times bold", "times-new-roman bold"):
+        return "Times-Bold"
+    if name in ("courier", "courier new", "monospace"):
+        return "Courier"
+    if name in ("courier bold", "courier new bold"):
+        return "Courier-Bold"
+    if name in ("helvetica", "arial", "sans-serif", "sans serif"):
+        return "Helvetica"
+    if name in ("helvetica bold", "arial bold"):
+        return "Helvetica-Bold"
+    # Default and any unknown -> Helvetica
+    return "Helvetica"
+
+
+def _build_da_string(font_size: float, font_family: str | None) -> str:
+    """Build PDF default appearance string: 0 0 0 rg /FontName size Tf (black text)."""
+    pdf_font = _pdf_font_name(font_family)
+    size = max(1, min(999, float(font_size)))
+    return f"0 0 0 rg /{pdf_font} {size:.1f} Tf"
+
+
+def _patch_field_type(patch: dict) -> str | None:
+    """Map patch fieldType or controlType to PDF /FT value: /Tx, /Btn, /Ch."""
+    ft = patch.get("fieldType") or patch.get("field_type")
+    if ft is not None:
+        s = str(ft).strip().lower()
+        if s in ("tx", "text"):
+            return "/Tx"
+        if s in ("btn", "button", "checkbox"):
+            return "/Btn"
+        if s in ("ch", "choice", "select"):
+            return "/Ch"
+        if s in ("sig", "signature"):
+            return "/Sig"
+        if ft in ("/Tx", "/Btn", "/Ch", "/Sig"):
+            return ft if ft.startswith("/") else f"/{ft}"
+    control = patch.get("controlType") or patch.get("control_type")
+    if control is not None:
+        c = str(control).strip().lower()
+        if c in ("text", "textarea"):
+            return "/Tx"
+        if c == "checkbox":
+            return "/Btn"
+        if c in ("select", "choice"):
+            return "/Ch"
+    return None
+
+
+def _first(d: dict, *keys: str):
+    """Return the first truthy value among the alias keys (camelCase first), else None."""
+    for key in keys:
+        val = d.get(key)
+        if val:
+            return val
+    return None
+
+
+def _parse_page_idx(fid: str) -> tuple[int, int] | None:
+    """Parse "p1-0" (page 1, annotation 0) or "Name@1-0" (deduplicated extractor id)."""
+    try:
+        if fid.startswith("p") and "-" in fid and "@" not in fid:
+            page_str, idx_str = fid[1:].split("-", 1)
+        elif "@" in fid and "-" in fid:
+            page_str, idx_str = fid.split("@", 1)[1].split("-", 1)
+        else:
+            return None
+        return int(page_str), int(idx_str)
+    except (ValueError, IndexError):
+        return None
+
+
+class FieldPatch:
+    """One AcroForm patch, normalized once from the JSON dict.
+
+    Aliases are resolved here (fieldId/field_id, fieldName/field_name, fontSize/font_size, ...),
+    numbers and rects are converted, and the default appearance string and PDF /FT are
+    precomputed, so apply_patches() only reads attributes. Attributes that were absent or
+    invalid in the JSON are None.
+    """
+
+    __slots__ = (
+        "field_id",
+        "field_name",
+        "page_idx",
+        "rect",
+        "rect_space",
+        "default_value",
+        "hidden",
+        "label",
+        "field_type",
+        "max_len",
+        "options",
+        "da",
+        "page",
+        "create_if_missing",
+    )
+
+    def __init__(self, data: dict) -> None:
+        self.field_id = str(_first(data, "fieldId", "field_id") or "")
+        fn = _first(data, "fieldName", "field_name")
+        self.field_name = str(fn).strip() if fn else ""
+        # (page, annotation index) for "pN-idx" and "Name@N-idx" ids; None means match by name
+        self.page_idx = _parse_page_idx(self.field_id) if self.field_id else None
+
+        rect = data.get("rect")
+        self.rect = None
+        if isinstance(rect, (list, tuple)) and len(rect) >= 4:
+            try:
+                self.rect = [float(rect[0]), float(rect[1]), float(rect[2]), float(rect[3])]
+            except (TypeError, ValueError):
+                self.rect = None
+        # rectUnit/rectOrigin: rect is [x, y, x + width, y + height] in viewer space (pdf_coords.py),
+        # converted with the matched widget's page geometry; an unknown unit or origin drops the rect
+        self.rect_space = None
+        unit, origin = _first(data, "rectUnit", "rect_unit"), _first(data, "rectOrigin", "rect_origin")
+        if self.rect is not None and (unit is not None or origin is not None):
+            from pdf_coords import ORIGINS, UNIT_TO_PT
+
+            space = (unit or "pt", origin or "top_left")
+            if space[0] in UNIT_TO_PT and space[1] in ORIGINS:
+                self.rect_space = space
+            else:
+                self.rect = None
+
+        dv = data["defaultValue"] if "defaultValue" in data else data.get("default_value")
+        self.default_value = str(dv) if dv is not None else None
+        self.hidden = data.get("hidden") is True
+        label = data.get("label")
+        self.label = str(label).strip() if label is not None and str(label).strip() else None
+        self.field_type = _patch_field_type(data)
+
+        max_len = data["maxLen"] if "maxLen" in data else data.get("max_len")
+        try:
+            self.max_len = int(max_len) if max_len is not None else None
+        except (TypeError, ValueError):
+            self.max_len = None
+
+        options = data.get("options")
+        self.options = options if isinstance(options, list) and len(options) > 0 else None
+
+        # Default appearance (/DA) only when a font size or family was requested
+        self.da = None
+        if "fontSize" in data or "fontFamily" in data or "font_size" in data or "font_family" in data:
+            try:
+                size = float(_first(data, "fontSize", "font_size") or 11)
+                self.da = _build_da_string(size, _first(data, "fontFamily", "font_family"))
+            except (TypeError, ValueError):
+                self.da = None
+
+        try:
+            self.page = int(data.get("page", 1))
+        except (TypeError, ValueError):
+            self.page = 0  # out of range: never created
+        cim = data.get("createIfMissing")
+        self.create_if_missing = (
+            cim is True
+            or (isinstance(cim, str) and cim.lower() in ("true", "1"))
+            or data.get("create_if_missing") is True
+        )
+
+    def canonical(self) -> list:
+        """The normalized attributes in slot order (JSON-serializable): equal for patches that apply the same."""
+        return [getattr(self, name) for name in self.__slots__]
+
+    def pdf_rect(self, page) -> list[float] | None:
+        """The patch rect in PDF user space points for a pypdf page (converted from rect_space)."""
+        if self.rect is None or self.rect_space is None:
+            return self.rect
+        from pdf_coords import page_geometry, rects_from_viewer
+
+        return rects_from_viewer([self.rect], page_geometry(page), *self.rect_space)[0]
+
+    def to_dict(self) -> dict:
+        """Return the normalized patch with camelCase keys (None values omitted)."""
+        out = {
+            "fieldId": self.field_id,
+            "fieldName": self.field_name or None,
+            "rect": self.rect,
+            "rectUnit": self.rect_space[0] if self.rect_space else None,
+            "rectOrigin": self.rect_space[1] if self.rect_space else None,
+            "defaultValue": self.default_value,
+            "hidden": self.hidden or None,
+            "label": self.label,
+            "fieldType": self.field_type,
+            "maxLen": self.max_len,
+            "options": self.options,
+            "da": self.da,
+            "page": self.page,
+            "createIfMissing": self.create_if_missing or None,
+        }
+        return {k: v for k, v in out.items() if v is not None}
+
+
+def normalize_patches(data) -> list[FieldPatch]:
+    """Normalize a decoded patches JSON value; anything but a list of objects yields []."""
+    if not isinstance(data, list):
+        return []
+    return [FieldPatch(p) for p in data if isinstance(p, dict)]
+
+
+def load_patches(patches_path: str | Path) -> list[FieldPatch]:
+    """Read and normalize the patches JSON file (array of patch objects)."""
+    with open(patches_path, encoding="utf-8") as f:
+        return normalize_patches(json.load(f))
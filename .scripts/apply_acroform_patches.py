@@ -7,10 +7,30 @@ Applies per field: rect, defaultValue (/V, /DV), hidden (remove widget), label (
 fieldType (/FT), options (/Opt for choice), maxLen (/MaxLen), default appearance (/DA) when fontSize or fontFamily.
 Matches by: (page, idx) for "p1-0", by fieldName (/T), or by fieldId.
 If createIfMissing and no match, creates a new Widget at rect (page required).
+rect is [llx, lly, urx, ury] in PDF points, or, with rectUnit and/or rectOrigin, a viewer-space
+rect [x, y, x + width, y + height] as extract_acroform_fields.py --viewer-space reports it.
 
 Usage:
   python apply_acroform_patches.py --pdf input.pdf --patches patches.json > output.pdf
   python apply_acroform_patches.py --pdf input.pdf --patches patches.json --dry-run  # stdout: JSON validation result
+  python apply_acroform_patches.py --pdf input.pdf --patches patches.json --optimize > output.pdf  # GC + object streams
+  python apply_acroform_patches.py --pdf input.pdf --patches patches.json --compress 9 > output.pdf  # recompress streams
+  python apply_acroform_patches.py --pdf input.pdf --patches patches.json --linearize > output.pdf  # fast web view
+  python apply_acroform_patches.py --pdf input.pdf --patches patches.json --deterministic > output.pdf  # reproducible bytes
+
+With --deterministic (or PDF_SCRIPTS_DETERMINISTIC=1) the same input PDF and patches always give
+byte-identical output, so its SHA-256 can serve as ETag or storage key: the trailer /ID is
+derived from the input bytes, the normalized patches and the output options
+(pdf_digest.set_content_id) instead of being copied from the input or left out, and nothing
+time-dependent is written.
+
+Besides the plain debug line, a JSON line with the SHA-256 fingerprints of the input and of the
+written output (computed while they are read and written, pdf_digest.py) goes to stderr:
+  {"script": "apply_acroform_patches", "input_sha256": ..., "input_bytes": ..., "output_sha256": ..., "output_bytes": ...}
+With --timings (or PDF_SCRIPTS_TIMINGS=1) the same line also carries version, totalMs, phases
+(load, import, parse, index, mutate, appearance, serialize, write; ms) and counts (pages,
+annotations, patches, matched, created, hidden), see pdf_phases.py. --profile PATH (or
+PDF_SCRIPTS_PROFILE) writes a cProfile dump of the run (pdf_profile.py).
 
 Requires: pypdf (pip install pypdf). Python 3.9+.
 """
@@ -18,8 +38,20 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 from pathlib import Path
+from typing import BinaryIO
+
+from acroform_core import FieldPatch, _build_da_string, _patch_field_type, _pdf_font_name, load_patches  # noqa: F401
+from pdf_digest import HashingReader, HashingWriter, digest_report, set_content_id
+from pdf_entry import run_script
+from pdf_memory import add_memory_arguments, check as check_memory, configure as configure_memory, report as memory_report
+from pdf_phases import NULL_TIMER, PhaseTimer, timings_enabled
+from pdf_profile import add_profile_arguments
+
+
+_IndirectObject = None  # pypdf.generic.IndirectObject, bound by the first _resolve() (pypdf loads lazily)
 
 
 def _resolve(obj, reader):
@@ -27,12 +59,17 @@ def _resolve(obj, reader):
 
     If obj is an IndirectObject, returns the dereferenced object; otherwise returns obj.
     """
-    try:
-        from pypdf.generic import IndirectObject
-        if isinstance(obj, IndirectObject):
+    global _IndirectObject
+    if _IndirectObject is None:
+        try:
+            from pypdf.generic import IndirectObject as _IndirectObject
+        except ImportError:
+            return obj
+    if isinstance(obj, _IndirectObject):
+        try:
             return reader.get_object(obj)
-    except Exception:
-        pass
+        except Exception:
+            pass
     return obj
 
 
@@ -49,74 +86,40 @@ def _get_inheritable(obj, key, reader):
     return None
 
 
-def _pdf_font_name(font_family: str | None) -> str:
-    """Map CSS/common font family names to PDF base font name (no leading slash).
-    Uses only the 14 standard PDF fonts so no embedding is required.
-    """
-    if not font_family or not isinstance(font_family, str):
-        return "Helvetica"
-    name = font_family.strip().lower()
-    if name in ("times", "times new roman", "times-new-roman", "serif"):
-        return "Times-Roman"
-    if name in ("times bold", "times-new-roman bold"):
-        return "Times-Bold"
-    if name in ("courier", "courier new", "monospace"):
-        return "Courier"
-    if name in ("courier bold", "courier new bold"):
-        return "Courier-Bold"
-    if name in ("helvetica", "arial", "sans-serif", "sans serif"):
-        return "Helvetica"
-    if name in ("helvetica bold", "arial bold"):
-        return "Helvetica-Bold"
-    # Default and any unknown -> Helvetica
-    return "Helvetica"
-
-
-def _build_da_string(font_size: float, font_family: str | None) -> str:
-    """Build PDF default appearance string: 0 0 0 rg /FontName size Tf (black text)."""
-    pdf_font = _pdf_font_name(font_family)
-    size = max(1, min(999, float(font_size)))
-    return f"0 0 0 rg /{pdf_font} {size:.1f} Tf"
-
-
-def _patch_field_type(patch: dict) -> str | None:
-    """Map patch fieldType or controlType to PDF /FT value: /Tx, /Btn, /Ch."""
-    ft = patch.get("fieldType") or patch.get("field_type")
-    if ft is not None:
-        s = str(ft).strip().lower()
-        if s in ("tx", "text"):
-            return "/Tx"
-        if s in ("btn", "button", "checkbox"):
-            return "/Btn"
-        if s in ("ch", "choice", "select"):
-            return "/Ch"
-        if s in ("sig", "signature"):
-            return "/Sig"
-        if ft in ("/Tx", "/Btn", "/Ch", "/Sig"):
-            return ft if ft.startswith("/") else f"/{ft}"
-    control = patch.get("controlType") or patch.get("control_type")
-    if control is not None:
-        c = str(control).strip().lower()
-        if c in ("text", "textarea"):
-            return "/Tx"
-        if c == "checkbox":
-            return "/Btn"
-        if c in ("select", "choice"):
-            return "/Ch"
-    return None
-
-
-def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
+def apply_patches(
+    pdf_path: str | Path | BinaryIO,
+    patches_path: str | Path,
+    optimize: bool = False,
+    compress_level: int | None = None,
+    linearize: bool = False,
+    timer=None,
+    deterministic: bool = False,
+) -> bytes:
     """Apply AcroForm patches to a PDF and return the modified PDF as bytes.
 
-    Reads the patches JSON (array of dicts with fieldId, rect?, defaultValue?, hidden?, etc.).
+    Reads the patches JSON (array of dicts with fieldId, rect?, defaultValue?, hidden?, etc.) and
+    normalizes each entry once into a FieldPatch (aliases resolved, values converted).
     Matches patches to annotations by (page, index) for ids like "p1-0", or by field name (/T).
     Applies: rect update, /V and /DV for default value, and removes widget when hidden is True.
     Writes the result to an in-memory buffer and returns its value.
 
     Args:
-        pdf_path: Path to the input PDF file.
+        pdf_path: Path to the input PDF file, or a binary stream positioned at its start (read to
+            the end once, e.g. a pdf_digest.HashingReader that fingerprints the input).
         patches_path: Path to the JSON file containing the patches array.
+        optimize: Write with pdf_optimize.write_optimized(): drop unreachable objects (e.g.
+            widgets removed by hidden and their /Fields entries), merge identical objects and
+            use object streams with a cross-reference stream.
+        compress_level: When set, recompress uncompressed and Flate streams at this zlib level
+            on a thread pool (pdf_recompress.recompress_writer) before writing.
+        linearize: Write a linearized ("fast web view") PDF with pdf_linearize.write_linearized()
+            so viewers can show page 1 before the whole file is loaded. Includes the garbage
+            collection of optimize, but no object streams; takes precedence over optimize.
+        timer: pdf_phases.PhaseTimer recording the load (patches JSON), import, parse, index,
+            mutate, appearance and serialize phases and the pages, annotations, patches,
+            matched, created and hidden counts (None = no timing).
+        deterministic: Derive the trailer /ID from the input bytes, the normalized patches and
+            the output options (pdf_digest.set_content_id), so equal inputs give equal bytes.
 
     Returns:
         Modified PDF file as raw bytes (suitable for stdout or HTTP response).
@@ -124,10 +127,17 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
     Raises:
         SystemExit: If pypdf is not installed.
     """
+    timer = timer or NULL_TIMER
+    timer.mark()
+    # Patches first: a bad patches file fails before pypdf is imported
+    patches = load_patches(patches_path)
+    timer.lap("load")
     try:
         from pypdf import PdfReader, PdfWriter
         from pypdf.generic import (
             ArrayObject,
+            BooleanObject,
+            DictionaryObject,
             FloatObject,
             NameObject,
             TextStringObject,
@@ -142,54 +152,40 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
         _detail = f" sys.path[0]={_sys.path[0]!r} PYTHONPATH={os.environ.get('PYTHONPATH', '')!r}"
         raise SystemExit(f"Requires pypdf. Install with: pip install pypdf. Debug: {e!r}{_detail}") from e
 
-    with open(patches_path, encoding="utf-8") as f:
-        patches = json.load(f)
-    if not isinstance(patches, list):
-        patches = []
+    N = NameObject
+    timer.lap("import")
 
-    reader = PdfReader(str(pdf_path))
+    if hasattr(pdf_path, "read"):
+        data = pdf_path.read()
+    else:
+        data = Path(pdf_path).read_bytes()
+    reader = PdfReader(__import__("io").BytesIO(data))
     writer = PdfWriter()
     writer.append(reader)
+    timer.lap("parse")
 
     # Index patches by (page_num, annot_index) for "pN-idx" ids and "X@N-idx", and by field name (/T) for names
-    patches_by_page_idx: dict[tuple[int, int], dict] = {}
-    patches_by_name: dict[str, dict] = {}
+    patches_by_page_idx: dict[tuple[int, int], FieldPatch] = {}
+    patches_by_name: dict[str, FieldPatch] = {}
     # Per-page field name -> value for update_page_form_field_values (updates /AP for visibility)
     page_field_values: dict[int, dict[str, str]] = {}
     for p in patches:
-        fid = p.get("fieldId") or p.get("field_id") or ""
+        fid = p.field_id
         if not fid:
             continue
-        fid = str(fid)
-        if fid.startswith("p") and "-" in fid and "@" not in fid:
-            try:
-                # e.g. "p1-0" -> page 1, annotation index 0
-                parts = fid.split("-", 1)
-                page_num = int(parts[0][1:])
-                idx = int(parts[1])
-                patches_by_page_idx[(page_num, idx)] = p
-            except (ValueError, IndexError):
-                patches_by_name[fid] = p
-        elif "@" in fid and "-" in fid:
-            try:
-                # e.g. "Nombre@1-0" -> deduplicated id from extractor; match by (page, idx)
-                suffix = fid.split("@", 1)[1]
-                page_str, idx_str = suffix.split("-", 1)
-                page_num = int(page_str)
-                idx = int(idx_str)
-                patches_by_page_idx[(page_num, idx)] = p
-            except (ValueError, IndexError):
-                patches_by_name[fid] = p
+        if p.page_idx is not None:
+            patches_by_page_idx[p.page_idx] = p
         else:
             patches_by_name[fid] = p
         # Index by fieldName too: extractor/load use ids like "509R" but PDF /T is "NOMBRE Y APELLIDOS"
-        fn = p.get("fieldName") or p.get("field_name")
-        if fn and (fn := str(fn).strip()) and fn != fid:
-            patches_by_name[fn] = p
+        if p.field_name and p.field_name != fid:
+            patches_by_name[p.field_name] = p
+    timer.lap("index")
 
     applied_count = 0
     matched_patch_ids: set[str] = set()  # fieldIds of patches that were matched
     for page_num in range(1, len(reader.pages) + 1):
+        check_memory(f"page {page_num}")
         page = writer.pages[page_num - 1]
         annots = page.get("/Annots")
         if annots is None:
@@ -198,6 +194,8 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
             annots = [annots]
         else:
             annots = list(annots)
+        if timer:
+            timer.count("annotations", len(annots))
 
         new_annots = []
         for idx, ref in enumerate(annots):
@@ -216,7 +214,8 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
                         except Exception:
                             pass
             # Skip this annotation entirely if patch says hidden
-            if patch and patch.get("hidden") is True:
+            if patch is not None and patch.hidden:
+                timer.count("hidden")
                 continue
 
             annot = _resolve(ref, writer)
@@ -224,75 +223,56 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
                 new_annots.append(ref)
                 continue
 
-            if patch:
+            if patch is not None:
                 applied_count += 1
-                matched_patch_ids.add(str(patch.get("fieldId") or patch.get("field_id") or ""))
-                from pypdf.generic import NameObject as N
-
+                matched_patch_ids.add(patch.field_id)
                 parent = annot.get("/Parent")
                 pobj = _resolve(parent, writer) if parent is not None else None
 
-                # Update widget rect (llx, lly, urx, ury in PDF points)
-                if "rect" in patch and isinstance(patch["rect"], (list, tuple)) and len(patch["rect"]) >= 4:
-                    try:
-                        rect = ArrayObject(
-                            [
-                                FloatObject(float(patch["rect"][0])),
-                                FloatObject(float(patch["rect"][1])),
-                                FloatObject(float(patch["rect"][2])),
-                                FloatObject(float(patch["rect"][3])),
-                            ]
-                        )
-                        annot[N("/Rect")] = rect
-                    except (TypeError, ValueError):
-                        pass
+                # Update widget rect (llx, lly, urx, ury in PDF points, converted from rectUnit/rectOrigin)
+                if patch.rect is not None:
+                    annot[N("/Rect")] = ArrayObject([FloatObject(v) for v in patch.pdf_rect(page)])
 
                 # Label/tooltip on widget (/TU)
-                if "label" in patch and patch["label"] is not None and str(patch["label"]).strip():
-                    annot[N("/TU")] = TextStringObject(str(patch["label"]).strip())
+                if patch.label is not None:
+                    annot[N("/TU")] = TextStringObject(patch.label)
 
                 # Set current and default value on widget and parent field
-                if "defaultValue" in patch:
-                    val = patch["defaultValue"]
-                    if val is not None:
-                        val_str = str(val)
-                        annot[N("/V")] = TextStringObject(val_str)
-                        annot[N("/DV")] = TextStringObject(val_str)
-                        if pobj is not None:
-                            pobj[N("/V")] = TextStringObject(val_str)
-                            pobj[N("/DV")] = TextStringObject(val_str)
-                        # Collect for update_page_form_field_values (regenerates appearance stream)
-                        name = _get_inheritable(annot, "/T", writer)
-                        if name is not None:
-                            try:
-                                fn = name.get_object() if hasattr(name, "get_object") else str(name)
-                                if isinstance(fn, bytes):
-                                    fn = fn.decode("utf-8", errors="replace")
-                                fn = str(fn).strip()
-                                if fn:
-                                    if page_num not in page_field_values:
-                                        page_field_values[page_num] = {}
-                                    page_field_values[page_num][fn] = val_str
-                            except Exception:
-                                pass
+                if patch.default_value is not None:
+                    val_str = patch.default_value
+                    annot[N("/V")] = TextStringObject(val_str)
+                    annot[N("/DV")] = TextStringObject(val_str)
+                    if pobj is not None:
+                        pobj[N("/V")] = TextStringObject(val_str)
+                        pobj[N("/DV")] = TextStringObject(val_str)
+                    # Collect for update_page_form_field_values (regenerates appearance stream)
+                    name = _get_inheritable(annot, "/T", writer)
+                    if name is not None:
+                        try:
+                            fn = name.get_object() if hasattr(name, "get_object") else str(name)
+                            if isinstance(fn, bytes):
+                                fn = fn.decode("utf-8", errors="replace")
+                            fn = str(fn).strip()
+                            if fn:
+                                if page_num not in page_field_values:
+                                    page_field_values[page_num] = {}
+                                page_field_values[page_num][fn] = val_str
+                        except Exception:
+                            pass
 
                 # Field type (/FT) on parent: Tx, Btn, Ch
                 if pobj is not None:
-                    ft = _patch_field_type(patch)
-                    if ft is not None:
-                        pobj[N("/FT")] = N(ft)
+                    if patch.field_type is not None:
+                        pobj[N("/FT")] = N(patch.field_type)
 
                     # Max length for text fields (/MaxLen)
-                    if "maxLen" in patch and patch["maxLen"] is not None:
-                        try:
-                            pobj[N("/MaxLen")] = NumberObject(int(patch["maxLen"]))
-                        except (TypeError, ValueError):
-                            pass
+                    if patch.max_len is not None:
+                        pobj[N("/MaxLen")] = NumberObject(patch.max_len)
 
                     # Options for choice fields (/Opt): list of strings or [[export, display], ...]
-                    if "options" in patch and isinstance(patch["options"], list) and len(patch["options"]) > 0:
+                    if patch.options is not None:
                         opt_list = []
-                        for item in patch["options"]:
+                        for item in patch.options:
                             if isinstance(item, dict):
                                 v = item.get("value", "")
                                 lbl = item.get("label")
@@ -309,65 +289,44 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
                             pobj[N("/Opt")] = ArrayObject(opt_list)
 
                 # Default appearance (/DA) for text: font and size (widget-level)
-                if "fontSize" in patch or "fontFamily" in patch:
-                    try:
-                        size = float(patch.get("fontSize") or patch.get("font_size") or 11)
-                        family = patch.get("fontFamily") or patch.get("font_family")
-                        da_str = _build_da_string(size, family)
-                        annot[N("/DA")] = TextStringObject(da_str)
-                    except (TypeError, ValueError):
-                        pass
+                if patch.da is not None:
+                    annot[N("/DA")] = TextStringObject(patch.da)
 
             new_annots.append(ref)
 
         # If we removed any annotations (hidden), update the page's /Annots array
         if len(new_annots) != len(annots):
-            from pypdf.generic import ArrayObject as Arr, NameObject as N
-            page[N("/Annots")] = Arr(new_annots)
+            page[N("/Annots")] = ArrayObject(new_annots)
 
     # Create new Widgets for unmatched patches with createIfMissing or fieldId starting with "new-" (add-field from editor)
     for p in patches:
-        fid = str(p.get("fieldId") or p.get("field_id") or "")
+        fid = p.field_id
         if fid in matched_patch_ids:
             continue
-        create_new = (
-            p.get("createIfMissing") is True
-            or (isinstance(p.get("createIfMissing"), str) and str(p.get("createIfMissing")).lower() in ("true", "1"))
-            or p.get("create_if_missing") is True
-        )
-        if not create_new and not fid.startswith("new-"):
+        if not p.create_if_missing and not fid.startswith("new-"):
             continue
-        rect_data = p.get("rect")
-        if not isinstance(rect_data, (list, tuple)) or len(rect_data) < 4:
+        if p.rect is None:
             continue
-        name = (p.get("fieldName") or p.get("field_name") or fid or "Field").strip()
-        page_num = int(p.get("page", 1))
+        name = (p.field_name or fid or "Field").strip()
+        page_num = p.page
         if page_num < 1 or page_num > len(writer.pages):
             continue
         try:
-            from pypdf.generic import BooleanObject, DictionaryObject, NameObject as N, TextStringObject
-
-            rect = ArrayObject([FloatObject(float(rect_data[0])), FloatObject(float(rect_data[1])),
-                               FloatObject(float(rect_data[2])), FloatObject(float(rect_data[3]))])
-            val = str(p.get("defaultValue", "")) if p.get("defaultValue") is not None else ""
+            page = writer.pages[page_num - 1]
+            rect = ArrayObject([FloatObject(v) for v in p.pdf_rect(page)])
+            val = p.default_value if p.default_value is not None else ""
             widget = DictionaryObject({
                 N("/Subtype"): N("/Widget"),
                 N("/Rect"): rect,
                 N("/T"): TextStringObject(name),
-                N("/FT"): N(_patch_field_type(p) or "/Tx"),
+                N("/FT"): N(p.field_type or "/Tx"),
                 N("/V"): TextStringObject(val),
                 N("/DV"): TextStringObject(val),
             })
-            if "fontSize" in p or "fontFamily" in p:
-                try:
-                    size = float(p.get("fontSize") or p.get("font_size") or 11)
-                    family = p.get("fontFamily") or p.get("font_family")
-                    widget[N("/DA")] = TextStringObject(_build_da_string(size, family))
-                except (TypeError, ValueError):
-                    pass
+            if p.da is not None:
+                widget[N("/DA")] = TextStringObject(p.da)
             writer._objects.append(widget)
             ref = writer.get_reference(widget)
-            page = writer.pages[page_num - 1]
             annots = list(page.get("/Annots") or [])
             annots.append(ref)
             page[N("/Annots")] = ArrayObject(annots)
@@ -382,9 +341,11 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
                 acro = {N("/Fields"): ArrayObject([ref]), N("/NeedAppearances"): BooleanObject(True)}
                 root[N("/AcroForm")] = acro
             applied_count += 1
+            timer.count("created")
         except (TypeError, ValueError, KeyError):
             pass
 
+    timer.lap("mutate")
     # Use pypdf's form API to update appearance streams (visible in PDF.js and other viewers)
     for page_num, fields_dict in page_field_values.items():
         if fields_dict and page_num <= len(writer.pages):
@@ -398,12 +359,42 @@ def apply_patches(pdf_path: str | Path, patches_path: str | Path) -> bytes:
                 pass
     # Ensure NeedAppearances is set so readers regenerate if update_page_form_field_values didn't
     writer.set_need_appearances_writer(True)
+    timer.lap("appearance")
+    if deterministic:
+        set_content_id(
+            writer,
+            data,
+            json.dumps([p.canonical() for p in patches], ensure_ascii=False, separators=(",", ":")),
+            f"optimize={optimize} compress={compress_level} linearize={linearize}",
+        )
     buf = __import__("io").BytesIO()
-    writer.write(buf)
+    opt_info = ""
+    if compress_level is not None:
+        from pdf_recompress import recompress_writer
+        cstats = recompress_writer(writer, level=compress_level)
+        opt_info += f" compress_saved={cstats['bytesSaved']} compressed_streams={cstats['recompressed']}"
+    if linearize:
+        from pdf_linearize import write_linearized
+        stats = write_linearized(writer, buf)
+        opt_info += f" input_bytes={len(data)} first_page_end={stats.get('firstPageEnd')}"
+    elif optimize:
+        from pdf_optimize import write_optimized
+        stats = write_optimized(writer, buf)
+        opt_info += (
+            f" input_bytes={len(data)}"
+            f" objects={stats['objectsBefore']}->{stats.get('objectsAfter', stats['objectsBefore'])}"
+        )
+    else:
+        writer.write(buf)
     out = buf.getvalue()
+    timer.lap("serialize")
+    if timer:
+        timer.count("pages", len(writer.pages))
+        timer.count("patches", len(patches))
+        timer.count("matched", len(matched_patch_ids))
     # Debug: one line to stderr (PHP listener logs it when script succeeds)
     print(
-        f"[apply_acroform] patches={len(patches)} matched={applied_count} output_bytes={len(out)}",
+        f"[apply_acroform] patches={len(patches)} matched={applied_count} output_bytes={len(out)}{opt_info}",
         file=sys.stderr,
     )
     return out
@@ -415,9 +406,56 @@ def main() -> None:
     ap.add_argument("--pdf", required=True, help="Path to input PDF")
     ap.add_argument("--patches", required=True, help="Path to JSON patches file")
     ap.add_argument("--dry-run", action="store_true", help="Validate only: run apply in memory, output JSON result to stdout")
+    ap.add_argument(
+        "--optimize",
+        action="store_true",
+        default=os.environ.get("PDF_APPLY_OPTIMIZE", "").lower() in ("1", "true"),
+        help="Drop unreachable objects, merge duplicates and write object/xref streams (env PDF_APPLY_OPTIMIZE=1)",
+    )
+    ap.add_argument(
+        "--compress",
+        nargs="?",
+        type=int,
+        const=9,
+        default=int(os.environ["PDF_APPLY_COMPRESS"]) if os.environ.get("PDF_APPLY_COMPRESS", "").isdigit() else None,
+        metavar="LEVEL",
+        help="Recompress streams with zlib LEVEL (default 9) on a thread pool (env PDF_APPLY_COMPRESS=LEVEL)",
+    )
+    ap.add_argument(
+        "--linearize",
+        action="store_true",
+        default=os.environ.get("PDF_APPLY_LINEARIZE", "").lower() in ("1", "true"),
+        help="Write a linearized (fast web view) PDF; implies the garbage collection of --optimize (env PDF_APPLY_LINEARIZE=1)",
+    )
+    ap.add_argument(
+        "--deterministic",
+        action="store_true",
+        default=os.environ.get("PDF_SCRIPTS_DETERMINISTIC", "").lower() in ("1", "true"),
+        help="Byte-reproducible output: /ID derived from input, patches and options (env PDF_SCRIPTS_DETERMINISTIC=1)",
+    )
+    ap.add_argument(
+        "--timings",
+        action="store_true",
+        help="Add per-phase times and counts to the JSON line on stderr (env PDF_SCRIPTS_TIMINGS=1)",
+    )
+    add_memory_arguments(ap)
+    add_profile_arguments(ap)
     args = ap.parse_args()
+    configure_memory(args.max_memory_mb, args.trace_memory)
+    timer = PhaseTimer("apply_acroform_patches") if timings_enabled(args.timings) else NULL_TIMER
+    options = {"timer": timer} if timer else {}
+    if args.optimize:
+        options["optimize"] = True
+    if args.compress is not None:
+        options["compress_level"] = args.compress
+    if args.linearize:
+        options["linearize"] = True
+    if args.deterministic:
+        options["deterministic"] = True
     try:
-        out = apply_patches(args.pdf, args.patches)
+        with open(args.pdf, "rb") as fh:
+            source = HashingReader(fh)  # input fingerprint without a second read
+            out = apply_patches(source, args.patches, **options)
         if args.dry_run:
             with open(args.patches, encoding="utf-8") as f:
                 patches_list = json.load(f)
@@ -428,10 +466,21 @@ def main() -> None:
                 "patches_count": patches_count,
             }
             sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if timer:
+                timer.emit(**digest_report(source, None), **memory_report())
         else:
             # Binary PDF to stdout so Symfony Process can capture and return it (no output file).
-            sys.stdout.buffer.write(out)
-            sys.stdout.buffer.flush()
+            with timer.phase("write"):
+                sink = HashingWriter(sys.stdout.buffer)
+                sink.write(out)
+                sink.flush()
+            if timer:
+                timer.emit(**digest_report(source, sink), **memory_report())
+            else:
+                print(
+                    json.dumps({"script": "apply_acroform_patches", **digest_report(source, sink), **memory_report()}),
+                    file=sys.stderr,
+                )
     except Exception as e:  # noqa: BLE001
         if args.dry_run:
             result = {"success": False, "error": str(e)}
@@ -441,4 +490,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    run_script(main, "apply_acroform_patches")
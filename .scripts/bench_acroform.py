@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Benchmark the AcroForm scripts on generated documents of increasing size.
+
+Measures wall time, peak RSS and output size of extract_fields(), apply_patches() with several
+patch sets and the process pipeline, for each size preset (pages x widgets per page):
+
+  extract           extract_fields() (output size: the JSON the CLI prints)
+  apply-small       apply_patches() with 10 value patches
+  apply-large       apply_patches() moving and filling every widget
+  apply-create      apply_patches() creating one new widget per existing widget
+  apply-hidden      apply_patches() hiding every second widget
+  process-copy      run_pipeline() without stages (byte copy)
+  process-fill      run_pipeline() with fill and flatten stages
+
+Documents and patch files are generated up front; each case then runs in its own interpreter
+(a fresh process per repeat), so peak RSS is that case's alone and imports are paid as in a
+real CLI call. Time is the best of --repeat runs, RSS and size the maximum.
+
+Results are written as JSON ({"python", "pypdf", "sizes", "results": {"extract@small":
+{"seconds", "peakRssMb", "outputBytes"}, ...}}). With --compare BASELINE.json each case present
+in both is checked and the exit status is 1 when a metric exceeds the baseline by more than
+--threshold percent (time differences under 5 ms are ignored as noise).
+
+Usage:
+  python bench_acroform.py [--sizes small,medium] [--cases extract,apply-large] [--repeat 3]
+                           [--output results.json] [--compare baseline.json] [--threshold 20]
+
+Requires: pypdf. Peak RSS needs the resource module (not on Windows: reported as null).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# name -> (pages, widgets per page)
+SIZES = {"tiny": (1, 5), "small": (5, 20), "medium": (20, 100), "large": (100, 100)}
+CASES = ("extract", "apply-small", "apply-large", "apply-create", "apply-hidden", "process-copy", "process-fill")
+METRICS = ("seconds", "peakRssMb", "outputBytes")
+NOISE_SECONDS = 0.005
+
+
+def build_document(pages: int, widgets: int) -> bytes:
+    """A form of pages x widgets text fields in a grid (named f{page}_{index}), as PDF bytes."""
+    import io
+
+    from pypdf import PdfWriter
+    from pypdf.generic import (
+        ArrayObject,
+        BooleanObject,
+        DictionaryObject,
+        FloatObject,
+        NameObject,
+        NumberObject,
+        TextStringObject,
+    )
+
+    n = NameObject
+    writer = PdfWriter()
+    fields = ArrayObject()
+    columns = 4
+    for page_num in range(1, pages + 1):
+        page = writer.add_blank_page(width=595, height=842)
+        annots = ArrayObject()
+        for idx in range(widgets):
+            row, col = divmod(idx, columns)
+            x, y = 40 + col * 135, 800 - (row % 38) * 20
+            widget = DictionaryObject(
+                {
+                    n("/Type"): n("/Annot"),
+                    n("/Subtype"): n("/Widget"),
+                    n("/FT"): n("/Tx"),
+                    n("/T"): TextStringObject(f"f{page_num}_{idx}"),
+                    n("/Rect"): ArrayObject([FloatObject(v) for v in (x, y, x + 120, y + 16)]),
+                    n("/DA"): TextStringObject("/Helv 10 Tf 0 g"),
+                    n("/V"): TextStringObject(""),
+                    n("/F"): NumberObject(4),
+                }
+            )
+            ref = writer._add_object(widget)
+            annots.append(ref)
+            fields.append(ref)
+        page[n("/Annots")] = annots
+    writer.root_object[n("/AcroForm")] = writer._add_object(
+        DictionaryObject({n("/Fields"): fields, n("/NeedAppearances"): BooleanObject(True)})
+    )
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def build_patches(kind: str, pages: int, widgets: int) -> list[dict]:
+    """Patch list for apply-<kind> on a build_document(pages, widgets) form."""
+    names = [(p, i, f"f{p}_{i}") for p in range(1, pages + 1) for i in range(widgets)]
+    if kind == "small":
+        return [{"fieldId": name, "defaultValue": f"v{i}"} for p, i, name in names[:10]]
+    if kind == "large":
+        return [
+            {"fieldId": name, "defaultValue": f"value {p}.{i}", "rect": [30 + (i % 4) * 135, 60 + (i // 4 % 38) * 20, 150 + (i % 4) * 135, 76 + (i // 4 % 38) * 20]}
+            for p, i, name in names
+        ]
+    if kind == "create":
+        return [
+            {"fieldId": f"new-{p}-{i}", "fieldName": f"n{p}_{i}", "page": p, "createIfMissing": True, "rect": [20, 20 + i % 38 * 20, 120, 36 + i % 38 * 20]}
+            for p, i, _ in names
+        ]
+    if kind == "hidden":
+        return [{"fieldId": name, "hidden": True} for p, i, name in names if i % 2 == 0]
+    raise ValueError(f"Unknown patch set: {kind}")
+
+
+def run_case(case: str, pdf: str, work: str) -> dict:
+    """Run one case in this process and return its metrics (called in the child interpreter)."""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    from pdf_memory import peak_rss_mb
+
+    start = time.perf_counter()
+    if case == "extract":
+        from acroform_core import json_default
+        from extract_acroform_fields import extract_fields
+
+        output_bytes = len(json.dumps(extract_fields(pdf), ensure_ascii=False, default=json_default).encode("utf-8"))
+    elif case.startswith("apply-"):
+        from apply_acroform_patches import apply_patches
+
+        output_bytes = len(apply_patches(pdf, os.path.join(work, f"{case}.json")))
+    elif case.startswith("process-"):
+        from process_modified_pdf import run_pipeline
+
+        stages = []
+        if case == "process-fill":
+            with open(os.path.join(work, "apply-large.json"), encoding="utf-8") as f:
+                values = {p["fieldId"]: p["defaultValue"] for p in json.load(f)}
+            stages = [("fill", {"values": values}), ("flatten", {})]
+        output = os.path.join(work, f"{case}-{os.getpid()}.pdf")
+        run_pipeline(pdf, output, stages)
+        output_bytes = os.path.getsize(output)
+        os.unlink(output)
+    else:
+        raise ValueError(f"Unknown case: {case}")
+    return {"seconds": time.perf_counter() - start, "peakRssMb": peak_rss_mb(), "outputBytes": output_bytes}
+
+
+def run_benchmarks(sizes: list[str], cases: list[str], repeat: int = 3) -> dict:
+    """Generate the documents and run every case for every size; return the results object."""
+    import pypdf
+
+    for name in sizes:
+        if name not in SIZES:
+            raise ValueError(f"Unknown size: {name} (expected one of {', '.join(SIZES)})")
+    for case in cases:
+        if case not in CASES:
+            raise ValueError(f"Unknown case: {case} (expected one of {', '.join(CASES)})")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_acroform_") as tmp:
+        for name in sizes:
+            pages, widgets = SIZES[name]
+            work = os.path.join(tmp, name)
+            os.mkdir(work)
+            pdf = os.path.join(work, "form.pdf")
+            Path(pdf).write_bytes(build_document(pages, widgets))
+            for kind in ("small", "large", "create", "hidden"):
+                with open(os.path.join(work, f"apply-{kind}.json"), "w", encoding="utf-8") as f:
+                    json.dump(build_patches(kind, pages, widgets), f)
+            for case in cases:
+                runs = []
+                for _ in range(max(1, repeat)):
+                    proc = subprocess.run(
+                        [sys.executable, __file__, "--run-case", case, pdf, work],
+                        capture_output=True,
+                        text=True,
+                    )
+                    if proc.returncode != 0:
+                        raise RuntimeError(f"{case}@{name} failed: {proc.stderr.strip()[-2000:]}")
+                    runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+                rss = [r["peakRssMb"] for r in runs if r["peakRssMb"] is not None]
+                results[f"{case}@{name}"] = {
+                    "seconds": round(min(r["seconds"] for r in runs), 4),
+                    "peakRssMb": max(rss) if rss else None,
+                    "outputBytes": max(r["outputBytes"] for r in runs),
+                    "pages": pages,
+                    "widgets": pages * widgets,
+                }
+    return {
+        "python": sys.version.split()[0],
+        "pypdf": pypdf.__version__,
+        "sizes": {name: SIZES[name] for name in sizes},
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regressions of results against baseline: one message per metric over threshold percent."""
+    failures = []
+    base_results = baseline.get("results", {})
+    for key, current in results.get("results", {}).items():
+        base = base_results.get(key)
+        if base is None:
+            continue
+        for metric in METRICS:
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "seconds" and new - old < NOISE_SECONDS:
+                continue
+            if new > old * (1 + threshold / 100):
+                failures.append(f"{key} {metric}: {new} > {old} + {threshold:g}%")
+    return failures
+
+
+def main() -> None:
+    """Entry point: run the benchmarks, write JSON, optionally compare with a baseline."""
+    if len(sys.argv) == 5 and sys.argv[1] == "--run-case":
+        print(json.dumps(run_case(*sys.argv[2:])))
+        return
+    ap = argparse.ArgumentParser(description="Benchmark the AcroForm scripts")
+    ap.add_argument("--sizes", default="small,medium", help=f"Comma-separated size presets ({', '.join(SIZES)})")
+    ap.add_argument("--cases", default=",".join(CASES), help="Comma-separated cases (default: all)")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest time is kept (default 3)")
+    ap.add_argument("--output", default=None, help="Write the results JSON here (default: stdout)")
+    ap.add_argument("--compare", default=None, metavar="BASELINE", help="Baseline results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=20.0, help="Allowed regression in percent (default 20)")
+    args = ap.parse_args()
+    try:
+        baseline = None
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                baseline = json.load(f)
+        results = run_benchmarks(
+            [s.strip() for s in args.sizes.split(",") if s.strip()],
+            [c.strip() for c in args.cases.split(",") if c.strip()],
+            args.repeat,
+        )
+    except (OSError, ValueError, RuntimeError) as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(2)
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    if baseline is not None:
+        failures = compare(results, baseline, args.threshold)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
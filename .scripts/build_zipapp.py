@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Build precompiled zipapp bundles of the AcroForm scripts for faster cold starts.
+
+Every call of a script pays interpreter start, compiling the script itself (a __main__ script
+is never cached) and, where the bundle's directory is not writable for the PHP user or
+PYTHONDONTWRITEBYTECODE is set, compiling each helper module again. A bundle holds the
+scripts and their helper modules with bytecode compiled once at build time, so a call only
+unmarshals it:
+
+  dist/extract_acroform_fields.pyz
+  dist/apply_acroform_patches.pyz
+  dist/process_modified_pdf.pyz
+
+Each is a drop-in replacement for the .py path in the bundle configuration (python3
+extract_acroform_fields.pyz form.pdf behaves as python3 extract_acroform_fields.py form.pdf)
+and contains all modules, so stage plugins such as pdf_flatten import as before. The bytecode
+is unchecked-hash .pyc for the building Python's version; the sources are included too, so
+another Python version still runs the bundle (compiling on each start, as the .py scripts do).
+Build with the Python that will run the scripts. pypdf and the optional packages are not
+bundled: they are loaded from site-packages as usual.
+
+Usage:
+  python3 .scripts/build_zipapp.py [--output-dir .scripts/dist]
+
+Standard library only.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import py_compile
+import sys
+import tempfile
+import zipapp
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ENTRY_POINTS = ("extract_acroform_fields", "apply_acroform_patches", "process_modified_pdf")
+EXCLUDE = {"bench_acroform", "build_zipapp", "replay_acroform"}  # development tools, not needed at runtime
+MAIN = """import runpy
+
+runpy.run_module({module!r}, run_name="__main__", alter_sys=True)
+"""
+
+
+def bundle_modules() -> list[Path]:
+    """The runtime modules of .scripts/ (scripts and helpers; not tests, PoC or dev tools)."""
+    return sorted(p for p in SCRIPT_DIR.glob("*.py") if p.stem not in EXCLUDE)
+
+
+def build_zipapps(output_dir: str | Path, entry_points=ENTRY_POINTS) -> dict[str, str]:
+    """Write one <entry point>.pyz per entry point into output_dir; return {entry point: path}."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    built = {}
+    with tempfile.TemporaryDirectory(prefix="pdf_zipapp_") as tmp:
+        staging = Path(tmp) / "app"
+        staging.mkdir()
+        for source in bundle_modules():
+            (staging / source.name).write_bytes(source.read_bytes())
+            # Sourceless layout (module.pyc next to module.py): zipimport prefers it, and falls
+            # back to the source when the magic number is another Python version's
+            py_compile.compile(
+                str(source),
+                cfile=str(staging / f"{source.stem}.pyc"),
+                dfile=source.name,
+                doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+            )
+        for name in entry_points:
+            if not (staging / f"{name}.py").is_file():
+                raise ValueError(f"Unknown entry point: {name}")
+            (staging / "__main__.py").write_text(MAIN.format(module=name), encoding="utf-8")
+            target = output_dir / f"{name}.pyz"
+            zipapp.create_archive(staging, target, interpreter="/usr/bin/env python3")
+            built[name] = str(target)
+    return built
+
+
+def main() -> None:
+    """Entry point: build the bundles and print {entry point: path} as JSON."""
+    ap = argparse.ArgumentParser(description="Build precompiled zipapp bundles of the AcroForm scripts")
+    ap.add_argument("--output-dir", default=str(SCRIPT_DIR / "dist"), help="Directory for the .pyz files (default .scripts/dist)")
+    args = ap.parse_args()
+    try:
+        built = build_zipapps(args.output_dir)
+    except (OSError, ValueError, py_compile.PyCompileError) as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps({"python": sys.version.split()[0], "magic": importlib.util.MAGIC_NUMBER.hex(), "bundles": built}))
+
+
+if __name__ == "__main__":
+    main()
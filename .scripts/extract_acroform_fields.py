@@ -4,32 +4,80 @@
 Output: JSON array of field descriptors (id, rect, width, height, fieldType,
 value, page, fontSize, maxLen, fieldName, flags, subtype) for use by the
 PdfSignableBundle backend (e.g. POST /acroform/fields/extract).
+With --format columnar the same data is written as {"format": "columnar", "count": N,
+"columns": {"id": [...], "rect": [...], ...}} (one array per attribute), and --gzip
+compresses the JSON output for large inventories.
+
+With --deadline-ms the extractor checks the time budget between pages and, when it runs
+out, returns the fields collected so far as {fields, truncated: true, nextPage, pageCount};
+run again with --start-page <nextPage> to fetch the rest.
+
+With --viewer-space, rect is [x, y, x + width, y + height] in --unit from the --origin corner of
+the page as the viewer shows it (CropBox, turned by /Rotate), like the signature boxes, instead
+of PDF user space points; apply_acroform_patches.py accepts such rects (rectUnit/rectOrigin).
+
+With --overlaps the output is {fields, overlaps: {widgets, signatureBoxes}}: widget pairs that
+overlap on a page, found with a per-page grid index (pdf_overlaps.py), and with
+--signature-boxes the widgets under each signature box of a coordinates JSON file.
+
+With --timings (or PDF_SCRIPTS_TIMINGS=1) one JSON line with the time of each phase (import,
+open, fields, serialize, write) and counts (pages, annotations, widgets) goes to stderr (pdf_phases.py).
+--profile PATH (or PDF_SCRIPTS_PROFILE) writes a cProfile dump of the run (pdf_profile.py).
+
+With --previous RESULT.json --previous-bytes N (the earlier output and the byte length of the PDF
+it came from) only the incremental updates appended since are read (pdf_incremental.py): the pages
+their changed objects touch are extracted again and the rest is taken from RESULT.json. When that
+is not safe (rewritten file, changed page tree, ids of other pages affected) it extracts in full;
+the timings line says which under "delta".
 
 Usage:
   python extract_acroform_fields.py <path-to-pdf>
   python extract_acroform_fields.py --stdin   # read base64 PDF from stdin (one line)
+  python extract_acroform_fields.py <path-to-pdf> --deadline-ms 8000 [--start-page 1]
+  python extract_acroform_fields.py <path-to-pdf> --probe   # catalog/trailer summary only
+  python extract_acroform_fields.py <path-to-pdf> --format columnar [--gzip]
+  python extract_acroform_fields.py --url https://host/form.pdf   # HTTP Range reads, see pdf_range_reader.py
+  python extract_acroform_fields.py <path-to-pdf> --viewer-space --unit mm --origin top_left
+  python extract_acroform_fields.py <path-to-pdf> --overlaps [--signature-boxes coordinates.json]
+  python extract_acroform_fields.py <path-to-pdf> --previous fields.json --previous-bytes 482113
 
 Requires: pypdf (pip install pypdf). Python 3.9+.
 """
 from __future__ import annotations
 
+import argparse
 import json
 import re
 import sys
+import time
 from pathlib import Path
 
+from acroform_core import FIELD_KEYS, FieldDescriptor, json_default
+from pdf_entry import run_script
+from pdf_memory import add_memory_arguments, check as check_memory, configure as configure_memory, report as memory_report
+from pdf_phases import NULL_TIMER, PhaseTimer, timings_enabled
+from pdf_profile import add_profile_arguments
+
+
+_IndirectObject = None  # pypdf.generic.IndirectObject, bound by the first _resolve() (pypdf loads lazily)
+
 
 def _resolve(obj, reader):
     """Resolve indirect references using the reader.
 
     If obj is an IndirectObject, returns the dereferenced object; otherwise returns obj unchanged.
     """
-    try:
-        from pypdf.generic import IndirectObject
-        if isinstance(obj, IndirectObject):
+    global _IndirectObject
+    if _IndirectObject is None:
+        try:
+            from pypdf.generic import IndirectObject as _IndirectObject
+        except ImportError:
+            return obj
+    if isinstance(obj, _IndirectObject):
+        try:
             return reader.get_object(obj)
-    except Exception:
-        pass
+        except Exception:
+            pass
     return obj
 
 
@@ -88,34 +136,164 @@ def _get_inheritable(obj, key, reader):
     return None
 
 
-def extract_fields(pdf_path: str | Path) -> list[dict]:
-    """Extract AcroForm/Widget field descriptors from a PDF file.
+def _columnar_sink():
+    """Return (emit, result) appending each value straight to its column (no dict per field).
 
-    Iterates over all pages and Widget annotations; for each, reads rect, type (/FT),
-    name (/T), value (/V), maxLen, DA (for font size), and flags. Returns a list of
-    dicts suitable for JSON (id, rect, width, height, fieldType, value, page, etc.).
-    Field ids are deduplicated by appending @page-idx when the name is repeated.
+    The result is {"format": "columnar", "count": N, "columns": {key: [values...]}} with one
+    array per FIELD_KEYS entry, all of length N.
+    """
+    columns: dict[str, list] = {key: [] for key in FIELD_KEYS}
+    appends = tuple(columns[key].append for key in FIELD_KEYS)
 
-    Args:
-        pdf_path: Path to the PDF file (or Path object).
+    def emit(*values) -> None:
+        for append, value in zip(appends, values):
+            append(value)
 
-    Returns:
-        List of field descriptor dicts (id, rect, width, height, fieldType, value,
-        page, subtype, fieldName, fontSize, maxLen, flags).
+    return emit, lambda: {"format": "columnar", "count": len(columns["id"]), "columns": columns}
 
-    Raises:
-        SystemExit: If pypdf is not installed.
-    """
-    try:
-        from pypdf import PdfReader
-    except ImportError:
-        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
 
-    reader = PdfReader(str(pdf_path))
+def _page_fields(
+    page, page_num: int, reader, seen_ids: set[str], emit=None, viewer=None, overlaps=None
+) -> list[FieldDescriptor]:
+    """Extract the Widget field descriptors of a single page.
+
+    Shared by extract_fields() and extract_fields_budgeted(); seen_ids is updated in place so
+    duplicated names get the same "@page-idx" suffix regardless of which function walks the pages.
+    When emit is given, each field's values (in FIELD_KEYS order) are passed to it instead of
+    being collected into the returned list. With viewer=(unit, origin) the page's rects are
+    converted to viewer space in one pdf_coords.rects_to_viewer() call before they are emitted.
+    With overlaps (a pdf_overlaps.OverlapCollector), the page's ids and PDF rects are handed to it
+    once the page is done.
+    """
     fields_out = []
-    seen_ids = set()
+    if emit is None:
+        def emit(*values) -> None:
+            fields_out.append(FieldDescriptor(*values))
+    if viewer is not None:
+        rows = []
+        emit_final, emit = emit, lambda *values: rows.append(values)
+    ids, rects = [], []
+    annots = page.get("/Annots")
+    if annots is None:
+        return fields_out
+    if not hasattr(annots, "__iter__"):
+        annots = [annots]
+    for idx, ref in enumerate(annots):
+        annot = _resolve(ref, reader)
+        if annot is None:
+            continue
+        # Only process Widget annotations (form fields)
+        subtype = annot.get("/Subtype")
+        subtype = _resolve(subtype, reader)
+        if subtype is None:
+            continue
+        # pypdf NameObject is a str subclass, so _str_val keeps its leading slash ("/Widget")
+        st = _str_val(subtype, reader).lstrip("/")
+        if st != "Widget":
+            continue
+
+        rect = annot.get("/Rect")
+        rect = _resolve(rect, reader)
+        if rect is None or not hasattr(rect, "__getitem__") or len(rect) < 4:
+            continue
+        try:
+            llx, lly, urx, ury = float(rect[0]), float(rect[1]), float(rect[2]), float(rect[3])
+        except (TypeError, ValueError):
+            continue
+        width = max(0, urx - llx)
+        height = max(0, ury - lly)
+
+        # Field type/name/value may be on the widget or on the parent field dict
+        parent = annot.get("/Parent")
+        field_dict = annot
+        if parent is not None:
+            p = _resolve(parent, reader)
+            if p is not None:
+                field_dict = p
+
+        ft = _get_inheritable(field_dict, "/FT", reader)
+        field_type = _str_val(ft, reader).lstrip("/") if ft is not None else "Tx"
+
+        name = _get_inheritable(field_dict, "/T", reader)
+        field_name = _str_val(name, reader) if name is not None else ""
+
+        v = _get_inheritable(field_dict, "/V", reader)
+        value = _str_val(v, reader) if v is not None else ""
+
+        max_len = None
+        m = _get_inheritable(field_dict, "/MaxLen", reader)
+        if m is not None:
+            try:
+                max_len = int(m)
+            except (TypeError, ValueError):
+                pass
+
+        da = annot.get("/DA") or _get_inheritable(field_dict, "/DA", reader)
+        da = _resolve(da, reader) if da is not None else None
+        da_str = _str_val(da, reader) if da is not None else ""
+        fontSize = parse_font_size_from_da(da_str)
+
+        flags = None
+        f = _get_inheritable(field_dict, "/F", reader)
+        if f is not None:
+            try:
+                flags = int(f)
+            except (TypeError, ValueError):
+                pass
+
+        # Deduplicate id: use field name or p{page}-{idx}; append @page-idx if name repeated
+        fid = (field_name or "").strip() or f"p{page_num}-{idx}"
+        if fid in seen_ids:
+            fid = f"{fid}@{page_num}-{idx}"
+        seen_ids.add(fid)
+        if overlaps is not None:
+            ids.append(fid)
+            rects.append((llx, lly, urx, ury))
+
+        emit(
+            fid,
+            [llx, lly, urx, ury],
+            round(width, 2),
+            round(height, 2),
+            field_type or "Tx",
+            value,
+            page_num,
+            "Widget",
+            field_name,
+            fontSize,
+            max_len,
+            flags,
+        )
+    if viewer is not None and rows:
+        from pdf_coords import page_geometry, rects_to_viewer
+
+        # Own name: the overlap collector below keeps working on the PDF space rects
+        viewer_rects = rects_to_viewer([values[1] for values in rows], page_geometry(page), *viewer)
+        for values, rect in zip(rows, viewer_rects):
+            rect = [round(v, 4) for v in rect]
+            emit_final(values[0], rect, round(rect[2] - rect[0], 2), round(rect[3] - rect[1], 2), *values[4:])
+    if overlaps is not None:
+        overlaps.add_page(page_num, page, ids, rects)
+    return fields_out
+
+
+def _count_page(timer, page, reader) -> None:
+    """Add one page and its /Annots entries to the timer's counts (only called when timing)."""
+    annots = _resolve(page.get("/Annots"), reader)
+    timer.count("pages")
+    timer.count("annotations", len(annots) if hasattr(annots, "__len__") else int(annots is not None))
 
+
+def _seen_ids_before(reader, start_page: int) -> set[str]:
+    """Rebuild the deduplication state for pages before start_page.
+
+    Only widget names are read (no rect, value or DA parsing), so resuming a truncated
+    extraction yields the same ids as a single full run at a fraction of the cost.
+    """
+    seen_ids: set[str] = set()
     for page_num, page in enumerate(reader.pages, start=1):
+        if page_num >= start_page:
+            break
         annots = page.get("/Annots")
         if annots is None:
             continue
@@ -123,122 +301,750 @@ def extract_fields(pdf_path: str | Path) -> list[dict]:
             annots = [annots]
         for idx, ref in enumerate(annots):
             annot = _resolve(ref, reader)
-            if annot is None:
-                continue
-            # Only process Widget annotations (form fields)
-            subtype = annot.get("/Subtype")
-            subtype = _resolve(subtype, reader)
-            if subtype is None:
+            if annot is None or _str_val(_resolve(annot.get("/Subtype"), reader), reader).lstrip("/") != "Widget":
                 continue
-            st = _str_val(subtype, reader)
-            if st != "Widget":
-                continue
-
-            rect = annot.get("/Rect")
-            rect = _resolve(rect, reader)
+            # Same skip rule as _page_fields: widgets without a usable /Rect never get an id
+            rect = _resolve(annot.get("/Rect"), reader)
             if rect is None or not hasattr(rect, "__getitem__") or len(rect) < 4:
                 continue
             try:
-                llx, lly, urx, ury = float(rect[0]), float(rect[1]), float(rect[2]), float(rect[3])
+                for i in range(4):
+                    float(rect[i])
             except (TypeError, ValueError):
                 continue
-            width = max(0, urx - llx)
-            height = max(0, ury - lly)
-
-            # Field type/name/value may be on the widget or on the parent field dict
             parent = annot.get("/Parent")
-            field_dict = annot
-            if parent is not None:
-                p = _resolve(parent, reader)
-                if p is not None:
-                    field_dict = p
-
-            ft = _get_inheritable(field_dict, "/FT", reader)
-            field_type = _str_val(ft, reader) if ft is not None else "Tx"
-
-            name = _get_inheritable(field_dict, "/T", reader)
-            field_name = _str_val(name, reader) if name is not None else ""
-
-            v = _get_inheritable(field_dict, "/V", reader)
-            value = _str_val(v, reader) if v is not None else ""
-
-            max_len = None
-            m = _get_inheritable(field_dict, "/MaxLen", reader)
-            if m is not None:
-                try:
-                    max_len = int(m)
-                except (TypeError, ValueError):
-                    pass
-
-            da = annot.get("/DA") or _get_inheritable(field_dict, "/DA", reader)
-            da = _resolve(da, reader) if da is not None else None
-            da_str = _str_val(da, reader) if da is not None else ""
-            fontSize = parse_font_size_from_da(da_str)
-
-            flags = None
-            f = _get_inheritable(field_dict, "/F", reader)
-            if f is not None:
-                try:
-                    flags = int(f)
-                except (TypeError, ValueError):
-                    pass
-
-            # Deduplicate id: use field name or p{page}-{idx}; append @page-idx if name repeated
-            fid = (field_name or "").strip() or f"p{page_num}-{idx}"
+            field_dict = _resolve(parent, reader) if parent is not None else None
+            name = _get_inheritable(field_dict if field_dict is not None else annot, "/T", reader)
+            fid = (_str_val(name, reader) if name is not None else "").strip() or f"p{page_num}-{idx}"
             if fid in seen_ids:
                 fid = f"{fid}@{page_num}-{idx}"
             seen_ids.add(fid)
+    return seen_ids
+
+
+def _open_reader(pdf_reader_cls, source):
+    """Open a PdfReader for a path or for a seekable binary stream.
+
+    Paths keep the plain PdfReader(path) call. Streams (e.g. pdf_range_reader.open_url())
+    are read strictly first, which skips pypdf's per-object xref verification (one seek, and for
+    remote files possibly one request, per object), and re-read leniently if that fails.
+    """
+    if not hasattr(source, "read"):
+        return pdf_reader_cls(str(source))
+    try:
+        source.seek(0)
+        reader = pdf_reader_cls(source, strict=True)
+        reader.strict = False
+        return reader
+    except Exception:  # noqa: BLE001
+        source.seek(0)
+        return pdf_reader_cls(source, strict=False)
+
+
+def extract_fields(
+    pdf_path: str | Path, viewer: tuple[str, str] | None = None, overlaps=None, timer=None
+) -> list[FieldDescriptor]:
+    """Extract AcroForm/Widget field descriptors from a PDF file.
+
+    Iterates over all pages and Widget annotations; for each, reads rect, type (/FT),
+    name (/T), value (/V), maxLen, DA (for font size), and flags. Returns a list of
+    FieldDescriptor (id, rect, width, height, fieldType, value, page, etc.); serialize
+    with json.dumps(..., default=json_default).
+    Field ids are deduplicated by appending @page-idx when the name is repeated.
+
+    Args:
+        pdf_path: Path to the PDF file (or Path object), or a seekable binary stream such as
+            pdf_range_reader.open_url() (only the parts pypdf dereferences are read).
+        viewer: (unit, origin) to report rect, width and height in viewer space, as the
+            signature boxes are (rect [x, y, x + width, y + height] in unit from origin of the
+            CropBox turned by /Rotate, see pdf_coords.py); None keeps PDF user space points.
+        overlaps: pdf_overlaps.OverlapCollector fed with each page's widgets (see its report()).
+        timer: pdf_phases.PhaseTimer to record the open and fields phases and the page,
+            annotation and widget counts (None = no timing).
+
+    Returns:
+        List of FieldDescriptor (read-only mappings with keys id, rect, width, height,
+        fieldType, value, page, subtype, fieldName, fontSize, maxLen, flags).
+
+    Raises:
+        SystemExit: If pypdf is not installed.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
+
+    timer = timer or NULL_TIMER
+    with timer.phase("open"):
+        reader = _open_reader(PdfReader, pdf_path)
+    fields_out = []
+    seen_ids = set()
+
+    with timer.phase("fields"):
+        for page_num, page in enumerate(reader.pages, start=1):
+            fields_out.extend(_page_fields(page, page_num, reader, seen_ids, viewer=viewer, overlaps=overlaps))
+            if timer:
+                _count_page(timer, page, reader)
+            check_memory(f"page {page_num}")
+    timer.count("widgets", len(fields_out))
+
+    return fields_out
+
+
+def extract_fields_columnar(
+    pdf_path: str | Path, viewer: tuple[str, str] | None = None, overlaps=None, timer=None
+) -> dict:
+    """Extract field descriptors as one array per attribute instead of one object per field.
+
+    Same fields, order and ids as extract_fields(), but encoded in a single pass straight into
+    columns, so key names are not repeated per field and no intermediate dict is built. Field i
+    is columns[key][i] for every key in FIELD_KEYS.
+
+    Args:
+        pdf_path: Path to the PDF file (or Path object), or a seekable binary stream.
+        viewer: (unit, origin) for viewer-space rects, as in extract_fields().
+        overlaps: Overlap collector, as in extract_fields().
+        timer: Phase timer, as in extract_fields().
+
+    Returns:
+        Dict {"format": "columnar", "count": N, "columns": {key: list of N values}}.
+
+    Raises:
+        SystemExit: If pypdf is not installed.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
+
+    timer = timer or NULL_TIMER
+    with timer.phase("open"):
+        reader = _open_reader(PdfReader, pdf_path)
+    emit, result = _columnar_sink()
+    seen_ids: set[str] = set()
 
-            fields_out.append({
-                "id": fid,
-                "rect": [llx, lly, urx, ury],
-                "width": round(width, 2),
-                "height": round(height, 2),
-                "fieldType": field_type or "Tx",
-                "value": value,
-                "page": page_num,
-                "subtype": "Widget",
-                "fieldName": field_name,
-                "fontSize": fontSize,
-                "maxLen": max_len,
-                "flags": flags,
-            })
+    with timer.phase("fields"):
+        for page_num, page in enumerate(reader.pages, start=1):
+            _page_fields(page, page_num, reader, seen_ids, emit, viewer, overlaps)
+            if timer:
+                _count_page(timer, page, reader)
+            check_memory(f"page {page_num}")
+    columnar = result()
+    timer.count("widgets", columnar["count"])
 
+    return columnar
+
+
+def extract_fields_budgeted(
+    pdf_path: str | Path,
+    deadline: float | None = None,
+    start_page: int = 1,
+    columnar: bool = False,
+    viewer: tuple[str, str] | None = None,
+    overlaps=None,
+    timer=None,
+) -> dict:
+    """Extract field descriptors until a monotonic-clock deadline is reached.
+
+    The budget is checked between pages: at least one page is always processed, and when
+    the deadline has passed the fields collected so far are returned with truncated=True
+    and the page to resume from. Calling again with start_page=nextPage continues the
+    extraction with the same field ids a full run would produce.
+
+    Args:
+        pdf_path: Path to the PDF file (or Path object), or a seekable binary stream.
+        deadline: time.monotonic() value after which no new page is started (None = no limit).
+        start_page: 1-based page to start from (resume point of a previous truncated run).
+        columnar: Encode fields as in extract_fields_columnar() instead of a list of dicts.
+        viewer: (unit, origin) for viewer-space rects, as in extract_fields().
+        overlaps: Overlap collector, as in extract_fields() (covers the pages processed).
+        timer: Phase timer, as in extract_fields() (resume state is rebuilt in the open phase).
+
+    Returns:
+        Dict with fields (list of descriptors, see extract_fields, or the columnar object),
+        truncated (bool), nextPage (int or None when complete) and pageCount.
+
+    Raises:
+        SystemExit: If pypdf is not installed.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
+
+    timer = timer or NULL_TIMER
+    with timer.phase("open"):
+        reader = _open_reader(PdfReader, pdf_path)
+        pages = reader.pages
+        page_count = len(pages)
+        start_page = max(1, int(start_page))
+        seen_ids = _seen_ids_before(reader, start_page) if start_page > 1 else set()
+    fields_out = []
+    emit, columnar_result = _columnar_sink() if columnar else (None, None)
+    next_page = None
+
+    with timer.phase("fields"):
+        for page_num in range(start_page, page_count + 1):
+            if page_num > start_page and deadline is not None and time.monotonic() >= deadline:
+                next_page = page_num
+                break
+            page = pages[page_num - 1]
+            fields_out.extend(_page_fields(page, page_num, reader, seen_ids, emit, viewer, overlaps))
+            if timer:
+                _count_page(timer, page, reader)
+            check_memory(f"page {page_num}")
+    fields = columnar_result() if columnar else fields_out
+    timer.count("widgets", fields["count"] if columnar else len(fields))
+
+    return {
+        "fields": fields,
+        "truncated": next_page is not None,
+        "nextPage": next_page,
+        "pageCount": page_count,
+    }
+
+
+_ID_SUFFIX_RE = re.compile(r"@\d+-\d+$")
+
+
+def _previous_rows(previous) -> list[dict]:
+    """Field dicts of a previous result: the array, the columnar object or {fields, ...}."""
+    if isinstance(previous, dict) and "fields" in previous:
+        if previous.get("truncated"):
+            raise ValueError("the previous result is truncated")
+        previous = previous["fields"]
+    if isinstance(previous, dict) and previous.get("format") == "columnar":
+        columns = [(previous.get("columns") or {}).get(key) or [] for key in FIELD_KEYS]
+        if len({len(column) for column in columns}) != 1:
+            raise ValueError("the previous columns differ in length")
+        previous = [dict(zip(FIELD_KEYS, values)) for values in zip(*columns)]
+    if not isinstance(previous, list) or not all(
+        isinstance(f, dict) and isinstance(f.get("id"), str) and isinstance(f.get("page"), int) for f in previous
+    ):
+        raise ValueError("expected the fields of a previous extraction")
+    return previous
+
+
+def _ref_num(value) -> int | None:
+    """Object number of an indirect reference (None for direct objects)."""
+    return getattr(value, "idnum", None)
+
+
+def _object_at(reader, num: int):
+    """The current object with number num (whatever its generation), None when it is free."""
+    from pypdf.generic import IndirectObject
+
+    generations = [gen for gen, table in reader.xref.items() if num in table]
+    try:
+        return reader.get_object(IndirectObject(num, max(generations, default=0), reader))
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _annot_nums(page, reader) -> set[int]:
+    """Object numbers in a page's /Annots array (the annotations themselves are not read)."""
+    annots = _resolve(page.get("/Annots"), reader)
+    if annots is None or not hasattr(annots, "__iter__"):
+        return set()
+    return {num for num in map(_ref_num, annots) if num is not None}
+
+
+def _collect_widgets(obj, num: int, reader, widgets: dict, visited: set[int], depth: int = 0) -> None:
+    """Add obj (when it is an annotation) and the annotations under its /Kids to widgets."""
+    if num in visited:
+        return
+    visited.add(num)
+    if "/Rect" in obj:
+        widgets[num] = obj
+    kids = _resolve(obj.get("/Kids"), reader)
+    if depth >= 32 or kids is None or not hasattr(kids, "__iter__"):
+        return
+    for ref in kids:
+        kid_num, kid = _ref_num(ref), _resolve(ref, reader)
+        if kid_num is not None and isinstance(kid, dict):
+            _collect_widgets(kid, kid_num, reader, widgets, visited, depth + 1)
+
+
+def _changed_pages(reader, changed: set[int], previous_size: int) -> set[int]:
+    """Numbers of the pages whose widgets the changed objects can affect.
+
+    New objects (numbers from previous_size on) are skipped: only a changed object can refer to
+    one. A modified page, annotation, field (through the widgets under its /Kids) or /Annots
+    array marks pages; streams and the other dictionaries (catalog, /AcroForm, fonts, appearance
+    and signature dictionaries) are not read by the extractor. A modified page tree, deleted
+    object, or other modified object, such as an indirect string a field may use as /V, raises
+    NotIncremental.
+    """
+    from pypdf.generic import NullObject
+
+    from pdf_incremental import NotIncremental
+
+    pages = reader.pages
+    page_of = {_ref_num(page.indirect_reference): n for n, page in enumerate(pages, start=1)}
+    annots_of = {_ref_num(page.get("/Annots")): n for n, page in enumerate(pages, start=1)}
+    root = _resolve(reader.trailer.get("/Root"), reader)
+    acro = _resolve(root.get("/AcroForm"), reader) if root is not None else None
+    fields_num = _ref_num(acro.get("/Fields")) if acro is not None else None
+    affected: set[int] = set()
+    widgets: dict = {}
+    visited: set[int] = set()
+    for num in sorted(changed):
+        if previous_size and num >= previous_size:
+            continue
+        obj = _object_at(reader, num)
+        if obj is None or isinstance(obj, NullObject):
+            raise NotIncremental(f"object {num} was deleted")
+        if hasattr(obj, "get_data"):
+            continue
+        if isinstance(obj, dict):
+            obj_type = _resolve(obj.get("/Type"), reader)
+            if obj_type == "/Pages" or (obj_type == "/Catalog" and _ref_num(obj.get("/Pages")) in changed):
+                raise NotIncremental("the page tree changed")
+            if num in page_of:
+                affected.add(page_of[num])
+            elif "/Rect" in obj or "/Kids" in obj:
+                _collect_widgets(obj, num, reader, widgets, visited)
+            elif "/T" in obj or "/FT" in obj:
+                raise NotIncremental(f"field {num} has no /Kids to find its widgets")
+        elif num in annots_of:
+            affected.add(annots_of[num])
+        elif num != fields_num:
+            raise NotIncremental(f"object {num} ({type(obj).__name__}) may be a field value")
+    unplaced = set()
+    for num, annot in widgets.items():
+        # /P is optional and may be stale: trust it only when that page lists the annotation
+        page_num = page_of.get(_ref_num(annot.get("/P")))
+        if page_num is not None and num in _annot_nums(pages[page_num - 1], reader):
+            affected.add(page_num)
+        else:
+            unplaced.add(num)
+    if unplaced:
+        for page_num, page in enumerate(pages, start=1):
+            if unplaced & _annot_nums(page, reader):
+                affected.add(page_num)
+    return affected
+
+
+def _patch_pages(rows: list[dict], pages: set[int], reader, viewer=None) -> list:
+    """The previous fields with those of the given pages extracted again.
+
+    Ids are deduplicated across pages, so an id that appears or disappears on a changed page can
+    change the ids of later pages; then NotIncremental is raised instead of guessing them.
+    """
+    from pdf_incremental import NotIncremental
+
+    by_page: dict[int, list] = {}
+    for field in rows:
+        by_page.setdefault(field["page"], []).append(field)
+    seen_ids: set[str] = set()
+    touched: set[str] = set()
+    fields_out = []
+    for page_num in sorted(by_page.keys() | pages):
+        old = by_page.get(page_num, [])
+        if page_num in pages:
+            new = _page_fields(reader.pages[page_num - 1], page_num, reader, seen_ids, viewer=viewer)
+            touched |= {f["id"] for f in old} ^ {f["id"] for f in new}
+            fields_out.extend(new)
+            continue
+        for field in old:
+            base = (field.get("fieldName") or "").strip() or _ID_SUFFIX_RE.sub("", field["id"])
+            if base in touched:
+                raise NotIncremental(f"field ids on page {page_num} depend on the change")
+            seen_ids.add(field["id"])
+        fields_out.extend(old)
     return fields_out
 
 
+def extract_fields_delta(
+    pdf_path: str | Path,
+    previous,
+    previous_length: int,
+    columnar: bool = False,
+    viewer: tuple[str, str] | None = None,
+    timer=None,
+) -> tuple[list | dict, dict]:
+    """Update a previous extraction after incremental updates were appended to the PDF.
+
+    Apply and signing often only append an incremental update. Given the previous result and the
+    byte length the file had then, only the xref sections appended since are read
+    (pdf_incremental.py), the pages whose widgets the changed objects can affect are extracted
+    again and the other pages' fields are taken from the previous result, so the cost follows
+    the size of the change rather than the number of widgets. When that cannot be done safely
+    (the file was rewritten, the page tree changed, a changed object cannot be traced to its
+    widgets, or ids of other pages would change) the fields are extracted in full instead.
+
+    Args:
+        pdf_path: Path to the PDF file (or Path object), or a seekable binary stream.
+        previous: Previous result for the same document: the field array, the columnar object,
+            or an object with fields (not truncated); made with the same viewer option.
+        previous_length: Byte length of the PDF the previous result was extracted from.
+        columnar: Return the columnar object instead of a list, as extract_fields_columnar().
+        viewer: (unit, origin) for viewer-space rects, as in extract_fields().
+        timer: Phase timer, as in extract_fields() (xref reading is the delta phase).
+
+    Returns:
+        (fields, info): fields as extract_fields() or extract_fields_columnar() returns them;
+        info is {"mode": "delta", "changedObjects": N, "pages": [...]} or
+        {"mode": "full", "reason": "..."}.
+
+    Raises:
+        ValueError: If previous is not an extraction result.
+        SystemExit: If pypdf is not installed.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
+    from pdf_incremental import NotIncremental, appended_objects
+
+    rows = _previous_rows(previous)
+    timer = timer or NULL_TIMER
+    fh = pdf_path if hasattr(pdf_path, "read") else open(pdf_path, "rb")
+    try:
+        with timer.phase("open"):
+            reader = _open_reader(PdfReader, fh)
+        try:
+            with timer.phase("delta"):
+                changed, previous_size = appended_objects(fh, int(previous_length), reader)
+                pages = _changed_pages(reader, changed, previous_size) if changed else set()
+                if rows and max(f["page"] for f in rows) > len(reader.pages):
+                    raise NotIncremental("the page count changed")
+            with timer.phase("fields"):
+                fields = _patch_pages(rows, pages, reader, viewer) if pages else rows
+        except NotIncremental as e:
+            info = {"mode": "full", "reason": str(e)}
+        else:
+            timer.count("changedObjects", len(changed))
+            timer.count("pages", len(pages))
+            timer.count("widgets", len(fields))
+            info = {"mode": "delta", "changedObjects": len(changed), "pages": sorted(pages)}
+            if not columnar:
+                return fields, info
+            emit, result = _columnar_sink()
+            for field in fields:
+                emit(*(field.values_tuple() if isinstance(field, FieldDescriptor) else (field.get(key) for key in FIELD_KEYS)))
+            return result(), info
+    finally:
+        if fh is not pdf_path:
+            fh.close()
+    options = {"viewer": viewer} if viewer is not None else {}
+    if columnar:
+        return extract_fields_columnar(pdf_path, timer=timer, **options), info
+    return extract_fields(pdf_path, timer=timer, **options), info
+
+
+def _probe_catalog(reader, version: str | None) -> tuple[str | None, int | None, bool, int]:
+    """Read version, page count and AcroForm presence from the catalog (see probe_pdf)."""
+    page_count = None
+    has_acroform = False
+    field_count = 0
+    root = _resolve(reader.trailer.get("/Root"), reader)
+    if root is None:
+        return version, page_count, has_acroform, field_count
+    # Catalog /Version overrides the header when it names a later version (ISO 32000-1, 7.2.2)
+    cat_version = _str_val(root.get("/Version"), reader).lstrip("/") if root.get("/Version") is not None else ""
+    if re.fullmatch(r"\d+\.\d+", cat_version) and (
+        version is None or tuple(map(int, cat_version.split("."))) > tuple(map(int, version.split(".")))
+    ):
+        version = cat_version
+    pages = _resolve(root.get("/Pages"), reader)
+    if pages is not None:
+        try:
+            page_count = int(_resolve(pages.get("/Count"), reader))
+        except (TypeError, ValueError):
+            page_count = None
+    acro = _resolve(root.get("/AcroForm"), reader)
+    if acro is not None:
+        has_acroform = True
+        fields = _resolve(acro.get("/Fields"), reader)
+        if fields is not None and hasattr(fields, "__len__"):
+            field_count = len(fields)
+    return version, page_count, has_acroform, field_count
+
+
+def probe_pdf(pdf_path: str | Path) -> dict:
+    """Summarize a PDF from its trailer and catalog only, without walking pages or annotations.
+
+    The file is handed to pypdf as an open stream (a path would be read fully into memory) and
+    only the trailer, the catalog, the page tree root and /AcroForm are dereferenced, so the cost
+    does not grow with page or widget count. Callers can use it to skip extraction for PDFs
+    without a form.
+
+    Args:
+        pdf_path: Path to the PDF file (or Path object), or a seekable binary stream.
+
+    Returns:
+        Dict with pageCount (int or None), hasAcroForm, hasFields, fieldCount (number of
+        top-level /Fields entries, kids not counted), encrypted, pdfVersion and fileSize (bytes).
+        When a user password is needed to open the PDF, pageCount, hasAcroForm, hasFields and
+        fieldCount are None.
+
+    Raises:
+        SystemExit: If pypdf is not installed.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
+
+    if hasattr(pdf_path, "read"):
+        return _probe_stream(PdfReader, pdf_path)
+    path = Path(pdf_path)
+    with open(path, "rb") as fh:
+        return _probe_stream(PdfReader, fh)
+
+
+def _probe_stream(pdf_reader_cls, fh) -> dict:
+    """probe_pdf() on an open seekable binary stream."""
+    fh.seek(0)
+    header = fh.read(1024)
+    m = re.search(rb"%PDF-(\d+\.\d+)", header)
+    header_version = m.group(1).decode("ascii") if m else None
+    # strict=True skips pypdf's per-object xref verification (one seek per object); files
+    # that need repairs are re-read leniently.
+    for strict in (True, False):
+        fh.seek(0)
+        try:
+            reader = pdf_reader_cls(fh, strict=strict)
+            encrypted = "/Encrypt" in reader.trailer
+            if encrypted and not reader.decrypt(""):
+                # User password set: the catalog cannot be read, only the trailer
+                version, page_count, has_acroform, field_count = header_version, None, None, None
+            else:
+                version, page_count, has_acroform, field_count = _probe_catalog(reader, header_version)
+            break
+        except Exception:  # noqa: BLE001
+            if not strict:
+                raise
+
+    return {
+        "pageCount": page_count,
+        "hasAcroForm": has_acroform,
+        "hasFields": field_count > 0 if field_count is not None else None,
+        "fieldCount": field_count,
+        "encrypted": encrypted,
+        "pdfVersion": version,
+        "fileSize": fh.seek(0, 2),
+    }
+
+
 def main() -> None:
-    """Entry point: parse args, load PDF (file or base64 from stdin), print JSON array to stdout."""
-    if len(sys.argv) < 2:
-        print("Usage: extract_acroform_fields.py <path-to-pdf>", file=sys.stderr)
+    """Entry point: parse args, load PDF (file or base64 from stdin), print JSON to stdout.
+
+    Without options the output is the JSON array of field descriptors. With --deadline-ms
+    (or --start-page) the output is an object {fields, truncated, nextPage, pageCount}; with
+    --probe it is the probe_pdf() summary. --overlaps wraps the fields as {fields, overlaps}
+    (added to the object above when budgeted). --previous/--previous-bytes give the same output
+    as a full run, updated from the previous result. With --timings (or PDF_SCRIPTS_TIMINGS=1) a
+    pdf_phases report line goes to stderr.
+    """
+    ap = argparse.ArgumentParser(description="Extract AcroForm field descriptors from a PDF")
+    ap.add_argument("pdf", nargs="?", help="Path to the PDF file")
+    ap.add_argument("--stdin", action="store_true", help="Read base64 PDF from stdin (one line)")
+    ap.add_argument(
+        "--url",
+        default=None,
+        help="Read a remote http(s) PDF with Range requests instead of a local file (only the needed parts are fetched)",
+    )
+    ap.add_argument(
+        "--probe",
+        action="store_true",
+        help="Only read the trailer and catalog: page count, AcroForm presence, encryption, version, size",
+    )
+    ap.add_argument(
+        "--deadline-ms",
+        type=int,
+        default=None,
+        help="Time budget in milliseconds; stop between pages and return partial results with truncated=true",
+    )
+    ap.add_argument("--start-page", type=int, default=1, help="1-based page to resume from (nextPage of a truncated run)")
+    ap.add_argument(
+        "--format",
+        choices=("json", "columnar"),
+        default="json",
+        help="json: array of field objects (default); columnar: one array per attribute (compact for large forms)",
+    )
+    ap.add_argument("--gzip", action="store_true", help="Write the JSON output gzip-compressed (binary stdout)")
+    ap.add_argument(
+        "--viewer-space",
+        action="store_true",
+        help="Report rect/width/height as the viewer shows the page (--unit, --origin; CropBox and /Rotate applied)",
+    )
+    ap.add_argument("--unit", choices=("pt", "mm", "cm", "in", "px"), default="pt", help="Unit for --viewer-space (default pt)")
+    ap.add_argument(
+        "--origin",
+        choices=("top_left", "bottom_left", "top_right", "bottom_right"),
+        default="top_left",
+        help="Origin corner for --viewer-space (default top_left)",
+    )
+    ap.add_argument(
+        "--overlaps",
+        action="store_true",
+        help="Also report overlapping widget pairs per page (grid index); output becomes {fields, overlaps, ...}",
+    )
+    ap.add_argument(
+        "--signature-boxes",
+        default=None,
+        metavar="PATH",
+        help="With --overlaps: coordinates JSON ({unit, origin, signature_boxes}) to report widgets under each box",
+    )
+    ap.add_argument(
+        "--timings",
+        action="store_true",
+        help="Write per-phase times and counts as one JSON line to stderr (env PDF_SCRIPTS_TIMINGS=1)",
+    )
+    ap.add_argument(
+        "--previous",
+        default=None,
+        metavar="PATH",
+        help="Previous result for this document (JSON, may be gzip); with --previous-bytes only appended updates are read",
+    )
+    ap.add_argument(
+        "--previous-bytes",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Byte length of the PDF the --previous result was extracted from",
+    )
+    add_memory_arguments(ap)
+    add_profile_arguments(ap)
+    args = ap.parse_args()
+    configure_memory(args.max_memory_mb, args.trace_memory)
+    # --trace-memory reports through the timings line (the extractor has no other stderr line)
+    timer = PhaseTimer("extract_acroform_fields") if timings_enabled(args.timings or bool(args.trace_memory)) else NULL_TIMER
+    # Only passed when requested (callers may wrap the extract functions with the old signature)
+    options = {"viewer": (args.unit, args.origin)} if args.viewer_space else {}
+    if timer:
+        options["timer"] = timer
+        with timer.phase("import"):  # pypdf import time, otherwise hidden in totalMs
+            try:
+                import pypdf  # noqa: F401
+            except ImportError:
+                pass
+    if args.overlaps or args.signature_boxes:
+        from pdf_overlaps import OverlapCollector
+        try:
+            coordinates = {}
+            if args.signature_boxes:
+                with open(args.signature_boxes, encoding="utf-8") as f:
+                    coordinates = json.load(f)
+                if isinstance(coordinates, list):
+                    coordinates = {"signature_boxes": coordinates}
+            options["overlaps"] = OverlapCollector(
+                coordinates.get("signature_boxes"), coordinates.get("unit", "mm"), coordinates.get("origin", "bottom_left")
+            )
+        except (OSError, ValueError, AttributeError) as e:
+            print(json.dumps({"error": f"Invalid signature boxes: {e}"}), file=sys.stderr)
+            sys.exit(2)
+    previous = None
+    if args.previous is not None or args.previous_bytes is not None:
+        if args.previous is None or args.previous_bytes is None:
+            print(json.dumps({"error": "--previous and --previous-bytes go together"}), file=sys.stderr)
+            sys.exit(2)
+        if args.probe or args.overlaps or args.signature_boxes or args.deadline_ms is not None or args.start_page != 1:
+            print(
+                json.dumps({"error": "--previous cannot be combined with --probe, --overlaps, --deadline-ms or --start-page"}),
+                file=sys.stderr,
+            )
+            sys.exit(2)
+        try:
+            with open(args.previous, "rb") as f:
+                raw = f.read()
+            if raw[:2] == b"\x1f\x8b":
+                import gzip
+                raw = gzip.decompress(raw)
+            previous = json.loads(raw)
+            _previous_rows(previous)
+        except (OSError, ValueError, EOFError) as e:
+            print(json.dumps({"error": f"Invalid previous result: {e}"}), file=sys.stderr)
+            sys.exit(2)
+    delta = {}
+    columnar = args.format == "columnar"
+    # Budget starts at entry so the deadline covers PDF loading, not just the page loop.
+    deadline = time.monotonic() + max(0, args.deadline_ms) / 1000.0 if args.deadline_ms is not None else None
+    budgeted = deadline is not None or args.start_page != 1
+
+    if not args.stdin and not args.pdf and not args.url:
+        print("Usage: extract_acroform_fields.py <path-to-pdf> [--probe] [--deadline-ms MS] [--start-page N]", file=sys.stderr)
         print("   or: extract_acroform_fields.py --stdin  # base64 PDF from stdin", file=sys.stderr)
+        print("   or: extract_acroform_fields.py --url URL  # remote PDF via HTTP Range requests", file=sys.stderr)
         sys.exit(1)
 
-    if sys.argv[1] == "--stdin":
-        import base64
-        import tempfile
-        data = sys.stdin.buffer.read()
+    def run(pdf_path):
+        if args.probe:
+            with timer.phase("probe"):
+                return probe_pdf(pdf_path)
+        if previous is not None:
+            fields, info = extract_fields_delta(pdf_path, previous, args.previous_bytes, columnar=columnar, **options)
+            delta.update(info)
+            return fields
+        if budgeted:
+            return extract_fields_budgeted(pdf_path, deadline, args.start_page, columnar=columnar, **options)
+        if columnar:
+            return extract_fields_columnar(pdf_path, **options)
+        return extract_fields(pdf_path, **options)
+
+    if args.url:
+        from pdf_range_reader import open_url
         try:
-            raw = base64.b64decode(data, validate=True)
-        except Exception as e:
-            print(json.dumps({"error": f"Invalid base64: {e}"}), file=sys.stderr)
+            source = open_url(args.url)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": f"Cannot open URL: {e}"}), file=sys.stderr)
             sys.exit(2)
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-            f.write(raw)
-            path = f.name
+        with source:
+            result = run(source)
+            if timer:
+                transfer = source.raw.stats()
+                timer.count("rangeRequests", transfer["requests"])
+                timer.count("bytesFetched", transfer["bytesFetched"])
+    elif args.stdin:
+        import base64
+        import tempfile
+        with timer.phase("load"):
+            data = sys.stdin.buffer.read()
+            try:
+                raw = base64.b64decode(data, validate=True)
+            except Exception as e:
+                print(json.dumps({"error": f"Invalid base64: {e}"}), file=sys.stderr)
+                sys.exit(2)
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                f.write(raw)
+                path = f.name
         try:
-            fields = extract_fields(path)
+            result = run(path)
         finally:
             Path(path).unlink(missing_ok=True)
     else:
-        path = Path(sys.argv[1])
+        path = Path(args.pdf)
         if not path.is_file():
             print(json.dumps({"error": f"File not found: {path}"}), file=sys.stderr)
             sys.exit(2)
-        fields = extract_fields(path)
+        result = run(path)
+
+    if "overlaps" in options and not args.probe:
+        if not isinstance(result, dict) or "fields" not in result:
+            result = {"fields": result}
+        result["overlaps"] = options["overlaps"].report()
 
-    print(json.dumps(fields, ensure_ascii=False))
+    with timer.phase("serialize"):
+        if columnar or args.gzip:
+            # Compact separators: the point of these modes is payload size
+            payload = json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        else:
+            payload = json.dumps(result, ensure_ascii=False, default=json_default)
+        if args.gzip:
+            import gzip
+            payload = gzip.compress((payload + "\n").encode("utf-8"), compresslevel=6, mtime=0)
+    with timer.phase("write"):
+        if args.gzip:
+            sys.stdout.buffer.write(payload)
+            sys.stdout.buffer.flush()
+        else:
+            print(payload)
+    if timer:
+        timer.count("outputBytes", len(payload) if args.gzip else len(payload.encode("utf-8")) + 1)
+        timer.emit(**memory_report(), **({"delta": delta} if delta else {}))
 
 
 if __name__ == "__main__":
-    main()
+    run_script(main, "extract_acroform_fields")
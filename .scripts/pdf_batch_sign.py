@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""Sign many PDFs (or many boxes in one PDF) with one PKCS#12 key: PAdES, incremental saves.
+
+Meant for BatchSignRequestedEvent listeners: instead of one signing process per document, one
+call signs a list of jobs. The key is loaded once per process (once in total with --workers 1;
+otherwise once in the parent, to fail fast on a bad key, and once in each worker process) and
+documents are distributed over a process pool. Each box of a job
+becomes a visible signature field at the box coordinates and is signed as its own incremental
+update (PAdES baseline B-B, /SubFilter /ETSI.CAdES.detached, SHA-256), so earlier signatures
+stay valid. The output file is signed in place: the ByteRange digest is computed by reading the
+file in chunks (chunk_size) rather than loading it into memory.
+
+Jobs file (JSON list, or {"jobs": [...]}); box fields are those of SignatureCoordinatesModel::toArray(),
+so a listener can pass [...$coordinates->toArray(), 'input' => ..., 'output' => ...]:
+  [{"input": "in.pdf", "output": "out.pdf", "unit": "mm", "origin": "bottom_left",
+    "signature_boxes": [{"name": "signer_1", "page": 1, "x": 20, "y": 20, "width": 60, "height": 20}],
+    "reason": "optional", "location": "optional"}]
+
+Usage:
+  PDF_SIGN_PASSPHRASE=secret python pdf_batch_sign.py --pkcs12 signer.p12 --jobs jobs.json [--workers 4]
+
+A JSON report is written to stdout: {"script": "pdf_batch_sign", "documents", "signatures",
+"errors", "workers", "keyLoads", "totalMs", "signaturesPerSec", "jobs": [{"input", "output",
+"signatures", "ms"} or {"input", "output", "error"}]}. keyLoads counts every key load that
+happened (the parent's and each worker's). Exit code 0 when every job succeeded, 1 when some
+failed, 2 for invalid arguments or a key that cannot be loaded.
+
+Also available as the "sign" bytes stage of process_modified_pdf.py (options: pkcs12,
+passphraseEnv, unit, origin, signature_boxes, reason, location).
+
+Requires: pypdf and pyHanko 0.20 to 0.37 (pip install "pyhanko>=0.20,<0.38"; the signer
+subclasses SimpleSigner and implements Signer.async_sign_raw).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pdf_coords import box_to_rect, page_geometry
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+PASSPHRASE_ENV = "PDF_SIGN_PASSPHRASE"
+
+_signer = None  # loaded once per (worker) process
+_signers_by_path: dict[tuple[str, bytes | None], object] = {}  # sign stage cache
+
+
+def load_signer(pkcs12_path: str | Path, passphrase: bytes | None = None):
+    """Load a pyHanko SimpleSigner from a PKCS#12 file.
+
+    Raises:
+        SystemExit: If pyHanko is not installed.
+        ValueError: If the file cannot be read or decrypted.
+    """
+    try:
+        from pyhanko.sign import signers
+    except ImportError:
+        raise SystemExit('Requires pyHanko. Install with: pip install "pyhanko>=0.20,<0.38"')
+    if not Path(pkcs12_path).is_file():
+        raise ValueError(f"PKCS#12 file not found: {pkcs12_path}")
+    signer = signers.SimpleSigner.load_pkcs12(str(pkcs12_path), passphrase=passphrase)
+    if signer is None:
+        raise ValueError("Cannot load PKCS#12 key (wrong passphrase or unsupported file)")
+    return _key_signer_class()(
+        signing_cert=signer.signing_cert,
+        signing_key=signer.signing_key,
+        cert_registry=signer.cert_registry,
+    )
+
+
+_KeySigner = None
+
+
+def _key_signer_class():
+    """SimpleSigner subclass that parses the private key once instead of on every signature.
+
+    SimpleSigner.sign_raw() re-loads the DER key for each raw signature (two per PDF signature,
+    counting the size estimate); for RSA-2048 that load, with its key consistency check, costs
+    ~70 ms against ~2 ms for the signature itself. The subclass keeps the cryptography key on the
+    instance and implements Signer.async_sign_raw() with it for RSA PKCS#1 v1.5 and ECDSA; other
+    mechanisms go to SimpleSigner. Defined on first use so that pyHanko is only imported when
+    signing.
+    """
+    global _KeySigner
+    if _KeySigner is not None:
+        return _KeySigner
+
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ec import ECDSA, EllipticCurvePrivateKey
+    from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+    from pyhanko.sign import signers
+    from pyhanko_certvalidator.util import get_pyca_cryptography_hash
+
+    class KeySigner(signers.SimpleSigner):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.private_key = serialization.load_der_private_key(self.signing_key.dump(), password=None)
+
+        async def async_sign_raw(self, data: bytes, digest_algorithm: str, dry_run=False) -> bytes:
+            mechanism = self.get_signature_mechanism_for_digest(digest_algorithm)
+            try:
+                algo = mechanism.signature_algo
+            except ValueError:
+                algo = mechanism["algorithm"].native
+            key = self.private_key
+            if algo == "rsassa_pkcs1v15" and isinstance(key, RSAPrivateKey):
+                return key.sign(data, PKCS1v15(), get_pyca_cryptography_hash(digest_algorithm))
+            if algo == "ecdsa" and isinstance(key, EllipticCurvePrivateKey):
+                return key.sign(data, ECDSA(get_pyca_cryptography_hash(digest_algorithm)))
+            return await super().async_sign_raw(data, digest_algorithm, dry_run)
+
+    _KeySigner = KeySigner
+    return KeySigner
+
+
+def _page_boxes(path: Path) -> list[tuple[float, float, float, float, int]]:
+    """Geometry (CropBox, inherited, else MediaBox, and /Rotate) of every page."""
+    from pypdf import PdfReader
+
+    return [page_geometry(page) for page in PdfReader(str(path)).pages]
+
+
+def _field_names(boxes: list[dict]) -> list[str]:
+    """Unique field names: the box name (or "Signature"), suffixed when repeated."""
+    names, seen = [], {}
+    for box in boxes:
+        base = str(box.get("name") or "Signature").strip() or "Signature"
+        count = seen.get(base, 0)
+        seen[base] = count + 1
+        names.append(base if count == 0 else f"{base}_{count + 1}")
+    return names
+
+
+def sign_document(
+    signer,
+    input_path: str | Path,
+    output_path: str | Path,
+    boxes: list[dict],
+    unit: str = "mm",
+    origin: str = "bottom_left",
+    reason: str | None = None,
+    location: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Copy input_path to output_path and add one signature per box; return the count.
+
+    Each signature is an incremental update signed in place on output_path.
+
+    Raises:
+        ValueError: Invalid box (page out of range, unknown unit/origin, bad numbers).
+    """
+    from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+    from pyhanko.sign import fields, signers
+
+    input_path, output_path = Path(input_path), Path(output_path)
+    page_boxes = _page_boxes(input_path)
+    specs = []
+    for box, name in zip(boxes, _field_names(boxes)):
+        try:
+            page = int(box.get("page", 1))
+            values = [float(box[k]) for k in ("x", "y", "width", "height")]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid signature box: {box!r}")
+        if not 1 <= page <= len(page_boxes):
+            raise ValueError(f"Signature box {name}: page {page} out of range (1-{len(page_boxes)})")
+        *page_box, rotate = page_boxes[page - 1]
+        rect = box_to_rect(*values, unit=unit, origin=origin, page_box=tuple(page_box), rotate=rotate)
+        specs.append(fields.SigFieldSpec(name, on_page=page - 1, box=tuple(round(v, 2) for v in rect)))
+
+    if input_path.resolve() != output_path.resolve():
+        shutil.copyfile(input_path, output_path)
+    with open(output_path, "r+b") as fh:
+        for spec in specs:
+            fh.seek(0)
+            meta = signers.PdfSignatureMetadata(
+                field_name=spec.sig_field_name,
+                md_algorithm="sha256",
+                subfilter=fields.SigSeedSubFilter.PADES,
+                reason=reason,
+                location=location,
+            )
+            pdf_signer = signers.PdfSigner(meta, signer=signer, new_field_spec=spec)
+            pdf_signer.sign_pdf(IncrementalPdfFileWriter(fh, strict=False), in_place=True, chunk_size=chunk_size)
+    return len(specs)
+
+
+def _job_boxes(job: dict) -> list[dict]:
+    boxes = job.get("signature_boxes", job.get("boxes"))
+    if not isinstance(boxes, list) or not boxes:
+        raise ValueError("job has no signature_boxes")
+    return boxes
+
+
+def _init_worker(pkcs12_path: str, passphrase: bytes | None, loads) -> None:
+    global _signer
+    _signer = load_signer(pkcs12_path, passphrase)
+    with loads.get_lock():
+        loads.value += 1
+
+
+def _run_job(job: dict, defaults: dict) -> dict:
+    """Sign one job with the process-wide signer; errors are reported, not raised."""
+    started = time.perf_counter()
+    result = {"input": job.get("input"), "output": job.get("output")}
+    try:
+        if not job.get("input") or not job.get("output"):
+            raise ValueError("job needs input and output")
+        if not Path(job["input"]).is_file():
+            raise ValueError(f"File not found: {job['input']}")
+        result["signatures"] = sign_document(
+            _signer,
+            job["input"],
+            job["output"],
+            _job_boxes(job),
+            unit=job.get("unit", "mm"),
+            origin=job.get("origin", "bottom_left"),
+            reason=job.get("reason", defaults.get("reason")),
+            location=job.get("location", defaults.get("location")),
+            chunk_size=defaults.get("chunk_size", DEFAULT_CHUNK_SIZE),
+        )
+    except Exception as e:  # noqa: BLE001 - one bad document must not stop the batch
+        result["error"] = str(e) or type(e).__name__
+    result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def sign_batch(
+    jobs: list[dict],
+    pkcs12_path: str | Path,
+    passphrase: bytes | None = None,
+    workers: int | None = None,
+    reason: str | None = None,
+    location: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """Sign all jobs and return the report (see module docstring).
+
+    With workers 1 (or a single job) everything runs in this process with one key load;
+    otherwise the key is loaded here once and jobs go to a process pool whose workers each load
+    it once (keyLoads counts them all, including workers that got no job).
+
+    Raises:
+        ValueError: If the key cannot be loaded.
+    """
+    global _signer
+    started = time.perf_counter()
+    defaults = {"reason": reason, "location": location, "chunk_size": chunk_size}
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    if workers == 1:
+        _signer = load_signer(pkcs12_path, passphrase)
+        results = [_run_job(job, defaults) for job in jobs]
+        key_loads = 1
+    else:
+        load_signer(pkcs12_path, passphrase)  # fail fast (and with a clear error) on a bad key
+        mp = multiprocessing.get_context()
+        loads = mp.Value("i", 0)
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp, initializer=_init_worker, initargs=(str(pkcs12_path), passphrase, loads)
+        ) as pool:
+            results = list(pool.map(_run_job, jobs, [defaults] * len(jobs)))
+        key_loads = 1 + loads.value
+    total_ms = (time.perf_counter() - started) * 1000
+    signatures = sum(r.get("signatures", 0) for r in results)
+    return {
+        "script": "pdf_batch_sign",
+        "documents": len(jobs),
+        "signatures": signatures,
+        "errors": sum(1 for r in results if "error" in r),
+        "workers": workers,
+        "keyLoads": key_loads,
+        "totalMs": round(total_ms, 2),
+        "signaturesPerSec": round(signatures / (total_ms / 1000), 2) if total_ms else None,
+        "jobs": results,
+    }
+
+
+def sign_stage(ctx, options: dict) -> dict:
+    """Process bytes stage: sign ctx.data at options["signature_boxes"] (unit/origin as in the jobs file).
+
+    Options: pkcs12 (path), passphraseEnv (default PDF_SIGN_PASSPHRASE), unit, origin,
+    signature_boxes, reason, location. The key is cached for the life of the process.
+    """
+    pkcs12 = options.get("pkcs12")
+    if not pkcs12:
+        raise ValueError("sign: pkcs12 option is required")
+    passphrase = os.environ.get(options.get("passphraseEnv", PASSPHRASE_ENV))
+    passphrase = passphrase.encode() if passphrase is not None else None
+    key = (str(pkcs12), passphrase)
+    signer = _signers_by_path.get(key)
+    if signer is None:
+        signer = _signers_by_path[key] = load_signer(pkcs12, passphrase)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "signing.pdf"
+        path.write_bytes(ctx.data)
+        count = sign_document(
+            signer,
+            path,
+            path,
+            _job_boxes(options),
+            unit=options.get("unit", "mm"),
+            origin=options.get("origin", "bottom_left"),
+            reason=options.get("reason"),
+            location=options.get("location"),
+        )
+        ctx.data = path.read_bytes()
+    return {"signatures": count}
+
+
+def _load_jobs(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    jobs = data.get("jobs") if isinstance(data, dict) else data
+    if not isinstance(jobs, list) or not all(isinstance(j, dict) for j in jobs):
+        raise ValueError("jobs must be a list of objects")
+    return jobs
+
+
+def main() -> None:
+    """Entry point: parse --pkcs12, --jobs and options, sign, print the JSON report."""
+    ap = argparse.ArgumentParser(description="Batch PAdES signing with one key load")
+    ap.add_argument("--pkcs12", required=True, help="PKCS#12 (.p12/.pfx) file with key and certificate")
+    ap.add_argument("--jobs", required=True, help="JSON file with the signing jobs")
+    ap.add_argument(
+        "--passphrase-env",
+        default=PASSPHRASE_ENV,
+        help=f"Environment variable holding the PKCS#12 passphrase (default {PASSPHRASE_ENV})",
+    )
+    ap.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count, at most one per job)")
+    ap.add_argument("--reason", default=None, help="Default /Reason for jobs without one")
+    ap.add_argument("--location", default=None, help="Default /Location for jobs without one")
+    args = ap.parse_args()
+
+    passphrase = os.environ.get(args.passphrase_env)
+    try:
+        jobs = _load_jobs(args.jobs)
+        report = sign_batch(
+            jobs,
+            args.pkcs12,
+            passphrase.encode() if passphrase is not None else None,
+            workers=args.workers,
+            reason=args.reason,
+            location=args.location,
+        )
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(report))
+    sys.exit(1 if report["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
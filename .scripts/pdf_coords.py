@@ -0,0 +1,247 @@
+"""Coordinate conversions between the bundle's viewer space and PDF user space.
+
+SignatureCoordinatesModel stores boxes in a unit (pt, mm, cm, in, px) relative to one of four
+corners (top_left, bottom_left, top_right, bottom_right) of the page as the viewer shows it:
+the CropBox, turned clockwise by the page's /Rotate. PDF rectangles (widget /Rect) are in points
+in the page's unrotated user space, y up. The conversion factors are the ones the viewer uses
+(signable-editor/constants.ts PT_TO_UNIT: px = 96 dpi).
+
+Viewer rects are [x, y, x + width, y + height]: (x, y) is the box corner nearest the origin,
+as in SignatureBoxModel. A page's geometry is (x0, y0, x1, y1, rotate) with the CropBox
+corners and /Rotate (page_geometry() reads it from a pypdf page).
+
+rects_to_viewer() and rects_from_viewer() convert many rects in one call, each with one shared
+geometry or its own (e.g. fields of all pages at once). With NumPy installed (optional, imported
+on first use), NumPy arrays and inputs of at least NUMPY_MIN_RECTS rects are converted as
+arrays; otherwise (or with use_numpy=False) a pure-Python loop gives the same results. On 100k
+rects: ~0.35 s pure Python, ~0.2 s with NumPy from lists, ~0.04 s array to array. No pypdf
+import here.
+"""
+from __future__ import annotations
+
+# Points per unit (inverse of PT_TO_UNIT in the frontend)
+UNIT_TO_PT = {"pt": 1.0, "mm": 72 / 25.4, "cm": 72 / 2.54, "in": 72.0, "px": 72 / 96}
+ORIGINS = ("top_left", "bottom_left", "top_right", "bottom_right")
+NUMPY_MIN_RECTS = 64  # below this the array setup costs more than the loop
+
+_np = False  # numpy module, None when not installed; imported on first large conversion
+
+
+def _numpy():
+    """The numpy module or None (optional dependency, imported lazily: it costs ~0.1 s)."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _np = numpy
+    return _np
+
+# User space -> viewer space (top-left origin, y down) per quarter turn, as
+# dx = a*ux + c*uy + e, dy = b*ux + d*uy + f with e, f picked from the CropBox corners.
+_ROT_ABCD = ((1, 0, 0, -1), (0, 1, 1, 0), (-1, 0, 0, 1), (0, -1, -1, 0))
+
+
+def _check(unit: str, origin: str) -> float:
+    if unit not in UNIT_TO_PT:
+        raise ValueError(f"Unknown unit: {unit} (expected one of {', '.join(UNIT_TO_PT)})")
+    if origin not in ORIGINS:
+        raise ValueError(f"Unknown origin: {origin} (expected one of {', '.join(ORIGINS)})")
+    return UNIT_TO_PT[unit]
+
+
+def _quarter(rotate) -> int:
+    """0-3 quarter turns for a /Rotate value (multiples of 90, negative allowed)."""
+    rotate = int(rotate)
+    if rotate % 90:
+        raise ValueError(f"Invalid page rotation: {rotate} (must be a multiple of 90)")
+    return (rotate // 90) % 4
+
+
+def page_geometry(page) -> tuple[float, float, float, float, int]:
+    """(x0, y0, x1, y1, rotate) of a pypdf page: normalized CropBox and /Rotate in 0, 90, 180, 270."""
+    box = [float(v) for v in page.cropbox]
+    rotate = _quarter(page.rotation if hasattr(page, "rotation") else page.get("/Rotate", 0))
+    return min(box[0], box[2]), min(box[1], box[3]), max(box[0], box[2]), max(box[1], box[3]), rotate * 90
+
+
+def _affine(geometry) -> tuple[float, float, float, float, float, float, float, float]:
+    """(a, b, c, d, e, f, viewer width, viewer height) of one page geometry."""
+    bx0, by0, bx1, by1, rotate = geometry
+    bx0, bx1 = min(bx0, bx1), max(bx0, bx1)
+    by0, by1 = min(by0, by1), max(by0, by1)
+    q = _quarter(rotate)
+    a, b, c, d = _ROT_ABCD[q]
+    e, f = ((-bx0, by1), (-by0, -bx0), (bx1, -by0), (by1, bx1))[q]
+    w, h = bx1 - bx0, by1 - by0
+    return a, b, c, d, e, f, (h if q % 2 else w), (w if q % 2 else h)
+
+
+def _to_viewer_one(rect, affine, k: float, right: bool, bottom: bool) -> list[float]:
+    a, b, c, d, e, f, vw, vh = affine
+    ux0, uy0, ux1, uy1 = rect
+    xs = (a * ux0 + c * uy0 + e, a * ux1 + c * uy1 + e)
+    ys = (b * ux0 + d * uy0 + f, b * ux1 + d * uy1 + f)
+    x, y = min(xs), min(ys)
+    w, h = max(xs) - x, max(ys) - y
+    if right:
+        x = vw - x - w
+    if bottom:
+        y = vh - y - h
+    return [x / k, y / k, (x + w) / k, (y + h) / k]
+
+
+def _from_viewer_one(box, affine, k: float, right: bool, bottom: bool) -> list[float]:
+    a, b, c, d, e, f, vw, vh = affine
+    x, y = min(box[0], box[2]) * k, min(box[1], box[3]) * k
+    w, h = abs(box[2] - box[0]) * k, abs(box[3] - box[1]) * k
+    if right:
+        x = vw - x - w
+    if bottom:
+        y = vh - y - h
+    # Inverse of an axis-aligned quarter turn is its transpose
+    dx0, dy0, dx1, dy1 = x - e, y - f, x + w - e, y + h - f
+    us = (a * dx0 + b * dy0, a * dx1 + b * dy1)
+    vs = (c * dx0 + d * dy0, c * dx1 + d * dy1)
+    return [min(us), min(vs), max(us), max(vs)]
+
+
+def _single_geometry(geometry) -> bool:
+    return len(geometry) == 5 and not hasattr(geometry[0], "__len__")
+
+
+def _convert_numpy(np, rects, geometry, k: float, right: bool, bottom: bool, inverse: bool):
+    r = np.asarray(rects, dtype=float).reshape(-1, 4)
+    g = np.asarray(geometry, dtype=float).reshape(-1, 5)
+    bx0, bx1 = np.minimum(g[:, 0], g[:, 2]), np.maximum(g[:, 0], g[:, 2])
+    by0, by1 = np.minimum(g[:, 1], g[:, 3]), np.maximum(g[:, 1], g[:, 3])
+    if np.any(g[:, 4] % 90):
+        raise ValueError("Invalid page rotation (must be a multiple of 90)")
+    q = (g[:, 4] // 90).astype(int) % 4
+    abcd = np.asarray(_ROT_ABCD, dtype=float)[q]
+    a, b, c, d = abcd[:, 0], abcd[:, 1], abcd[:, 2], abcd[:, 3]
+    e = np.choose(q, (-bx0, -by0, bx1, by1))
+    f = np.choose(q, (by1, -bx0, -by0, bx1))
+    odd = q % 2 == 1
+    vw = np.where(odd, by1 - by0, bx1 - bx0)
+    vh = np.where(odd, bx1 - bx0, by1 - by0)
+    out = np.empty_like(r)
+    if not inverse:
+        xa, xb = a * r[:, 0] + c * r[:, 1] + e, a * r[:, 2] + c * r[:, 3] + e
+        ya, yb = b * r[:, 0] + d * r[:, 1] + f, b * r[:, 2] + d * r[:, 3] + f
+        x, y = np.minimum(xa, xb), np.minimum(ya, yb)
+        w, h = np.abs(xb - xa), np.abs(yb - ya)
+        if right:
+            x = vw - x - w
+        if bottom:
+            y = vh - y - h
+        out[:, 0], out[:, 1], out[:, 2], out[:, 3] = x / k, y / k, (x + w) / k, (y + h) / k
+        return out
+    x, y = np.minimum(r[:, 0], r[:, 2]) * k, np.minimum(r[:, 1], r[:, 3]) * k
+    w, h = np.abs(r[:, 2] - r[:, 0]) * k, np.abs(r[:, 3] - r[:, 1]) * k
+    if right:
+        x = vw - x - w
+    if bottom:
+        y = vh - y - h
+    dx0, dy0, dx1, dy1 = x - e, y - f, x + w - e, y + h - f
+    ua, ub = a * dx0 + b * dy0, a * dx1 + b * dy1
+    va, vb = c * dx0 + d * dy0, c * dx1 + d * dy1
+    out[:, 0], out[:, 1], out[:, 2], out[:, 3] = (
+        np.minimum(ua, ub),
+        np.minimum(va, vb),
+        np.maximum(ua, ub),
+        np.maximum(va, vb),
+    )
+    return out
+
+
+def _convert(rects, geometry, unit: str, origin: str, use_numpy: bool | None, inverse: bool):
+    k = _check(unit, origin)
+    right, bottom = origin.endswith("right"), origin.startswith("bottom")
+    single = _single_geometry(geometry)
+    count = len(rects)
+    if not single and len(geometry) != count:
+        raise ValueError(f"Expected one geometry or {count}, got {len(geometry)}")
+    np = None
+    if use_numpy or (use_numpy is None and (count >= NUMPY_MIN_RECTS or not isinstance(rects, (list, tuple)))):
+        np = _numpy()
+        if np is None and use_numpy:
+            raise ValueError("use_numpy=True but NumPy is not installed")
+    is_array = np is not None and isinstance(rects, np.ndarray)
+    if np is not None and (use_numpy or is_array or count >= NUMPY_MIN_RECTS) and count:
+        out = _convert_numpy(np, rects, geometry, k, right, bottom, inverse)
+        return out if is_array else out.tolist()
+    one = _from_viewer_one if inverse else _to_viewer_one
+    if single:
+        affine = _affine(geometry)
+        return [one(r, affine, k, right, bottom) for r in rects]
+    affines: dict[tuple, tuple] = {}  # pages repeat: one affine per distinct geometry
+    out = []
+    for r, g in zip(rects, geometry):
+        g = tuple(g)
+        affine = affines.get(g)
+        if affine is None:
+            affine = affines[g] = _affine(g)
+        out.append(one(r, affine, k, right, bottom))
+    return out
+
+
+def rects_to_viewer(rects, geometry, unit: str = "pt", origin: str = "top_left", use_numpy: bool | None = None):
+    """Convert PDF rects (x0, y0, x1, y1 in user space points) to viewer rects.
+
+    Args:
+        rects: Sequence (or N x 4 NumPy array) of PDF rects.
+        geometry: One page geometry (x0, y0, x1, y1, rotate) for all rects, or one per rect.
+        unit: One of UNIT_TO_PT.
+        origin: One of ORIGINS.
+        use_numpy: Force (True) or disable (False) the NumPy path; None picks it for arrays
+            and inputs of NUMPY_MIN_RECTS rects or more when NumPy is installed.
+
+    Returns:
+        Viewer rects [x, y, x + width, y + height] in unit: a list of lists, or an array when
+        rects is a NumPy array.
+
+    Raises:
+        ValueError: Unknown unit or origin, rotation not a multiple of 90, or geometry count
+            not matching.
+    """
+    return _convert(rects, geometry, unit, origin, use_numpy, inverse=False)
+
+
+def rects_from_viewer(rects, geometry, unit: str = "pt", origin: str = "top_left", use_numpy: bool | None = None):
+    """Convert viewer rects [x, y, x + width, y + height] in unit to PDF rects (x0, y0, x1, y1).
+
+    Inverse of rects_to_viewer() (same arguments and return types).
+    """
+    return _convert(rects, geometry, unit, origin, use_numpy, inverse=True)
+
+
+def box_to_rect(
+    x: float,
+    y: float,
+    width: float,
+    height: float,
+    unit: str = "mm",
+    origin: str = "bottom_left",
+    page_box: tuple[float, float, float, float] = (0.0, 0.0, 612.0, 792.0),
+    rotate: int = 0,
+) -> tuple[float, float, float, float]:
+    """Convert one box to a PDF rectangle (x0, y0, x1, y1) in points.
+
+    Args:
+        x, y: Position of the box corner nearest to origin, in unit.
+        width, height: Box size in unit.
+        unit: One of UNIT_TO_PT.
+        origin: One of ORIGINS.
+        page_box: Visible page box (CropBox, else MediaBox) as x0, y0, x1, y1.
+        rotate: Page /Rotate (clockwise degrees the viewer turns the page).
+
+    Raises:
+        ValueError: Unknown unit or origin, or rotate not a multiple of 90.
+    """
+    k = _check(unit, origin)
+    rect = _from_viewer_one(
+        (x, y, x + width, y + height), _affine((*page_box, rotate)), k, origin.endswith("right"), origin.startswith("bottom")
+    )
+    return tuple(rect)
@@ -0,0 +1,125 @@
+"""Hash a file's bytes while they are read or written (tee hashing) for audit fingerprints.
+
+HashingReader and HashingWriter wrap a binary file object and update a SHA-256 digest with
+every byte that passes through, so the apply and process scripts can report input and output
+fingerprints without reading either file a second time:
+
+  with open(path, "rb") as fh:
+      source = HashingReader(fh)
+      data = source.read()          # hashed while read
+  sink = HashingWriter(sys.stdout.buffer)
+  sink.write(out)                   # hashed while written
+  print(json.dumps({"script": "...", **digest_report(source, sink)}), file=sys.stderr)
+
+Both are sequential: the digest covers the bytes in the order they were transferred, which is
+the file content when it is read or written from start to end (as the scripts do).
+
+set_content_id() gives a pypdf writer a trailer /ID derived from what the output is made of
+(input bytes, patches, options) for the scripts' --deterministic mode. Standard library only
+(set_content_id() uses the caller's pypdf).
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+
+
+class HashingReader(io.RawIOBase):
+    """Read-only, non-seekable view of raw that hashes every byte read.
+
+    Args:
+        raw: Binary file object opened for reading (positioned at the start).
+        algorithm: hashlib algorithm name.
+    """
+
+    def __init__(self, raw, algorithm: str = "sha256") -> None:
+        super().__init__()
+        self._raw = raw
+        self._hash = hashlib.new(algorithm)
+        self.bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = self._raw.readinto(b)
+        if n:
+            with memoryview(b) as view:
+                self._hash.update(view[:n])
+            self.bytes += n
+        return n or 0
+
+    def readall(self) -> bytes:
+        data = self._raw.read()
+        self._hash.update(data)
+        self.bytes += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class HashingWriter(io.RawIOBase):
+    """Write-only view of raw that hashes every byte written (raw is not closed with it).
+
+    Args:
+        raw: Binary file object opened for writing.
+        algorithm: hashlib algorithm name.
+    """
+
+    def __init__(self, raw, algorithm: str = "sha256") -> None:
+        super().__init__()
+        self._raw = raw
+        self._hash = hashlib.new(algorithm)
+        self.bytes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        with memoryview(b) as view:
+            n = view.nbytes
+            self._hash.update(view)
+            self._raw.write(view)
+        self.bytes += n
+        return n
+
+    def flush(self) -> None:
+        self._raw.flush()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def digest_report(source: HashingReader | None, sink: HashingWriter | None) -> dict:
+    """{"input_sha256", "input_bytes", "output_sha256", "output_bytes"} for the given streams.
+
+    A side that is None (e.g. no output in a dry run) is left out.
+    """
+    report = {}
+    if source is not None:
+        report.update(input_sha256=source.hexdigest(), input_bytes=source.bytes)
+    if sink is not None:
+        report.update(output_sha256=sink.hexdigest(), output_bytes=sink.bytes)
+    return report
+
+
+def set_content_id(writer, *parts: bytes | str) -> bytes:
+    """Set writer's trailer /ID from a SHA-256 of parts instead of leaving it to the PDF library.
+
+    The second identifier is the first 16 bytes of SHA-256 over the parts (each hashed on its
+    own, so part boundaries count): the same input and changes always give the same /ID, and
+    other changes a different one. The first identifier, the permanent one (PDF 32000-1
+    section 14.4), is kept when the document has one and is the same value otherwise. Returns
+    the second identifier.
+    """
+    from pypdf.generic import ArrayObject, ByteStringObject
+
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(hashlib.sha256(part.encode("utf-8") if isinstance(part, str) else part).digest())
+    content_id = digest.digest()[:16]
+    existing = getattr(writer, "_ID", None)
+    first = existing[0] if existing else ByteStringObject(content_id)
+    writer._ID = ArrayObject([first, ByteStringObject(content_id)])
+    return content_id
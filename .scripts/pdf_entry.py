@@ -0,0 +1,24 @@
+"""Entry point shared by the AcroForm scripts' __main__ blocks.
+
+run_script() calls a script's main() with the process-wide options that wrap it rather than
+live inside it: the invocation recorder (pdf_record.py, only imported when PDF_SCRIPTS_RECORD is
+set), the memory ceiling error (pdf_memory.run_limited) and profiling (pdf_profile.run_profiled).
+"""
+from __future__ import annotations
+
+import os
+
+from pdf_memory import run_limited
+from pdf_profile import run_profiled
+
+
+def run_script(main, script: str):
+    """Run main() for script as its command-line entry point; returns main()'s result."""
+    def run():
+        return run_limited(lambda: run_profiled(main, script), script)
+
+    if os.environ.get("PDF_SCRIPTS_RECORD"):
+        from pdf_record import run_recorded
+
+        return run_recorded(run, script)
+    return run()
@@ -0,0 +1,325 @@
+"""Flatten an AcroForm: bake each widget's normal appearance into the page content.
+
+For every Widget annotation the normal appearance stream (/AP /N, or the /AS state of a
+checkbox/radio) is drawn on the page with one "cm ... Do" per widget. The appearance stream is
+referenced as a Form XObject as-is, so widgets sharing an appearance share one XObject and
+nothing is copied. Widgets are then removed from /Annots and /AcroForm from the catalog; other
+annotations (links, comments) are kept.
+
+Forms that rely on NeedAppearances have values but no appearance streams. For a text or choice
+widget with a value and no normal appearance a single-line appearance is generated (Helvetica,
+size and color from /DA, text outside WinAnsi shown as "?"); a checkbox or radio that is on
+without an appearance for its state makes the stage fail with ValueError instead of losing the
+value. Widgets without a value and without an appearance are removed without drawing anything
+(missingAppearance in the stats).
+
+Cost is one pass over the widgets plus one appended content stream per page (no per-widget
+re-serialization).
+
+The removed widget and field dictionaries stay in the writer until it is garbage collected
+(e.g. by an optimize stage).
+
+Usage (process_modified_pdf.py stage):
+  {"stages": ["fill", "flatten"]}
+"""
+from __future__ import annotations
+
+import re
+
+_FLAG_HIDDEN = 1 << 1
+_FLAG_NOVIEW = 1 << 5
+_DA_FONT_RE = re.compile(r"/[^\s/]+\s+(-?[\d.]+)\s+Tf")
+_DA_COLOR_RE = re.compile(r"(?:-?[\d.]+\s+){1,4}(?:g|rg|k)\b")
+
+
+class _PagePlan:
+    """What flattening one page needs: widgets to draw and annotations to keep."""
+
+    __slots__ = ("draws", "keep", "removed", "missing", "generated")
+
+    def __init__(self) -> None:
+        self.draws: list[tuple[object, tuple[float, ...]]] = []  # (appearance ref or stream, cm matrix)
+        self.keep: list = []  # non-widget annotation refs
+        self.removed = 0
+        self.missing = 0  # widgets without a value or a usable normal appearance
+        self.generated = 0  # appearances generated for widgets that only had a value
+
+
+def _num(x: float) -> str:
+    """Format a number for a content stream (no exponent, at most 4 decimals)."""
+    s = f"{x:.4f}".rstrip("0").rstrip(".")
+    return s if s not in ("", "-0") else "0"
+
+
+def _transform_bbox(bbox: list[float], m: list[float]) -> tuple[float, float, float, float]:
+    """Bounding box of bbox transformed by matrix m (ISO 32000-1, 12.5.5 step 1)."""
+    a, b, c, d, e, f = m
+    xs, ys = [], []
+    for x in (bbox[0], bbox[2]):
+        for y in (bbox[1], bbox[3]):
+            xs.append(a * x + c * y + e)
+            ys.append(b * x + d * y + f)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _appearance_matrix(rect: list[float], bbox: list[float], matrix: list[float]) -> tuple[float, ...] | None:
+    """Matrix A mapping the transformed appearance BBox onto the annotation Rect (12.5.5 step 2).
+
+    The form's own /Matrix is applied by the Do operator, so only A goes into "cm".
+    """
+    x0, y0, x1, y1 = _transform_bbox(bbox, matrix)
+    if x1 - x0 <= 0 or y1 - y0 <= 0:
+        return None
+    rx0, ry0 = min(rect[0], rect[2]), min(rect[1], rect[3])
+    rx1, ry1 = max(rect[0], rect[2]), max(rect[1], rect[3])
+    sx = (rx1 - rx0) / (x1 - x0)
+    sy = (ry1 - ry0) / (y1 - y0)
+    return (sx, 0.0, 0.0, sy, rx0 - sx * x0, ry0 - sy * y0)
+
+
+def _floats(arr, n: int) -> list[float] | None:
+    try:
+        vals = [float(v) for v in arr]
+    except (TypeError, ValueError):
+        return None
+    return vals if len(vals) == n else None
+
+
+def _inherited(page, key: str):
+    """Page attribute, looked up through the /Parent page tree nodes when not on the page."""
+    node = page
+    while node is not None:
+        val = node.get(key)
+        if val is not None:
+            return val
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+    return None
+
+
+def _normal_appearance(annot):
+    """Return the normal appearance stream reference of a widget (state per /AS), or None."""
+    ap = annot.get("/AP")
+    if ap is None:
+        return None
+    ap = ap.get_object()
+    normal_ref = ap.get("/N") if hasattr(ap, "get") else None
+    if normal_ref is None:
+        return None
+    normal = normal_ref.get_object()
+    if hasattr(normal, "get_data"):
+        return normal_ref
+    # Checkbox / radio: dictionary of appearance states
+    state = annot.get("/AS")
+    if state is None or not hasattr(normal, "get"):
+        return None
+    return normal.get(state)
+
+
+def _field_attr(annot, key: str):
+    """Field attribute of a widget: on the widget or inherited from its /Parent fields."""
+    node, depth = annot, 0
+    while node is not None and depth < 32:
+        val = node.get(key)
+        if val is not None:
+            return val.get_object()
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+        depth += 1
+    return None
+
+
+def _pdf_text(text: str) -> str:
+    """A PDF literal string for text in WinAnsiEncoding (other characters become "?")."""
+    raw = text.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _text_appearance(annot, rect: list[float], value: str, default_da: str):
+    """Single-line Form XObject showing value in the widget rect (see the module docstring)."""
+    from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, StreamObject
+
+    width, height = abs(rect[2] - rect[0]), abs(rect[3] - rect[1])
+    da = str(_field_attr(annot, "/DA") or default_da or "")
+    m = _DA_FONT_RE.search(da)
+    size = float(m.group(1)) if m else 0.0
+    if size <= 0:  # auto size: fit the height
+        size = max(1.0, min(12.0, (height - 4) * 0.8))
+    color = _DA_COLOR_RE.search(_DA_FONT_RE.sub(" ", da))
+    text = value.replace("\r", " ").replace("\n", " ")
+    y = max(0.0, (height - size) / 2 + size * 0.22)
+    content = (
+        f"/Tx BMC q 1 1 {_num(width - 2)} {_num(height - 2)} re W n BT /Helv {_num(size)} Tf "
+        f"{color.group(0) if color else '0 g'} 2 {_num(y)} Td {_pdf_text(text)} Tj ET Q EMC\n"
+    )
+    font = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+            NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+        }
+    )
+    stream = StreamObject()
+    stream.update(
+        {
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Form"),
+            NameObject("/BBox"): ArrayObject([FloatObject(0), FloatObject(0), FloatObject(width), FloatObject(height)]),
+            NameObject("/Resources"): DictionaryObject(
+                {NameObject("/Font"): DictionaryObject({NameObject("/Helv"): font})}
+            ),
+        }
+    )
+    stream.set_data(content.encode("latin-1"))
+    return stream
+
+
+def _value_appearance(annot, rect: list[float], default_da: str):
+    """Generated appearance for a widget that has a value but no normal appearance.
+
+    Returns None when the widget has nothing to show (no value, checkbox or radio off, signature).
+
+    Raises:
+        ValueError: For a checkbox or radio that is on, whose look cannot be generated.
+    """
+    value = _field_attr(annot, "/V")
+    field_type = _field_attr(annot, "/FT")
+    if value is None or field_type not in ("/Tx", "/Ch"):
+        if field_type == "/Btn" and value not in (None, "/Off", ""):
+            name = _field_attr(annot, "/T")
+            raise ValueError(f"flatten: button field {name!s} is {value!s} but has no appearance for that state")
+        return None
+    if isinstance(value, list):
+        value = ", ".join(str(v) for v in value)
+    value = str(value)
+    return _text_appearance(annot, rect, value, default_da) if value else None
+
+
+def _plan_page(page, default_da: str = "") -> _PagePlan:
+    """Collect the draws for one page (appearances are only generated, not added to the writer)."""
+    plan = _PagePlan()
+    annots = page.get("/Annots")
+    if annots is None:
+        return plan
+    for ref in annots.get_object():
+        annot = ref.get_object()
+        if annot is None or annot.get("/Subtype") != "/Widget":
+            plan.keep.append(ref)
+            continue
+        plan.removed += 1
+        try:
+            flags = int(annot.get("/F") or 0)
+        except (TypeError, ValueError):
+            flags = 0
+        if flags & (_FLAG_HIDDEN | _FLAG_NOVIEW):
+            continue
+        rect = _floats(annot.get("/Rect") or [], 4)
+        ap_ref = _normal_appearance(annot)
+        if ap_ref is None and rect is not None:
+            ap_ref = _value_appearance(annot, rect, default_da)
+            plan.generated += ap_ref is not None
+        stream = ap_ref.get_object() if ap_ref is not None else None
+        bbox = _floats(stream.get("/BBox") or [], 4) if stream is not None else None
+        if rect is None or bbox is None:
+            plan.missing += 1
+            continue
+        matrix = _floats(stream.get("/Matrix") or [1, 0, 0, 1, 0, 0], 6) or [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+        cm = _appearance_matrix(rect, bbox, matrix)
+        if cm is None:
+            plan.missing += 1
+            continue
+        plan.draws.append((ap_ref, cm))
+    return plan
+
+
+def _apply_plan(writer, page, plan: _PagePlan) -> None:
+    """Write the draws of one plan into the page's resources and contents."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+    if plan.draws:
+        resources = _inherited(page, "/Resources")
+        # Copy (shallowly) so pages sharing one resources dictionary do not see each other's names
+        resources = DictionaryObject(resources.get_object()) if resources is not None else DictionaryObject()
+        xobjects = resources.get("/XObject")
+        xobjects = DictionaryObject(xobjects.get_object()) if xobjects is not None else DictionaryObject()
+        names: dict[tuple[int, int], str] = {}
+        ops = []
+        counter = 0
+        for ap_ref, cm in plan.draws:
+            if not isinstance(ap_ref, IndirectObject):
+                ap_ref = writer._add_object(ap_ref)
+            key = (ap_ref.idnum, ap_ref.generation)
+            name = names.get(key)
+            if name is None:
+                while f"/Fx{counter}" in xobjects:
+                    counter += 1
+                name = f"/Fx{counter}"
+                counter += 1
+                names[key] = name
+                stream = ap_ref.get_object()
+                stream.setdefault(NameObject("/Type"), NameObject("/XObject"))
+                stream.setdefault(NameObject("/Subtype"), NameObject("/Form"))
+                xobjects[NameObject(name)] = ap_ref
+            ops.append(f"q {' '.join(_num(v) for v in cm)} cm {name} Do Q\n")
+        resources[NameObject("/XObject")] = xobjects
+        page[NameObject("/Resources")] = resources
+
+        # Isolate the existing content's graphics state, then draw the appearances on top
+        before = StreamObject()
+        before.set_data(b"q\n")
+        after = StreamObject()
+        after.set_data(("Q\n" + "".join(ops)).encode("latin-1"))
+        contents = page.get("/Contents")
+        existing = []
+        if contents is not None:
+            resolved = contents.get_object()
+            existing = list(resolved) if isinstance(resolved, ArrayObject) else [contents]
+        page[NameObject("/Contents")] = ArrayObject([writer._add_object(before), *existing, writer._add_object(after)])
+
+    if plan.removed:
+        if plan.keep:
+            page[NameObject("/Annots")] = ArrayObject(plan.keep)
+        else:
+            del page["/Annots"]
+
+
+def flatten_writer(writer) -> dict:
+    """Flatten all widgets of a pypdf PdfWriter in place.
+
+    Args:
+        writer: PdfWriter holding the document.
+
+    Returns:
+        Dict with pages, widgets (removed), drawn, generated (appearances made from values)
+        and missingAppearance (removed without a value or appearance) counts.
+
+    Raises:
+        ValueError: A checkbox or radio is on but has no appearance for its state (the writer
+            is left unchanged).
+    """
+    from pypdf.generic import NameObject
+
+    pages = list(writer.pages)
+    root = writer.root_object
+    acro = root.get("/AcroForm")
+    acro = acro.get_object() if acro is not None else None
+    default_da = str(acro.get("/DA") or "") if acro is not None else ""
+    # Plan every page before changing any, so a failing widget leaves the document as it was
+    plans = [_plan_page(page, default_da) for page in pages]
+    for page, plan in zip(pages, plans):
+        _apply_plan(writer, page, plan)
+    if "/AcroForm" in root:
+        del root[NameObject("/AcroForm")]
+    return {
+        "pages": len(pages),
+        "widgets": sum(p.removed for p in plans),
+        "drawn": sum(len(p.draws) for p in plans),
+        "generated": sum(p.generated for p in plans),
+        "missingAppearance": sum(p.missing for p in plans),
+    }
+
+
+def flatten_stage(ctx, options: dict) -> dict:
+    """Flatten the form (no options); returns the flatten_writer() counts for the report."""
+    return flatten_writer(ctx.writer)
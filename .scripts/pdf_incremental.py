@@ -0,0 +1,166 @@
+"""Find the objects an incremental update appended to a PDF, reading only the appended sections.
+
+An incremental update (ISO 32000-1, 7.5.6) keeps the earlier bytes and appends the new and
+changed objects with a cross-reference section whose /Prev points at the previous one. Given the
+byte length the file had before, appended_objects() follows the /Prev chain from the end of the
+file through the sections at or after that length (xref tables, xref streams, and the /XRefStm
+of hybrid files) and returns the object numbers they define or free, plus the /Size of the
+earlier version, so the caller can redo only the work those objects affect:
+
+  with open(path, "rb") as fh:
+      reader = PdfReader(fh)
+      changed, previous_size = appended_objects(fh, previous_length, reader)
+
+NotIncremental is raised when the earlier bytes are not the previous version: no %%EOF right
+before previous_length, a rewritten file (the newest section has no /Prev), or a chain that
+does not lead to the previous version's startxref. Trailers and xref streams are parsed with
+pypdf (imported on first use) against the caller's reader.
+"""
+from __future__ import annotations
+
+import re
+
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)\s*%%EOF[\s\x00]*\Z")
+_OBJ_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_SUBSECTION_RE = re.compile(rb"\s*(\d+)[ \t]+(\d+)[ \t]*(?:\r\n|\r|\n)")
+_ENTRY_RE = re.compile(rb"\d{10} \d{5} [nf]")
+TAIL_BYTES = 1024
+MAX_SECTIONS = 4096
+
+
+class NotIncremental(ValueError):
+    """The file is not the previous version plus appended updates (message says why)."""
+
+
+def startxref_at(fh, end: int) -> int:
+    """The startxref offset of the %%EOF that ends at byte end (trailing whitespace allowed)."""
+    fh.seek(max(0, end - TAIL_BYTES))
+    tail = fh.read(min(end, TAIL_BYTES))
+    m = _STARTXREF_RE.search(tail)
+    if m is None:
+        raise NotIncremental(f"no startxref/%%EOF ends at byte {end}")
+    return int(m.group(1))
+
+
+def _int(value) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_table(fh, offset: int, reader, entries: bool) -> tuple[list[int], dict]:
+    """Object numbers and trailer of a classic xref table ("xref" keyword at offset)."""
+    from pypdf.generic import read_object
+
+    objects = []
+    pos = offset + 4
+    while True:
+        fh.seek(pos)
+        head = fh.read(64)
+        m = _SUBSECTION_RE.match(head)
+        if m is None:
+            break
+        start, count = int(m.group(1)), int(m.group(2))
+        pos += m.end()
+        if entries:
+            fh.seek(pos)
+            rows = fh.read(count * 20)
+            # Entries are 20 bytes each (7.5.4); anything else is left to a full read
+            if len(rows) != count * 20 or any(_ENTRY_RE.match(rows, i * 20) is None for i in range(count)):
+                raise NotIncremental(f"malformed xref table at byte {offset}")
+            objects.extend(range(start, start + count))
+        pos += count * 20
+    fh.seek(pos)
+    rest = fh.read(64)
+    if not rest.lstrip().startswith(b"trailer"):
+        raise NotIncremental(f"no trailer after the xref table at byte {offset}")
+    start = rest.find(b"<<", rest.index(b"trailer"))
+    if start < 0:
+        raise NotIncremental(f"no trailer after the xref table at byte {offset}")
+    fh.seek(pos + start)
+    return objects, read_object(fh, reader)
+
+
+def _read_stream(fh, offset: int, reader, entries: bool) -> tuple[list[int], dict]:
+    """Object numbers and dictionary of an xref stream ("N G obj" at offset)."""
+    from pypdf.generic import read_object
+
+    fh.seek(offset)
+    m = _OBJ_HEADER_RE.match(fh.read(64))
+    if m is None:
+        raise NotIncremental(f"no xref section at byte {offset}")
+    fh.seek(offset + m.end())
+    stream = read_object(fh, reader)
+    if not hasattr(stream, "get_data") or stream.get("/Type") != "/XRef":
+        raise NotIncremental(f"no xref stream at byte {offset}")
+    if not entries:
+        return [], stream
+    size = _int(stream.get("/Size")) or 0
+    index = [_int(v) for v in stream.get("/Index", [0, size])]
+    widths = [_int(v) for v in stream.get("/W", ())]
+    if len(widths) != 3 or None in widths or None in index or len(index) % 2:
+        raise NotIncremental(f"malformed xref stream at byte {offset}")
+    data = stream.get_data()
+    objects = []
+    for start, count in zip(index[::2], index[1::2]):
+        objects.extend(range(start, start + count))
+    if len(data) < len(objects) * sum(widths):
+        raise NotIncremental(f"truncated xref stream at byte {offset}")
+    return objects, stream
+
+
+def read_section(fh, offset: int, reader, entries: bool = True) -> tuple[list[int], dict]:
+    """(object numbers, trailer dictionary) of the xref section at offset.
+
+    With entries=False only the trailer (or xref stream dictionary) is read.
+    """
+    fh.seek(offset)
+    if fh.read(4) == b"xref":
+        return _read_table(fh, offset, reader, entries)
+    return _read_stream(fh, offset, reader, entries)
+
+
+def appended_objects(fh, previous_length: int, reader) -> tuple[set[int], int]:
+    """Object numbers (re)defined or freed after previous_length, and the earlier /Size.
+
+    Args:
+        fh: Seekable binary stream of the current file.
+        previous_length: Byte length of the earlier version (the file must start with it).
+        reader: pypdf PdfReader of fh, used to parse trailers and decode xref streams.
+
+    Returns:
+        (object numbers, /Size of the earlier version; 0 when it cannot be read). Object 0,
+        the head of the free list, is not reported. Numbers at or above the earlier /Size are new.
+
+    Raises:
+        NotIncremental: When the file is not the earlier version plus appended updates.
+    """
+    size = fh.seek(0, 2)
+    if previous_length <= 0 or size < previous_length:
+        raise NotIncremental(f"the file ({size} bytes) is shorter than the previous length {previous_length}")
+    previous_xref = startxref_at(fh, previous_length)
+    changed: set[int] = set()
+    offset = startxref_at(fh, size)
+    sections = 0
+    while offset >= previous_length:
+        sections += 1
+        if sections > MAX_SECTIONS or offset >= size:
+            raise NotIncremental(f"invalid xref chain at byte {offset}")
+        objects, trailer = read_section(fh, offset, reader)
+        changed.update(objects)
+        hybrid = _int(trailer.get("/XRefStm"))
+        if hybrid is not None and hybrid >= previous_length:
+            changed.update(read_section(fh, hybrid, reader)[0])
+        prev = _int(trailer.get("/Prev"))
+        if prev is None:
+            raise NotIncremental("the newest xref section has no /Prev (the file was rewritten)")
+        offset = prev
+    if offset != previous_xref:
+        raise NotIncremental(f"the xref chain leads to byte {offset}, not to the previous startxref {previous_xref}")
+    try:
+        previous_size = _int(read_section(fh, previous_xref, reader, entries=False)[1].get("/Size")) or 0
+    except Exception:  # noqa: BLE001 - unknown size: every changed object counts as modified
+        previous_size = 0
+    changed.discard(0)
+    return changed, previous_size
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""Write linearized ("fast web view") PDFs and check linearization.
+
+A linearized file starts with everything needed to display page 1 (ISO 32000-1, Annex F): the
+linearization dictionary, a first-page cross-reference table, the catalog and open-document
+objects (/AcroForm with its widgets, /OpenAction, ...), the primary hint stream and the first
+page with the objects it uses. The other pages (each page object followed by its private
+objects), objects shared by several pages and the rest (page tree, /Info, outlines, names) come
+after it. A viewer reading the file front to back, such as PDF.js fed by the bundle's /proxy
+route, can then render page 1 after /E bytes instead of after the whole file.
+
+write_linearized() applies the same garbage collection and duplicate merging as
+pdf_optimize.write_optimized(), then lays objects out in that order and writes the page offset
+and shared object hint tables. Object streams are not used: linearized files keep every object
+in classic cross-reference tables so pages can be located from the hint tables. Inheritable page
+attributes (/Resources, /MediaBox, /CropBox, /Rotate) are copied onto the pages so each page is
+self-contained. Encrypted writers and documents without pages are written with writer.write().
+
+check_linearization() verifies the structure of any file (dictionary first, /L, /O, /N, /E,
+/T, first-page cross-reference table, hint table offsets and page lengths) in pure Python, and
+additionally runs `qpdf --check-linearization` when qpdf is on PATH.
+
+Usage:
+  from pdf_linearize import write_linearized, check_linearization
+  stats = write_linearized(writer, out_stream)
+or as the "linearize" stage of process_modified_pdf.py / apply_acroform_patches.py --linearize.
+Command line check (exit 0 when linearized, 1 otherwise; JSON report on stdout):
+  python pdf_linearize.py --check file.pdf
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+from pdf_optimize import _merge_duplicates, _pdf_version_at_least, _prune_fields, _reachable, _Serializer, _trailer_refs
+
+_INHERITABLE = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+# Catalog keys a viewer needs before page 1 (Annex F.3.4 "document-level objects")
+_OPEN_DOCUMENT_KEYS = ("/ViewerPreferences", "/PageMode", "/Threads", "/OpenAction", "/AcroForm")
+_SHARED_DENOMINATOR = 4  # numerators are all 0 (no fractional positions), any value is valid
+_PLACEHOLDER = 9_999_999_999  # widest value reserved in the fixed-size dictionaries
+
+
+class _BitWriter:
+    """MSB-first bit packing for the hint tables (each row starts on a byte boundary)."""
+
+    def __init__(self) -> None:
+        self.out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        if bits == 0:
+            return
+        if value < 0 or value >= 1 << bits:
+            raise ValueError(f"hint value {value} does not fit in {bits} bits")
+        self._acc = (self._acc << bits) | value
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self.out.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def flush(self) -> None:
+        if self._bits:
+            self.out.append((self._acc << (8 - self._bits)) & 0xFF)
+            self._acc = self._bits = 0
+
+
+class _BitReader:
+    def __init__(self, data: bytes, pos: int = 0) -> None:
+        self.data = data
+        self.bit = pos * 8
+
+    def read(self, bits: int) -> int:
+        value = 0
+        for _ in range(bits):
+            byte = self.data[self.bit >> 3] if self.bit >> 3 < len(self.data) else 0
+            value = (value << 1) | ((byte >> (7 - (self.bit & 7))) & 1)
+            self.bit += 1
+        return value
+
+    def align(self) -> None:
+        self.bit = (self.bit + 7) & ~7
+
+
+def _push_inherited(writer) -> None:
+    """Copy inheritable attributes from the page tree onto each page (values are shared)."""
+    from pypdf.generic import NameObject
+
+    for page in writer.pages:
+        for key in _INHERITABLE:
+            if key in page:
+                continue
+            parent = page.get("/Parent")
+            node = parent.get_object() if parent is not None else None
+            while node is not None:
+                if key in node:
+                    page[NameObject(key)] = node[key]
+                    break
+                parent = node.get("/Parent")
+                node = parent.get_object() if parent is not None else None
+
+
+def _walk(objects, rep: dict[int, int], value, user, users: dict, order: dict, page_top: int | None = None) -> None:
+    """Record user on every object reachable from value without entering other page objects."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    seen: set[int] = set()
+    todo = [value]
+    while todo:
+        obj = todo.pop()
+        if isinstance(obj, IndirectObject):
+            num = rep.get(obj.idnum)
+            if num is None or num in seen:
+                continue
+            obj = objects[num - 1]
+            if num != page_top and isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page":
+                continue  # other pages (annotation /P, /Dest arrays) are not part of this user
+            seen.add(num)
+            users.setdefault(num, set()).add(user)
+            order.setdefault(num, len(order))
+            if num == page_top:
+                todo.extend(v for k, v in reversed(list(obj.items())) if k != "/Parent")
+                continue
+        if isinstance(obj, DictionaryObject):
+            todo.extend(reversed(list(obj.values())))
+        elif isinstance(obj, ArrayObject):
+            todo.extend(reversed(obj))
+
+
+def _partition(writer, rep: dict[int, int], page_nums: list[int]):
+    """Split the kept objects into the linearization parts (old object numbers, file order).
+
+    Returns (part4, part6, part7 per page, part8, part9, users).
+    """
+    objects = writer._objects
+    root = writer.root_object
+    root_num = rep[root.indirect_reference.idnum]
+    users: dict[int, set] = {root_num: {("root",)}}
+    order: dict[int, int] = {root_num: 0}
+    for key, value in root.items():
+        kind = "open" if key in _OPEN_DOCUMENT_KEYS else "other"
+        _walk(objects, rep, value, (kind, key), users, order)
+    for index, num in enumerate(page_nums):
+        _walk(objects, rep, writer.pages[index].indirect_reference, ("page", index), users, order, page_top=num)
+    info = getattr(writer, "_info", None)
+    if info is not None and getattr(info, "indirect_reference", None) is not None:
+        _walk(objects, rep, info.indirect_reference, ("other", "/Info"), users, order)
+
+    part4, private6, shared6, part8, part9 = [root_num], [], [], [], []
+    part7: list[list[int]] = [[num] for num in page_nums[1:]]
+    page_set = set(page_nums)
+    for num in sorted(set(rep.values()), key=lambda n: order.get(n, len(order) + n)):
+        if num == root_num or num in page_set:
+            continue
+        used = users.get(num, set())
+        pages = {u[1] for u in used if u[0] == "page"}
+        others = sum(1 for u in used if u[0] == "other")
+        if any(u[0] == "open" for u in used):
+            part4.append(num)
+        elif 0 in pages:
+            (private6 if others == 0 and len(pages) == 1 else shared6).append(num)
+        elif len(pages) == 1 and others == 0:
+            part7[next(iter(pages)) - 1].append(num)
+        elif len(pages) > 1:
+            part8.append(num)
+        else:
+            part9.append(num)
+    return part4, [page_nums[0], *private6, *shared6], part7, part8, part9, users
+
+
+def _fixed_dict(text: str, width: int) -> bytes:
+    """Pad a "<<...>>" dictionary with spaces before ">>" to exactly width bytes."""
+    return (text[:-2] + " " * (width - len(text)) + ">>").encode()
+
+
+def _lin_dict(length, hint_offset, hint_length, first_page, end, npages, xref_zero) -> str:
+    return (
+        f"<</Linearized 1 /L {length} /H [{hint_offset} {hint_length}] /O {first_page} /E {end}"
+        f" /N {npages} /T {xref_zero}>>"
+    )
+
+
+def _hint_stream(
+    page_objects: list[int],
+    page_lengths: list[int],
+    page_shared: list[list[int]],
+    first_page_offset: int,
+    shared_lengths: list[int],
+    nshared_first_page: int,
+    first_shared: tuple[int, int],
+) -> tuple[bytes, int]:
+    """Page offset and shared object hint tables (Annex F.4); returns (data, /S offset).
+
+    Offsets are given as if the hint stream were absent, as the specification requires.
+    Content stream offsets/lengths repeat the page values (content is not interleaved).
+    """
+    w = _BitWriter()
+    min_objects, min_length = min(page_objects), min(page_lengths)
+    bits_objects = (max(page_objects) - min_objects).bit_length()
+    bits_length = (max(page_lengths) - min_length).bit_length()
+    bits_nshared = max(len(s) for s in page_shared).bit_length()
+    bits_shared_id = len(shared_lengths).bit_length()
+    for value, bits in (
+        (min_objects, 32),
+        (first_page_offset, 32),
+        (bits_objects, 16),
+        (min_length, 32),
+        (bits_length, 16),
+        (0, 32),  # least content stream offset
+        (0, 16),
+        (min_length, 32),  # least content stream length
+        (bits_length, 16),
+        (bits_nshared, 16),
+        (bits_shared_id, 16),
+        (0, 16),  # bits per fractional position numerator
+        (_SHARED_DENOMINATOR, 16),
+    ):
+        w.write(value, bits)
+    for row in (
+        [(n - min_objects, bits_objects) for n in page_objects],
+        [(n - min_length, bits_length) for n in page_lengths],
+        [(len(s), bits_nshared) for s in page_shared],
+        [(i, bits_shared_id) for s in page_shared for i in s],
+        [(n - min_length, bits_length) for n in page_lengths],  # content stream lengths
+    ):
+        for value, bits in row:
+            w.write(value, bits)
+        w.flush()
+    shared_offset = len(w.out)
+
+    min_group = min(shared_lengths)
+    bits_group = (max(shared_lengths) - min_group).bit_length()
+    for value, bits in (
+        (first_shared[0], 32),
+        (first_shared[1], 32),
+        (nshared_first_page, 32),
+        (len(shared_lengths), 32),
+        (0, 16),  # bits for objects per group: every group is one object
+        (min_group, 32),
+        (bits_group, 16),
+    ):
+        w.write(value, bits)
+    for row in ([(n - min_group, bits_group) for n in shared_lengths], [(0, 1)] * len(shared_lengths)):
+        for value, bits in row:
+            w.write(value, bits)
+        w.flush()
+    return bytes(w.out), shared_offset
+
+
+def write_linearized(writer, stream, level: int = 6) -> dict:
+    """Write writer to stream as a linearized PDF.
+
+    Args:
+        writer: pypdf PdfWriter (its /AcroForm /Fields may be pruned and inherited page
+            attributes are copied onto the pages, in place).
+        stream: Binary output stream.
+        level: zlib level for the hint stream.
+
+    Returns:
+        Dict with objectsBefore, objectsAfter, unreachable, duplicates, fieldsPruned, pages,
+        firstPageEnd (/E: bytes needed for page 1), hintBytes and bytes (size written).
+    """
+    start = stream.tell()
+    objects_before = sum(1 for o in writer._objects if o is not None)
+    pages = list(writer.pages)
+    page_refs = [p.indirect_reference.idnum for p in pages]
+    skipped = None
+    if getattr(writer, "_encryption", None) is not None:
+        skipped = "encrypted"
+    elif not pages:
+        skipped = "no pages"
+    elif len(set(page_refs)) != len(page_refs):
+        skipped = "page object used twice"
+    if skipped:
+        writer.write(stream)
+        return {"objectsBefore": objects_before, "skipped": skipped, "bytes": stream.tell() - start}
+    if hasattr(writer, "_resolve_links"):
+        writer._resolve_links()
+
+    _push_inherited(writer)
+    fields_pruned = _prune_fields(writer)
+    live = _reachable(writer)
+    protected = {r.idnum for r in _trailer_refs(writer)} | set(page_refs)
+    rep = _merge_duplicates(writer, live, protected)
+    part4, part6, part7, part8, part9, users = _partition(writer, rep, page_refs)
+
+    # Numbering: main section (parts 7-9) from 1, then the first-page section
+    main_order = [n for page in part7 for n in page] + part8 + part9
+    number = {old: new for new, old in enumerate(main_order, start=1)}
+    main_size = len(main_order) + 1
+    lin_num = main_size
+    for new, old in enumerate(part4, start=lin_num + 1):
+        number[old] = new
+    hint_num = lin_num + 1 + len(part4)
+    for new, old in enumerate(part6, start=hint_num + 1):
+        number[old] = new
+    size = hint_num + 1 + len(part6)
+    for n in live:
+        number[n] = number[rep[n]]
+
+    ser = _Serializer(writer, number)
+    objects = writer._objects
+    body = {old: f"{number[old]} 0 obj\n".encode() + ser.dumps(objects[old - 1]) + b"\nendobj\n" for old in set(rep.values())}
+
+    header = f"%PDF-{_pdf_version_at_least(writer.pdf_header, '1.4')}\n".encode() + b"%\xe2\xe3\xcf\xd3\n"
+    lin_prefix = f"{lin_num} 0 obj\n".encode()
+    lin_width = len(_lin_dict(*[_PLACEHOLDER] * 7))
+    trailer_keys = [f"/Size {size}", f"/Root {number[writer.root_object.indirect_reference.idnum]} 0 R"]
+    info = getattr(writer, "_info", None)
+    if info is not None and getattr(info, "indirect_reference", None) is not None:
+        trailer_keys.append(f"/Info {number[info.indirect_reference.idnum]} 0 R")
+    id_array = getattr(writer, "_ID", None)
+    if id_array is not None:
+        trailer_keys.append("/ID " + ser.dumps(id_array).decode("latin-1"))
+    trailer_text = "<<" + " ".join(trailer_keys) + " /Prev {}>>"
+    trailer_width = len(trailer_text.format(_PLACEHOLDER))
+    first_count = size - lin_num
+    first_xref_offset = len(header) + len(lin_prefix) + lin_width + len(b"\nendobj\n")
+    first_section_len = (
+        len(f"xref\n{lin_num} {first_count}\n".encode()) + 20 * first_count
+        + len(b"trailer\n") + trailer_width + len(b"\nstartxref\n0\n%%EOF\n")
+    )
+
+    # Offsets with the hint stream absent (the hint tables are expressed that way)
+    offsets: dict[int, int] = {}
+    pos = first_xref_offset + first_section_len
+    for old in part4:
+        offsets[old] = pos
+        pos += len(body[old])
+    hint_offset = pos
+    for old in part6 + main_order:
+        offsets[old] = pos
+        pos += len(body[old])
+    main_xref_absent = pos
+
+    def length(olds) -> int:
+        return sum(len(body[o]) for o in olds)
+
+    shared_index = {old: i for i, old in enumerate(part6 + part8)}
+    page_shared: list[list[int]] = [[] for _ in pages]
+    for old, index in shared_index.items():
+        used = users.get(old, ())
+        if len(used) > 1:
+            for user in used:
+                if user[0] == "page" and user[1] > 0:
+                    page_shared[user[1]].append(index)
+    for shared in page_shared:
+        shared.sort()
+    hint_data, shared_table_offset = _hint_stream(
+        page_objects=[len(part6)] + [len(p) for p in part7],
+        page_lengths=[length(part6)] + [length(p) for p in part7],
+        page_shared=page_shared,
+        first_page_offset=offsets[part6[0]],
+        shared_lengths=[len(body[o]) for o in part6 + part8],
+        nshared_first_page=len(part6),
+        first_shared=(number[part8[0]], offsets[part8[0]]) if part8 else (0, 0),
+    )
+    packed = zlib.compress(hint_data, level)
+    hint_obj = (
+        f"{hint_num} 0 obj\n<</S {shared_table_offset} /Filter /FlateDecode /Length {len(packed)}>>\nstream\n".encode()
+        + packed
+        + b"\nendstream\nendobj\n"
+    )
+    shift = len(hint_obj)
+
+    def real(offset: int) -> int:
+        return offset + shift if offset >= hint_offset else offset
+
+    main_xref = main_xref_absent + shift
+    main_head = f"xref\n0 {main_size}".encode()
+    main_section = (
+        main_head + b"\n0000000000 65535 f \n"
+        + b"".join(f"{real(offsets[o]):010d} 00000 n \n".encode() for o in main_order)
+        + f"trailer\n<</Size {main_size}>>\nstartxref\n{first_xref_offset}\n%%EOF\n".encode()
+    )
+    file_length = main_xref + len(main_section)
+    end_first_page = real(offsets[part6[-1]]) + len(body[part6[-1]])
+    lin = _lin_dict(file_length, hint_offset, shift, number[part6[0]], end_first_page, len(pages), main_xref + len(main_head))
+    first_entries = {lin_num: len(header), hint_num: hint_offset}
+    for old in part4 + part6:
+        first_entries[number[old]] = real(offsets[old])
+    first_section = (
+        f"xref\n{lin_num} {first_count}\n".encode()
+        + b"".join(f"{first_entries[n]:010d} 00000 n \n".encode() for n in range(lin_num, size))
+        + b"trailer\n" + _fixed_dict(trailer_text.format(main_xref), trailer_width)
+        + b"\nstartxref\n0\n%%EOF\n"
+    )
+
+    stream.write(header + lin_prefix + _fixed_dict(lin, lin_width) + b"\nendobj\n" + first_section)
+    for old in part4:
+        stream.write(body[old])
+    stream.write(hint_obj)
+    for old in part6 + main_order:
+        stream.write(body[old])
+    stream.write(main_section)
+    kept = len(body)
+    return {
+        "objectsBefore": objects_before,
+        "objectsAfter": kept,
+        "unreachable": objects_before - len(live),
+        "duplicates": len(live) - kept,
+        "fieldsPruned": fields_pruned,
+        "pages": len(pages),
+        "firstPageEnd": end_first_page,
+        "hintBytes": shift,
+        "bytes": stream.tell() - start,
+    }
+
+
+def linearize_stage(ctx, options: dict) -> dict:
+    """Process stage: serialize with write_linearized() instead of writer.write().
+
+    Options: {"level": zlib level for the hint stream (default 6)}. Replaces the serializer of
+    an earlier optimize stage (linearized files do not use object streams). The returned dict is
+    filled in when the pipeline serializes.
+    """
+    level = int(options.get("level", 6))
+    stats: dict = {}
+
+    def serializer(writer) -> bytes:
+        buf = io.BytesIO()
+        stats.update(write_linearized(writer, buf, level=level))
+        return buf.getvalue()
+
+    ctx.serializer = serializer
+    return stats
+
+
+_LIN_RE = re.compile(rb"%PDF-[^\r\n]*[\r\n]+(?:%[^\r\n]*[\r\n]+)?\s*(\d+)\s+(\d+)\s+obj\s*<<(.*?)>>\s*endobj", re.S)
+
+
+def _int_key(text: bytes, key: str) -> int | None:
+    match = re.search(rb"/" + key.encode() + rb"\s+(\d+)(?![\d.])", text)
+    return int(match.group(1)) if match else None
+
+
+def _xref_offsets(data: bytes, first: int) -> list[int]:
+    """Offsets of the cross-reference sections, following /Prev from first."""
+    seen = []
+    offset = first
+    while offset is not None and offset not in seen and 0 <= offset < len(data):
+        seen.append(offset)
+        end = data.find(b"startxref", offset)
+        trailer = data[offset:end if end != -1 else len(data)]
+        offset = _int_key(trailer, "Prev")
+    return seen
+
+
+def _run_qpdf(data: bytes) -> dict | None:
+    """qpdf --check-linearization (0 = ok, 3 = warnings only, 2 = errors), or None without qpdf."""
+    qpdf = shutil.which("qpdf")
+    if qpdf is None:
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+    try:
+        result = subprocess.run([qpdf, "--check-linearization", f.name], capture_output=True, text=True, timeout=120)
+    finally:
+        Path(f.name).unlink(missing_ok=True)
+    return {"returncode": result.returncode, "output": (result.stdout + result.stderr).strip()}
+
+
+def check_linearization(source, use_qpdf: bool = True) -> dict:
+    """Verify that a PDF is linearized and that its hint tables match the file.
+
+    Args:
+        source: Path or PDF bytes.
+        use_qpdf: Also run `qpdf --check-linearization` when qpdf is installed.
+
+    Returns:
+        Dict with linearized (bool), errors (list of str), fileSize and, when a linearization
+        dictionary is present, pages, firstPageObject, firstPageEnd, hintOffset, hintLength
+        (and qpdf: {returncode, output} when qpdf ran).
+    """
+    from pypdf import PdfReader
+
+    data = bytes(source) if isinstance(source, (bytes, bytearray)) else Path(source).read_bytes()
+    report: dict = {"linearized": False, "errors": [], "fileSize": len(data)}
+    errors = report["errors"]
+    match = _LIN_RE.match(data)
+    if match is None or match.start(1) > 1024 or b"/Linearized" not in match.group(3):
+        errors.append("no linearization dictionary at the start of the file")
+        return report
+    lin = match.group(3)
+    hint = re.search(rb"/H\s*\[\s*(\d+)\s+(\d+)", lin)
+    values = {k: _int_key(lin, k) for k in ("L", "O", "E", "N", "T")}
+    if hint is None or None in values.values():
+        errors.append("linearization dictionary lacks /L, /H, /O, /E, /N or /T")
+        return report
+    hint_offset, hint_length = int(hint.group(1)), int(hint.group(2))
+    report.update(
+        pages=values["N"], firstPageObject=values["O"], firstPageEnd=values["E"],
+        hintOffset=hint_offset, hintLength=hint_length,
+    )
+    if values["L"] != len(data):
+        errors.append(f"/L {values['L']} does not match the file size {len(data)}")
+        return report  # offsets cannot be trusted (file modified or truncated)
+
+    # The last startxref must point to the first-page cross-reference section after the dictionary
+    startxref = re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", data[-1024:])
+    first_xref = data.find(b"xref", match.end()) if data[match.end():].lstrip()[:4] == b"xref" else -1
+    if startxref is None or int(startxref.group(1)) != first_xref:
+        errors.append("startxref does not point to the first-page cross-reference table")
+    sections = _xref_offsets(data, first_xref) if first_xref != -1 else []
+    if len(sections) > 1 and data[sections[1]:sections[1] + 4] == b"xref":
+        pos = values["T"]
+        while pos < len(data) and data[pos:pos + 1] in b" \r\n":
+            pos += 1
+        if not re.match(rb"\d{10} 65535 f", data[pos:pos + 18]) or not sections[1] < values["T"] < pos:
+            errors.append("/T does not point before the first entry of the main cross-reference table")
+
+    reader = PdfReader(io.BytesIO(data))
+    pages = reader.pages
+    offsets = {num: off for gen_table in reader.xref.values() for num, off in gen_table.items()}
+    if len(pages) != values["N"]:
+        errors.append(f"/N {values['N']} but the document has {len(pages)} pages")
+    page_nums = [p.indirect_reference.idnum for p in pages]
+    if page_nums and page_nums[0] != values["O"]:
+        errors.append(f"/O {values['O']} is not the first page object {page_nums[0]}")
+    for num, off in offsets.items():
+        if not re.match(rb"\s*" + str(num).encode() + rb"\s+\d+\s+obj", data[off:off + 32]):
+            errors.append(f"cross-reference offset of object {num} is wrong")
+    boundaries = sorted(set(offsets.values()) | set(sections) | {len(data)})
+
+    def obj_length(num: int) -> int | None:
+        off = offsets.get(num)
+        if off is None:
+            return None
+        return boundaries[boundaries.index(off) + 1] - off
+
+    def adjusted(offset: int) -> int:
+        return offset + hint_length if offset >= hint_offset else offset
+
+    hint_match = re.match(rb"(\d+)\s+\d+\s+obj", data[hint_offset:hint_offset + 32])
+    if hint_match is None or obj_length(int(hint_match.group(1))) != hint_length:
+        errors.append("/H does not describe the hint stream object")
+        return report
+    hint_stream = reader.get_object(int(hint_match.group(1)))
+    hints = hint_stream.get_data()
+    r = _BitReader(hints)
+    head = [r.read(b) for b in (32, 32, 16, 32, 16, 32, 16, 32, 16, 16, 16, 16, 16)]
+    min_objects, first_page_offset, bits_objects, min_length, bits_length = head[:5]
+    bits_nshared, bits_shared_id, bits_numerator = head[9], head[10], head[11]
+    npages = len(page_nums)
+    counts = [min_objects + r.read(bits_objects) for _ in range(npages)]
+    r.align()
+    lengths = [min_length + r.read(bits_length) for _ in range(npages)]
+    r.align()
+    nshared = [r.read(bits_nshared) for _ in range(npages)]
+    r.align()
+    if page_nums and adjusted(first_page_offset) != offsets.get(page_nums[0]):
+        errors.append("page offset hint table: first page offset mismatch")
+    for index, (num, count, hinted) in enumerate(zip(page_nums, counts, lengths)):
+        parts = [obj_length(n) for n in range(num, num + count)]
+        if None in parts or sum(parts) != hinted:
+            errors.append(f"page offset hint table: length mismatch for page {index + 1}")
+    if page_nums:
+        last = page_nums[0] + counts[0] - 1
+        end_after = offsets.get(last, 0) + (obj_length(last) or 0)
+        end_before = len(data[:end_after].rstrip())
+        if not end_before <= values["E"] <= end_after:
+            errors.append(f"/E {values['E']} is not the end of the first page section ({end_after})")
+    del bits_shared_id, bits_numerator, nshared
+    shared_offset = hint_stream.get("/S")
+    if shared_offset is not None:
+        r = _BitReader(hints, int(shared_offset))
+        first_shared_obj, first_shared_offset = r.read(32), r.read(32)
+        if first_shared_obj and adjusted(first_shared_offset) != offsets.get(first_shared_obj):
+            errors.append("shared object hint table: first shared object offset mismatch")
+
+    if use_qpdf:
+        qpdf = _run_qpdf(data)
+        if qpdf is not None:
+            report["qpdf"] = qpdf
+            if qpdf["returncode"] == 2:
+                errors.append("qpdf --check-linearization reported errors")
+    report["linearized"] = not errors
+    return report
+
+
+def main() -> None:
+    """Entry point: --check FILE prints the check_linearization() report as JSON."""
+    ap = argparse.ArgumentParser(description="Check PDF linearization")
+    ap.add_argument("--check", required=True, metavar="PDF", help="PDF file to check")
+    ap.add_argument("--no-qpdf", action="store_true", help="Do not run qpdf even if installed")
+    args = ap.parse_args()
+    if not Path(args.check).is_file():
+        print(json.dumps({"error": f"File not found: {args.check}"}), file=sys.stderr)
+        sys.exit(2)
+    report = check_linearization(args.check, use_qpdf=not args.no_qpdf)
+    print(json.dumps(report))
+    sys.exit(0 if report["linearized"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Memory ceiling and memory accounting for the AcroForm scripts.
+
+Each script loads the whole PDF, so several large documents processed at once can push a host
+into swap. With --max-memory-mb MB (or env PDF_SCRIPTS_MAX_MEMORY_MB, since the bundle runs the
+scripts with fixed arguments) the process is limited in two ways:
+
+  - a cooperative check: check() compares the resident set size with MB and raises
+    MemoryLimitExceeded; the scripts call it between pages and stages, where stopping is clean;
+  - a hard ceiling: the soft RLIMIT_DATA (RLIMIT_AS where there is none) is lowered to
+    HARD_FACTOR x MB, so a single step that overshoots (parsing, serializing) gets MemoryError
+    instead of the kernel OOM killer. It sits above MB because an allocation failing deep in
+    pypdf or a C extension can leave the interpreter unable to recover (CPython sometimes
+    reports it as SystemError, which is treated the same); the check is the normal way out.
+
+Either way run_limited() turns the error into one JSON line on stderr and exit status 2:
+
+  {"error": "Memory limit exceeded", "script": "apply_acroform_patches", "maxMemoryMb": 256,
+   "rssMb": 262.1, "peakRssMb": 262.4, "where": "page 12"}
+
+With --trace-memory [N] (or PDF_SCRIPTS_TRACE_MEMORY=N) tracemalloc runs for the whole call and
+report() adds tracedPeakMb and the N largest allocation sites ("topAllocations": [{"where":
+"pypdf/_reader.py:512", "kb", "count"}]); the scripts merge report() into their diagnostic line
+(the apply/process JSON line, the extractor's --timings line). tracemalloc slows Python code
+down noticeably, so it is meant for sizing runs, not for every request.
+
+The limits apply to the whole process and are set once per run by configure(). RSS is read
+from /proc/self/statm (the peak from getrusage elsewhere); without the resource module
+(Windows) only the cooperative check is available. Standard library only.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+ENV_MAX_MB = "PDF_SCRIPTS_MAX_MEMORY_MB"
+ENV_TRACE = "PDF_SCRIPTS_TRACE_MEMORY"
+TOP_ALLOCATIONS = 10
+HARD_FACTOR = 1.5  # rlimit = HARD_FACTOR x --max-memory-mb
+
+_limit_bytes: int | None = None
+_trace: int = 0
+_saved_rlimit: tuple[int, tuple[int, int]] | None = None  # (resource, (soft, hard)) before configure()
+
+
+class MemoryLimitExceeded(MemoryError):
+    """The resident set size passed --max-memory-mb at a cooperative check."""
+
+    def __init__(self, rss_mb: float, where: str | None = None) -> None:
+        super().__init__(f"Memory limit exceeded: {rss_mb:.1f} MB resident" + (f" at {where}" if where else ""))
+        self.rss_mb = rss_mb
+        self.where = where
+
+
+def add_memory_arguments(ap: argparse.ArgumentParser) -> None:
+    """Declare --max-memory-mb and --trace-memory on a script's parser (defaults from the environment)."""
+    try:
+        max_mb = float(os.environ.get(ENV_MAX_MB) or 0) or None
+    except ValueError:
+        max_mb = None
+    trace = os.environ.get(ENV_TRACE, "")
+    ap.add_argument(
+        "--max-memory-mb",
+        type=float,
+        default=max_mb,
+        metavar="MB",
+        help=f"Fail with a JSON error instead of growing past MB megabytes (rlimit and checks between pages; env {ENV_MAX_MB})",
+    )
+    ap.add_argument(
+        "--trace-memory",
+        nargs="?",
+        type=int,
+        const=TOP_ALLOCATIONS,
+        default=int(trace) if trace.isdigit() else None,
+        metavar="N",
+        help=f"Trace allocations and report the N largest sites (default {TOP_ALLOCATIONS}; env {ENV_TRACE}=N)",
+    )
+
+
+def configure(max_mb: float | None = None, trace: int | None = None) -> None:
+    """Set the memory ceiling (None = none) and start tracemalloc when trace is a positive count."""
+    global _limit_bytes, _trace, _saved_rlimit
+    _trace = max(0, trace or 0)
+    if _trace:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    _limit_bytes = int(max_mb * 1024 * 1024) if max_mb and max_mb > 0 else None
+    if _limit_bytes is None:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    which = getattr(resource, "RLIMIT_DATA", None)
+    if which is None:
+        which = resource.RLIMIT_AS
+    soft, hard = resource.getrlimit(which)
+    ceiling = int(_limit_bytes * HARD_FACTOR)
+    if hard != resource.RLIM_INFINITY:
+        ceiling = min(ceiling, hard)
+    try:
+        resource.setrlimit(which, (ceiling, hard))
+    except (ValueError, OSError):
+        return  # e.g. already above the new limit: the cooperative check still applies
+    if _saved_rlimit is None:
+        _saved_rlimit = (which, (soft, hard))
+
+
+def _release() -> None:
+    """Restore the rlimit configure() lowered (so the error report itself can allocate)."""
+    global _saved_rlimit
+    if _saved_rlimit is None:
+        return
+    import resource
+
+    which, limits = _saved_rlimit
+    _saved_rlimit = None
+    try:
+        resource.setrlimit(which, limits)
+    except (ValueError, OSError):
+        pass
+
+
+def rss_bytes() -> int | None:
+    """Current resident set size (peak where the current value is not available), or None."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    peak = peak_rss_mb()
+    return int(peak * 1024 * 1024) if peak is not None else None
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MB (None where unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB elsewhere
+
+
+def check(where: str | None = None) -> None:
+    """Raise MemoryLimitExceeded when the resident set size is over the configured ceiling.
+
+    Costs one small read of /proc per call; does nothing when no ceiling is configured.
+    """
+    if _limit_bytes is None:
+        return
+    rss = rss_bytes()
+    if rss is not None and rss > _limit_bytes:
+        raise MemoryLimitExceeded(rss / (1024 * 1024), where)
+
+
+def report() -> dict:
+    """Memory keys for the diagnostic line: {} unless a ceiling or tracing is configured."""
+    if _limit_bytes is None and not _trace:
+        return {}
+    out: dict = {"peakRssMb": peak_rss_mb()}
+    if _limit_bytes is not None:
+        out["maxMemoryMb"] = round(_limit_bytes / (1024 * 1024), 1)
+    if _trace:
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            out["tracedPeakMb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+            )
+            out["topAllocations"] = [
+                {
+                    "where": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                    "kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:_trace]
+            ]
+    return out
+
+
+def _short_path(filename: str) -> str:
+    """Last two path components (package/module.py) of a source file name."""
+    parts = filename.replace("\\", "/").rsplit("/", 2)
+    return "/".join(parts[-2:])
+
+
+def run_limited(main, script: str):
+    """Call main() and return its result; with a ceiling set, running out of memory becomes a JSON
+    error line on stderr and exit status 2."""
+    try:
+        return main()
+    except (MemoryError, SystemError) as e:
+        if _limit_bytes is None:
+            raise
+        _release()
+        error = {"error": "Memory limit exceeded", "script": script}
+        if isinstance(e, MemoryLimitExceeded):
+            error["rssMb"] = round(e.rss_mb, 1)
+            if e.where:
+                error["where"] = e.where
+        try:
+            error.update(report())
+        except MemoryError:
+            pass
+        print(json.dumps(error), file=sys.stderr)
+        sys.exit(2)
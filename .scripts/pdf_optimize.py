@@ -0,0 +1,337 @@
+"""Write a pypdf PdfWriter compactly: orphan GC, duplicate merging, object and xref streams.
+
+pypdf's writer.write() emits every object it ever held (including widgets removed from
+/Annots and their /AcroForm /Fields entries) with a classic xref table. write_optimized()
+instead:
+
+1. prunes /AcroForm /Fields (and /Kids) entries whose widgets are no longer on any page,
+2. keeps only objects reachable from the trailer (/Root, /Info), so cycles such as
+   widget <-> parent field are collected too,
+3. merges objects whose serialization is byte-identical (fonts, images, resources...; pages,
+   annotations and fields keep their identity),
+4. renumbers the remaining objects densely and packs every non-stream object into
+   compressed object streams (/Type /ObjStm) indexed by a cross-reference stream (PDF 1.5).
+
+Encrypted writers are written with the plain writer.write() (object streams would have to be
+encrypted as a whole). The writer's objects are not modified except for the /Fields pruning.
+
+Usage:
+  from pdf_optimize import write_optimized
+  stats = write_optimized(writer, out_stream)
+or as the "optimize" stage of process_modified_pdf.py / apply_acroform_patches.py --optimize.
+"""
+from __future__ import annotations
+
+import io
+import zlib
+
+OBJECTS_PER_STREAM = 100
+
+# Dictionaries whose identity matters (two equal widgets are still two widgets): never merged
+_IDENTITY_KEYS = ("/Rect", "/Parent", "/Kids")
+_IDENTITY_TYPES = ("/Page", "/Pages", "/Catalog")
+
+
+def _prune_fields(writer) -> int:
+    """Drop /Fields and /Kids entries for widgets that are not on any page; return the count."""
+    from pypdf.generic import ArrayObject, IndirectObject, NameObject
+
+    acro = writer.root_object.get("/AcroForm")
+    if acro is None:
+        return 0
+    acro = acro.get_object()
+    fields = acro.get("/Fields")
+    if fields is None:
+        return 0
+    on_page = set()
+    for page in writer.pages:
+        for ref in page.get("/Annots") or []:
+            if isinstance(ref, IndirectObject):
+                on_page.add(ref.idnum)
+    pruned = 0
+
+    def keep(ref) -> bool:
+        nonlocal pruned
+        if not isinstance(ref, IndirectObject):
+            return True
+        node = ref.get_object()
+        if node is None:
+            return False
+        kids = node.get("/Kids")
+        if kids is not None:
+            kids = kids.get_object()
+            kept = [k for k in kids if keep(k)]
+            if len(kept) != len(kids):
+                pruned += len(kids) - len(kept)
+                node[NameObject("/Kids")] = ArrayObject(kept)
+            return bool(kept)
+        if node.get("/Subtype") == "/Widget" or "/Rect" in node:
+            return ref.idnum in on_page
+        return True
+
+    fields = fields.get_object()
+    kept = [f for f in fields if keep(f)]
+    if len(kept) != len(fields):
+        pruned += len(fields) - len(kept)
+        acro[NameObject("/Fields")] = ArrayObject(kept)
+    return pruned
+
+
+def _trailer_refs(writer) -> list:
+    refs = [writer.root_object.indirect_reference]
+    info = getattr(writer, "_info", None)
+    if info is not None and getattr(info, "indirect_reference", None) is not None:
+        refs.append(info.indirect_reference)
+    return refs
+
+
+def _reachable(writer) -> list[int]:
+    """Object numbers reachable from the trailer, in original order (mark phase)."""
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    objects = writer._objects
+    marked = set()
+    stack: list = [r.idnum for r in _trailer_refs(writer)]
+    while stack:
+        idnum = stack.pop()
+        if idnum in marked or not 0 < idnum <= len(objects) or objects[idnum - 1] is None:
+            continue
+        marked.add(idnum)
+        todo = [objects[idnum - 1]]
+        while todo:
+            obj = todo.pop()
+            if isinstance(obj, IndirectObject):
+                if obj.idnum not in marked:
+                    stack.append(obj.idnum)
+            elif isinstance(obj, DictionaryObject):
+                todo.extend(obj.values())
+            elif isinstance(obj, ArrayObject):
+                todo.extend(obj)
+    return sorted(marked)
+
+
+class _Serializer:
+    """Serialize objects with references rewritten through a number mapping."""
+
+    def __init__(self, writer, number: dict[int, int]) -> None:
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+        self.number = number
+        self._types = (IndirectObject, DictionaryObject, StreamObject, ArrayObject)
+
+    def dumps(self, obj) -> bytes:
+        buf = io.BytesIO()
+        self._write(obj, buf)
+        return buf.getvalue()
+
+    def _write(self, obj, buf) -> None:
+        IndirectObject, DictionaryObject, StreamObject, ArrayObject = self._types  # noqa: N806
+        if isinstance(obj, IndirectObject):
+            num = self.number.get(obj.idnum)
+            buf.write(f"{num} 0 R".encode() if num is not None else b"null")
+        elif isinstance(obj, DictionaryObject):
+            buf.write(b"<<")
+            for key, value in obj.items():
+                if len(key) > 2 and key[1] == "%" and key[-1] == "%":
+                    continue  # pypdf-internal keys
+                if isinstance(obj, StreamObject) and key == "/Length":
+                    continue
+                key.write_to_stream(buf)
+                buf.write(b" ")
+                self._write(value, buf)
+                buf.write(b"\n")
+            if isinstance(obj, StreamObject):
+                data = obj._data
+                buf.write(f"/Length {len(data)}>>\nstream\n".encode())
+                buf.write(data)
+                buf.write(b"\nendstream")
+            else:
+                buf.write(b">>")
+        elif isinstance(obj, ArrayObject):
+            buf.write(b"[")
+            for item in obj:
+                buf.write(b" ")
+                self._write(item, buf)
+            buf.write(b" ]")
+        else:
+            obj.write_to_stream(buf)
+
+
+def _mergeable(obj) -> bool:
+    from pypdf.generic import DictionaryObject, StreamObject
+
+    if isinstance(obj, DictionaryObject) and not isinstance(obj, StreamObject):
+        if obj.get("/Type") in _IDENTITY_TYPES or any(k in obj for k in _IDENTITY_KEYS):
+            return False
+    return True
+
+
+def _merge_duplicates(writer, live: list[int], protected: set[int]) -> dict[int, int]:
+    """Map each live object number to its representative (first byte-identical object).
+
+    Repeated until stable, since merging children can make parents identical.
+    """
+    rep = {n: n for n in live}
+    objects = writer._objects
+    candidates = [n for n in live if n not in protected and _mergeable(objects[n - 1])]
+    for _ in range(4):
+        ser = _Serializer(writer, rep)
+        seen: dict[bytes, int] = {}
+        changed = False
+        for n in candidates:
+            if rep[n] != n:
+                continue
+            key = ser.dumps(objects[n - 1])
+            first = seen.setdefault(key, n)
+            if first != n:
+                rep[n] = first
+                changed = True
+        if not changed:
+            break
+        # Point merged objects at their final representative
+        for n in live:
+            r = rep[n]
+            while rep[r] != r:
+                r = rep[r]
+            rep[n] = r
+    return rep
+
+
+def _pdf_version_at_least(header: str, minimum: str = "1.5") -> str:
+    try:
+        version = header.strip().split("-", 1)[1]
+        if tuple(map(int, version.split("."))) >= tuple(map(int, minimum.split("."))):
+            return version
+    except (IndexError, ValueError):
+        pass
+    return minimum
+
+
+def write_optimized(writer, stream, level: int = 6) -> dict:
+    """Write writer to stream with GC, duplicate merging and object/xref streams.
+
+    Args:
+        writer: pypdf PdfWriter (its /AcroForm /Fields may be pruned in place).
+        stream: Binary output stream.
+        level: zlib level for object and xref streams.
+
+    Returns:
+        Dict with objectsBefore, objectsAfter, unreachable, duplicates, fieldsPruned,
+        objectStreams and bytes (size written).
+    """
+    from pypdf.generic import StreamObject
+
+    start = stream.tell()
+    objects_before = sum(1 for o in writer._objects if o is not None)
+    if getattr(writer, "_encryption", None) is not None:
+        writer.write(stream)
+        return {"objectsBefore": objects_before, "skipped": "encrypted", "bytes": stream.tell() - start}
+    if hasattr(writer, "_resolve_links"):
+        writer._resolve_links()  # as writer.write() does
+
+    fields_pruned = _prune_fields(writer)
+    live = _reachable(writer)
+    protected = {r.idnum for r in _trailer_refs(writer)}
+    rep = _merge_duplicates(writer, live, protected)
+    kept = [n for n in live if rep[n] == n]
+    number = {old: new for new, old in enumerate(kept, start=1)}
+    for n in live:
+        number[n] = number[rep[n]]
+    ser = _Serializer(writer, number)
+    objects = writer._objects
+
+    # xref entries by new object number: (type, field2, field3)
+    xref: dict[int, tuple[int, int, int]] = {}
+    stream.write(f"%PDF-{_pdf_version_at_least(writer.pdf_header)}\n".encode() + b"%\xe2\xe3\xcf\xd3\n")
+    next_num = len(kept) + 1
+    object_streams = 0
+    pending: list[tuple[int, bytes]] = []
+
+    def write_obj(num: int, body: bytes) -> None:
+        xref[num] = (1, stream.tell() - start, 0)
+        stream.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def flush() -> None:
+        nonlocal next_num, object_streams
+        if not pending:
+            return
+        stm_num = next_num
+        next_num += 1
+        header, offset, bodies = [], 0, []
+        for idx, (num, body) in enumerate(pending):
+            header.append(f"{num} {offset}")
+            bodies.append(body)
+            offset += len(body) + 1
+            xref[num] = (2, stm_num, idx)
+        head = (" ".join(header) + "\n").encode()
+        data = zlib.compress(head + b"\n".join(bodies) + b"\n", level)
+        write_obj(
+            stm_num,
+            f"<</Type /ObjStm /N {len(pending)} /First {len(head)} /Filter /FlateDecode /Length {len(data)}>>\nstream\n".encode()
+            + data
+            + b"\nendstream",
+        )
+        object_streams += 1
+        pending.clear()
+
+    for old in kept:
+        obj = objects[old - 1]
+        body = ser.dumps(obj)
+        if isinstance(obj, StreamObject):
+            write_obj(number[old], body)
+        else:
+            pending.append((number[old], body))
+            if len(pending) >= OBJECTS_PER_STREAM:
+                flush()
+    flush()
+
+    # Cross-reference stream (it is its own last entry)
+    xref_num = next_num
+    xref_offset = stream.tell() - start
+    xref[xref_num] = (1, xref_offset, 0)
+    size = xref_num + 1
+    w2 = max(1, (max(max(e[1] for e in xref.values()), 1).bit_length() + 7) // 8)
+    rows = [b"\x00" + (0).to_bytes(w2, "big") + (65535).to_bytes(2, "big")]
+    for num in range(1, size):
+        kind, f2, f3 = xref.get(num, (0, 0, 0))
+        rows.append(bytes([kind]) + f2.to_bytes(w2, "big") + f3.to_bytes(2, "big"))
+    data = zlib.compress(b"".join(rows), level)
+    trailer = [f"/Type /XRef /Size {size} /W [1 {w2} 2] /Root {number[writer.root_object.indirect_reference.idnum]} 0 R"]
+    info = getattr(writer, "_info", None)
+    if info is not None and getattr(info, "indirect_reference", None) is not None:
+        trailer.append(f"/Info {number[info.indirect_reference.idnum]} 0 R")
+    id_array = getattr(writer, "_ID", None)
+    if id_array is not None:
+        trailer.append("/ID " + ser.dumps(id_array).decode("latin-1"))
+    stream.write(
+        f"{xref_num} 0 obj\n<<{' '.join(trailer)} /Filter /FlateDecode /Length {len(data)}>>\nstream\n".encode()
+        + data
+        + f"\nendstream\nendobj\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    )
+    return {
+        "objectsBefore": objects_before,
+        "objectsAfter": len(kept),
+        "unreachable": objects_before - len(live),
+        "duplicates": len(live) - len(kept),
+        "fieldsPruned": fields_pruned,
+        "objectStreams": object_streams,
+        "bytes": stream.tell() - start,
+    }
+
+
+def optimize_stage(ctx, options: dict) -> dict:
+    """Process stage: serialize with write_optimized() instead of writer.write().
+
+    Options: {"level": zlib level for object/xref streams (default 6)}. The returned dict
+    (the stage's "stats" in the report) is filled in when the pipeline serializes.
+    """
+    level = int(options.get("level", 6))
+    stats: dict = {}
+
+    def serializer(writer) -> bytes:
+        buf = io.BytesIO()
+        stats.update(write_optimized(writer, buf, level=level))
+        return buf.getvalue()
+
+    ctx.serializer = serializer
+    return stats
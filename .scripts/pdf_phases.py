@@ -0,0 +1,105 @@
+"""Per-phase wall time and counters for the AcroForm scripts, reported as one JSON line on stderr.
+
+Enabled per call with --timings or for every call with the environment variable
+PDF_SCRIPTS_TIMINGS=1 (the bundle runs the scripts with fixed arguments). The line is
+machine-readable so the PHP listener can log it as structured data:
+
+  {"script": "extract_acroform_fields", "version": 1, "pypdf": "6.1.0", "totalMs": 41.2,
+   "phases": {"open": 12.0, "fields": 25.1, "serialize": 3.9, "write": 0.2},
+   "counts": {"pages": 3, "annotations": 40, "widgets": 38}}
+
+Phase times are milliseconds on the monotonic clock; a phase entered more than once adds up.
+version is the layout of this object (bumped when keys change meaning). When timing is off the
+scripts get NULL_TIMER, whose methods do nothing, so the instrumented code needs no branches.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+REPORT_VERSION = 1
+ENV_VAR = "PDF_SCRIPTS_TIMINGS"
+
+
+def timings_enabled(flag: bool = False) -> bool:
+    """True when the --timings flag is set or PDF_SCRIPTS_TIMINGS is 1/true."""
+    return flag or os.environ.get(ENV_VAR, "").lower() in ("1", "true")
+
+
+class PhaseTimer:
+    """Accumulates phase durations and counters for one script run."""
+
+    def __init__(self, script: str) -> None:
+        self.script = script
+        self.started = self._lap_start = time.monotonic()
+        self.phases: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def __bool__(self) -> bool:
+        return True
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self._lap_start = time.monotonic()
+            self.phases[name] = self.phases.get(name, 0.0) + (self._lap_start - t0) * 1000
+
+    def mark(self) -> None:
+        """Start timing the next lap() here."""
+        self._lap_start = time.monotonic()
+
+    def lap(self, name: str) -> None:
+        """Add the time since the last mark(), lap() or phase() end to phase name.
+
+        For long sequential code where a with block per phase would re-indent everything.
+        """
+        now = time.monotonic()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self._lap_start) * 1000
+        self._lap_start = now
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def report(self) -> dict:
+        pypdf = sys.modules.get("pypdf")  # only reported when the run loaded it
+        return {
+            "script": self.script,
+            "version": REPORT_VERSION,
+            "pypdf": getattr(pypdf, "__version__", None),
+            "totalMs": round((time.monotonic() - self.started) * 1000, 2),
+            "phases": {name: round(ms, 2) for name, ms in self.phases.items()},
+            "counts": dict(self.counts),
+        }
+
+    def emit(self, **extra) -> None:
+        """Write the report (with extra keys, e.g. digests) as one JSON line to stderr."""
+        print(json.dumps({**self.report(), **extra}), file=sys.stderr)
+
+
+class _NullTimer:
+    """Timer used when timing is off: every method is a no-op and it is falsy."""
+
+    def __bool__(self) -> bool:
+        return False
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def mark(self) -> None:
+        pass
+
+    def lap(self, name: str) -> None:
+        pass
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
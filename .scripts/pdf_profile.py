@@ -0,0 +1,161 @@
+"""Profile one run of an AcroForm script: cProfile/pstats dump and optional collapsed stacks.
+
+The scripts' entry points run main() through run_profiled(), which profiles it when asked:
+
+  --profile PATH          write the pstats file to PATH (a directory, or a path ending in /,
+                          gets <script>-<YYYYmmdd-HHMMSS>-<pid>.prof inside it)
+  --profile-collapsed     also write PATH.collapsed: sampled stacks in the collapsed format that
+                          flamegraph.pl, speedscope and inferno read (as py-spy record --format raw)
+  --profile-min-ms N      keep the files only when the run took at least N ms
+
+or, since the bundle runs the scripts with fixed arguments, with the environment variables
+PDF_SCRIPTS_PROFILE (path or directory), PDF_SCRIPTS_PROFILE_COLLAPSED=1 and
+PDF_SCRIPTS_PROFILE_MIN_MS. A directory is the natural choice for the environment variable: each
+request writes its own file and, with a threshold, only slow requests leave one. Nothing is
+written to stdout or stderr, so the scripts' output contracts (e.g. the JSON line apply writes
+last on stderr) are unchanged.
+
+The pstats file is cProfile's, of the main thread (python -m pstats FILE, snakeviz). Collapsed
+stacks come from a sampling thread that reads the main thread's frame every millisecond (the GIL
+switch interval is lowered to match while it runs) and count one line per distinct stack, root
+first, frames as "function (file:first line)". Standard library only.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+ENV_PATH = "PDF_SCRIPTS_PROFILE"
+ENV_COLLAPSED = "PDF_SCRIPTS_PROFILE_COLLAPSED"
+ENV_MIN_MS = "PDF_SCRIPTS_PROFILE_MIN_MS"
+SAMPLE_INTERVAL = 0.001
+
+
+def add_profile_arguments(ap: argparse.ArgumentParser) -> None:
+    """Declare the profiling options on a script's parser (run_profiled() reads them before main())."""
+    ap.add_argument("--profile", default=None, metavar="PATH", help=f"Write a cProfile/pstats dump of this run (env {ENV_PATH})")
+    ap.add_argument(
+        "--profile-collapsed",
+        action="store_true",
+        help=f"With --profile: also write PATH.collapsed, sampled stacks for flame graphs (env {ENV_COLLAPSED}=1)",
+    )
+    ap.add_argument(
+        "--profile-min-ms",
+        type=float,
+        default=None,
+        metavar="MS",
+        help=f"Keep the profile only if the run took at least MS milliseconds (env {ENV_MIN_MS})",
+    )
+
+
+def _settings(argv: list[str]) -> tuple[str, bool, float] | None:
+    """(path, collapsed, min_ms) from argv, else from the environment; None when not profiling."""
+    ap = argparse.ArgumentParser(add_help=False)
+    add_profile_arguments(ap)
+    args, _ = ap.parse_known_args(argv)
+    path = args.profile or os.environ.get(ENV_PATH) or None
+    if not path:
+        return None
+    collapsed = args.profile_collapsed or os.environ.get(ENV_COLLAPSED, "").lower() in ("1", "true")
+    min_ms = args.profile_min_ms
+    if min_ms is None:
+        try:
+            min_ms = float(os.environ.get(ENV_MIN_MS) or 0)
+        except ValueError:
+            min_ms = 0.0
+    return path, collapsed, min_ms
+
+
+def _profile_path(path: str, script: str) -> str:
+    if path.endswith(("/", os.sep)) or os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+        return os.path.join(path, f"{script}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+    return path
+
+
+class _StackSampler:
+    """Counts the stacks of one thread, sampled every interval seconds, below a stop frame's code.
+
+    Only stacks rooted in root_code (the profiled function) are kept, so samples taken while the
+    caller starts or stops the sampler are not. threading is imported here, not at module level,
+    so runs without --profile-collapsed do not pay for it at startup.
+    """
+
+    def __init__(self, thread_id: int, stop_code, root_code, interval: float = SAMPLE_INTERVAL) -> None:
+        import threading
+        from collections import Counter
+
+        self.thread_id = thread_id
+        self.stop_code = stop_code
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self.run, name="pdf-profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def run(self) -> None:
+        names: dict = {}  # code object -> "function (file:line)"
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            code = None
+            while frame is not None and frame.f_code is not self.stop_code:
+                code = frame.f_code
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(name)
+                frame = frame.f_back
+            if stack and code is self.root_code:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def run_profiled(main, script: str, argv: list[str] | None = None):
+    """Call main() and return its result, profiled when --profile or PDF_SCRIPTS_PROFILE is set.
+
+    SystemExit and other exceptions from main() propagate after the profile has been written.
+    """
+    settings = _settings(sys.argv[1:] if argv is None else argv)
+    if settings is None:
+        return main()
+    import cProfile
+
+    path, collapsed, min_ms = settings
+    profiler = cProfile.Profile()
+    sampler = None
+    switch_interval = sys.getswitchinterval()
+    if collapsed:
+        sys.setswitchinterval(SAMPLE_INTERVAL)
+        import threading
+
+        sampler = _StackSampler(threading.get_ident(), sys._getframe().f_code, getattr(main, "__code__", None))
+        sampler.start()
+    started = time.monotonic()
+    profiler.enable()
+    try:
+        return main()
+    finally:
+        profiler.disable()
+        elapsed_ms = (time.monotonic() - started) * 1000
+        if sampler is not None:
+            sampler.stop()
+            sys.setswitchinterval(switch_interval)
+        if elapsed_ms >= min_ms:
+            path = _profile_path(path, script)
+            profiler.dump_stats(path)
+            if sampler is not None:
+                sampler.write(path + ".collapsed")
@@ -0,0 +1,282 @@
+"""Lazy, seekable file object for a remote PDF backed by HTTP Range requests.
+
+pypdf only needs the trailer, the cross-reference data and the objects it dereferences, so
+extracting fields from a large remote PDF does not require downloading it. HttpRangeFile
+fetches fixed-size blocks on demand (adjacent missing blocks in one request), keeps them in an
+LRU cache and reuses one keep-alive connection for all requests.
+
+Usage:
+  from pdf_range_reader import open_url
+  from extract_acroform_fields import extract_fields
+  with open_url("https://example.com/form.pdf") as fh:
+      fields = extract_fields(fh)
+      print(fh.raw.stats())
+
+open_url() wraps HttpRangeFile in io.BufferedReader: pypdf parses with many one-byte reads,
+which the C buffer serves without a Python call each (several times faster than the raw file).
+
+Servers that ignore Range (200 instead of 206) still work: the body of the first response is
+kept and served from memory. Standard library only.
+"""
+from __future__ import annotations
+
+import http.client
+import io
+import re
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+DEFAULT_MAX_BLOCKS = 512  # 32 MiB cache with the default block size
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+# Not forwarded when a redirect leads to another scheme or host
+_CREDENTIAL_HEADERS = frozenset({"authorization", "proxy-authorization", "cookie"})
+
+
+class RangeRequestError(OSError):
+    """Raised when the server answers a range request with an unexpected status or body."""
+
+
+class HttpRangeFile(io.RawIOBase):
+    """Read-only, seekable binary file over HTTP(S) using Range requests and a block cache.
+
+    Args:
+        url: http:// or https:// URL of the PDF. Redirects are followed (up to 5).
+        block_size: Bytes per cached block (and minimum request size).
+        max_blocks: Maximum number of blocks kept in the LRU cache.
+        timeout: Socket timeout in seconds for each request.
+        headers: Extra request headers (e.g. Authorization). Authorization, Proxy-Authorization
+            and Cookie are dropped when a redirect changes the scheme or the host.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_blocks: int = DEFAULT_MAX_BLOCKS,
+        timeout: float = 30.0,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__()
+        if block_size < 1 or max_blocks < 1:
+            raise ValueError("block_size and max_blocks must be positive")
+        self._block_size = block_size
+        self._max_blocks = max_blocks
+        self._timeout = timeout
+        self._headers = dict(headers or {})
+        self._conn: http.client.HTTPConnection | None = None
+        self._conn_key: tuple[str, str] | None = None
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        self._full: bytes | None = None  # whole body when the server ignores Range
+        self._pos = 0
+        self._requests = 0
+        self._connections = 0
+        self._bytes_fetched = 0
+        self._set_url(url)
+        self._size = self._fetch_first_block()
+
+    # -- HTTP -----------------------------------------------------------------
+
+    def _set_url(self, url: str) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Only http(s) URLs are supported: {url!r}")
+        self._url = url
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    def _connection(self) -> http.client.HTTPConnection:
+        key = (self._scheme, self._netloc)
+        if self._conn is None or self._conn_key != key:
+            if self._conn is not None:
+                self._conn.close()
+            cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self._netloc, timeout=self._timeout)
+            self._conn_key = key
+            self._connections += 1
+        return self._conn
+
+    def _get(self, start: int, end: int) -> tuple[int, dict[str, str], bytes]:
+        """GET bytes start..end (inclusive); returns (status, lowercased headers, body).
+
+        Reuses the keep-alive connection; a request that fails because the server closed an
+        idle connection is retried once on a fresh one. Redirects are followed.
+        """
+        for _redirect in range(6):
+            headers = {**self._headers, "Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"}
+            for attempt in (0, 1):
+                conn = self._connection()
+                try:
+                    conn.request("GET", self._target, headers=headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise
+            self._requests += 1
+            self._bytes_fetched += len(body)
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            if resp.will_close:
+                conn.close()
+                self._conn = None
+            if resp.status in (301, 302, 303, 307, 308) and resp_headers.get("location"):
+                origin = (self._scheme, self._netloc)
+                self._set_url(urljoin(self._url, resp_headers["location"]))
+                if (self._scheme, self._netloc) != origin:
+                    self._headers = {k: v for k, v in self._headers.items() if k.lower() not in _CREDENTIAL_HEADERS}
+                continue
+            return resp.status, resp_headers, body
+        raise RangeRequestError(f"Too many redirects for {self._url}")
+
+    def _fetch_first_block(self) -> int:
+        status, headers, body = self._get(0, self._block_size - 1)
+        if status == 200:
+            # Range not supported: serve everything from the body we already have
+            self._full = body
+            return len(body)
+        if status != 206:
+            raise RangeRequestError(f"HTTP {status} for {self._url}")
+        m = _CONTENT_RANGE_RE.match(headers.get("content-range", ""))
+        if m is None or m.group(3) == "*":
+            raise RangeRequestError(f"Missing or unusable Content-Range for {self._url}")
+        self._store(0, body)
+        return int(m.group(3))
+
+    def _store(self, first_block: int, data: bytes) -> None:
+        bs = self._block_size
+        for i in range(0, len(data), bs):
+            self._blocks[first_block + i // bs] = data[i:i + bs]
+            self._blocks.move_to_end(first_block + i // bs)
+        while len(self._blocks) > self._max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _fetch_blocks(self, first: int, last: int) -> None:
+        start = first * self._block_size
+        end = min(self._size, (last + 1) * self._block_size) - 1
+        status, headers, body = self._get(start, end)
+        if status == 200:
+            # Server stopped honouring Range mid-way: keep the full body
+            self._full = body
+            return
+        if status != 206:
+            raise RangeRequestError(f"HTTP {status} for bytes {start}-{end} of {self._url}")
+        m = _CONTENT_RANGE_RE.match(headers.get("content-range", ""))
+        if m is None or int(m.group(1)) != start or len(body) != end - start + 1:
+            raise RangeRequestError(f"Unexpected range response for bytes {start}-{end} of {self._url}")
+        self._store(first, body)
+
+    # -- io.RawIOBase -----------------------------------------------------------
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("Negative seek position")
+        self._pos = pos
+        return pos
+
+    def _read_range(self, start: int, end: int) -> bytes:
+        """Return bytes [start, end) from the cache, fetching missing blocks (coalesced)."""
+        if self._full is not None:
+            return self._full[start:end]
+        bs = self._block_size
+        first, last = start // bs, (end - 1) // bs
+        if first == last:
+            # Fast path: pypdf mostly issues small reads inside one block
+            block = self._blocks.get(first)
+            if block is not None:
+                self._blocks.move_to_end(first)
+                return block[start - first * bs:end - first * bs]
+        missing = [i for i in range(first, last + 1) if i not in self._blocks]
+        run_start = None
+        for i in missing + [None]:
+            if run_start is not None and (i is None or i != prev + 1):
+                self._fetch_blocks(run_start, prev)
+                run_start = None
+                if self._full is not None:
+                    return self._full[start:end]
+            if i is not None and run_start is None:
+                run_start = i
+            prev = i
+        chunks = []
+        for i in range(first, last + 1):
+            block = self._blocks.get(i)
+            if block is None:  # evicted while fetching a very large range
+                self._fetch_blocks(i, i)
+                block = self._blocks[i] if self._full is None else self._full[i * bs:(i + 1) * bs]
+            else:
+                self._blocks.move_to_end(i)
+            chunks.append(block)
+        data = b"".join(chunks)
+        offset = first * bs
+        return data[start - offset:end - offset]
+
+    def readinto(self, b) -> int:
+        if self._pos >= self._size or len(b) == 0:
+            return 0
+        end = min(self._size, self._pos + len(b))
+        data = self._read_range(self._pos, end)
+        n = len(data)
+        b[:n] = data
+        self._pos += n
+        return n
+
+    def readall(self) -> bytes:
+        if self._pos >= self._size:
+            return b""
+        data = self._read_range(self._pos, self._size)
+        self._pos += len(data)
+        return data
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._blocks.clear()
+        super().close()
+
+    # -- Diagnostics ----------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        """Total size of the remote file in bytes."""
+        return self._size
+
+    def stats(self) -> dict:
+        """Return transfer counters: size, requests, connections, bytesFetched, rangeSupported."""
+        return {
+            "size": self._size,
+            "requests": self._requests,
+            "connections": self._connections,
+            "bytesFetched": self._bytes_fetched,
+            "rangeSupported": self._full is None,
+        }
+
+
+def open_url(url: str, buffer_size: int = io.DEFAULT_BUFFER_SIZE, **kwargs) -> io.BufferedReader:
+    """Open url as a buffered, seekable binary file (see HttpRangeFile for kwargs).
+
+    Transfer counters are available as fh.raw.stats(). Closing the returned file closes the
+    connection.
+    """
+    return io.BufferedReader(HttpRangeFile(url, **kwargs), buffer_size=buffer_size)
@@ -0,0 +1,212 @@
+"""Record each AcroForm script invocation into a local spool for replay_acroform.py.
+
+Opt-in with the environment variable PDF_SCRIPTS_RECORD=DIR (the bundle runs the scripts with
+fixed arguments, so PHP enables it per deployment or per request). After the script finishes,
+one JSON file is written atomically to DIR/records/:
+
+  {"version": 1, "script": "apply_acroform_patches", "startedAt": 1760000000.123,
+   "durationMs": 182.4, "exitCode": 0, "error": null, "inputSha256": "...", "inputBytes": 48213,
+   "patchesSha256": "...", "args": ["--optimize"], "env": {"PDF_APPLY_COMPRESS": "6"}}
+
+Only what shapes the work is kept, so the spool holds no document content by default:
+
+  - the input PDF as its SHA-256 and size (with PDF_SCRIPTS_RECORD_PDFS=1 the file itself is
+    also stored once as DIR/pdfs/<sha256>.pdf, for replay on another machine);
+  - the patches, anonymized and stored once as DIR/patches/<sha256>.json: field ids, names,
+    rects and flags as sent, every character of defaultValue, label and options other than
+    whitespace replaced with "x" (same lengths, so appearance generation costs the same);
+  - mode options from an allowlist (MODE_OPTIONS, e.g. --format, --dry-run, --stages); paths,
+    --document-key, --config, --previous and anything else are dropped (a replay extracts in full), as are all environment variables
+    but the mode ones (MODE_ENV).
+
+startedAt is the wall-clock start (for the arrival pattern) and durationMs the monotonic time of
+main(), without interpreter start. Calls that read the PDF from stdin or a URL are recorded
+without an input hash and cannot be replayed. Recording never changes a script's output or exit
+status: spool errors are ignored. Standard library only.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+ENV_RECORD = "PDF_SCRIPTS_RECORD"
+ENV_RECORD_PDFS = "PDF_SCRIPTS_RECORD_PDFS"
+RECORD_VERSION = 1
+
+# script -> ((option, takes a value), ...) kept in "args"
+MODE_OPTIONS = {
+    "extract_acroform_fields": (
+        ("--probe", False),
+        ("--deadline-ms", True),
+        ("--start-page", True),
+        ("--format", True),
+        ("--gzip", False),
+        ("--viewer-space", False),
+        ("--unit", True),
+        ("--origin", True),
+        ("--overlaps", False),
+    ),
+    "apply_acroform_patches": (
+        ("--dry-run", False),
+        ("--optimize", False),
+        ("--compress", True),
+        ("--linearize", False),
+        ("--deterministic", False),
+    ),
+    "process_modified_pdf": (("--stages", True), ("--deterministic", False)),
+}
+# script -> option holding the input PDF (None: first positional argument)
+INPUT_OPTION = {"extract_acroform_fields": None, "apply_acroform_patches": "--pdf", "process_modified_pdf": "--input"}
+MODE_ENV = ("PDF_APPLY_OPTIMIZE", "PDF_APPLY_COMPRESS", "PDF_APPLY_LINEARIZE", "PDF_PROCESS_STAGES", "PDF_SCRIPTS_DETERMINISTIC")
+ANONYMIZED_KEYS = ("defaultValue", "default_value", "label", "options")
+# Other options that take a value, declared so their values are not taken for the input path
+OTHER_VALUE_OPTIONS = (
+    "--output",
+    "--document-key",
+    "--config",
+    "--signature-boxes",
+    "--profile",
+    "--profile-min-ms",
+    "--max-memory-mb",
+    "--previous",
+    "--previous-bytes",
+)
+
+
+def _parse(script: str, argv: list[str]) -> tuple[str | None, str | None, list[str]]:
+    """(input PDF path, patches path, mode args) from a script's argv."""
+    ap = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    input_option = INPUT_OPTION[script]
+    if input_option is None:
+        ap.add_argument("pdf", nargs="?")
+    else:
+        ap.add_argument(input_option, dest="pdf")
+    ap.add_argument("--patches")
+    ap.add_argument("--stdin", action="store_true")
+    ap.add_argument("--url")
+    for option in OTHER_VALUE_OPTIONS:
+        ap.add_argument(option, dest=f"_other{option}")
+    ap.add_argument("--trace-memory", nargs="?", dest="_other_trace")
+    for option, takes_value in MODE_OPTIONS[script]:
+        if option == "--compress":
+            ap.add_argument(option, nargs="?", const="9")
+        elif takes_value:
+            ap.add_argument(option)
+        else:
+            ap.add_argument(option, action="store_true")
+    args, _ = ap.parse_known_args(argv)
+    mode = []
+    for option, takes_value in MODE_OPTIONS[script]:
+        value = getattr(args, option[2:].replace("-", "_"))
+        if value is True:
+            mode.append(option)
+        elif takes_value and value not in (None, False):
+            mode += [option, str(value)]
+    pdf = None if args.stdin or args.url else args.pdf
+    return pdf, args.patches, mode
+
+
+def _mask(value):
+    if isinstance(value, str):
+        return "".join(c if c.isspace() else "x" for c in value)
+    if isinstance(value, list):
+        return [_mask(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _mask(v) for k, v in value.items()}
+    return value
+
+
+def anonymize_patches(patches) -> list:
+    """The patches with defaultValue, label and options masked (same structure and lengths)."""
+    if not isinstance(patches, list):
+        return []
+    return [
+        {k: (_mask(v) if k in ANONYMIZED_KEYS else v) for k, v in patch.items()} if isinstance(patch, dict) else patch
+        for patch in patches
+    ]
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _file_sha256(path: str) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def record(spool: str, script: str, argv: list[str], started_at: float, duration_ms: float, exit_code: int, error: str | None) -> str:
+    """Write one invocation record (and its anonymized patches / PDF) to spool; return its path."""
+    pdf, patches_path, mode = _parse(script, argv)
+    for sub in ("records", "patches", "pdfs"):
+        os.makedirs(os.path.join(spool, sub), exist_ok=True)
+    entry = {
+        "version": RECORD_VERSION,
+        "script": script,
+        "startedAt": round(started_at, 3),
+        "durationMs": round(duration_ms, 2),
+        "exitCode": exit_code,
+        "error": error,
+        "inputSha256": None,
+        "inputBytes": None,
+        "patchesSha256": None,
+        "args": mode,
+        "env": {k: os.environ[k] for k in MODE_ENV if os.environ.get(k)},
+    }
+    if pdf and os.path.isfile(pdf):
+        entry["inputSha256"], entry["inputBytes"] = _file_sha256(pdf)
+        stored = os.path.join(spool, "pdfs", f"{entry['inputSha256']}.pdf")
+        if os.environ.get(ENV_RECORD_PDFS, "").lower() in ("1", "true") and not os.path.exists(stored):
+            with open(pdf, "rb") as f:
+                _write_atomic(stored, f.read())
+    if patches_path and os.path.isfile(patches_path):
+        try:
+            with open(patches_path, encoding="utf-8") as f:
+                data = json.dumps(anonymize_patches(json.load(f)), ensure_ascii=False, sort_keys=True).encode("utf-8")
+        except ValueError:
+            data = b"[]"
+        entry["patchesSha256"] = hashlib.sha256(data).hexdigest()
+        stored = os.path.join(spool, "patches", f"{entry['patchesSha256']}.json")
+        if not os.path.exists(stored):
+            _write_atomic(stored, data)
+    path = os.path.join(spool, "records", f"{int(started_at * 1000)}-{os.getpid()}-{script}.json")
+    _write_atomic(path, json.dumps(entry).encode("utf-8"))
+    return path
+
+
+def run_recorded(main, script: str, spool: str | None = None):
+    """Call main() and return its result, recording the call into spool (default: $PDF_SCRIPTS_RECORD).
+
+    SystemExit and other exceptions propagate unchanged after the record is written.
+    """
+    spool = spool or os.environ.get(ENV_RECORD)
+    if not spool:
+        return main()
+    argv = sys.argv[1:]
+    started_at, t0 = time.time(), time.monotonic()
+    exit_code, error = 0, None
+    try:
+        return main()
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        raise
+    except BaseException as e:
+        exit_code, error = 1, type(e).__name__
+        raise
+    finally:
+        try:
+            record(spool, script, argv, started_at, (time.monotonic() - t0) * 1000, exit_code, error)
+        except (OSError, ValueError):
+            pass
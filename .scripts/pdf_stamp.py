@@ -0,0 +1,372 @@
+"""Stamp signature images onto the pages at the signature box coordinates.
+
+Input is the coordinate JSON the bundle produces (SignatureCoordinatesModel::toArray()):
+{"unit", "origin", "signature_boxes": [{"page", "x", "y", "width", "height", "angle",
+"signature_data"}, ...]}; signature_data is the data URL from the draw pad or upload (PNG or
+JPEG). Boxes without signature_data are skipped.
+
+Each distinct image is embedded once as an Image XObject keyed by the SHA-256 of its bytes, so
+the same initials on every page cost one image plus a few bytes of "cm ... Do" per box. Pages
+are visited once: all boxes of a page are drawn by one appended content stream, and one shared
+"q" stream isolates the existing content's graphics state on every stamped page.
+
+PNG without transparency is embedded as-is (its zlib data with the PNG predictor in
+/DecodeParms, no decoding); PNG with an alpha channel (what the draw pad produces) is decoded
+once and split into colour data and a /SMask; JPEG is embedded as /DCTDecode. Interlaced PNGs
+and palette PNGs with transparency below 8 bits per pixel are rejected. The image is fitted
+into the box keeping its aspect ratio (fit "contain", centred) or stretched (fit "fill"), and
+rotated by the box angle around the box centre, clockwise as in the editor. Coordinates are
+relative to the page as the viewer shows it (CropBox turned by /Rotate, see pdf_coords.py), and
+on rotated pages the image is turned with it so it stays upright on screen.
+
+Usage (process_modified_pdf.py stage):
+  {"stages": [{"name": "stamp", "coordinates": "coordinates.json"}]}
+  {"stages": [{"name": "stamp", "unit": "mm", "origin": "bottom_left", "signature_boxes": [...]}]}
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import math
+import struct
+import zlib
+
+from pdf_coords import UNIT_TO_PT, box_to_rect, page_geometry
+from pdf_flatten import _inherited, _num
+
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+_PNG_COLORS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}  # colour type -> samples per pixel
+_FITS = ("contain", "fill")
+
+
+def decode_data_url(value: str) -> bytes:
+    """Return the bytes of a base64 data URL (data:image/png;base64,...).
+
+    Raises:
+        ValueError: Not a base64 data URL or invalid base64.
+    """
+    head, sep, payload = value.partition(",")
+    if not sep or not head.startswith("data:") or not head.endswith(";base64"):
+        raise ValueError("signature_data must be a base64 data URL (data:image/...;base64,...)")
+    try:
+        return base64.b64decode(payload, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 in signature_data: {e}") from e
+
+
+def _png_image(data: bytes) -> tuple[dict, bytes, bytes | None, int]:
+    """Parse a PNG into (XObject entries, stream data, soft mask data or None, mask depth)."""
+    from pypdf.filters import FlateDecode
+    from pypdf.generic import ArrayObject, ByteStringObject, DictionaryObject, NameObject, NumberObject
+
+    pos, ihdr, palette, trns, idat = 8, None, b"", None, []
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos : pos + 8])
+        body = data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+        if ctype == b"IHDR":
+            ihdr = struct.unpack(">IIBBBBB", body)
+        elif ctype == b"PLTE":
+            palette = body
+        elif ctype == b"tRNS":
+            trns = body
+        elif ctype == b"IDAT":
+            idat.append(body)
+        elif ctype == b"IEND":
+            break
+    if ihdr is None or not idat:
+        raise ValueError("Invalid PNG: missing IHDR or IDAT")
+    width, height, depth, color, _, _, interlace = ihdr
+    if interlace:
+        raise ValueError("Interlaced PNG is not supported")
+    colors = _PNG_COLORS.get(color)
+    if colors is None or (color == 3 and not palette):
+        raise ValueError(f"Unsupported PNG colour type {color}")
+
+    n = NumberObject
+    entries = {"/Width": n(width), "/Height": n(height), "/BitsPerComponent": n(depth)}
+    if color == 3:
+        entries["/ColorSpace"] = ArrayObject(
+            [NameObject("/Indexed"), NameObject("/DeviceRGB"), n(len(palette) // 3 - 1), ByteStringObject(palette)]
+        )
+    else:
+        entries["/ColorSpace"] = NameObject("/DeviceRGB" if color in (2, 6) else "/DeviceGray")
+    packed = b"".join(idat)
+    params = DictionaryObject(
+        {
+            NameObject("/Predictor"): n(15),
+            NameObject("/Colors"): n(colors),
+            NameObject("/BitsPerComponent"): n(depth),
+            NameObject("/Columns"): n(width),
+        }
+    )
+    if color in (0, 2) and trns is not None:
+        # Colour-key transparency: a /Mask range per component, still no decoding
+        keys = struct.unpack(f">{colors}H", trns[: 2 * colors])
+        entries["/Mask"] = ArrayObject([n(v) for k in keys for v in (k, k)])
+    if color not in (4, 6) and not (color == 3 and trns):
+        entries["/DecodeParms"] = params
+        return entries, packed, None, 0
+
+    raw = FlateDecode.decode(packed, params)
+    if color == 3:
+        if depth != 8:
+            raise ValueError("Palette PNG with transparency must use 8 bits per pixel")
+        alpha = raw.translate(trns[:256].ljust(256, b"\xff"))
+        return entries, zlib.compress(raw), zlib.compress(alpha), 8
+    # Grey/RGB + alpha: split each pixel into colour samples and the alpha sample
+    sample = depth // 8
+    pixel = colors * sample
+    color_bytes = pixel - sample
+    pixels = len(raw) // pixel
+    rgb = bytearray(pixels * color_bytes)
+    for k in range(color_bytes):
+        rgb[k::color_bytes] = raw[k::pixel]
+    alpha = bytearray(pixels * sample)
+    for k in range(sample):
+        alpha[k::sample] = raw[color_bytes + k :: pixel]
+    return entries, zlib.compress(bytes(rgb)), zlib.compress(bytes(alpha)), depth
+
+
+def _jpeg_image(data: bytes) -> dict:
+    """XObject entries (size, colour space) of a baseline or progressive JPEG."""
+    from pypdf.generic import ArrayObject, NameObject, NumberObject
+
+    pos, adobe = 2, False
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("Invalid JPEG: marker expected")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2
+            continue
+        (length,) = struct.unpack(">H", data[pos + 2 : pos + 4])
+        if marker == 0xEE and data[pos + 4 : pos + 9] == b"Adobe":
+            adobe = True
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            _, height, width, components = struct.unpack(">BHHB", data[pos + 4 : pos + 10])
+            spaces = {1: "/DeviceGray", 3: "/DeviceRGB", 4: "/DeviceCMYK"}
+            if components not in spaces:
+                raise ValueError(f"Unsupported JPEG with {components} components")
+            entries = {
+                "/Width": NumberObject(width),
+                "/Height": NumberObject(height),
+                "/BitsPerComponent": NumberObject(8),
+                "/ColorSpace": NameObject(spaces[components]),
+            }
+            if components == 4 and adobe:  # Adobe CMYK JPEGs store inverted values
+                entries["/Decode"] = ArrayObject([NumberObject(v) for v in (1, 0) * 4])
+            return entries
+        pos += 2 + length
+    raise ValueError("Invalid JPEG: no frame header")
+
+
+class ImageCache:
+    """Image XObjects added to one writer, keyed by the SHA-256 of the image bytes."""
+
+    def __init__(self, writer) -> None:
+        self._writer = writer
+        self._by_text: dict[str, tuple] = {}  # data URL -> (ref, width, height, digest)
+        self._by_digest: dict[str, tuple] = {}
+        self.embedded_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._by_digest)
+
+    def get(self, data_url: str) -> tuple:
+        """Return (XObject ref, pixel width, pixel height, digest) for a data URL, embedding it once."""
+        hit = self._by_text.get(data_url)
+        if hit is None:
+            data = decode_data_url(data_url)
+            digest = hashlib.sha256(data).hexdigest()
+            hit = self._by_digest.get(digest)
+            if hit is None:
+                hit = self._by_digest[digest] = self._embed(data, digest)
+            self._by_text[data_url] = hit
+        return hit
+
+    def _embed(self, data: bytes, digest: str) -> tuple:
+        from pypdf.generic import EncodedStreamObject, NameObject, NumberObject
+
+        def stream(entries: dict, payload: bytes, filter_name: str):
+            obj = EncodedStreamObject()
+            obj[NameObject("/Type")] = NameObject("/XObject")
+            obj[NameObject("/Subtype")] = NameObject("/Image")
+            for key, value in entries.items():
+                obj[NameObject(key)] = value
+            obj[NameObject("/Filter")] = NameObject(filter_name)
+            obj._data = payload
+            self.embedded_bytes += len(payload)
+            return obj
+
+        if data.startswith(_PNG_MAGIC):
+            entries, payload, mask, mask_depth = _png_image(data)
+            image = stream(entries, payload, "/FlateDecode")
+            if mask is not None:
+                smask = stream(
+                    {
+                        "/Width": entries["/Width"],
+                        "/Height": entries["/Height"],
+                        "/BitsPerComponent": NumberObject(mask_depth),
+                        "/ColorSpace": NameObject("/DeviceGray"),
+                    },
+                    mask,
+                    "/FlateDecode",
+                )
+                image[NameObject("/SMask")] = self._writer._add_object(smask)
+        elif data.startswith(b"\xff\xd8"):
+            entries = _jpeg_image(data)
+            image = stream(entries, data, "/DCTDecode")
+        else:
+            raise ValueError("signature_data must be a PNG or JPEG image")
+        return self._writer._add_object(image), int(entries["/Width"]), int(entries["/Height"]), digest
+
+
+def _image_matrix(
+    rect: tuple[float, ...], box_size: tuple[float, float], angle: float, image_size: tuple[int, int], fit: str
+) -> tuple[float, ...]:
+    """Matrix mapping the image unit square onto a box centred in rect.
+
+    box_size is the box as the viewer shows it (points) and angle its counter-clockwise turn
+    in user space (page /Rotate minus the box angle), so the image is upright in the viewer.
+    """
+    w, h = box_size
+    if fit == "contain" and image_size[0] > 0 and image_size[1] > 0:
+        scale = min(w / image_size[0], h / image_size[1])
+        w, h = image_size[0] * scale, image_size[1] * scale
+    cx, cy = (rect[0] + rect[2]) / 2, (rect[1] + rect[3]) / 2
+    theta = math.radians(angle)
+    cos, sin = math.cos(theta), math.sin(theta)
+    return (
+        w * cos,
+        w * sin,
+        -h * sin,
+        h * cos,
+        cx - w / 2 * cos + h / 2 * sin,
+        cy - w / 2 * sin - h / 2 * cos,
+    )
+
+
+def stamp_writer(
+    writer,
+    boxes: list[dict],
+    unit: str = "mm",
+    origin: str = "bottom_left",
+    fit: str = "contain",
+) -> dict:
+    """Draw the signature image of each box on its page of a pypdf PdfWriter, in place.
+
+    Args:
+        writer: PdfWriter holding the document.
+        boxes: Signature boxes as in SignatureCoordinatesModel::toArray()["signature_boxes"]
+            (page is 1-based).
+        unit: Unit of x, y, width and height (pdf_coords.UNIT_TO_PT).
+        origin: Corner the coordinates are relative to (pdf_coords.ORIGINS).
+        fit: "contain" (keep the aspect ratio, centred) or "fill" (stretch to the box).
+
+    Returns:
+        Dict with boxes, stamped, skipped (no signature_data), images (distinct XObjects),
+        imageBytes (their stream bytes) and pages (pages drawn on).
+
+    Raises:
+        ValueError: Unknown unit, origin or fit; page out of range; undecodable image.
+    """
+    from pypdf.generic import ArrayObject, DictionaryObject, NameObject, StreamObject
+
+    if fit not in _FITS:
+        raise ValueError(f"Unknown fit: {fit} (expected one of {', '.join(_FITS)})")
+    pages = writer.pages
+    cache = ImageCache(writer)
+    by_page: dict[int, list[tuple]] = {}
+    geometries: dict[int, tuple] = {}
+    skipped = 0
+    for box in boxes:
+        data_url = box.get("signature_data")
+        if not data_url:
+            skipped += 1
+            continue
+        page_num = int(box.get("page", 1))
+        if not 1 <= page_num <= len(pages):
+            raise ValueError(f"Page {page_num} out of range (1-{len(pages)})")
+        geometry = geometries.get(page_num)
+        if geometry is None:
+            geometry = geometries[page_num] = page_geometry(pages[page_num - 1])
+        *page_box, rotate = geometry
+        width, height = float(box.get("width", 0)), float(box.get("height", 0))
+        x, y = float(box.get("x", 0)), float(box.get("y", 0))
+        rect = box_to_rect(x, y, width, height, unit, origin, tuple(page_box), rotate)
+        ref, image_width, image_height, digest = cache.get(data_url)
+        k = UNIT_TO_PT[unit]
+        # The editor turns boxes clockwise on screen; the page itself is shown turned by /Rotate
+        angle = rotate - float(box.get("angle") or 0)
+        matrix = _image_matrix(rect, (width * k, height * k), angle, (image_width, image_height), fit)
+        by_page.setdefault(page_num - 1, []).append((ref, digest, matrix))
+
+    save = None  # one "q" stream shared by all stamped pages
+    for index in sorted(by_page):
+        page = pages[index]
+        resources = _inherited(page, "/Resources")
+        # Copy (shallowly) so pages sharing one resources dictionary do not see each other's names
+        resources = DictionaryObject(resources.get_object()) if resources is not None else DictionaryObject()
+        xobjects = resources.get("/XObject")
+        xobjects = DictionaryObject(xobjects.get_object()) if xobjects is not None else DictionaryObject()
+        ops = []
+        for ref, digest, matrix in by_page[index]:
+            name = f"/SigImg{digest[:12]}"
+            while name in xobjects and xobjects[name] != ref:
+                name += "x"
+            xobjects[NameObject(name)] = ref
+            ops.append(f"q {' '.join(_num(v) for v in matrix)} cm {name} Do Q\n")
+        resources[NameObject("/XObject")] = xobjects
+        page[NameObject("/Resources")] = resources
+
+        if save is None:
+            q = StreamObject()
+            q.set_data(b"q\n")
+            save = writer._add_object(q)
+        after = StreamObject()
+        after.set_data(("Q\n" + "".join(ops)).encode("latin-1"))
+        contents = page.get("/Contents")
+        existing = []
+        if contents is not None:
+            resolved = contents.get_object()
+            existing = list(resolved) if isinstance(resolved, ArrayObject) else [contents]
+        page[NameObject("/Contents")] = ArrayObject([save, *existing, writer._add_object(after)])
+
+    return {
+        "boxes": len(boxes),
+        "stamped": sum(len(v) for v in by_page.values()),
+        "skipped": skipped,
+        "images": len(cache),
+        "imageBytes": cache.embedded_bytes,
+        "pages": len(by_page),
+    }
+
+
+def stamp_stage(ctx, options: dict) -> dict:
+    """Stamp signature images: options {"coordinates": path} and/or unit, origin, signature_boxes, fit.
+
+    Inline options override the values read from the coordinates file.
+    """
+    coordinates = {}
+    if options.get("coordinates"):
+        with open(options["coordinates"], encoding="utf-8") as f:
+            coordinates = json.load(f)
+        if not isinstance(coordinates, dict):
+            raise ValueError("stamp: coordinates must be a JSON object")
+    merged = {**coordinates, **{k: v for k, v in options.items() if k != "coordinates"}}
+    boxes = merged.get("signature_boxes") or []
+    if not isinstance(boxes, list) or not all(isinstance(b, dict) for b in boxes):
+        raise ValueError("stamp: signature_boxes must be a list of objects")
+    return stamp_writer(
+        ctx.writer,
+        boxes,
+        unit=merged.get("unit", "mm"),
+        origin=merged.get("origin", "bottom_left"),
+        fit=merged.get("fit", "contain"),
+    )
@@ -1,11 +1,40 @@
 #!/usr/bin/env python3
 """Process the modified PDF (e.g. after AcroForm edits) and write the result.
 
-This is a stub: it copies input to output. Replace with your own logic
-(fill remaining fields, sign, flatten, etc.) and configure process_script in the bundle.
+Runs a configurable, ordered list of stages on one in-memory document: the input is parsed
+once, every document stage (fill, flatten, ...) modifies the same pypdf PdfWriter, the result is
+serialized once, and byte stages (post-serialization steps such as signing) run on the
+serialized bytes. Without stages the input is copied to the output unchanged.
 
 Usage:
   python process_modified_pdf.py --input input.pdf --output output.pdf [--document-key KEY]
+  python process_modified_pdf.py --input in.pdf --output out.pdf --stages fill --config stages.json
+
+Stage selection (first one set wins):
+  --config PATH        JSON {"stages": ["fill", {"name": "fill", "values": {...}}, ...]}
+  --stages a,b         stage names, options from --config / defaults
+  PDF_PROCESS_CONFIG / PDF_PROCESS_STAGES environment variables (same meaning), so the bundle's
+  fixed --input/--output/--document-key call can still select stages.
+
+Built-in stages: fill (set field values), flatten (pdf_flatten.py), stamp (signature images,
+pdf_stamp.py), optimize (pdf_optimize.py), recompress (pdf_recompress.py), linearize
+(pdf_linearize.py), sign (bytes stage, pdf_batch_sign.py).
+
+A JSON line with per-stage wall time and peak memory, and the SHA-256 fingerprints of input and
+output (hashed while they are read and written, pdf_digest.py) is written to stderr:
+  {"script": "process_modified_pdf", "input_sha256": ..., "output_sha256": ...,
+   "stages": [{"stage": "parse", "ms": 12.3, "maxRssKb": ...}, ...]}
+With --timings (or PDF_SCRIPTS_TIMINGS=1) it also has version, pypdf, phases and counts (pages,
+annotations, stages) in the layout shared with the extract and apply scripts (pdf_phases.py).
+--profile PATH (or PDF_SCRIPTS_PROFILE) writes a cProfile dump of the run (pdf_profile.py).
+With --deterministic (or PDF_SCRIPTS_DETERMINISTIC=1) the same input, stages and document key
+give byte-identical output: the trailer /ID is derived from the input's SHA-256, the stage list
+and the document key (pdf_digest.set_content_id), and stages that embed the time (sign) are
+refused.
+
+Custom stages: import this module in your own script, decorate a function with
+@register_stage("name") (kind="document" gets ctx.writer, kind="bytes" gets/sets ctx.data)
+and call main() or run_pipeline().
 
 The bundle calls this after the user submits the modified PDF via POST /acroform/process.
 Your script can write the result to --output; the bundle then dispatches an event
@@ -14,25 +43,375 @@ so PHP can save or use the file.
 from __future__ import annotations
 
 import argparse
+import io
+import json
+import os
 import shutil
+import sys
+import time
 from pathlib import Path
+from typing import Callable, NamedTuple
+
+from pdf_digest import HashingReader, HashingWriter, set_content_id
+from pdf_entry import run_script
+from pdf_memory import add_memory_arguments, check as check_memory, configure as configure_memory, report as memory_report
+from pdf_phases import NULL_TIMER, PhaseTimer, timings_enabled
+from pdf_profile import add_profile_arguments
+
+
+class Stage(NamedTuple):
+    """A registered pipeline stage: func(ctx, options) on the document or on the serialized bytes."""
+
+    name: str
+    func: Callable
+    kind: str  # "document" (ctx.writer) or "bytes" (ctx.data)
+
+
+STAGES: dict[str, Stage] = {}
+
+# Built-in stages implemented in sibling modules: name -> (module, function, kind). They are
+# imported on first use so that running without them does not pay for their imports.
+BUILTIN_STAGES: dict[str, tuple[str, str, str]] = {
+    "flatten": ("pdf_flatten", "flatten_stage", "document"),
+    "stamp": ("pdf_stamp", "stamp_stage", "document"),
+    "optimize": ("pdf_optimize", "optimize_stage", "document"),
+    "recompress": ("pdf_recompress", "recompress_stage", "document"),
+    "linearize": ("pdf_linearize", "linearize_stage", "document"),
+    "sign": ("pdf_batch_sign", "sign_stage", "bytes"),
+}
+# Stages whose output depends on the time of the run (signing time), refused with --deterministic
+NONDETERMINISTIC_STAGES = ("sign",)
+
+
+def get_stage(name: str) -> Stage | None:
+    """Return the registered or built-in stage called name (importing its module), else None."""
+    stage = STAGES.get(name)
+    if stage is None and name in BUILTIN_STAGES:
+        import importlib
+
+        module, func, kind = BUILTIN_STAGES[name]
+        stage = STAGES[name] = Stage(name, getattr(importlib.import_module(module), func), kind)
+    return stage
+
+
+def _stage_kind(name: str) -> str | None:
+    if name in STAGES:
+        return STAGES[name].kind
+    return BUILTIN_STAGES[name][2] if name in BUILTIN_STAGES else None
+
+
+def available_stages() -> list[str]:
+    """Names of all registered and built-in stages."""
+    return sorted(set(STAGES) | set(BUILTIN_STAGES))
+
+
+def register_stage(name: str, kind: str = "document"):
+    """Decorator registering func(ctx, options) as pipeline stage name.
+
+    Document stages modify ctx.writer (a pypdf PdfWriter holding the parsed input); bytes
+    stages read and replace ctx.data (the serialized PDF) and always run after all document
+    stages.
+    """
+    if kind not in ("document", "bytes"):
+        raise ValueError(f"Unknown stage kind: {kind}")
+
+    def decorator(func: Callable) -> Callable:
+        STAGES[name] = Stage(name, func, kind)
+        return func
+
+    return decorator
+
+
+class PipelineContext:
+    """State shared by the stages of one run."""
+
+    __slots__ = ("input_path", "document_key", "writer", "data", "serializer")
+
+    def __init__(self, input_path: Path, document_key: str | None) -> None:
+        self.input_path = input_path
+        self.document_key = document_key
+        self.writer = None  # pypdf PdfWriter while document stages run
+        self.data: bytes | None = None  # serialized PDF for bytes stages
+        self.serializer: Callable | None = None  # writer -> bytes; a stage may replace writer.write()
+
+
+def _max_rss_kb() -> int | None:
+    """Peak resident set size of this process in KiB (None where unavailable, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS reports bytes
+
+
+def normalize_stage_specs(specs) -> list[tuple[str, dict]]:
+    """Turn ["fill", {"name": "recompress", "level": 6}, ...] into [(name, options), ...].
+
+    Raises:
+        ValueError: Unknown stage name, malformed entry, or a document stage after a bytes stage.
+    """
+    if not isinstance(specs, list):
+        raise ValueError("stages must be a list")
+    out = []
+    seen_bytes_stage = None
+    for spec in specs:
+        if isinstance(spec, str):
+            name, options = spec.strip(), {}
+        elif isinstance(spec, dict) and isinstance(spec.get("name"), str):
+            name, options = spec["name"].strip(), {k: v for k, v in spec.items() if k != "name"}
+        else:
+            raise ValueError(f"Invalid stage entry: {spec!r}")
+        kind = _stage_kind(name)
+        if kind is None:
+            raise ValueError(f"Unknown stage: {name} (available: {', '.join(available_stages())})")
+        if kind == "bytes":
+            seen_bytes_stage = name
+        elif seen_bytes_stage is not None:
+            raise ValueError(f"Stage {name} must run before {seen_bytes_stage} (it needs the parsed document)")
+        out.append((name, options))
+    return out
+
+
+def check_reproducible(stages: list[tuple[str, dict]]) -> None:
+    """Raise ValueError if a stage cannot give byte-identical output for the same input."""
+    for name, _ in stages:
+        if name in NONDETERMINISTIC_STAGES:
+            raise ValueError(f"Stage {name} embeds the time of the run and cannot be used with --deterministic")
+
+
+def run_pipeline(
+    input_path: str | Path,
+    output_path: str | Path,
+    stages: list[tuple[str, dict]],
+    document_key: str | None = None,
+    timer=None,
+    deterministic: bool = False,
+) -> dict:
+    """Run stages on input_path and write output_path; return the timing report.
+
+    The input is parsed only if a document stage is configured and serialized once after the
+    last one. Without stages the file is copied byte for byte.
+
+    Args:
+        input_path: PDF to process.
+        output_path: Where the result is written.
+        stages: [(name, options), ...] as returned by normalize_stage_specs().
+        document_key: Optional document key from the request (available as ctx.document_key).
+        timer: pdf_phases.PhaseTimer; when given, the report also has version, pypdf, phases
+            (ms per stage name) and counts (pages, annotations, stages).
+        deterministic: Derive the trailer /ID from the input's SHA-256, the stages and the
+            document key (pdf_digest.set_content_id) so equal inputs give equal bytes.
+
+    Raises:
+        ValueError: deterministic with a stage in NONDETERMINISTIC_STAGES.
+
+    Returns:
+        Dict {"script", "documentKey", "inputBytes", "outputBytes", "input_sha256",
+        "output_sha256", "totalMs", "stages": [{"stage", "ms", "maxRssKb", "stats"?, "bytes"?},
+        ...]} including the implicit parse/serialize steps ("stats" is what a stage returned,
+        "bytes" the serialized size). The input is read and the output written exactly once;
+        the byte counts and digests are taken on the way.
+    """
+    if deterministic:
+        check_reproducible(stages)
+    started = time.perf_counter()
+    timer = timer or NULL_TIMER
+    input_path = Path(input_path)
+    ctx = PipelineContext(input_path, document_key)
+    timings: list[dict] = []
+
+    def timed(name: str, func: Callable, *args):
+        check_memory(f"stage {name}")  # before each step, so a ceiling hit during the last one stops here
+        t0 = time.perf_counter()
+        with timer.phase(name):
+            result = func(*args)
+        entry = {"stage": name, "ms": round((time.perf_counter() - t0) * 1000, 2), "maxRssKb": _max_rss_kb()}
+        if isinstance(result, dict):
+            entry["stats"] = result  # stages may return counters for the report
+        elif isinstance(result, bytes):
+            entry["bytes"] = len(result)
+        timings.append(entry)
+        return result
+
+    resolved = [(get_stage(n), o) for n, o in stages]
+    document_stages = [(s, o) for s, o in resolved if s.kind == "document"]
+    bytes_stages = [(s, o) for s, o in resolved if s.kind == "bytes"]
+
+    def write(data_or_source) -> None:
+        nonlocal sink
+        with open(output_path, "wb") as dst:
+            sink = HashingWriter(dst)
+            if isinstance(data_or_source, bytes):
+                sink.write(data_or_source)
+            else:
+                shutil.copyfileobj(data_or_source, sink, 1 << 20)
+
+    sink = None
+    with open(input_path, "rb") as src:
+        source = HashingReader(src)  # input and output are fingerprinted while transferred
+        if not stages:
+            timed("copy", write, source)
+        else:
+            if document_stages:
+                ctx.writer = timed("parse", _parse, source)
+                if timer:
+                    _count_document(timer, ctx.writer)
+                for stage, options in document_stages:
+                    timed(stage.name, stage.func, ctx, options)
+                if deterministic:
+                    set_content_id(
+                        ctx.writer,
+                        source.hexdigest(),  # the parse read the whole input
+                        json.dumps(stages, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str),
+                        document_key or "",
+                    )
+                ctx.data = timed("serialize", ctx.serializer or _serialize, ctx.writer)
+                ctx.writer = None
+            else:
+                ctx.data = source.read()
+            for stage, options in bytes_stages:
+                timed(stage.name, stage.func, ctx, options)
+            timed("write", write, ctx.data)
+
+    report = {
+        "script": "process_modified_pdf",
+        "documentKey": document_key,
+        "inputBytes": source.bytes,
+        "outputBytes": sink.bytes,
+        "input_sha256": source.hexdigest(),
+        "output_sha256": sink.hexdigest(),
+        "totalMs": round((time.perf_counter() - started) * 1000, 2),
+        "stages": timings,
+    }
+    if timer:
+        timer.count("stages", len(stages))
+        report.update({k: v for k, v in timer.report().items() if k not in report})
+    return report
+
+
+def _count_document(timer, writer) -> None:
+    """Pages and annotations of the parsed input, for the timing counts."""
+    timer.count("pages", len(writer.pages))
+    for page in writer.pages:
+        annots = page.get("/Annots")
+        annots = annots.get_object() if annots is not None else None
+        timer.count("annotations", len(annots) if hasattr(annots, "__len__") else 0)
+
+
+def _parse(source):
+    """Parse the input (read once from the binary stream source) into a PdfWriter that all document stages share."""
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        raise SystemExit("Requires pypdf. Install with: pip install pypdf")
+    return PdfWriter(clone_from=PdfReader(io.BytesIO(source.read())))
+
+
+def _serialize(writer) -> bytes:
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+@register_stage("fill")
+def fill_stage(ctx: PipelineContext, options: dict) -> None:
+    """Set field values: options {"values": {"fieldName": "value", ...}}.
+
+    Appearance streams are regenerated by pypdf so the values are visible without
+    NeedAppearances (and survive flattening).
+    """
+    values = options.get("values") or {}
+    if not isinstance(values, dict):
+        raise ValueError("fill: values must be an object of field name -> value")
+    if not values or "/AcroForm" not in ctx.writer.root_object:
+        return
+    ctx.writer.update_page_form_field_values(None, {str(k): str(v) for k, v in values.items()}, auto_regenerate=False)
+
+
+def _load_config(path: str | None) -> dict:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("config must be a JSON object")
+    return config
+
+
+def _resolve_stages(stages_arg: str | None, config: dict) -> list[tuple[str, dict]]:
+    """Combine --stages (names) with --config (ordered specs and per-stage options)."""
+    config_stages = config.get("stages", [])
+    if not stages_arg:
+        return normalize_stage_specs(config_stages)
+    options_by_name = {
+        spec["name"]: {k: v for k, v in spec.items() if k != "name"}
+        for spec in config_stages
+        if isinstance(spec, dict) and isinstance(spec.get("name"), str)
+    }
+    names = [n.strip() for n in stages_arg.split(",") if n.strip()]
+    return normalize_stage_specs([{"name": n, **options_by_name.get(n, {})} for n in names])
 
 
 def main() -> None:
-    """Entry point: parse --input, --output, --document-key; copy input to output (stub).
+    """Entry point: parse --input, --output, --document-key and the stage selection; run the pipeline.
 
-    Replace the body with your own logic (e.g. fill fields, sign, flatten) and configure
-    acroform_editor.process_script in the bundle. The bundle dispatches an event after
+    Without stages the input is copied to the output unchanged. Configure
+    acroform_editor.process_script in the bundle; the bundle dispatches an event after
     this script runs so PHP can save or use the output file.
     """
     ap = argparse.ArgumentParser(description="Process modified PDF")
     ap.add_argument("--input", required=True, help="Path to input PDF")
     ap.add_argument("--output", required=True, help="Path to output PDF")
     ap.add_argument("--document-key", default=None, help="Optional document key from the request")
+    ap.add_argument(
+        "--stages",
+        default=os.environ.get("PDF_PROCESS_STAGES"),
+        help=f"Comma-separated stages to run in order (available: {', '.join(available_stages())})",
+    )
+    ap.add_argument(
+        "--config",
+        default=os.environ.get("PDF_PROCESS_CONFIG"),
+        help='JSON file {"stages": [name or {"name": ..., options...}, ...]}',
+    )
+    ap.add_argument(
+        "--deterministic",
+        action="store_true",
+        default=os.environ.get("PDF_SCRIPTS_DETERMINISTIC", "").lower() in ("1", "true"),
+        help="Byte-reproducible output: /ID derived from input, stages and document key; refuses sign (env PDF_SCRIPTS_DETERMINISTIC=1)",
+    )
+    ap.add_argument(
+        "--timings",
+        action="store_true",
+        help="Add version, per-phase times and counts to the JSON report on stderr (env PDF_SCRIPTS_TIMINGS=1)",
+    )
+    add_memory_arguments(ap)
+    add_profile_arguments(ap)
     args = ap.parse_args()
-    # Stub: copy input to output; replace with fill/sign/flatten etc.
-    shutil.copy(args.input, args.output)
+    configure_memory(args.max_memory_mb, args.trace_memory)
+    timer = PhaseTimer("process_modified_pdf") if timings_enabled(args.timings) else NULL_TIMER
+
+    if not Path(args.input).is_file():
+        print(json.dumps({"error": f"File not found: {args.input}"}), file=sys.stderr)
+        sys.exit(2)
+    try:
+        stages = _resolve_stages(args.stages, _load_config(args.config))
+        if args.deterministic:
+            check_reproducible(stages)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"Invalid stage configuration: {e}"}), file=sys.stderr)
+        sys.exit(2)
+
+    options = {"timer": timer} if timer else {}
+    if args.deterministic:
+        options["deterministic"] = True
+    try:
+        report = run_pipeline(args.input, args.output, stages, args.document_key, **options)
+    except ValueError as e:  # a stage refused the document (e.g. flatten without an appearance)
+        print(json.dumps({"error": f"Processing failed: {e}"}), file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps({**report, **memory_report()}), file=sys.stderr)
 
 
 if __name__ == "__main__":
-    main()
+    run_script(main, "process_modified_pdf")
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""Durable local job queue for the process step, so POST /acroform/process can return at once.
+
+With acroform.process_queue_dir set, the bundle does not run process_modified_pdf.py inside the
+HTTP request: it writes a job into the spool directory, answers 202 with the job id, and the
+frontend polls GET /acroform/process/status by document key (and POSTs to it to take the result
+of a done job). This worker (run it under systemd, supervisord or a container restart policy)
+takes the jobs, runs the process script on each with bounded concurrency and records the
+outcome. Spool layout, shared with the bundle:
+
+  jobs/<id>.json        job state, replaced atomically (write, fsync, rename) on every change
+  jobs/<id>.pdf         input PDF, written before the job file; removed once the job is finished
+  jobs/<id>.lock        flock()ed by the worker running the job
+  results/<id>.pdf      processed PDF, renamed into place only when complete
+  status/<sha256(document key)>.json   state of the latest job for that document key
+
+Job ids are "<13-digit epoch ms>-<12 hex>", so sorting them gives the queue order. A job file
+looks like:
+
+  {"version": 1, "id": "1760000000123-9f2c4e1a7b3d", "documentKey": "contract-42",
+   "state": "retrying", "attempts": 1, "createdAt": 1760000000.123, "updatedAt": ...,
+   "notBefore": 1760000005.2, "error": "Exit status 1", "report": null}
+
+and state is one of queued, running, retrying (waiting for notBefore), done or failed. A worker
+claims a job by taking a non-blocking flock on its lock file and re-reading the job under it,
+so any number of workers (on one host, or on hosts sharing a filesystem with working flock) can
+serve one spool. The kernel drops the lock when a worker dies, so a job left "running" is
+claimed again and counts as a failed attempt.
+
+Failures are retried with exponential backoff (--backoff x 2^(attempt-1), at most
+--max-backoff seconds) up to --max-attempts, when retrying can help: a timeout, a signal, or an
+exit status other than 2. Exit status 2 is the scripts' "rejected the input" status (JSON
+error line: invalid PDF, stage configuration, memory ceiling), and a run that leaves no output
+file is not retried either. Finished jobs and their results are purged after
+--retention-hours. A GET status poll only reports the state; the result is taken (and
+AcroFormModifiedPdfProcessedEvent dispatched) by the CSRF-protected POST /acroform/process/status,
+so it must be taken with that POST within --retention-hours.
+
+Usage:
+  python3 .scripts/process_queue.py work --spool /var/spool/pdf-process [--concurrency 2]
+      [--max-attempts 3] [--backoff 5] [--max-backoff 300] [--timeout 120] [--once]
+  python3 .scripts/process_queue.py enqueue --spool DIR --input in.pdf [--document-key KEY]
+  python3 .scripts/process_queue.py status --spool DIR (--document-key KEY | --job-id ID)
+
+The process script runs as a subprocess per job (--script, default process_modified_pdf.py
+next to this file, with --python, default this interpreter) and inherits the worker's
+environment, so PDF_PROCESS_STAGES, PDF_SCRIPTS_MAX_MEMORY_MB and the like apply as for the
+synchronous call. The worker prints one JSON line per finished attempt to stderr and a summary
+on stdout when it stops (--once when no job is ready, or SIGTERM/SIGINT, after which running
+jobs finish). POSIX only (fcntl). Standard library only.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCRIPT = os.path.join(SCRIPT_DIR, "process_modified_pdf.py")
+JOB_VERSION = 1
+JOB_ID_RE = re.compile(r"^\d{13}-[0-9a-f]{12}$")
+READY_STATES = ("queued", "retrying")
+FINAL_STATES = ("done", "failed")
+REJECTED_EXIT_CODE = 2  # the scripts' JSON error status: retrying cannot help
+DETAIL_CHARS = 2000  # stderr kept in a failed job's "detail"
+PURGE_INTERVAL = 60.0
+
+
+def _paths(spool: str, job_id: str) -> dict[str, str]:
+    jobs = os.path.join(spool, "jobs")
+    return {
+        "job": os.path.join(jobs, f"{job_id}.json"),
+        "input": os.path.join(jobs, f"{job_id}.pdf"),
+        "lock": os.path.join(jobs, f"{job_id}.lock"),
+        "result": os.path.join(spool, "results", f"{job_id}.pdf"),
+    }
+
+
+def status_path(spool: str, document_key: str) -> str:
+    """Path of the status file for a document key (status/<sha256 of the UTF-8 key>.json)."""
+    return os.path.join(spool, "status", hashlib.sha256(document_key.encode("utf-8")).hexdigest() + ".json")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write path so readers see the old or the new content, never a part (and it survives a crash)."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _save(spool: str, job: dict) -> None:
+    """Write the job file and, for a job with a document key, its status file.
+
+    The status file is left alone when it already describes a newer job for the same key.
+    """
+    job["updatedAt"] = round(time.time(), 3)
+    data = json.dumps(job).encode("utf-8")
+    _write_atomic(_paths(spool, job["id"])["job"], data)
+    if job.get("documentKey"):
+        path = status_path(spool, job["documentKey"])
+        current = _read_json(path)
+        if current is None or str(current.get("id", "")) <= job["id"]:
+            _write_atomic(path, data)
+
+
+def _makedirs(spool: str) -> None:
+    for sub in ("jobs", "results", "status"):
+        os.makedirs(os.path.join(spool, sub), exist_ok=True)
+
+
+def new_job_id() -> str:
+    """A job id that sorts by creation time: <13-digit epoch ms>-<12 random hex digits>."""
+    return f"{int(time.time() * 1000):013d}-{secrets.token_hex(6)}"
+
+
+def enqueue(spool: str, input_path: str, document_key: str | None = None) -> dict:
+    """Copy input_path into the spool as a new queued job and return the job."""
+    _makedirs(spool)
+    job_id = new_job_id()
+    paths = _paths(spool, job_id)
+    shutil.copyfile(input_path, paths["input"])
+    now = round(time.time(), 3)
+    job = {
+        "version": JOB_VERSION,
+        "id": job_id,
+        "documentKey": document_key or None,
+        "state": "queued",
+        "attempts": 0,
+        "createdAt": now,
+        "updatedAt": now,
+        "notBefore": 0,
+        "error": None,
+        "report": None,
+    }
+    _save(spool, job)
+    return job
+
+
+def job_status(spool: str, document_key: str | None = None, job_id: str | None = None) -> dict | None:
+    """The job for a job id, or the latest job for a document key; None when there is none."""
+    if job_id is not None:
+        if not JOB_ID_RE.match(job_id):
+            return None
+        return _read_json(_paths(spool, job_id)["job"])
+    if document_key:
+        return _read_json(status_path(spool, document_key))
+    return None
+
+
+def _try_lock(path: str) -> int | None:
+    """Open and flock path without blocking; the descriptor, or None when another worker holds it."""
+    import fcntl
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _claim(spool: str, job_id: str, max_attempts: int) -> tuple[int, dict] | None:
+    """Lock a ready job and mark it running: (lock descriptor, job), or None if it is not ours to run."""
+    paths = _paths(spool, job_id)
+    fd = _try_lock(paths["lock"])
+    if fd is None:
+        return None
+    job = _read_json(paths["job"])  # again, under the lock: another worker may just have finished it
+    now = time.time()
+    ready = job is not None and (
+        job.get("state") == "running" or (job.get("state") in READY_STATES and job.get("notBefore", 0) <= now)
+    )
+    if not ready:
+        os.close(fd)
+        return None
+    if job["state"] == "running" and job.get("attempts", 0) >= max_attempts:
+        # The worker running the last attempt died: give up as for any other failed attempt
+        _finish(spool, job, "failed", "Worker stopped while processing")
+        os.close(fd)
+        return None
+    job.update(state="running", attempts=job.get("attempts", 0) + 1, error=None, startedAt=round(now, 3))
+    _save(spool, job)
+    return fd, job
+
+
+def _finish(spool: str, job: dict, state: str, error: str | None = None, **extra) -> None:
+    job.update(state=state, error=error, **extra)
+    _save(spool, job)
+    if state in FINAL_STATES:
+        try:
+            os.unlink(_paths(spool, job["id"])["input"])
+        except OSError:
+            pass
+
+
+def _last_json_line(stderr: str) -> dict | None:
+    for line in reversed(stderr.strip().splitlines()):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return None
+
+
+def run_job(spool: str, job: dict, python: str, script: str, timeout: float) -> tuple[str | None, bool, dict | None, str]:
+    """Run the process script on a job's input: (error or None, retryable, report, stderr tail)."""
+    paths = _paths(spool, job["id"])
+    partial = paths["result"] + ".part"
+    cmd = [python, script, "--input", paths["input"], "--output", partial]
+    if job.get("documentKey"):
+        cmd += ["--document-key", job["documentKey"]]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=timeout, stdin=subprocess.DEVNULL)
+    except subprocess.TimeoutExpired:
+        error, retryable, report, stderr = f"Timed out after {timeout:g} s", True, None, ""
+    except OSError as e:
+        error, retryable, report, stderr = f"Could not start the process script: {e}", True, None, ""
+    else:
+        stderr = proc.stderr.decode("utf-8", "replace")
+        report = _last_json_line(stderr)
+        if proc.returncode == 0:
+            if os.path.isfile(partial) and os.path.getsize(partial) > 0:
+                try:
+                    os.replace(partial, paths["result"])
+                    return None, False, report, ""
+                except OSError as e:
+                    error, retryable = f"Could not store the result: {e}", True
+            else:
+                error, retryable = "Process script produced no output file", False
+        elif report is not None and isinstance(report.get("error"), str):
+            error, retryable = report["error"], proc.returncode != REJECTED_EXIT_CODE
+        else:
+            error = f"Exit status {proc.returncode}" if proc.returncode > 0 else f"Killed by signal {-proc.returncode}"
+            retryable = proc.returncode != REJECTED_EXIT_CODE
+    try:
+        os.unlink(partial)
+    except OSError:
+        pass
+    return error, retryable, report, stderr[-DETAIL_CHARS:]
+
+
+def _execute(spool: str, fd: int, job: dict, settings: dict) -> str:
+    """Run one claimed attempt, record its outcome and release the lock; the job's new state."""
+    started = time.monotonic()
+    try:
+        error, retryable, report, detail = run_job(spool, job, settings["python"], settings["script"], settings["timeout"])
+        if error is None:
+            _finish(spool, job, "done", report=report, detail=None)
+        elif retryable and job["attempts"] < settings["max_attempts"]:
+            delay = min(settings["max_backoff"], settings["backoff"] * 2 ** (job["attempts"] - 1))
+            _finish(spool, job, "retrying", error, report=report, detail=detail or None, notBefore=round(time.time() + delay, 3))
+        else:
+            _finish(spool, job, "failed", error, report=report, detail=detail or None)
+    finally:
+        os.close(fd)
+    line = {"job": job["id"], "state": job["state"], "attempts": job["attempts"], "ms": round((time.monotonic() - started) * 1000, 1)}
+    if job.get("error"):
+        line["error"] = job["error"]
+    print(json.dumps(line), file=sys.stderr, flush=True)
+    return job["state"]
+
+
+def _candidates(spool: str, exclude) -> list[str]:
+    """Ids of jobs that may be ready, oldest first (claiming decides)."""
+    now = time.time()
+    ids = []
+    for name in sorted(os.listdir(os.path.join(spool, "jobs"))):
+        job_id = name[:-5]
+        if not name.endswith(".json") or job_id in exclude or not JOB_ID_RE.match(job_id):
+            continue
+        job = _read_json(os.path.join(spool, "jobs", name))
+        if job is None:
+            continue
+        if job.get("state") == "running" or (job.get("state") in READY_STATES and job.get("notBefore", 0) <= now):
+            ids.append(job_id)
+    return ids
+
+
+def purge(spool: str, retention_hours: float) -> int:
+    """Remove finished jobs (and their results) last updated more than retention_hours ago; the count."""
+    cutoff = time.time() - retention_hours * 3600
+    purged = 0
+    for name in sorted(os.listdir(os.path.join(spool, "jobs"))):
+        job_id = name[:-5]
+        if not name.endswith(".json") or not JOB_ID_RE.match(job_id):
+            continue
+        paths = _paths(spool, job_id)
+        job = _read_json(paths["job"])
+        if job is None or job.get("state") not in FINAL_STATES or job.get("updatedAt", 0) > cutoff:
+            continue
+        fd = _try_lock(paths["lock"])
+        if fd is None:
+            continue
+        try:
+            for key in ("result", "input", "job"):
+                try:
+                    os.unlink(paths[key])
+                except OSError:
+                    pass
+            if job.get("documentKey"):
+                path = status_path(spool, job["documentKey"])
+                current = _read_json(path)
+                if current is not None and current.get("id") == job_id:
+                    os.unlink(path)
+            os.unlink(paths["lock"])
+        finally:
+            os.close(fd)
+        purged += 1
+    return purged
+
+
+def work(
+    spool: str,
+    concurrency: int = 2,
+    once: bool = False,
+    poll_interval: float = 1.0,
+    max_attempts: int = 3,
+    backoff: float = 5.0,
+    max_backoff: float = 300.0,
+    timeout: float = 120.0,
+    python: str = sys.executable,
+    script: str = DEFAULT_SCRIPT,
+    retention_hours: float = 24.0,
+    stop: threading.Event | None = None,
+) -> dict:
+    """Run jobs from spool, at most concurrency at a time, until stop is set (or, with once, until
+    no job is ready). Returns the counts of attempts by outcome: {"done", "retrying", "failed"}."""
+    _makedirs(spool)
+    stop = stop or threading.Event()
+    settings = {
+        "python": python,
+        "script": script,
+        "timeout": timeout,
+        "max_attempts": max(1, max_attempts),
+        "backoff": max(0.0, backoff),
+        "max_backoff": max(0.0, max_backoff),
+    }
+    counts = {"done": 0, "retrying": 0, "failed": 0, "purged": purge(spool, retention_hours)}
+    last_purge = time.monotonic()
+    running: dict = {}  # future -> job id
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="pdf-process-job") as pool:
+        while True:
+            claimed = 0
+            if not stop.is_set() and len(running) < concurrency:
+                for job_id in _candidates(spool, set(running.values())):
+                    got = _claim(spool, job_id, settings["max_attempts"])
+                    if got is None:
+                        continue
+                    fd, job = got
+                    running[pool.submit(_execute, spool, fd, job, settings)] = job_id
+                    claimed += 1
+                    if len(running) >= concurrency:
+                        break
+            if not running:
+                if stop.is_set() or (once and not claimed):
+                    break
+                stop.wait(poll_interval)
+            else:
+                finished, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del running[future]
+                    counts[future.result()] += 1
+            if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                counts["purged"] += purge(spool, retention_hours)
+                last_purge = time.monotonic()
+    return counts
+
+
+def _fail(message: str) -> None:
+    print(json.dumps({"error": message}), file=sys.stderr)
+    sys.exit(2)
+
+
+def main() -> None:
+    """Entry point: work, enqueue or status (see the module docstring)."""
+    ap = argparse.ArgumentParser(description="Durable local job queue for the AcroForm process script")
+    sub = ap.add_subparsers(dest="command", required=True)
+    w = sub.add_parser("work", help="Run queued jobs until stopped")
+    w.add_argument("--spool", required=True, help="Spool directory (acroform.process_queue_dir)")
+    w.add_argument("--concurrency", type=int, default=2, help="Jobs run at the same time (default 2)")
+    w.add_argument("--max-attempts", type=int, default=3, help="Attempts per job before it fails (default 3)")
+    w.add_argument("--backoff", type=float, default=5.0, help="Seconds before the first retry, doubled per attempt (default 5)")
+    w.add_argument("--max-backoff", type=float, default=300.0, help="Longest wait between attempts in seconds (default 300)")
+    w.add_argument("--timeout", type=float, default=120.0, help="Seconds one attempt may run (default 120)")
+    w.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between spool scans when idle (default 1)")
+    w.add_argument("--retention-hours", type=float, default=24.0, help="Purge finished jobs and results after this many hours (default 24)")
+    w.add_argument("--script", default=DEFAULT_SCRIPT, help="Process script (default process_modified_pdf.py next to this file)")
+    w.add_argument("--python", default=sys.executable, help="Interpreter for the process script (default this one)")
+    w.add_argument("--once", action="store_true", help="Exit when no job is ready instead of waiting for new ones")
+    e = sub.add_parser("enqueue", help="Add a job")
+    e.add_argument("--spool", required=True)
+    e.add_argument("--input", required=True, help="PDF to process")
+    e.add_argument("--document-key", default=None)
+    s = sub.add_parser("status", help="Print a job's state")
+    s.add_argument("--spool", required=True)
+    which = s.add_mutually_exclusive_group(required=True)
+    which.add_argument("--document-key")
+    which.add_argument("--job-id")
+    args = ap.parse_args()
+
+    if args.command == "enqueue":
+        if not os.path.isfile(args.input):
+            _fail(f"File not found: {args.input}")
+        print(json.dumps(enqueue(args.spool, args.input, args.document_key)))
+    elif args.command == "status":
+        job = job_status(args.spool, document_key=args.document_key, job_id=args.job_id)
+        if job is None:
+            _fail("Job not found")
+        print(json.dumps(job))
+    else:
+        try:
+            import fcntl  # noqa: F401
+        except ImportError:
+            _fail("process_queue.py needs POSIX file locking (fcntl)")
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+        counts = work(
+            args.spool,
+            concurrency=max(1, args.concurrency),
+            once=args.once,
+            poll_interval=args.poll_interval,
+            max_attempts=args.max_attempts,
+            backoff=args.backoff,
+            max_backoff=args.max_backoff,
+            timeout=args.timeout,
+            python=args.python,
+            script=args.script,
+            retention_hours=args.retention_hours,
+            stop=stop,
+        )
+        print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Replay recorded AcroForm script calls (pdf_record.py spool) at a target concurrency and rate.
+
+Recordings are read from SPOOL/records; each one's PDF is looked up by SHA-256 in SPOOL/pdfs
+(recorded with PDF_SCRIPTS_RECORD_PDFS=1) and in the --pdf-dir directories, its anonymized
+patches in SPOOL/patches. Recordings whose PDF cannot be found are counted as missing. The calls
+are replayed in recorded order (cycled when --requests is larger) with the recorded mode options
+and environment, through one or more runners:
+
+  spawn   a new interpreter per call, as the bundle runs the scripts (python3 script.py ...;
+          with --pyz-dir the build_zipapp.py bundles instead)
+  pool    --concurrency long-lived worker processes that import the scripts and pypdf once and
+          call each script's main() in-process (stdout/stderr discarded)
+
+Load shape: by default closed loop (--concurrency calls in flight, latency = time of the call);
+with --rate R calls start at R per second and with --speed X at the recorded arrival times
+divided by X (open loop: latency is measured from the scheduled start, so queueing behind slow
+calls counts, and throughput shows whether the runner keeps up).
+
+The report (JSON) has, per runner, requests, errors (non-zero exit), errorRate, throughput
+(calls per second over the run), wallSeconds, latencyMs {p50, p95, p99, max, mean} overall
+and per script, and exitCodes; recordedMs gives the same percentiles of the recorded durations.
+
+Usage:
+  python replay_acroform.py --spool /var/spool/pdf-record [--pdf-dir corpus/] [--runner spawn,pool]
+                            [--concurrency 4] [--rate 20 | --speed 2] [--requests 500]
+                            [--scripts extract_acroform_fields] [--pyz-dir .scripts/dist] [--output report.json]
+
+Requires: pypdf (for the replayed scripts).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SCRIPTS = ("extract_acroform_fields", "apply_acroform_patches", "process_modified_pdf")
+RUNNERS = ("spawn", "pool")
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_recordings(spool: str | Path, pdf_dirs=(), scripts=None) -> tuple[list[dict], int]:
+    """Replayable calls from a spool, in recorded order, and the number of recordings skipped.
+
+    Each call is {"script", "args", "env", "pdf", "patches", "offset" (seconds after the first
+    recording), "recordedMs"}. A recording is skipped when it has no input hash (stdin, URL) or
+    its PDF is neither in SPOOL/pdfs nor in one of pdf_dirs.
+    """
+    spool = Path(spool)
+    by_hash = {p.stem: p for p in (spool / "pdfs").glob("*.pdf")}
+    for directory in pdf_dirs:
+        for p in Path(directory).rglob("*.pdf"):
+            by_hash.setdefault(_sha256(p), p)
+    records = []
+    for path in sorted((spool / "records").glob("*.json")):
+        try:
+            records.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    records = [r for r in records if r.get("script") in SCRIPTS and (not scripts or r["script"] in scripts)]
+    records.sort(key=lambda r: r.get("startedAt") or 0)
+    calls, missing = [], 0
+    first = (records[0].get("startedAt") or 0) if records else 0
+    for r in records:
+        pdf = by_hash.get(r.get("inputSha256") or "")
+        if pdf is None:
+            missing += 1
+            continue
+        patches = spool / "patches" / f"{r['patchesSha256']}.json" if r.get("patchesSha256") else None
+        calls.append(
+            {
+                "script": r["script"],
+                "args": list(r.get("args") or []),
+                "env": dict(r.get("env") or {}),
+                "pdf": str(pdf),
+                "patches": str(patches) if patches is not None and patches.is_file() else None,
+                "offset": max(0.0, (r.get("startedAt") or first) - first),
+                "recordedMs": r.get("durationMs"),
+            }
+        )
+    return calls, missing
+
+
+def _argv(call: dict, workdir: str, n: int) -> list[str]:
+    """Command-line arguments for one call (outputs and missing patches files in workdir)."""
+    script = call["script"]
+    if script == "extract_acroform_fields":
+        return [call["pdf"], *call["args"]]
+    if script == "apply_acroform_patches":
+        patches = call["patches"] or os.path.join(workdir, "empty-patches.json")
+        return ["--pdf", call["pdf"], "--patches", patches, *call["args"]]
+    return ["--input", call["pdf"], "--output", os.path.join(workdir, f"out-{n}.pdf"), *call["args"]]
+
+
+def _spawn_call(command: list[str], env: dict) -> tuple[int, float]:
+    t0 = time.monotonic()
+    proc = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    return proc.returncode, (time.monotonic() - t0) * 1000
+
+
+def _warm_worker() -> None:
+    """Pool worker initializer: import the scripts (and pypdf with them) once."""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import importlib
+
+    for script in SCRIPTS:
+        importlib.import_module(script)
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        pass
+
+
+def _pool_call(script: str, argv: list[str], env: dict) -> tuple[int, float]:
+    """Run script's main() in this worker process with argv and extra env; return (exit code, ms)."""
+    import importlib
+
+    module = importlib.import_module(script)
+    saved = sys.argv, sys.stdout, sys.stderr, {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    code = 0
+    with open(os.devnull, "w") as devnull:
+        sys.argv, sys.stdout, sys.stderr = [f"{script}.py", *argv], devnull, devnull
+        t0 = time.monotonic()
+        try:
+            module.main()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:  # noqa: BLE001
+            code = 1
+        ms = (time.monotonic() - t0) * 1000
+        sys.argv, sys.stdout, sys.stderr, previous = saved
+    for k, v in previous.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+    return code, ms
+
+
+def percentiles(values: list[float]) -> dict:
+    """{p50, p95, p99, max, mean} of values (nearest rank; None when empty)."""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None, "mean": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return round(ordered[max(0, min(len(ordered) - 1, -(-q * len(ordered) // 100) - 1))], 2)
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": round(ordered[-1], 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+    }
+
+
+def replay(
+    calls: list[dict],
+    runner: str = "spawn",
+    concurrency: int = 4,
+    rate: float | None = None,
+    speed: float | None = None,
+    requests: int | None = None,
+    pyz_dir: str | None = None,
+) -> dict:
+    """Replay calls through runner and return its statistics (see the module docstring)."""
+    if runner not in RUNNERS:
+        raise ValueError(f"Unknown runner: {runner} (expected one of {', '.join(RUNNERS)})")
+    if not calls:
+        raise ValueError("No replayable recordings")
+    total = requests or len(calls)
+    concurrency = max(1, concurrency)
+    env = {k: v for k, v in os.environ.items() if not k.startswith("PDF_SCRIPTS_RECORD")}  # no recording of the replay
+    results: list[tuple[str, int, float]] = []
+    lock = threading.Lock()
+    with tempfile.TemporaryDirectory(prefix="replay_acroform_") as workdir:
+        Path(workdir, "empty-patches.json").write_text("[]", encoding="utf-8")
+        if runner == "pool":
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=_warm_worker)
+            for future in [executor.submit(time.sleep, 0) for _ in range(concurrency)]:
+                future.result()  # workers started and warmed before the clock starts
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+        with executor:
+            cycle = calls[-1]["offset"] + 1.0  # recorded span, for repeating the arrival pattern
+            started = time.monotonic()
+            futures = []
+            for n in range(total):
+                call = calls[n % len(calls)]
+                scheduled = None
+                if speed:
+                    scheduled = started + (call["offset"] + (n // len(calls)) * cycle) / speed
+                elif rate:
+                    scheduled = started + n / rate
+                if scheduled is not None:
+                    time.sleep(max(0.0, scheduled - time.monotonic()))
+                argv = _argv(call, workdir, n)
+                if runner == "pool":
+                    future = executor.submit(_pool_call, call["script"], argv, call["env"])
+                else:
+                    script = os.path.join(pyz_dir, f"{call['script']}.pyz") if pyz_dir else str(SCRIPT_DIR / f"{call['script']}.py")
+                    future = executor.submit(_spawn_call, [sys.executable, script, *argv], {**env, **call["env"]})
+
+                def done(f, script=call["script"], scheduled=scheduled) -> None:
+                    try:
+                        code, ms = f.result()
+                    except Exception:  # noqa: BLE001 (worker crashed)
+                        code, ms = -1, 0.0
+                    if scheduled is not None:
+                        ms = (time.monotonic() - scheduled) * 1000  # open loop: includes queueing
+                    with lock:
+                        results.append((script, code, ms))
+
+                future.add_done_callback(done)
+                futures.append(future)
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:  # noqa: BLE001
+                    pass
+            wall = time.monotonic() - started
+    while len(results) < total:  # callbacks of the last futures may still be running
+        time.sleep(0.001)
+    errors = sum(1 for _, code, _ in results if code != 0)
+    exit_codes: dict[str, int] = {}
+    for _, code, _ in results:
+        exit_codes[str(code)] = exit_codes.get(str(code), 0) + 1
+    return {
+        "runner": runner + (" (pyz)" if pyz_dir and runner == "spawn" else ""),
+        "concurrency": concurrency,
+        "rate": rate,
+        "speed": speed,
+        "requests": len(results),
+        "errors": errors,
+        "errorRate": round(errors / len(results), 4),
+        "throughput": round(len(results) / wall, 2) if wall > 0 else None,
+        "wallSeconds": round(wall, 3),
+        "latencyMs": percentiles([ms for _, _, ms in results]),
+        "byScript": {
+            script: {
+                "requests": sum(1 for s, _, _ in results if s == script),
+                "errors": sum(1 for s, code, _ in results if s == script and code != 0),
+                "latencyMs": percentiles([ms for s, _, ms in results if s == script]),
+            }
+            for script in sorted({s for s, _, _ in results})
+        },
+        "exitCodes": exit_codes,
+    }
+
+
+def main() -> None:
+    """Entry point: load the spool, replay with each runner, print or write the JSON report."""
+    ap = argparse.ArgumentParser(description="Replay recorded AcroForm script calls")
+    ap.add_argument("--spool", required=True, help="Spool directory written with PDF_SCRIPTS_RECORD")
+    ap.add_argument("--pdf-dir", action="append", default=[], help="Directory of PDFs to find recorded inputs by SHA-256 (repeatable)")
+    ap.add_argument("--runner", default="spawn", help=f"Comma-separated runners to compare ({', '.join(RUNNERS)})")
+    ap.add_argument("--concurrency", type=int, default=4, help="Calls in flight / worker processes (default 4)")
+    shape = ap.add_mutually_exclusive_group()
+    shape.add_argument("--rate", type=float, default=None, help="Start calls at this many per second (open loop)")
+    shape.add_argument("--speed", type=float, default=None, help="Start calls at the recorded times divided by this factor")
+    ap.add_argument("--requests", type=int, default=None, help="Number of calls (default: one per recording, cycled)")
+    ap.add_argument("--scripts", default=None, help="Comma-separated scripts to replay (default: all)")
+    ap.add_argument("--pyz-dir", default=None, help="Spawn the build_zipapp.py bundles in this directory instead of the .py scripts")
+    ap.add_argument("--output", default=None, help="Write the report here (default: stdout)")
+    args = ap.parse_args()
+    try:
+        scripts = [s.strip() for s in args.scripts.split(",") if s.strip()] if args.scripts else None
+        calls, missing = load_recordings(args.spool, args.pdf_dir, scripts)
+        runs = {}
+        for runner in [r.strip() for r in args.runner.split(",") if r.strip()]:
+            runs[runner] = replay(calls, runner, args.concurrency, args.rate, args.speed, args.requests, args.pyz_dir)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(2)
+    report = {
+        "recordings": len(calls) + missing,
+        "missing": missing,
+        "recordedMs": percentiles([c["recordedMs"] for c in calls if c["recordedMs"] is not None]),
+        "runs": runs,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
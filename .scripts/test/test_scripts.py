@@ -86,6 +86,27 @@ def form_pdf(tmp_path: Path) -> Path:
     return path
 
 
+@pytest.fixture
+def multipage_form_pdf(tmp_path: Path) -> Path:
+    """Fixture: 3-page PDF with one "DUP" widget per page (ids depend on earlier pages)."""
+    from pypdf.generic import ArrayObject, BooleanObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    refs = []
+    for page_idx in range(3):
+        writer.add_blank_page(width=595, height=842)
+        ref = _create_widget(writer, "DUP", [100, 700 - page_idx * 10, 250, 730 - page_idx * 10], str(page_idx))
+        writer.pages[page_idx][NameObject("/Annots")] = ArrayObject([ref])
+        refs.append(ref)
+    writer.root_object[NameObject("/AcroForm")] = DictionaryObject(
+        {NameObject("/Fields"): ArrayObject(refs), NameObject("/NeedAppearances"): BooleanObject(True)}
+    )
+    path = tmp_path / "multipage.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
 class TestParseFontSizeFromDa:
     """Tests for parse_font_size_from_da in extract_acroform_fields."""
 
@@ -191,6 +212,461 @@ class TestExtractAcroformFields:
         assert result.returncode != 0
 
 
+class TestExtractDeadline:
+    """Tests for the time-budgeted extraction (--deadline-ms / --start-page)."""
+
+    def test_no_deadline_returns_all_fields_not_truncated(self, multipage_form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields, extract_fields_budgeted
+
+        result = extract_fields_budgeted(multipage_form_pdf)
+        assert result["truncated"] is False
+        assert result["nextPage"] is None
+        assert result["pageCount"] == 3
+        assert result["fields"] == extract_fields(multipage_form_pdf)
+
+    def test_expired_deadline_processes_one_page_and_returns_next_page(self, multipage_form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields_budgeted
+
+        result = extract_fields_budgeted(multipage_form_pdf, deadline=0.0)
+        assert result["truncated"] is True
+        assert result["nextPage"] == 2
+        assert [f["page"] for f in result["fields"]] == [1]
+
+    def test_resumed_chunks_match_full_extraction_ids(self, multipage_form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields, extract_fields_budgeted
+
+        collected = []
+        start = 1
+        while start is not None:
+            chunk = extract_fields_budgeted(multipage_form_pdf, deadline=0.0, start_page=start)
+            collected.extend(chunk["fields"])
+            start = chunk["nextPage"]
+        assert [f["id"] for f in collected] == [f["id"] for f in extract_fields(multipage_form_pdf)]
+        assert collected[1]["id"] == "DUP@2-0"
+
+    def test_cli_deadline_outputs_object(self, multipage_form_pdf: Path) -> None:
+        result = subprocess.run(
+            [
+                "python3",
+                str(SCRIPTS_DIR / "extract_acroform_fields.py"),
+                str(multipage_form_pdf),
+                "--deadline-ms",
+                "60000",
+            ],
+            capture_output=True,
+            text=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0
+        data = json.loads(result.stdout)
+        assert data["truncated"] is False
+        assert len(data["fields"]) == 3
+
+    def test_cli_start_page_resumes(self, multipage_form_pdf: Path) -> None:
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(multipage_form_pdf), "--start-page", "3"],
+            capture_output=True,
+            text=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0
+        data = json.loads(result.stdout)
+        assert [f["id"] for f in data["fields"]] == ["DUP@3-0"]
+
+
+class TestExtractDelta:
+    """Tests for re-extraction from a previous result (--previous / --previous-bytes)."""
+
+    @staticmethod
+    def _update(path: Path, out: Path, edit) -> int:
+        """Append an incremental update made by edit(writer) to a copy of path; return the old length."""
+        from pypdf.generic import NameObject, TextStringObject
+
+        writer = PdfWriter(str(path), incremental=True)
+        edit(writer, NameObject, TextStringObject)
+        with open(out, "wb") as f:
+            writer.write(f)
+        return path.stat().st_size
+
+    @staticmethod
+    def _as_json(fields):
+        from acroform_core import json_default
+
+        return json.loads(json.dumps(fields, default=json_default))
+
+    def test_incremental_update_reextracts_changed_pages_only(self, multipage_form_pdf: Path, tmp_path: Path) -> None:
+        from pypdf.generic import ArrayObject, DictionaryObject, FloatObject
+
+        from extract_acroform_fields import extract_fields, extract_fields_columnar, extract_fields_delta
+
+        previous = self._as_json(extract_fields(multipage_form_pdf))
+
+        def edit(writer, n, text):
+            writer.pages[1]["/Annots"][0].get_object()[n("/V")] = text("changed")
+            rect = ArrayObject([FloatObject(x) for x in (10, 10, 60, 30)])
+            new = writer._add_object(DictionaryObject({n("/Subtype"): n("/Widget"), n("/Rect"): rect, n("/T"): text("NEW")}))
+            writer.pages[2]["/Annots"].append(new)
+
+        updated = tmp_path / "updated.pdf"
+        length = self._update(multipage_form_pdf, updated, edit)
+        fields, info = extract_fields_delta(updated, previous, length)
+        assert info["mode"] == "delta" and info["pages"] == [2, 3]
+        assert self._as_json(fields) == self._as_json(extract_fields(updated))
+        assert [f["value"] for f in fields] == ["0", "changed", "2", ""]
+        assert fields[0] is previous[0]  # unchanged page taken from the previous result
+        columnar, _ = extract_fields_delta(updated, previous, length, columnar=True)
+        assert columnar == extract_fields_columnar(updated)
+        unchanged, info = extract_fields_delta(multipage_form_pdf, previous, length)
+        assert unchanged == previous and info == {"mode": "delta", "changedObjects": 0, "pages": []}
+
+    def test_unsafe_changes_fall_back_to_full_extraction(self, multipage_form_pdf: Path, tmp_path: Path) -> None:
+        from extract_acroform_fields import extract_fields, extract_fields_delta
+
+        previous = self._as_json(extract_fields(multipage_form_pdf))
+
+        def rename(writer, n, text):
+            # Page 1 no longer has "DUP": the page 2 and 3 ids lose their @page-idx suffix
+            writer.pages[0]["/Annots"][0].get_object()[n("/T")] = text("OTHER")
+
+        renamed = tmp_path / "renamed.pdf"
+        length = self._update(multipage_form_pdf, renamed, rename)
+        fields, info = extract_fields_delta(renamed, previous, length)
+        assert info == {"mode": "full", "reason": "field ids on page 2 depend on the change"}
+        assert [f["id"] for f in fields] == ["OTHER", "DUP", "DUP@3-0"]
+        rewritten = tmp_path / "rewritten.pdf"
+        writer = PdfWriter(clone_from=str(renamed))
+        writer.write(str(rewritten))
+        assert extract_fields_delta(rewritten, previous, length)[1]["mode"] == "full"
+        assert extract_fields_delta(renamed, previous, length - 5)[1]["mode"] == "full"
+
+        previous_path = tmp_path / "previous.json"
+        previous_path.write_text(json.dumps(previous))
+        script = [sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(renamed), "--previous", str(previous_path)]
+        result = subprocess.run([*script, "--previous-bytes", str(length), "--timings"], capture_output=True, text=True)
+        assert result.returncode == 0
+        assert json.loads(result.stdout) == self._as_json(fields)
+        assert json.loads(result.stderr.strip().splitlines()[-1])["delta"]["mode"] == "full"
+        result = subprocess.run([*script, "--previous-bytes", "10", "--probe"], capture_output=True, text=True)
+        assert result.returncode == 2 and "cannot be combined" in json.loads(result.stderr)["error"]
+
+
+class TestProbePdf:
+    """Tests for probe_pdf / --probe (catalog and trailer only)."""
+
+    def test_probe_minimal_pdf_has_no_form(self, minimal_pdf: Path) -> None:
+        from extract_acroform_fields import probe_pdf
+
+        info = probe_pdf(minimal_pdf)
+        assert info["pageCount"] == 1
+        assert info["hasAcroForm"] is False
+        assert info["hasFields"] is False
+        assert info["fieldCount"] == 0
+        assert info["encrypted"] is False
+        assert info["pdfVersion"] is not None
+        assert info["fileSize"] == minimal_pdf.stat().st_size
+
+    def test_probe_form_pdf_counts_top_level_fields(self, form_pdf: Path) -> None:
+        from extract_acroform_fields import probe_pdf
+
+        info = probe_pdf(form_pdf)
+        assert info["hasAcroForm"] is True
+        assert info["hasFields"] is True
+        assert info["fieldCount"] == 2
+
+    def test_probe_does_not_walk_page_annotations(self, form_pdf: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        import extract_acroform_fields as mod
+
+        def fail(*_a, **_k):
+            raise AssertionError("probe must not extract page fields")
+
+        monkeypatch.setattr(mod, "_page_fields", fail)
+        assert mod.probe_pdf(form_pdf)["fieldCount"] == 2
+
+    def test_probe_reports_encryption(self, tmp_path: Path) -> None:
+        from extract_acroform_fields import probe_pdf
+
+        writer = PdfWriter()
+        writer.add_blank_page(width=100, height=100)
+        writer.encrypt(user_password="", owner_password="owner", algorithm="RC4-128")
+        path = tmp_path / "enc.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        info = probe_pdf(path)
+        assert info["encrypted"] is True
+        assert info["pageCount"] == 1
+
+    def test_probe_with_user_password_reports_encrypted_only(self, tmp_path: Path) -> None:
+        from extract_acroform_fields import probe_pdf
+
+        path = tmp_path / "locked.pdf"
+        writer = PdfWriter()
+        writer.add_blank_page(width=100, height=100)
+        writer.encrypt(user_password="secret", owner_password="owner", algorithm="AES-128")
+        with open(path, "wb") as f:
+            writer.write(f)
+        info = probe_pdf(path)
+        assert info["encrypted"] is True
+        assert (info["pageCount"], info["hasAcroForm"], info["hasFields"], info["fieldCount"]) == (None, None, None, None)
+        result = subprocess.run([sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(path), "--probe"], capture_output=True, text=True)
+        assert result.returncode == 0 and json.loads(result.stdout)["encrypted"] is True
+
+    def test_cli_probe_outputs_object(self, form_pdf: Path) -> None:
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf), "--probe"],
+            capture_output=True,
+            text=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0
+        data = json.loads(result.stdout)
+        assert data["hasFields"] is True
+        assert data["pageCount"] == 1
+
+
+class TestExtractColumnar:
+    """Tests for the columnar output format (--format columnar, --gzip)."""
+
+    def test_columnar_matches_row_output(self, form_pdf: Path) -> None:
+        from extract_acroform_fields import FIELD_KEYS, extract_fields, extract_fields_columnar
+
+        rows = extract_fields(form_pdf)
+        data = extract_fields_columnar(form_pdf)
+        assert data["format"] == "columnar"
+        assert data["count"] == len(rows) == 2
+        assert list(data["columns"]) == list(FIELD_KEYS)
+        rebuilt = [{key: data["columns"][key][i] for key in FIELD_KEYS} for i in range(data["count"])]
+        assert rebuilt == rows
+
+    def test_budgeted_columnar_fields(self, multipage_form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields_budgeted
+
+        result = extract_fields_budgeted(multipage_form_pdf, deadline=0.0, columnar=True)
+        assert result["truncated"] is True
+        assert result["fields"]["columns"]["id"] == ["DUP"]
+
+    def test_cli_columnar_gzip_roundtrip(self, form_pdf: Path) -> None:
+        import gzip
+
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf), "--format", "columnar", "--gzip"],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0
+        data = json.loads(gzip.decompress(result.stdout))
+        assert data["count"] == 2
+        assert data["columns"]["id"] == ["DUP", "DUP@1-1"]
+
+
+def _range_server(files: dict[str, bytes], honour_range: bool = True, redirects: dict[str, str] | None = None):
+    """Start a local HTTP/1.1 server serving files by path with Range support.
+
+    Returns (server, base_url, log); log collects (path, range header, status) per request,
+    server.connections counts accepted TCP connections and server.authorization collects the
+    Authorization header of each request. redirects maps paths to 302 Location values
+    (/moved.pdf redirects to /form.pdf). Call server.shutdown() when done.
+    """
+    import http.server
+    import re
+    import threading
+
+    log: list[tuple[str, str | None, int]] = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:  # keep pytest output clean
+            pass
+
+        def setup(self) -> None:
+            super().setup()
+            self.server.connections += 1
+
+        def do_GET(self) -> None:  # noqa: N802
+            self.server.authorization.append(self.headers.get("Authorization"))
+            location = {"/moved.pdf": "/form.pdf", **(redirects or {})}.get(self.path)
+            if location is not None:
+                log.append((self.path, self.headers.get("Range"), 302))
+                self.send_response(302)
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = files.get(self.path)
+            if data is None:
+                log.append((self.path, self.headers.get("Range"), 404))
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            rng = self.headers.get("Range")
+            m = re.fullmatch(r"bytes=(\d+)-(\d*)", rng or "")
+            if honour_range and m:
+                start = int(m.group(1))
+                end = min(int(m.group(2)) if m.group(2) else len(data) - 1, len(data) - 1)
+                body = data[start:end + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            else:
+                body = data
+                self.send_response(200)
+            log.append((self.path, rng, 206 if honour_range and m else 200))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.connections = 0
+    server.authorization = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", log
+
+
+@pytest.fixture
+def large_form_pdf(tmp_path: Path) -> Path:
+    """Fixture: 3-page form PDF with a ~400 KB uncompressed content stream per page."""
+    from pypdf.generic import ArrayObject, BooleanObject, DictionaryObject, NameObject, StreamObject
+
+    writer = PdfWriter()
+    refs = []
+    for page_idx in range(3):
+        writer.add_blank_page(width=595, height=842)
+        content = StreamObject()
+        content.set_data(b"% padding\n" * 40_000)
+        writer.pages[page_idx][NameObject("/Contents")] = writer._add_object(content)
+        ref = _create_widget(writer, f"F{page_idx}", [100, 700, 250, 730], str(page_idx))
+        writer.pages[page_idx][NameObject("/Annots")] = ArrayObject([ref])
+        refs.append(ref)
+    writer.root_object[NameObject("/AcroForm")] = DictionaryObject(
+        {NameObject("/Fields"): ArrayObject(refs), NameObject("/NeedAppearances"): BooleanObject(True)}
+    )
+    path = tmp_path / "large.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+class TestHttpRangeFile:
+    """Tests for pdf_range_reader.HttpRangeFile against a local Range-capable HTTP server."""
+
+    def test_extract_over_http_matches_local_and_fetches_part(self, large_form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields
+        from pdf_range_reader import open_url
+
+        data = large_form_pdf.read_bytes()
+        server, base, log = _range_server({"/form.pdf": data})
+        try:
+            with open_url(f"{base}/form.pdf", block_size=16 * 1024) as fh:
+                fields = extract_fields(fh)
+                stats = fh.raw.stats()
+        finally:
+            server.shutdown()
+        assert fields == extract_fields(large_form_pdf)
+        assert [f["id"] for f in fields] == ["F0", "F1", "F2"]
+        assert stats["size"] == len(data)
+        assert stats["rangeSupported"] is True
+        assert stats["bytesFetched"] < len(data) // 4
+        # Every range request went over the same keep-alive connection
+        assert stats["connections"] == 1
+        assert server.connections == 1
+        assert all(status == 206 for _path, _rng, status in log)
+
+    def test_read_seek_and_block_cache(self, minimal_pdf: Path) -> None:
+        from pdf_range_reader import HttpRangeFile
+
+        data = minimal_pdf.read_bytes()
+        server, base, log = _range_server({"/min.pdf": data})
+        try:
+            with HttpRangeFile(f"{base}/min.pdf", block_size=64) as fh:
+                assert fh.read(8) == data[:8]
+                fh.seek(-20, 2)
+                assert fh.read() == data[-20:]
+                fh.seek(100)
+                assert fh.read(200) == data[100:300]
+                requests = fh.stats()["requests"]
+                fh.seek(120)
+                assert fh.read(50) == data[120:170]  # cached, no new request
+                assert fh.stats()["requests"] == requests
+                fh.seek(0)
+                assert fh.read() == data
+                assert fh.read(10) == b""
+        finally:
+            server.shutdown()
+        # Adjacent missing blocks are fetched with one request per run
+        assert len(log) == requests + 1
+
+    def test_server_without_range_support(self, form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields
+        from pdf_range_reader import HttpRangeFile
+
+        server, base, _log = _range_server({"/form.pdf": form_pdf.read_bytes()}, honour_range=False)
+        try:
+            with HttpRangeFile(f"{base}/form.pdf") as fh:
+                fields = extract_fields(fh)
+                assert fh.stats()["rangeSupported"] is False
+                assert fh.stats()["requests"] == 1
+        finally:
+            server.shutdown()
+        assert [f["id"] for f in fields] == ["DUP", "DUP@1-1"]
+
+    def test_redirect_and_http_error(self, form_pdf: Path) -> None:
+        from pdf_range_reader import HttpRangeFile, RangeRequestError
+
+        data = form_pdf.read_bytes()
+        server, base, _log = _range_server({"/form.pdf": data})
+        try:
+            with HttpRangeFile(f"{base}/moved.pdf") as fh:
+                assert fh.size == len(data)
+                assert fh.read() == data
+            with pytest.raises(RangeRequestError):
+                HttpRangeFile(f"{base}/missing.pdf")
+        finally:
+            server.shutdown()
+
+    def test_redirect_to_another_host_drops_credentials(self, form_pdf: Path) -> None:
+        from pdf_range_reader import HttpRangeFile
+
+        data = form_pdf.read_bytes()
+        other, other_base, _other_log = _range_server({"/form.pdf": data})
+        server, base, _log = _range_server({"/form.pdf": data}, redirects={"/away.pdf": f"{other_base}/form.pdf"})
+        headers = {"Authorization": "Bearer secret", "Cookie": "session=1", "X-Trace": "t"}
+        try:
+            with HttpRangeFile(f"{base}/moved.pdf", headers=headers) as fh:
+                assert fh.read() == data
+            with HttpRangeFile(f"{base}/away.pdf", block_size=256, headers=headers) as fh:
+                assert fh.read() == data
+        finally:
+            server.shutdown()
+            other.shutdown()
+        # Same origin keeps the credentials; the other host (another port) never sees them
+        assert server.authorization and set(server.authorization) == {"Bearer secret"}
+        assert other.authorization and set(other.authorization) == {None}
+        assert headers["Authorization"] == "Bearer secret"  # the caller's dict is not changed
+
+    def test_rejects_non_http_urls(self) -> None:
+        from pdf_range_reader import HttpRangeFile
+
+        with pytest.raises(ValueError):
+            HttpRangeFile("file:///etc/passwd")
+
+    def test_cli_url_and_probe(self, form_pdf: Path) -> None:
+        server, base, _log = _range_server({"/form.pdf": form_pdf.read_bytes()})
+        try:
+            script = str(SCRIPTS_DIR / "extract_acroform_fields.py")
+            fields = subprocess.run(["python3", script, "--url", f"{base}/form.pdf"], capture_output=True, cwd=BUNDLE_ROOT)
+            probe = subprocess.run(
+                ["python3", script, "--url", f"{base}/form.pdf", "--probe"], capture_output=True, cwd=BUNDLE_ROOT
+            )
+            missing = subprocess.run(["python3", script, "--url", f"{base}/nope.pdf"], capture_output=True, cwd=BUNDLE_ROOT)
+        finally:
+            server.shutdown()
+        assert fields.returncode == 0
+        assert [f["id"] for f in json.loads(fields.stdout)] == ["DUP", "DUP@1-1"]
+        assert probe.returncode == 0
+        assert json.loads(probe.stdout)["fieldCount"] == 2
+        assert missing.returncode == 2
+
+
 class TestApplyAcroformPatches:
     """Tests for .scripts/apply_acroform_patches.py."""
 
@@ -209,7 +685,9 @@ class TestApplyAcroformPatches:
         assert len(reader.pages) >= 1
 
     def test_apply_patches_cli_minimal(self, minimal_pdf: Path, tmp_path: Path) -> None:
-        """CLI with --pdf and --patches produces PDF on stdout."""
+        """CLI with --pdf and --patches produces PDF on stdout and the input/output SHA-256 on stderr."""
+        import hashlib
+
         patches_path = tmp_path / "patches.json"
         patches_path.write_text('[{"fieldId": "p1-0", "defaultValue": "test"}]')
         result = subprocess.run(
@@ -226,6 +704,14 @@ class TestApplyAcroformPatches:
         )
         assert result.returncode == 0
         assert result.stdout.startswith(b"%PDF")
+        digests = json.loads(result.stderr.decode().strip().splitlines()[-1])
+        assert digests == {
+            "script": "apply_acroform_patches",
+            "input_sha256": hashlib.sha256(minimal_pdf.read_bytes()).hexdigest(),
+            "input_bytes": minimal_pdf.stat().st_size,
+            "output_sha256": hashlib.sha256(result.stdout).hexdigest(),
+            "output_bytes": len(result.stdout),
+        }
 
     def test_apply_patches_rect_patch_accepted(
         self, minimal_pdf: Path, tmp_path: Path
@@ -402,7 +888,7 @@ class TestRealFormCoverage:
 
 
 class TestProcessModifiedPdf:
-    """Tests for .scripts/process_modified_pdf.py (stub)."""
+    """Tests for .scripts/process_modified_pdf.py without stages (copy)."""
 
     def test_process_copies_input_to_output(
         self, minimal_pdf: Path, tmp_path: Path
@@ -495,6 +981,1450 @@ class TestProcessModifiedPdf:
         assert out_path.stat().st_size == minimal_pdf.stat().st_size
 
 
+class TestProcessPipeline:
+    """Tests for the process_modified_pdf.py stage pipeline."""
+
+    def test_fill_stage_parses_once_and_reports_timings(
+        self, form_pdf: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        import pypdf
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        parsed = []
+        real_reader = pypdf.PdfReader
+
+        def counting_reader(*args, **kwargs):
+            parsed.append(args[0])
+            return real_reader(*args, **kwargs)
+
+        monkeypatch.setattr(pypdf, "PdfReader", counting_reader)
+        out = tmp_path / "filled.pdf"
+        stages = normalize_stage_specs([{"name": "fill", "values": {"DUP": "filled"}}, "fill"])
+        report = run_pipeline(form_pdf, out, stages, document_key="k1")
+
+        assert len(parsed) == 1
+        assert [t["stage"] for t in report["stages"]] == ["parse", "fill", "fill", "serialize", "write"]
+        assert all(t["ms"] >= 0 for t in report["stages"])
+        assert report["documentKey"] == "k1"
+        assert report["outputBytes"] == out.stat().st_size
+        assert real_reader(str(out)).get_fields()["DUP"]["/V"] == "filled"
+
+    def test_bytes_stage_runs_after_serialization(self, minimal_pdf: Path, tmp_path: Path) -> None:
+        import process_modified_pdf as mod
+
+        seen = []
+
+        @mod.register_stage("test-suffix", kind="bytes")
+        def _suffix(ctx, options):
+            seen.append(ctx.writer)
+            ctx.data += options.get("suffix", "").encode()
+
+        try:
+            out = tmp_path / "out.pdf"
+            report = mod.run_pipeline(minimal_pdf, out, mod.normalize_stage_specs([{"name": "test-suffix", "suffix": "%x"}]))
+            assert out.read_bytes() == minimal_pdf.read_bytes() + b"%x"
+            # No document stage: the input is not parsed at all
+            assert [t["stage"] for t in report["stages"]] == ["test-suffix", "write"]
+            assert seen == [None]
+            with pytest.raises(ValueError, match="must run before"):
+                mod.normalize_stage_specs(["test-suffix", "fill"])
+        finally:
+            mod.STAGES.pop("test-suffix", None)
+
+    def test_input_and_output_fingerprinted_while_transferred(self, form_pdf: Path, tmp_path: Path) -> None:
+        import hashlib
+        import io
+
+        from pdf_digest import HashingReader, HashingWriter, digest_report
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        sha = lambda p: hashlib.sha256(p.read_bytes()).hexdigest()  # noqa: E731
+        for stages in ([], ["fill"]):
+            out = tmp_path / f"out{len(stages)}.pdf"
+            report = run_pipeline(form_pdf, out, normalize_stage_specs(stages))
+            assert report["input_sha256"] == sha(form_pdf) and report["inputBytes"] == form_pdf.stat().st_size
+            assert report["output_sha256"] == sha(out) and report["outputBytes"] == out.stat().st_size
+        assert report["input_sha256"] != report["output_sha256"]
+
+        source, buf = HashingReader(io.BytesIO(b"abc" * 1000)), io.BytesIO()
+        sink = HashingWriter(buf)
+        while chunk := source.read(7):
+            sink.write(memoryview(chunk))
+        assert digest_report(source, sink) == {
+            "input_sha256": hashlib.sha256(b"abc" * 1000).hexdigest(),
+            "input_bytes": 3000,
+            "output_sha256": hashlib.sha256(buf.getvalue()).hexdigest(),
+            "output_bytes": 3000,
+        }
+        assert digest_report(source, None).keys() == {"input_sha256", "input_bytes"}
+
+    def test_cli_stages_config_and_errors(self, form_pdf: Path, tmp_path: Path) -> None:
+        import os
+
+        script = str(SCRIPTS_DIR / "process_modified_pdf.py")
+        config = tmp_path / "stages.json"
+        config.write_text(json.dumps({"stages": [{"name": "fill", "values": {"DUP": "cli"}}]}))
+        out = tmp_path / "out.pdf"
+        ok = subprocess.run(
+            ["python3", script, "--input", str(form_pdf), "--output", str(out), "--stages", "fill", "--config", str(config)],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert ok.returncode == 0
+        report = json.loads(ok.stderr.decode().strip().splitlines()[-1])
+        assert [t["stage"] for t in report["stages"]] == ["parse", "fill", "serialize", "write"]
+        assert PdfReader(str(out)).get_fields()["DUP"]["/V"] == "cli"
+
+        # Stage selection from the environment (the bundle only passes --input/--output)
+        env = {**os.environ, "PDF_PROCESS_CONFIG": str(config)}
+        out_env = tmp_path / "out-env.pdf"
+        via_env = subprocess.run(
+            ["python3", script, "--input", str(form_pdf), "--output", str(out_env)], capture_output=True, cwd=BUNDLE_ROOT, env=env
+        )
+        assert via_env.returncode == 0
+        assert PdfReader(str(out_env)).get_fields()["DUP"]["/V"] == "cli"
+
+        unknown = subprocess.run(
+            ["python3", script, "--input", str(form_pdf), "--output", str(out), "--stages", "nope"],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert unknown.returncode == 2
+        assert "Unknown stage" in json.loads(unknown.stderr)["error"]
+
+
+class TestDeterministicOutput:
+    """Tests for --deterministic in apply and process (byte-reproducible output, pdf_digest.set_content_id)."""
+
+    def test_apply_twice_gives_identical_sha256(self, form_pdf: Path, tmp_path: Path) -> None:
+        import hashlib
+        import os
+
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([{"fieldId": "p1-0", "defaultValue": "Jane"}, {"fieldId": "p1-1", "hidden": True}]))
+        other = tmp_path / "other.json"
+        other.write_text(json.dumps([{"defaultValue": "Joe", "fieldId": "p1-0"}, {"fieldId": "p1-1", "hidden": True}]))
+
+        def apply(patches_path: Path, seed: str, *extra: str) -> tuple[bytes, dict]:
+            env = {k: v for k, v in os.environ.items() if not k.startswith("PDF_")}
+            env["PYTHONHASHSEED"] = seed
+            result = subprocess.run(
+                [sys.executable, str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(form_pdf), "--patches", str(patches_path), "--deterministic", *extra],
+                capture_output=True, check=True, env=env,
+            )
+            return result.stdout, json.loads(result.stderr.decode().strip().splitlines()[-1])
+
+        first, digest = apply(patches, "1")
+        second, _ = apply(patches, "2")
+        assert hashlib.sha256(first).hexdigest() == hashlib.sha256(second).hexdigest() == digest["output_sha256"]
+        trailer_id = PdfReader(__import__("io").BytesIO(first)).trailer["/ID"]
+        assert trailer_id[0] == trailer_id[1] and len(trailer_id[1].original_bytes) == 16  # the input had no /ID
+        changed, _ = apply(other, "1")
+        assert PdfReader(__import__("io").BytesIO(changed)).trailer["/ID"][1] != trailer_id[1]
+        optimized_a, _ = apply(patches, "3", "--optimize")
+        optimized_b, _ = apply(patches, "4", "--optimize")
+        assert optimized_a == optimized_b and optimized_a != first
+
+    def test_process_deterministic_keeps_input_id_and_refuses_sign(self, form_pdf: Path, tmp_path: Path) -> None:
+        from pypdf.generic import ArrayObject, ByteStringObject
+
+        from process_modified_pdf import run_pipeline
+
+        writer = PdfWriter(clone_from=str(form_pdf))
+        permanent = bytes(range(200, 216))
+        writer._ID = ArrayObject([ByteStringObject(permanent), ByteStringObject(permanent)])
+        with_id = tmp_path / "with_id.pdf"
+        writer.write(str(with_id))
+        stages = [("fill", {"values": {"DUP": "x"}}), ("flatten", {}), ("optimize", {})]
+        outputs = []
+        for name in ("a.pdf", "b.pdf"):
+            report = run_pipeline(with_id, tmp_path / name, stages, "doc-1", deterministic=True)
+            outputs.append((tmp_path / name).read_bytes())
+        assert outputs[0] == outputs[1] and report["output_sha256"] == __import__("hashlib").sha256(outputs[0]).hexdigest()
+        trailer_id = PdfReader(str(tmp_path / "a.pdf")).trailer["/ID"]
+        assert trailer_id[0].original_bytes == permanent and trailer_id[1].original_bytes != permanent
+        run_pipeline(with_id, tmp_path / "c.pdf", stages, "doc-2", deterministic=True)
+        assert PdfReader(str(tmp_path / "c.pdf")).trailer["/ID"][1] != trailer_id[1]
+
+        with pytest.raises(ValueError, match="sign"):
+            run_pipeline(with_id, tmp_path / "d.pdf", [("sign", {})], deterministic=True)
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "process_modified_pdf.py"), "--input", str(with_id), "--output", str(tmp_path / "e.pdf"), "--stages", "sign", "--deterministic"],
+            capture_output=True,
+        )
+        assert result.returncode == 2 and "deterministic" in json.loads(result.stderr)["error"]
+
+
+class TestPhaseTimings:
+    """Tests for .scripts/pdf_phases.py and the --timings / PDF_SCRIPTS_TIMINGS report lines."""
+
+    def test_timer_phases_laps_and_null_timer(self) -> None:
+        from pdf_phases import NULL_TIMER, PhaseTimer, timings_enabled
+
+        timer = PhaseTimer("demo")
+        with timer.phase("a"):
+            pass
+        timer.lap("b")
+        with timer.phase("a"):
+            timer.count("items", 3)
+        timer.count("items")
+        report = timer.report()
+        assert report["script"] == "demo" and report["version"] == 1
+        assert list(report["phases"]) == ["a", "b"] and report["counts"] == {"items": 4}
+        assert report["totalMs"] >= sum(report["phases"].values()) - 0.05
+        assert not NULL_TIMER and timer
+        with NULL_TIMER.phase("x"):
+            NULL_TIMER.lap("y")
+            NULL_TIMER.count("z")
+        assert timings_enabled(True)
+
+    def test_scripts_emit_one_json_line(self, form_pdf: Path, tmp_path: Path) -> None:
+        import os
+
+        env = {k: v for k, v in os.environ.items() if k != "PDF_SCRIPTS_TIMINGS"}
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf), "--timings"],
+            capture_output=True, text=True, check=True, env=env,
+        )
+        line = json.loads(result.stderr.strip().splitlines()[-1])
+        assert line["script"] == "extract_acroform_fields" and line["version"] == 1
+        assert {"import", "open", "fields", "serialize", "write"} <= set(line["phases"])
+        assert line["counts"]["pages"] == 1 and line["counts"]["annotations"] == 2 and line["counts"]["widgets"] == 2
+        plain = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf)], capture_output=True, text=True, env=env
+        )
+        assert plain.stderr == ""
+
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([
+            {"fieldId": "p1-0", "defaultValue": "X"},
+            {"fieldId": "p1-1", "hidden": True},
+            {"fieldId": "new-a", "page": 1, "rect": [10, 10, 50, 30]},
+        ]))
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(form_pdf), "--patches", str(patches)],
+            capture_output=True, check=True, env={**env, "PDF_SCRIPTS_TIMINGS": "1"},
+        )
+        line = json.loads(result.stderr.decode().strip().splitlines()[-1])
+        assert line["output_bytes"] == len(result.stdout) and line["input_sha256"]
+        assert list(line["phases"]) == ["load", "import", "parse", "index", "mutate", "appearance", "serialize", "write"]
+        assert line["counts"] == {"annotations": 2, "hidden": 1, "created": 1, "pages": 1, "patches": 3, "matched": 1}
+
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "process_modified_pdf.py"), "--input", str(form_pdf), "--output", str(tmp_path / "o.pdf"),
+             "--stages", "flatten", "--timings"],
+            capture_output=True, text=True, check=True, env=env,
+        )
+        line = json.loads(result.stderr.strip().splitlines()[-1])
+        assert list(line["phases"]) == ["parse", "flatten", "serialize", "write"]
+        assert line["counts"] == {"pages": 1, "annotations": 2, "stages": 1} and line["version"] == 1
+
+
+class TestPdfProfile:
+    """Tests for .scripts/pdf_profile.py and the --profile / PDF_SCRIPTS_PROFILE options."""
+
+    def test_profile_and_collapsed_stacks(self, form_pdf: Path, tmp_path: Path) -> None:
+        import os
+        import pstats
+
+        env = {k: v for k, v in os.environ.items() if not k.startswith("PDF_SCRIPTS_PROFILE")}
+        prof = tmp_path / "extract.prof"
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf), "--profile", str(prof), "--profile-collapsed"],
+            capture_output=True, text=True, check=True, env=env,
+        )
+        assert len(json.loads(result.stdout)) == 2 and result.stderr == ""
+        functions = {name for _, _, name in pstats.Stats(str(prof)).stats}
+        assert {"main", "extract_fields"} <= functions
+        lines = (tmp_path / "extract.prof.collapsed").read_text().splitlines()
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) >= 1 and stack.startswith("main (extract_acroform_fields.py:")
+
+    def test_env_directory_and_min_ms_threshold(self, form_pdf: Path, tmp_path: Path) -> None:
+        import os
+
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([{"fieldId": "p1-0", "defaultValue": "X"}]))
+        command = [sys.executable, str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(form_pdf), "--patches", str(patches)]
+        env = {k: v for k, v in os.environ.items() if not k.startswith("PDF_SCRIPTS_PROFILE")}
+        out = tmp_path / "profiles"
+        env["PDF_SCRIPTS_PROFILE"] = str(out) + os.sep
+        subprocess.run(command, capture_output=True, check=True, env={**env, "PDF_SCRIPTS_PROFILE_MIN_MS": "100000"})
+        assert not out.exists() or not list(out.iterdir())
+        result = subprocess.run(command, capture_output=True, check=True, env=env)
+        assert result.stdout.startswith(b"%PDF") and json.loads(result.stderr.decode().strip().splitlines()[-1])["output_bytes"]
+        files = list(out.iterdir())
+        assert len(files) == 1 and files[0].name.startswith("apply_acroform_patches-") and files[0].suffix == ".prof"
+
+
+class TestPdfMemory:
+    """Tests for .scripts/pdf_memory.py and the --max-memory-mb / --trace-memory options."""
+
+    def test_check_report_and_json_error(self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+        import pdf_memory
+
+        assert pdf_memory.report() == {}
+        pdf_memory.check("page 1")  # no ceiling: no-op
+        assert pdf_memory.rss_bytes() > 0 and pdf_memory.peak_rss_mb() > 0
+        monkeypatch.setattr(pdf_memory, "_limit_bytes", 1024 * 1024)
+        with pytest.raises(pdf_memory.MemoryLimitExceeded, match="at page 3"):
+            pdf_memory.check("page 3")
+
+        def main() -> None:
+            pdf_memory.check("stage fill")
+
+        with pytest.raises(SystemExit) as exc:
+            pdf_memory.run_limited(main, "process_modified_pdf")
+        assert exc.value.code == 2
+        error = json.loads(capsys.readouterr().err.strip())
+        assert error["error"] == "Memory limit exceeded" and error["where"] == "stage fill"
+        assert error["maxMemoryMb"] == 1.0 and error["rssMb"] > 1
+
+    def test_scripts_report_peak_rss_and_top_allocations(self, form_pdf: Path, tmp_path: Path) -> None:
+        import os
+
+        env = {k: v for k, v in os.environ.items() if not k.startswith("PDF_SCRIPTS_")}
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([{"fieldId": "p1-0", "defaultValue": "X"}]))
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(form_pdf), "--patches", str(patches),
+             "--max-memory-mb", "2048"],
+            capture_output=True, check=True, env={**env, "PDF_SCRIPTS_TRACE_MEMORY": "3"},
+        )
+        line = json.loads(result.stderr.decode().strip().splitlines()[-1])
+        assert result.stdout.startswith(b"%PDF") and line["output_bytes"] == len(result.stdout)
+        assert line["maxMemoryMb"] == 2048 and line["peakRssMb"] > 0 and line["tracedPeakMb"] > 0
+        assert len(line["topAllocations"]) == 3 and all(":" in a["where"] and a["kb"] > 0 for a in line["topAllocations"])
+
+
+class TestPdfFlatten:
+    """Tests for the flatten stage (.scripts/pdf_flatten.py)."""
+
+    @staticmethod
+    def _filled_form(tmp_path: Path) -> Path:
+        """2-page form: 2 text widgets + 1 link per page, one hidden widget, values filled."""
+        from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, NumberObject, TextStringObject
+
+        writer = PdfWriter()
+        refs = []
+        for p in range(2):
+            writer.add_blank_page(width=595, height=842)
+            page_refs = [_create_widget(writer, f"F{p}{i}", [50, 700 - i * 40, 250, 720 - i * 40]) for i in range(2)]
+            link = writer._add_object(
+                DictionaryObject(
+                    {
+                        NameObject("/Subtype"): NameObject("/Link"),
+                        NameObject("/Rect"): ArrayObject([FloatObject(0), FloatObject(0), FloatObject(10), FloatObject(10)]),
+                    }
+                )
+            )
+            writer.pages[p][NameObject("/Annots")] = ArrayObject([*page_refs, link])
+            refs += page_refs
+        writer.root_object[NameObject("/AcroForm")] = DictionaryObject(
+            {NameObject("/Fields"): ArrayObject(refs), NameObject("/DA"): TextStringObject("/Helv 10 Tf 0 g")}
+        )
+        writer.update_page_form_field_values(None, {"F00": "alpha", "F01": "beta", "F10": "gamma", "F11": "delta"})
+        refs[3].get_object()[NameObject("/F")] = NumberObject(2)  # F11 hidden
+        path = tmp_path / "filled.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        return path
+
+    def test_flatten_bakes_appearances_and_removes_form(self, tmp_path: Path) -> None:
+        from pdf_flatten import flatten_writer
+
+        src = self._filled_form(tmp_path)
+        writer = PdfWriter(clone_from=PdfReader(str(src)))
+        stats = flatten_writer(writer)
+        assert stats == {"pages": 2, "widgets": 4, "drawn": 3, "generated": 0, "missingAppearance": 0}
+        out = tmp_path / "flat.pdf"
+        with open(out, "wb") as f:
+            writer.write(f)
+
+        reader = PdfReader(str(out))
+        assert "/AcroForm" not in reader.trailer["/Root"]
+        for page in reader.pages:
+            annots = [a.get_object() for a in page["/Annots"]]
+            assert [a["/Subtype"] for a in annots] == ["/Link"]
+        text = reader.pages[0].extract_text() + reader.pages[1].extract_text()
+        assert "alpha" in text and "beta" in text and "gamma" in text
+        assert "delta" not in text  # hidden widgets are removed but not drawn
+        assert reader.get_fields() in (None, {})
+
+    def test_flatten_generates_appearances_for_values_only_forms(self, form_pdf: Path) -> None:
+        from pypdf.generic import NameObject
+
+        from pdf_flatten import flatten_writer
+
+        # NeedAppearances form: "DUP" has the value "A" on its parent field and no /AP
+        writer = PdfWriter(clone_from=PdfReader(str(form_pdf)))
+        stats = flatten_writer(writer)
+        assert stats == {"pages": 1, "widgets": 2, "drawn": 1, "generated": 1, "missingAppearance": 1}
+        buf = __import__("io").BytesIO()
+        writer.write(buf)
+        assert PdfReader(buf).pages[0].extract_text().strip() == "A"
+
+        writer = PdfWriter(clone_from=PdfReader(str(form_pdf)))
+        widget = writer.pages[0]["/Annots"][1].get_object()
+        widget[NameObject("/FT")], widget[NameObject("/V")] = NameObject("/Btn"), NameObject("/Yes")
+        with pytest.raises(ValueError, match="no appearance"):
+            flatten_writer(writer)
+        assert "/AcroForm" in writer.root_object and len(writer.pages[0]["/Annots"]) == 2
+
+    def test_appearance_matrix_maps_bbox_to_rect(self) -> None:
+        from pdf_flatten import _appearance_matrix
+
+        # Identity form matrix: scale 100x20 bbox onto a 200x40 rect at (10, 20)
+        assert _appearance_matrix([10, 20, 210, 60], [0, 0, 100, 20], [1, 0, 0, 1, 0, 0]) == (2.0, 0.0, 0.0, 2.0, 10.0, 20.0)
+        # Rotated form (90 degrees): the transformed bbox is 20x100
+        a = _appearance_matrix([0, 0, 20, 100], [0, 0, 100, 20], [0, 1, -1, 0, 0, 0])
+        assert a == (1.0, 0.0, 0.0, 1.0, 20.0, 0.0)
+        assert _appearance_matrix([0, 0, 10, 10], [0, 0, 0, 0], [1, 0, 0, 1, 0, 0]) is None
+
+    def test_pipeline_fill_then_flatten_cli(self, form_pdf: Path, tmp_path: Path) -> None:
+        config = tmp_path / "stages.json"
+        config.write_text(json.dumps({"stages": [{"name": "fill", "values": {"DUP": "done"}}, "flatten"]}))
+        out = tmp_path / "out.pdf"
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "process_modified_pdf.py"), "--input", str(form_pdf), "--output", str(out), "--config", str(config)],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0, result.stderr
+        report = json.loads(result.stderr.decode().strip().splitlines()[-1])
+        assert [t["stage"] for t in report["stages"]] == ["parse", "fill", "flatten", "serialize", "write"]
+        assert report["stages"][2]["stats"] == {"pages": 1, "widgets": 2, "drawn": 2, "generated": 0, "missingAppearance": 0}
+        reader = PdfReader(str(out))
+        assert "/AcroForm" not in reader.trailer["/Root"]
+        assert "done" in reader.pages[0].extract_text()
+
+
+def _png_bytes(width: int, height: int, color_type: int = 6, pixel: bytes = b"\x10\x10\x40\xff", **chunks: bytes) -> bytes:
+    """Minimal non-interlaced 8-bit PNG filled with pixel (extra chunks, e.g. PLTE=..., before IDAT)."""
+    import struct
+    import zlib
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    rows = b"".join(b"\x00" + pixel * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        + b"".join(chunk(kind.encode(), body) for kind, body in chunks.items())
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _data_url(data: bytes, mime: str = "image/png") -> str:
+    import base64
+
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+class TestPdfCoords:
+    """Tests for .scripts/pdf_coords.py (viewer space <-> PDF user space)."""
+
+    def test_rotation_origin_and_round_trip(self) -> None:
+        from pdf_coords import box_to_rect, rects_from_viewer, rects_to_viewer
+
+        # 600 x 800 CropBox at (10, 20); /Rotate 90 shows it 800 wide and 600 high with the
+        # user space's lower-left corner at the top left
+        rect = [10, 20, 40, 30]  # 30 x 10 pt in user space
+        assert rects_to_viewer([rect], (10, 20, 610, 820, 90)) == [[0.0, 0.0, 10.0, 30.0]]
+        assert rects_to_viewer([rect], (10, 20, 610, 820, 0)) == [[0.0, 790.0, 30.0, 800.0]]
+        assert rects_to_viewer([rect], (10, 20, 610, 820, 180)) == [[570.0, 0.0, 600.0, 10.0]]
+        assert rects_to_viewer([rect], (10, 20, 610, 820, -90), origin="bottom_right") == [[0.0, 0.0, 10.0, 30.0]]
+        assert box_to_rect(0, 0, 10, 30, "pt", "top_left", (10, 20, 610, 820), 90) == (10, 20, 40, 30)
+
+        geometries = [(0, 0, 595, 842, r) for r in (0, 90, 180, 270)] * 3
+        rects = [[50 + i, 100 + 2 * i, 150 + i, 130 + 2 * i] for i in range(len(geometries))]
+        for unit in ("mm", "px"):
+            for origin in ("top_left", "top_right", "bottom_left", "bottom_right"):
+                viewer = rects_to_viewer(rects, geometries, unit, origin)
+                back = rects_from_viewer(viewer, geometries, unit, origin)
+                assert sum(back, []) == pytest.approx(sum(rects, []))
+        with pytest.raises(ValueError, match="multiple of 90"):
+            rects_to_viewer([rect], (0, 0, 1, 1, 45))
+        with pytest.raises(ValueError, match="Expected one geometry"):
+            rects_to_viewer([rect, rect], [(0, 0, 1, 1, 0)])
+        with pytest.raises(ValueError, match="Unknown unit"):
+            rects_from_viewer([rect], (0, 0, 1, 1, 0), unit="km")
+
+    def test_numpy_matches_pure_python(self) -> None:
+        np = pytest.importorskip("numpy")
+        from pdf_coords import rects_from_viewer, rects_to_viewer
+
+        rng = np.random.default_rng(7)
+        xy = rng.uniform(0, 500, size=(1000, 2))
+        rects = np.hstack([xy, xy + rng.uniform(1, 80, size=(1000, 2))])
+        geometries = np.column_stack(
+            [rng.choice([0, 5], 1000), rng.choice([0, 9], 1000), np.full(1000, 600.0), np.full(1000, 800.0), rng.choice([0, 90, 180, 270, 450], 1000)]
+        )
+        for origin in ("top_left", "bottom_right"):
+            fast = rects_to_viewer(rects, geometries, "cm", origin)
+            assert isinstance(fast, np.ndarray)
+            slow = rects_to_viewer(rects.tolist(), geometries.tolist(), "cm", origin, use_numpy=False)
+            assert np.allclose(fast, slow)
+            assert np.allclose(rects_from_viewer(fast, geometries, "cm", origin), rects)
+
+    def test_extract_viewer_space_and_apply_accepts_it(self, tmp_path: Path) -> None:
+        from apply_acroform_patches import apply_patches
+        from extract_acroform_fields import extract_fields
+        from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject, RectangleObject
+
+        writer = PdfWriter()
+        writer.add_blank_page(width=600, height=800)
+        page = writer.pages[0]
+        page[NameObject("/Rotate")] = NumberObject(90)
+        page[NameObject("/CropBox")] = RectangleObject([10, 20, 590, 780])
+        ref = _create_widget(writer, "sig", [10, 20, 40, 30], "")
+        page[NameObject("/Annots")] = ArrayObject([ref])
+        writer.root_object[NameObject("/AcroForm")] = DictionaryObject({NameObject("/Fields"): ArrayObject([ref])})
+        pdf = tmp_path / "rotated.pdf"
+        with open(pdf, "wb") as f:
+            writer.write(f)
+
+        field = extract_fields(pdf, viewer=("pt", "top_left"))[0]
+        assert (field["rect"], field["width"], field["height"]) == ([0, 0, 10, 30], 10, 30)
+        assert extract_fields(pdf)[0]["rect"] == [10, 20, 40, 30]
+        mm = extract_fields(pdf, viewer=("mm", "bottom_left"))[0]
+        assert mm["rect"] == pytest.approx([0, 194.0278, 3.5278, 204.6111], abs=1e-4)  # view is 580 pt high
+
+        # Move the field 20 pt right and 5 pt down in the viewer; apply converts back
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([
+            {"fieldId": "sig", "rect": [20, 5, 30, 35], "rectUnit": "pt", "rectOrigin": "top_left"},
+            {"fieldId": "new", "fieldName": "new", "page": 1, "createIfMissing": True, "rect": [0, 0, 10, 10], "rectOrigin": "bottom_right"},
+            {"fieldId": "bad", "page": 1, "createIfMissing": True, "rect": [0, 0, 1, 1], "rectUnit": "km"},
+        ]))
+        out = PdfReader(__import__("io").BytesIO(apply_patches(pdf, patches)))
+        rects = {a.get_object()["/T"]: [float(v) for v in a.get_object()["/Rect"]] for a in out.pages[0]["/Annots"]}
+        assert rects == {"sig": [15, 40, 45, 50], "new": [580, 770, 590, 780]}
+
+
+class TestPdfOverlaps:
+    """Tests for .scripts/pdf_overlaps.py (grid index for widget and signature box overlaps)."""
+
+    def test_grid_matches_pairwise_check(self) -> None:
+        import random
+
+        from pdf_overlaps import _intersection, overlapping_pairs, rects_under
+
+        rng = random.Random(3)
+        rects = []
+        for _ in range(400):
+            x, y = rng.uniform(0, 500), rng.uniform(0, 700)
+            rects.append([x, y, x + rng.uniform(5, 60), y + rng.uniform(5, 25)])
+        rects += [[0, 0, 595, 842], [300, 0, 305, 842]]  # page frame and a tall rule: outside the grid
+        expected = [
+            (i, j) for i in range(len(rects)) for j in range(i + 1, len(rects)) if _intersection(rects[i], rects[j], 1.0)
+        ]
+        assert [(i, j) for i, j, _ in overlapping_pairs(rects, tolerance=1.0)] == expected
+        # Shared edges and corners are not overlaps; reversed corners are normalized
+        assert overlapping_pairs([[0, 0, 10, 10], [10, 0, 20, 10], [20, 20, 10, 10], [5, 5, 15, 15]]) == [
+            (0, 3, 25.0), (1, 3, 25.0), (2, 3, 25.0)
+        ]
+        hits = rects_under(rects[:50], [[100, 100, 200, 150]])
+        assert [i for _, i, _ in hits] == [i for i in range(50) if _intersection(rects[i], [100, 100, 200, 150], 0)]
+
+    def test_extract_reports_widget_and_signature_box_overlaps(self, tmp_path: Path) -> None:
+        from extract_acroform_fields import extract_fields
+        from pdf_overlaps import OverlapCollector
+        from pypdf.generic import ArrayObject, DictionaryObject, NameObject
+
+        writer = PdfWriter()
+        refs = []
+        for page_idx, rects in enumerate([[[100, 700, 250, 730], [200, 710, 300, 740], [100, 600, 200, 620]], [[65, 775, 150, 790]]]):
+            writer.add_blank_page(width=595, height=842)
+            page_refs = [_create_widget(writer, f"p{page_idx}f{i}", r) for i, r in enumerate(rects)]
+            writer.pages[page_idx][NameObject("/Annots")] = ArrayObject(page_refs)
+            refs += page_refs
+        writer.root_object[NameObject("/AcroForm")] = DictionaryObject({NameObject("/Fields"): ArrayObject(refs)})
+        pdf = tmp_path / "overlaps.pdf"
+        with open(pdf, "wb") as f:
+            writer.write(f)
+
+        boxes = [
+            {"name": "s1", "page": 1, "x": 150, "y": 110, "width": 100, "height": 30, "angle": 0},
+            {"name": "s2", "page": 2, "x": 0, "y": 0, "width": 60, "height": 60, "angle": 45},
+            {"name": "s3", "page": 2, "x": 400, "y": 400, "width": 10, "height": 10},
+        ]
+        collector = OverlapCollector(boxes, "pt", "top_left")
+        extract_fields(pdf, overlaps=collector)
+        report = collector.report()
+        assert report["widgets"] == [{"page": 1, "a": "p0f0", "b": "p0f1", "area": 1000.0}]
+        # s1 covers user space y 702-732; s2 turned 45 degrees reaches x ~72.4, y ~769.6 (unturned: 60, 782)
+        assert [(h["name"], h["field"]) for h in report["signatureBoxes"]] == [
+            ("s1", "p0f0"), ("s1", "p0f1"), ("s2", "p1f0")
+        ]
+
+        coordinates = tmp_path / "coordinates.json"
+        coordinates.write_text(json.dumps({"unit": "pt", "origin": "top_left", "signature_boxes": boxes}))
+        script = SCRIPTS_DIR / "extract_acroform_fields.py"
+        result = subprocess.run(
+            [sys.executable, str(script), str(pdf), "--overlaps", "--signature-boxes", str(coordinates), "--format", "columnar"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        out = json.loads(result.stdout)
+        assert out["fields"]["count"] == 4
+        assert out["overlaps"] == json.loads(json.dumps(report))
+        coordinates.write_text(json.dumps({"unit": "km", "signature_boxes": []}))
+        result = subprocess.run([sys.executable, str(script), str(pdf), "--signature-boxes", str(coordinates)], capture_output=True, text=True)
+        assert result.returncode == 2 and "Invalid signature boxes" in result.stderr
+
+    def test_viewer_space_keeps_overlaps_in_pdf_space(self, form_pdf: Path) -> None:
+        from extract_acroform_fields import extract_fields
+        from pdf_overlaps import OverlapCollector
+
+        # Box over widget "DUP" only (user space 100,700-250,730 on an A4 page), given in mm from top left
+        mm = 25.4 / 72
+        box = {"name": "s1", "page": 1, "x": 110 * mm, "y": 117 * mm, "width": 100 * mm, "height": 20 * mm}
+        reports = []
+        for viewer in (None, ("mm", "top_left")):
+            collector = OverlapCollector([box], "mm", "top_left")
+            fields = extract_fields(form_pdf, viewer=viewer, overlaps=collector)
+            reports.append(collector.report())
+        assert reports[0] == reports[1]
+        assert [(hit["field"], hit["area"]) for hit in reports[1]["signatureBoxes"]] == [("DUP", 2000.0)]
+        assert fields[0]["rect"][0] == pytest.approx(100 * mm, abs=1e-3)
+
+
+class TestPdfStamp:
+    """Tests for .scripts/pdf_stamp.py (signature images at box coordinates)."""
+
+    def test_images_deduplicated_and_placed(self, multipage_form_pdf: Path, tmp_path: Path) -> None:
+        import io
+
+        from pdf_stamp import stamp_writer
+        from pypdf.filters import FlateDecode
+
+        signature = _data_url(_png_bytes(300, 100))
+        # Same bytes, different data URL text: still one image
+        initials = _data_url(_png_bytes(40, 20, pixel=b"\x00\x00\x00\x80")).replace("image/png", "image/x-png")
+        boxes = [
+            {"page": p, "x": 10, "y": 10, "width": 60, "height": 20, "angle": 0, "signature_data": signature}
+            for p in (1, 2, 3)
+        ]
+        boxes += [
+            {"page": p, "x": 100, "y": 10, "width": 20, "height": 20, "angle": 90, "signature_data": initials}
+            for p in (1, 2, 3)
+        ]
+        boxes.append({"page": 2, "x": 0, "y": 0, "width": 10, "height": 10, "signature_data": _data_url(_png_bytes(40, 20, pixel=b"\x00\x00\x00\x80"))})
+        boxes.append({"page": 1, "x": 0, "y": 0, "width": 10, "height": 10})  # not signed yet
+        writer = PdfWriter(clone_from=PdfReader(str(multipage_form_pdf)))
+        stats = stamp_writer(writer, boxes, unit="mm", origin="bottom_left")
+        assert stats == {"boxes": 8, "stamped": 7, "skipped": 1, "images": 2, "imageBytes": stats["imageBytes"], "pages": 3}
+        buf = io.BytesIO()
+        writer.write(buf)
+
+        reader = PdfReader(buf)
+        images = {}
+        for page in reader.pages:
+            for name, ref in page["/Resources"]["/XObject"].items():
+                images[name] = ref.indirect_reference
+        assert len(set(images.values())) == 2
+        sig = next(ref.get_object() for name, ref in images.items() if ref.get_object()["/Width"] == 300)
+        assert sig["/ColorSpace"] == "/DeviceRGB" and sig["/SMask"]["/BitsPerComponent"] == 8
+        assert sig.get_data() == b"\x10\x10\x40" * 300 * 100
+        assert sig["/SMask"].get_data() == b"\xff" * 300 * 100
+
+        content = reader.pages[0].get_contents().get_data().decode()
+        mm = 72 / 25.4
+        # 60 x 20 mm box at (10, 10) mm fits the 3:1 image exactly; the 2:1 initials are
+        # centred in the 20 mm square and turned 90 degrees clockwise about its centre
+        ops = [line.split() for line in content.splitlines() if line.endswith("Do Q")]
+        assert len(ops) == 2
+        assert [float(v) for v in ops[0][1:7]] == pytest.approx([60 * mm, 0, 0, 20 * mm, 10 * mm, 10 * mm], abs=1e-3)
+        cx, cy, w, h = 110 * mm, 20 * mm, 20 * mm, 10 * mm
+        assert [float(v) for v in ops[1][1:7]] == pytest.approx([0, -w, h, 0, cx - h / 2, cy + w / 2], abs=1e-3)
+        assert reader.get_fields()["DUP"]  # form untouched
+
+    def test_png_variants_and_errors(self, minimal_pdf: Path) -> None:
+        from pdf_stamp import _jpeg_image, _png_image, stamp_writer
+
+        # RGB and palette PNGs go in without decoding (PNG predictor in /DecodeParms)
+        entries, data, mask, _ = _png_image(_png_bytes(4, 2, color_type=2, pixel=b"\x01\x02\x03"))
+        assert mask is None and entries["/DecodeParms"]["/Predictor"] == 15
+        entries, _, mask, _ = _png_image(_png_bytes(4, 2, color_type=3, pixel=b"\x01", PLTE=b"\0\0\0\xff\0\0", tRNS=b"\xff\x40"))
+        assert entries["/ColorSpace"][0] == "/Indexed" and __import__("zlib").decompress(mask) == b"\x40" * 8
+        jpeg = b"\xff\xd8\xff\xe0\x00\x04JF\xff\xc0\x00\x0b\x08\x00\x20\x00\x40\x03\x01\x11\x00\xff\xd9"
+        assert (_jpeg_image(jpeg)["/Width"], _jpeg_image(jpeg)["/Height"]) == (64, 32)
+
+        writer = PdfWriter(clone_from=PdfReader(str(minimal_pdf)))
+        box = {"page": 1, "x": 0, "y": 0, "width": 10, "height": 10}
+        with pytest.raises(ValueError, match="data URL"):
+            stamp_writer(writer, [{**box, "signature_data": "not-a-url"}])
+        with pytest.raises(ValueError, match="PNG or JPEG"):
+            stamp_writer(writer, [{**box, "signature_data": _data_url(b"GIF89a")}])
+        with pytest.raises(ValueError, match="out of range"):
+            stamp_writer(writer, [{**box, "page": 5, "signature_data": _data_url(jpeg, "image/jpeg")}])
+        with pytest.raises(ValueError, match="Unknown fit"):
+            stamp_writer(writer, [], fit="cover")
+
+    def test_stage_reads_coordinates_json(self, multipage_form_pdf: Path, tmp_path: Path) -> None:
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        coordinates = tmp_path / "coordinates.json"
+        coordinates.write_text(json.dumps({
+            "pdf_url": "https://example.com/doc.pdf",
+            "unit": "pt",
+            "origin": "top_left",
+            "signature_boxes": [
+                {"name": "s", "page": p, "x": 50, "y": 50, "width": 90, "height": 30, "angle": 0,
+                 "signature_data": _data_url(_png_bytes(30, 10))}
+                for p in (1, 3)
+            ],
+        }))
+        out = tmp_path / "stamped.pdf"
+        stages = normalize_stage_specs([{"name": "stamp", "coordinates": str(coordinates), "fit": "fill"}, "flatten"])
+        report = run_pipeline(multipage_form_pdf, out, stages)
+        assert [t["stage"] for t in report["stages"]] == ["parse", "stamp", "flatten", "serialize", "write"]
+        assert report["stages"][1]["stats"]["stamped"] == 2
+        content = PdfReader(str(out)).pages[2].get_contents().get_data().decode()
+        assert "q 90 0 0 30 50 762 cm /SigImg" in content  # 842 - 50 - 30
+
+
+class TestPdfOptimize:
+    """Tests for .scripts/pdf_optimize.py (GC, duplicate merging, object/xref streams)."""
+
+    def test_apply_optimize_drops_hidden_widget_objects(self, form_pdf: Path, tmp_path: Path) -> None:
+        import io
+
+        from apply_acroform_patches import apply_patches
+
+        patches_path = tmp_path / "hide.json"
+        patches_path.write_text(json.dumps([{"fieldId": "DUP@1-1", "hidden": True}]), encoding="utf-8")
+        plain = apply_patches(form_pdf, patches_path)
+        optimized = apply_patches(form_pdf, patches_path, optimize=True)
+
+        assert len(optimized) < len(plain)
+        assert b"/Type /XRef" in optimized and b"/Type /ObjStm" in optimized
+        assert b"\nxref\n" not in optimized
+        reader = PdfReader(io.BytesIO(optimized), strict=True)
+        annots = reader.pages[0]["/Annots"]
+        assert len(annots) == 1
+        # The hidden widget is gone from /AcroForm /Fields too, and nothing dangles
+        fields = reader.trailer["/Root"]["/AcroForm"]["/Fields"]
+        assert len(fields) == 1
+        for num in range(1, reader.trailer["/Size"]):
+            assert reader.get_object(num) is not None
+
+    def test_flatten_then_optimize_collects_widgets(self, form_pdf: Path, tmp_path: Path) -> None:
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        out = tmp_path / "out.pdf"
+        stages = normalize_stage_specs([{"name": "fill", "values": {"DUP": "x"}}, "flatten", {"name": "optimize", "level": 9}])
+        report = run_pipeline(form_pdf, out, stages)
+        by_stage = {t["stage"]: t for t in report["stages"]}
+        stats = by_stage["optimize"]["stats"]
+        assert stats["objectsAfter"] < stats["objectsBefore"]
+        assert stats["unreachable"] > 0
+        assert by_stage["serialize"]["bytes"] == out.stat().st_size == stats["bytes"]
+        reader = PdfReader(str(out), strict=True)
+        assert "/AcroForm" not in reader.trailer["/Root"]
+        assert "x" in reader.pages[0].extract_text()
+
+    def test_identical_streams_are_merged_but_pages_are_not(self) -> None:
+        import io
+
+        from pdf_optimize import write_optimized
+        from pypdf.generic import DictionaryObject, NameObject, StreamObject
+
+        writer = PdfWriter()
+        for _ in range(2):
+            page = writer.add_blank_page(width=100, height=100)
+            content = StreamObject()
+            content.set_data(b"0 0 m 100 100 l S")
+            page[NameObject("/Contents")] = writer._add_object(content)
+            page[NameObject("/Resources")] = DictionaryObject()
+        buf = io.BytesIO()
+        stats = write_optimized(writer, buf)
+        assert stats["duplicates"] >= 1
+        reader = PdfReader(io.BytesIO(buf.getvalue()), strict=True)
+        assert len(reader.pages) == 2
+        assert reader.pages[0].indirect_reference != reader.pages[1].indirect_reference
+        assert reader.pages[0]["/Contents"] == reader.pages[1]["/Contents"]
+
+    def test_cli_optimize_flag_reports_objects(self, form_pdf: Path, tmp_path: Path) -> None:
+        patches_path = tmp_path / "hide.json"
+        patches_path.write_text(json.dumps([{"fieldId": "DUP@1-1", "hidden": True}]), encoding="utf-8")
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(form_pdf), "--patches", str(patches_path), "--optimize"],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0
+        assert result.stdout.startswith(b"%PDF-1.")
+        assert b"input_bytes=" in result.stderr and b"objects=" in result.stderr
+
+
+def _uncompressed_pdf(pages: int = 4) -> bytes:
+    """PDF whose pages have large uncompressed content streams plus one DCT and one predictor stream."""
+    import io
+
+    from pypdf.generic import DictionaryObject, NameObject, NumberObject, StreamObject
+
+    writer = PdfWriter()
+    for i in range(pages):
+        page = writer.add_blank_page(width=200, height=200)
+        content = StreamObject()
+        content.set_data(f"BT /F1 12 Tf 10 {i} Td (page {i}) Tj ET\n".encode() * 400)
+        page[NameObject("/Contents")] = writer._add_object(content)
+    jpeg = StreamObject()
+    jpeg.set_data(b"\xff\xd8" + b"\x00" * 500)
+    jpeg[NameObject("/Filter")] = NameObject("/DCTDecode")
+    writer._add_object(jpeg)
+    predicted = StreamObject()
+    predicted.set_data(__import__("zlib").compress(b"\x02" * 600, 1))
+    predicted[NameObject("/Filter")] = NameObject("/FlateDecode")
+    predicted[NameObject("/DecodeParms")] = DictionaryObject({NameObject("/Predictor"): NumberObject(12)})
+    writer._add_object(predicted)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class TestPdfRecompress:
+    """Tests for .scripts/pdf_recompress.py (threaded zlib recompression)."""
+
+    def test_recompress_saves_bytes_and_keeps_content(self) -> None:
+        import io
+
+        from pdf_recompress import recompress_writer
+
+        data = _uncompressed_pdf()
+        outputs = []
+        for workers, batch_bytes in ((1, 1 << 20), (3, 1)):
+            writer = PdfWriter(clone_from=PdfReader(io.BytesIO(data)))
+            stats = recompress_writer(writer, level=9, workers=workers, batch_bytes=batch_bytes)
+            assert stats["streams"] == 4  # DCT and predictor streams are skipped
+            assert stats["recompressed"] == 4
+            assert stats["bytesSaved"] > 0 and stats["bytesAfter"] < stats["bytesBefore"]
+            assert stats["batches"] == (1 if batch_bytes > 1 else 4)
+            buf = io.BytesIO()
+            writer.write(buf)
+            outputs.append(buf.getvalue())
+        assert outputs[0] == outputs[1]
+        assert len(outputs[0]) < len(data)
+        reader = PdfReader(io.BytesIO(outputs[0]))
+        assert reader.pages[2].get_contents().get_data().startswith(b"BT /F1 12 Tf 10 2 Td (page 2) Tj ET")
+
+    def test_flate_streams_only_replaced_when_smaller(self) -> None:
+        import io
+
+        from pdf_recompress import recompress_writer
+
+        writer = PdfWriter(clone_from=PdfReader(io.BytesIO(_uncompressed_pdf(1))))
+        first = recompress_writer(writer, level=9)
+        again = recompress_writer(writer, level=1)
+        assert first["recompressed"] == 1
+        assert again["streams"] == 1 and again["recompressed"] == 0 and again["bytesSaved"] == 0
+
+    def test_stage_and_apply_cli(self, tmp_path: Path) -> None:
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        src = tmp_path / "unc.pdf"
+        src.write_bytes(_uncompressed_pdf())
+        out = tmp_path / "out.pdf"
+        report = run_pipeline(src, out, normalize_stage_specs([{"name": "recompress", "level": 6, "workers": 2}]))
+        stats = {t["stage"]: t for t in report["stages"]}["recompress"]["stats"]
+        assert stats["workers"] == 2 and stats["bytesSaved"] > 0
+        assert report["outputBytes"] < report["inputBytes"]
+
+        patches = tmp_path / "p.json"
+        patches.write_text("[]")
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(src), "--patches", str(patches), "--compress"],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+        )
+        assert result.returncode == 0
+        assert b"compressed_streams=4" in result.stderr
+        assert len(result.stdout) < src.stat().st_size
+
+
+class TestPdfLinearize:
+    """Tests for .scripts/pdf_linearize.py (linearized output and its verification)."""
+
+    @staticmethod
+    def _shared_resources_pdf() -> bytes:
+        """4 pages: one font on every page, one XObject on pages 2-3 only, private content per page."""
+        import io
+
+        from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+        n = NameObject
+        writer = PdfWriter()
+        font = writer._add_object(DictionaryObject({n("/Type"): n("/Font"), n("/Subtype"): n("/Type1"), n("/BaseFont"): n("/Helvetica")}))
+        logo = StreamObject()
+        logo.set_data(b"0 0 10 10 re f")
+        logo.update({n("/Type"): n("/XObject"), n("/Subtype"): n("/Form")})
+        logo[n("/BBox")] = ArrayObject([NumberObject(v) for v in (0, 0, 10, 10)])
+        logo_ref = writer._add_object(logo)
+        for i in range(4):
+            page = writer.add_blank_page(width=200, height=200)
+            resources = DictionaryObject({n("/Font"): DictionaryObject({n("/F1"): font})})
+            ops = f"BT /F1 12 Tf 10 10 Td (page {i + 1}) Tj ET\n"
+            if i in (1, 2):
+                resources[n("/XObject")] = DictionaryObject({n("/L"): logo_ref})
+                ops += "/L Do\n"
+            page[n("/Resources")] = resources
+            content = StreamObject()
+            content.set_data(ops.encode())
+            page[n("/Contents")] = writer._add_object(content)
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    def _linearize(self, data: bytes) -> tuple[bytes, dict]:
+        import io
+
+        from pdf_linearize import write_linearized
+
+        buf = io.BytesIO()
+        stats = write_linearized(PdfWriter(clone_from=PdfReader(io.BytesIO(data))), buf)
+        return buf.getvalue(), stats
+
+    def test_form_is_linearized_and_unchanged(self, multipage_form_pdf: Path) -> None:
+        import io
+
+        from pdf_linearize import check_linearization
+
+        out, stats = self._linearize(multipage_form_pdf.read_bytes())
+        assert stats["pages"] == 3 and stats["bytes"] == len(out)
+        report = check_linearization(out, use_qpdf=False)
+        assert report["linearized"], report["errors"]
+        assert report["pages"] == 3 and report["fileSize"] == len(out)
+        assert out.index(b"/Linearized") < 1024
+        reader = PdfReader(io.BytesIO(out))
+        assert report["firstPageObject"] == reader.pages[0].indirect_reference.idnum
+        before = PdfReader(multipage_form_pdf)
+        assert [len(p["/Annots"]) for p in reader.pages] == [len(p["/Annots"]) for p in before.pages]
+        assert [a.get_object()["/V"] for p in reader.pages for a in p["/Annots"]] == ["0", "1", "2"]
+
+    def test_shared_objects_and_first_page_first(self) -> None:
+        import io
+
+        from pdf_linearize import check_linearization
+
+        out, _ = self._linearize(self._shared_resources_pdf())
+        report = check_linearization(out, use_qpdf=False)
+        assert report["linearized"], report["errors"]
+        reader = PdfReader(io.BytesIO(out))
+        assert [p.extract_text().strip() for p in reader.pages] == [f"page {i}" for i in range(1, 5)]
+
+        # Page 1 (with its 15 KB content stream) is complete long before the end of the file
+        out, stats = self._linearize(_uncompressed_pdf(pages=6))
+        assert check_linearization(out, use_qpdf=False)["linearized"]
+        assert 15_000 < stats["firstPageEnd"] < len(out) / 4
+
+    def test_check_rejects_plain_and_modified_files(self, form_pdf: Path) -> None:
+        from pdf_linearize import check_linearization
+
+        plain = form_pdf.read_bytes()
+        report = check_linearization(plain, use_qpdf=False)
+        assert not report["linearized"]
+        assert "no linearization dictionary" in report["errors"][0]
+
+        out, _ = self._linearize(plain)
+        # An incremental update appended after linearization breaks /L
+        report = check_linearization(out + b"\n% appended update\n", use_qpdf=False)
+        assert not report["linearized"]
+        assert "/L" in report["errors"][0]
+
+    def test_stage_apply_and_check_cli(self, tmp_path: Path, multipage_form_pdf: Path) -> None:
+        import os
+
+        from pdf_linearize import check_linearization
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        out = tmp_path / "lin.pdf"
+        report = run_pipeline(multipage_form_pdf, out, normalize_stage_specs(["fill", "linearize"]))
+        stats = {t["stage"]: t for t in report["stages"]}["linearize"]["stats"]
+        assert stats["bytes"] == out.stat().st_size and stats["firstPageEnd"] > 0
+        check = [sys.executable, str(SCRIPTS_DIR / "pdf_linearize.py"), "--no-qpdf", "--check"]
+        result = subprocess.run([*check, str(out)], capture_output=True, text=True)
+        assert result.returncode == 0
+        assert json.loads(result.stdout)["linearized"] is True
+        assert subprocess.run([*check, str(multipage_form_pdf)], capture_output=True).returncode == 1
+
+        patches = tmp_path / "p.json"
+        patches.write_text(json.dumps([{"fieldId": "p1-0", "defaultValue": "X"}]))
+        result = subprocess.run(
+            ["python3", str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(multipage_form_pdf), "--patches", str(patches)],
+            capture_output=True,
+            cwd=BUNDLE_ROOT,
+            env={**os.environ, "PDF_APPLY_LINEARIZE": "1"},
+        )
+        assert result.returncode == 0
+        assert b"first_page_end=" in result.stderr
+        assert check_linearization(result.stdout, use_qpdf=False)["linearized"]
+
+
+@pytest.fixture(scope="module")
+def signing_identity(tmp_path_factory: pytest.TempPathFactory) -> tuple[Path, bytes]:
+    """Fixture: self-signed RSA-2048 certificate as (PKCS#12 path with passphrase "secret", certificate DER)."""
+    pytest.importorskip("pyhanko")
+    import datetime
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.serialization import pkcs12
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "PdfSignable Test Signer")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .sign(key, hashes.SHA256())
+    )
+    path = tmp_path_factory.mktemp("pki") / "signer.p12"
+    path.write_bytes(
+        pkcs12.serialize_key_and_certificates(b"signer", key, cert, None, serialization.BestAvailableEncryption(b"secret"))
+    )
+    return path, cert.public_bytes(serialization.Encoding.DER)
+
+
+def _validate_signatures(path: Path, cert_der: bytes) -> list:
+    """Validate every embedded signature of path against the test certificate; return them."""
+    from asn1crypto import x509 as asn1_x509
+    from pyhanko.pdf_utils.reader import PdfFileReader
+    from pyhanko.sign.validation import validate_pdf_signature
+    from pyhanko_certvalidator import ValidationContext
+
+    root = asn1_x509.Certificate.load(cert_der)
+    with open(path, "rb") as f:
+        sigs = PdfFileReader(f).embedded_signatures
+        for sig in sigs:
+            status = validate_pdf_signature(sig, ValidationContext(trust_roots=[root]))
+            assert status.intact and status.valid and status.trusted, sig.field_name
+        return [(sig.field_name, sig.sig_field["/Kids"][0]["/Rect"] if "/Kids" in sig.sig_field else sig.sig_field["/Rect"]) for sig in sigs]
+
+
+class TestPdfBatchSign:
+    """Tests for .scripts/pdf_batch_sign.py (pyHanko; skipped when it is not installed)."""
+
+    @pytest.fixture
+    def plain_pdf(self, tmp_path: Path) -> Path:
+        """3 blank A4 pages with one uniquely named text field (diff analysis rejects duplicate names)."""
+        from pypdf.generic import ArrayObject, DictionaryObject, NameObject
+
+        writer = PdfWriter()
+        for _ in range(3):
+            writer.add_blank_page(width=595, height=842)
+        ref = _create_widget(writer, "name", [100, 700, 250, 730], "x")
+        writer.pages[0][NameObject("/Annots")] = ArrayObject([ref])
+        writer.root_object[NameObject("/AcroForm")] = DictionaryObject({NameObject("/Fields"): ArrayObject([ref])})
+        path = tmp_path / "plain.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        return path
+
+    def _jobs(self, src: Path, tmp_path: Path, count: int) -> list[dict]:
+        return [
+            {
+                "input": str(src),
+                "output": str(tmp_path / f"signed{i}.pdf"),
+                "unit": "mm",
+                "origin": "top_left",
+                "signature_boxes": [
+                    {"name": "signer", "page": 1, "x": 10, "y": 10, "width": 50, "height": 20},
+                    {"name": "signer", "page": 3, "x": 10, "y": 40, "width": 50, "height": 20},
+                ],
+            }
+            for i in range(count)
+        ]
+
+    def test_boxes_signed_incrementally_with_one_key_load(
+        self, tmp_path: Path, plain_pdf: Path, signing_identity: tuple[Path, bytes]
+    ) -> None:
+        from pdf_batch_sign import sign_batch
+        from pdf_coords import box_to_rect
+
+        p12, cert = signing_identity
+        report = sign_batch(self._jobs(plain_pdf, tmp_path, 3), p12, b"secret", workers=1, reason="Approved")
+        assert report["documents"] == 3 and report["signatures"] == 6 and report["errors"] == 0
+        assert report["keyLoads"] == 1 and report["signaturesPerSec"] > 0
+        signed = tmp_path / "signed0.pdf"
+        assert signed.read_bytes().startswith(plain_pdf.read_bytes())  # incremental updates
+        fields = _validate_signatures(signed, cert)
+        assert [name for name, _ in fields] == ["signer", "signer_2"]
+        expected = box_to_rect(10, 10, 50, 20, "mm", "top_left", (0, 0, 595, 842))
+        assert expected[0] == pytest.approx(28.35, abs=0.01) and expected[3] == pytest.approx(813.65, abs=0.01)
+        assert [float(v) for v in fields[0][1]] == pytest.approx(expected, abs=0.1)  # pyHanko rounds /Rect
+        assert PdfReader(signed).get_fields()["name"]["/V"] == "x"  # existing form untouched
+
+    def test_signer_subclass_signs_with_parsed_key(self, signing_identity: tuple[Path, bytes]) -> None:
+        import asyncio
+
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+        from cryptography.x509 import load_der_x509_certificate
+        from pdf_batch_sign import load_signer
+        from pyhanko.sign.signers import SimpleSigner
+
+        signer = load_signer(signing_identity[0], b"secret")
+        assert isinstance(signer, SimpleSigner) and "sign_raw" not in vars(signer)  # no instance patching
+        signature = asyncio.run(signer.async_sign_raw(b"data", "sha256"))
+        public_key = load_der_x509_certificate(signer.signing_cert.dump()).public_key()
+        public_key.verify(signature, b"data", PKCS1v15(), hashes.SHA256())
+
+    def test_process_pool_and_errors(
+        self, tmp_path: Path, plain_pdf: Path, signing_identity: tuple[Path, bytes]
+    ) -> None:
+        from pdf_batch_sign import sign_batch
+
+        p12, cert = signing_identity
+        jobs = self._jobs(plain_pdf, tmp_path, 2)
+        jobs.append({"input": str(tmp_path / "missing.pdf"), "output": str(tmp_path / "x.pdf"), "signature_boxes": [{}]})
+        jobs.append({**jobs[0], "output": str(tmp_path / "bad.pdf"), "signature_boxes": [{"page": 9, "x": 0, "y": 0, "width": 1, "height": 1}]})
+        report = sign_batch(jobs, p12, b"secret", workers=2)
+        assert report["workers"] == 2 and report["keyLoads"] == 3  # parent check + one per worker
+        assert report["signatures"] == 4 and report["errors"] == 2
+        assert "File not found" in report["jobs"][2]["error"]
+        assert "out of range" in report["jobs"][3]["error"]
+        assert len(_validate_signatures(tmp_path / "signed1.pdf", cert)) == 2
+        with pytest.raises(ValueError, match="Cannot load"):
+            sign_batch(jobs, p12, b"wrong", workers=1)
+
+    def test_cli_and_sign_stage(
+        self, tmp_path: Path, plain_pdf: Path, signing_identity: tuple[Path, bytes]
+    ) -> None:
+        import os
+
+        from process_modified_pdf import normalize_stage_specs, run_pipeline
+
+        p12, cert = signing_identity
+        jobs_file = tmp_path / "jobs.json"
+        jobs_file.write_text(json.dumps({"jobs": self._jobs(plain_pdf, tmp_path, 1)}))
+        cmd = [sys.executable, str(SCRIPTS_DIR / "pdf_batch_sign.py"), "--pkcs12", str(p12), "--jobs", str(jobs_file)]
+        result = subprocess.run(cmd, capture_output=True, text=True, env={**os.environ, "PDF_SIGN_PASSPHRASE": "secret"})
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout)["signatures"] == 2
+        result = subprocess.run(cmd, capture_output=True, text=True, env={**os.environ, "PDF_SIGN_PASSPHRASE": "nope"})
+        assert result.returncode == 2  # pyHanko logs its own message first; the JSON error is the last line
+        assert "Cannot load" in json.loads(result.stderr.strip().splitlines()[-1])["error"]
+
+        os.environ["TEST_SIGN_PASS"] = "secret"
+        try:
+            out = tmp_path / "processed.pdf"
+            stage = {"name": "sign", "pkcs12": str(p12), "passphraseEnv": "TEST_SIGN_PASS", "unit": "pt",
+                     "signature_boxes": [{"page": 2, "x": 100, "y": 100, "width": 120, "height": 40}]}
+            report = run_pipeline(plain_pdf, out, normalize_stage_specs(["fill", stage]))
+        finally:
+            del os.environ["TEST_SIGN_PASS"]
+        assert [t["stage"] for t in report["stages"]] == ["parse", "fill", "serialize", "sign", "write"]
+        assert report["stages"][3]["stats"] == {"signatures": 1}
+        assert _validate_signatures(out, cert)[0][0] == "Signature"
+
+
+class TestBenchAcroform:
+    """Tests for .scripts/bench_acroform.py (benchmark suite and baseline comparison)."""
+
+    def test_patch_sets_apply_to_generated_document(self, tmp_path: Path) -> None:
+        from apply_acroform_patches import apply_patches
+        from bench_acroform import build_document, build_patches
+
+        pdf = tmp_path / "form.pdf"
+        pdf.write_bytes(build_document(2, 6))
+        counts = {}
+        for kind in ("small", "large", "create", "hidden"):
+            patches = tmp_path / f"{kind}.json"
+            patches.write_text(json.dumps(build_patches(kind, 2, 6)))
+            reader = PdfReader(__import__("io").BytesIO(apply_patches(pdf, patches)))
+            counts[kind] = sum(len(page.get("/Annots") or []) for page in reader.pages)
+        assert counts == {"small": 12, "large": 12, "create": 24, "hidden": 6}
+
+    def test_results_json_and_baseline_comparison(self, tmp_path: Path) -> None:
+        from bench_acroform import compare
+
+        script = SCRIPTS_DIR / "bench_acroform.py"
+        results = tmp_path / "results.json"
+        subprocess.run(
+            [sys.executable, str(script), "--sizes", "tiny", "--cases", "extract,process-copy", "--repeat", "1", "--output", str(results)],
+            check=True,
+        )
+        data = json.loads(results.read_text())
+        assert set(data["results"]) == {"extract@tiny", "process-copy@tiny"}
+        extract = data["results"]["extract@tiny"]
+        assert extract["seconds"] > 0 and extract["outputBytes"] > 0 and extract["widgets"] == 5
+
+        assert compare(data, data, 0) == []
+        baseline = json.loads(json.dumps(data))
+        baseline["results"]["extract@tiny"]["outputBytes"] = extract["outputBytes"] // 2
+        baseline["results"]["extract@tiny"]["seconds"] = extract["seconds"] / 4
+        assert [f.split(":")[0] for f in compare(data, baseline, 50)] == ["extract@tiny seconds", "extract@tiny outputBytes"]
+        assert compare(data, baseline, 500) == []
+
+        baseline_path = tmp_path / "baseline.json"
+        baseline_path.write_text(json.dumps(baseline))
+        result = subprocess.run(
+            [sys.executable, str(script), "--sizes", "tiny", "--cases", "extract", "--repeat", "1", "--compare", str(baseline_path), "--threshold", "50"],
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 1 and "REGRESSION extract@tiny outputBytes" in result.stderr
+
+
+class TestGenerateCorpus:
+    """Tests for .scripts/PoC/generate_corpus.py (seeded synthetic forms)."""
+
+    def test_same_seed_same_bytes_and_requested_structure(self) -> None:
+        sys.path.insert(0, str(SCRIPTS_DIR / "PoC"))
+        from generate_corpus import generate_document
+        from pypdf.generic import IndirectObject
+
+        data = generate_document(pages=2, widgets=9, seed=5, depth=2, fanout=3, noise=4, da="widget", image_kb=3)
+        assert generate_document(pages=2, widgets=9, seed=5, depth=2, fanout=3, noise=4, da="widget", image_kb=3) == data
+        assert generate_document(pages=2, widgets=9, seed=6, depth=2, fanout=3, noise=4, da="widget", image_kb=3) != data
+
+        reader = PdfReader(__import__("io").BytesIO(data))
+        acroform = reader.trailer["/Root"]["/AcroForm"]
+        assert "/DA" not in acroform
+        top = [f.get_object() for f in acroform["/Fields"]]
+        assert [f["/T"] for f in top] == ["g1_0", "g1_1"]  # 18 widgets / 3 per group = 6 groups, 3 per top group
+        assert sum(len(g.get_object()["/Kids"]) for f in top for g in f["/Kids"]) == 18
+        for page in reader.pages:
+            annots = [a.get_object() for a in page["/Annots"]]
+            widgets = [a for a in annots if a["/Subtype"] == "/Widget"]
+            assert len(widgets) == 9 and len(annots) == 13
+            assert all(w["/DA"].endswith(" Tf 0 g") and w["/Parent"].get_object()["/T"].startswith("g2_") for w in widgets)
+            image = next(iter(page["/Resources"]["/XObject"].values())).get_object()
+            assert len(image.get_data()) == image["/Width"] * image["/Height"] * 3 >= 3000
+            contents = page.raw_get("/Contents")
+            assert all(isinstance(c, IndirectObject) for c in contents.get_object())  # streams stay indirect
+        assert len(PdfWriter(clone_from=reader).pages) == 2
+
+        flat = PdfReader(__import__("io").BytesIO(generate_document(pages=1, widgets=3)))
+        assert flat.trailer["/Root"]["/AcroForm"]["/DA"] == "/Helv 10 Tf 0 g"
+        assert sorted(flat.get_fields()) == ["f1_0", "f1_1", "f1_2"]
+        with pytest.raises(ValueError, match="Unknown da"):
+            generate_document(da="none")
+
+    def test_cli_and_corpus_manifest(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        sys.path.insert(0, str(SCRIPTS_DIR / "PoC"))
+        import generate_corpus
+
+        script = SCRIPTS_DIR / "PoC" / "generate_corpus.py"
+        out = tmp_path / "form.pdf"
+        result = subprocess.run(
+            [sys.executable, str(script), "--output", str(out), "--pages", "2", "--widgets", "4", "--seed", "3", "--noise", "2"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert out.read_bytes() == generate_corpus.generate_document(pages=2, widgets=4, seed=3, noise=2)
+        assert json.loads(result.stdout)["bytes"] == out.stat().st_size
+
+        monkeypatch.setattr(generate_corpus, "CORPUS", {"a": {"pages": 1, "widgets": 2}, "b": {"pages": 2, "widgets": 1, "depth": 1}})
+        manifest = generate_corpus.generate_corpus(tmp_path / "corpus", seed=9)
+        assert json.loads((tmp_path / "corpus" / "manifest.json").read_text()) == manifest
+        assert manifest["seed"] == 9 and set(manifest["documents"]) == {"a", "b"}
+        data = (tmp_path / "corpus" / "b.pdf").read_bytes()
+        assert manifest["documents"]["b"]["sha256"] == __import__("hashlib").sha256(data).hexdigest()
+
+
+IMPORT_BUDGET_MS = 150  # script-owned imports (after site) of a usage/argument error, with -X importtime overhead
+
+
+def _top_level_imports(stderr: str) -> dict[str, int]:
+    """Top-level modules imported after site in -X importtime output -> cumulative microseconds."""
+    imports: dict[str, int] = {}
+    after_site = False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "site" and not name.startswith("  "):
+            after_site = True
+        elif after_site and not name.startswith("  "):
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+class TestStartupImports:
+    """Startup budget of the script entry points and the .scripts/build_zipapp.py bundles."""
+
+    def test_usage_errors_exit_before_pypdf_within_budget(self, form_pdf: Path, tmp_path: Path) -> None:
+        bad_patches = tmp_path / "bad.json"
+        bad_patches.write_text("{not json")
+        cases = [
+            ["extract_acroform_fields.py"],
+            ["extract_acroform_fields.py", str(tmp_path / "missing.pdf")],
+            ["apply_acroform_patches.py", "--pdf", str(form_pdf)],
+            ["apply_acroform_patches.py", "--pdf", str(form_pdf), "--patches", str(bad_patches)],
+            ["process_modified_pdf.py", "--input", str(tmp_path / "missing.pdf"), "--output", str(tmp_path / "o.pdf")],
+        ]
+        for script, *args in cases:
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", str(SCRIPTS_DIR / script), *args], capture_output=True, text=True
+            )
+            assert result.returncode != 0, (script, args)
+            imports = _top_level_imports(result.stderr)
+            assert "acroform_core" in imports or "pdf_digest" in imports
+            assert not {"pypdf", "threading", "tracemalloc", "cProfile"} & set(imports), (script, args, sorted(imports))
+            assert sum(imports.values()) / 1000 < IMPORT_BUDGET_MS, (script, args, imports)
+
+    def test_zipapp_bundles_run_like_the_scripts(self, form_pdf: Path, tmp_path: Path) -> None:
+        from build_zipapp import ENTRY_POINTS, build_zipapps
+
+        built = build_zipapps(tmp_path / "dist")
+        assert sorted(built) == sorted(ENTRY_POINTS)
+        import zipfile
+
+        names = zipfile.ZipFile(built["extract_acroform_fields"]).namelist()
+        assert {"__main__.py", "extract_acroform_fields.pyc", "pdf_flatten.pyc", "acroform_core.py"} <= set(names)
+        assert not any(name.startswith(("bench_acroform", "build_zipapp", "test/")) for name in names)
+        script = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf)], capture_output=True, check=True
+        )
+        bundle = subprocess.run([sys.executable, built["extract_acroform_fields"], str(form_pdf)], capture_output=True, check=True)
+        assert bundle.stdout == script.stdout and len(json.loads(bundle.stdout)) == 2
+        out = tmp_path / "out.pdf"
+        result = subprocess.run(
+            [sys.executable, built["process_modified_pdf"], "--input", str(form_pdf), "--output", str(out), "--stages", "flatten"],
+            capture_output=True, text=True, check=True,
+        )
+        assert json.loads(result.stderr.strip().splitlines()[-1])["script"] == "process_modified_pdf"
+        assert not PdfReader(str(out)).get_fields()
+
+
+class TestReplayAcroform:
+    """Tests for .scripts/pdf_record.py (PDF_SCRIPTS_RECORD) and .scripts/replay_acroform.py."""
+
+    def test_recorder_spools_anonymized_calls(self, form_pdf: Path, tmp_path: Path) -> None:
+        import hashlib
+        import os
+
+        spool = tmp_path / "spool"
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([{"fieldId": "p1-0", "defaultValue": "Jane Doe", "label": "Nombre", "rect": [10, 10, 90, 30]}]))
+        env = {k: v for k, v in os.environ.items() if not k.startswith("PDF_")}
+        env.update({"PDF_SCRIPTS_RECORD": str(spool), "PDF_SCRIPTS_RECORD_PDFS": "1", "PDF_APPLY_COMPRESS": "6"})
+        result = subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "apply_acroform_patches.py"), "--pdf", str(form_pdf), "--patches", str(patches), "--optimize"],
+            capture_output=True, check=True, env=env,
+        )
+        assert result.stdout.startswith(b"%PDF") and json.loads(result.stderr.decode().strip().splitlines()[-1])["input_sha256"]
+        subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(form_pdf), "--format", "columnar"],
+            capture_output=True, check=True, env=env,
+        )
+        subprocess.run([sys.executable, str(SCRIPTS_DIR / "extract_acroform_fields.py"), str(tmp_path / "missing.pdf")], capture_output=True, env=env)
+        records = sorted((json.loads(p.read_text()) for p in (spool / "records").glob("*.json")), key=lambda r: r["startedAt"])
+        sha = hashlib.sha256(form_pdf.read_bytes()).hexdigest()
+        apply, extract, failed = records
+        assert apply["script"] == "apply_acroform_patches" and apply["exitCode"] == 0 and apply["inputSha256"] == sha
+        assert apply["args"] == ["--optimize"] and apply["env"] == {"PDF_APPLY_COMPRESS": "6"} and apply["durationMs"] > 0
+        assert extract["args"] == ["--format", "columnar"] and failed["exitCode"] == 2 and failed["inputSha256"] is None
+        stored = json.loads((spool / "patches" / f"{apply['patchesSha256']}.json").read_text())
+        assert stored == [{"fieldId": "p1-0", "defaultValue": "xxxx xxx", "label": "xxxxxx", "rect": [10, 10, 90, 30]}]
+        assert (spool / "pdfs" / f"{sha}.pdf").read_bytes() == form_pdf.read_bytes()
+
+    def test_replay_spawn_and_pool_report_latency(self, form_pdf: Path, tmp_path: Path) -> None:
+        from pdf_record import record
+        from replay_acroform import load_recordings, percentiles, replay
+
+        spool = tmp_path / "spool"
+        patches = tmp_path / "patches.json"
+        patches.write_text(json.dumps([{"fieldId": "p1-0", "defaultValue": "X"}]))
+        record(str(spool), "extract_acroform_fields", [str(form_pdf)], 1000.0, 12.0, 0, None)
+        record(str(spool), "apply_acroform_patches", ["--pdf", str(form_pdf), "--patches", str(patches)], 1000.5, 30.0, 0, None)
+        record(str(spool), "process_modified_pdf", ["--input", str(form_pdf), "--output", "o.pdf", "--stages", "flatten"], 1001.0, 20.0, 0, None)
+        record(str(spool), "extract_acroform_fields", ["--stdin"], 1002.0, 5.0, 0, None)
+        calls, missing = load_recordings(spool, [form_pdf.parent])
+        assert missing == 1 and [c["script"] for c in calls] == ["extract_acroform_fields", "apply_acroform_patches", "process_modified_pdf"]
+        assert calls[1]["patches"] and calls[2]["args"] == ["--stages", "flatten"] and calls[2]["offset"] == 1.0
+
+        spawned = replay(calls, "spawn", concurrency=2, requests=4)
+        assert spawned["requests"] == 4 and spawned["errors"] == 0 and spawned["exitCodes"] == {"0": 4}
+        assert spawned["byScript"]["extract_acroform_fields"]["requests"] == 2
+        pooled = replay(calls, "pool", concurrency=1, rate=50)
+        assert pooled["requests"] == 3 and pooled["errorRate"] == 0 and pooled["throughput"] > 0
+        latency = pooled["latencyMs"]
+        assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] == latency["max"]
+        assert percentiles(list(range(1, 101)))["p95"] == 95 and percentiles([])["p50"] is None
+
+
+class TestProcessQueue:
+    """Tests for .scripts/process_queue.py (spool-directory queue for the process step)."""
+
+    def test_worker_runs_jobs_and_reports_status_by_document_key(self, form_pdf: Path, tmp_path: Path) -> None:
+        from process_queue import enqueue, job_status, status_path, work
+
+        spool = tmp_path / "spool"
+        first = enqueue(str(spool), str(form_pdf), "contract-42")
+        second = enqueue(str(spool), str(form_pdf))
+        assert first["state"] == "queued" and first["id"] < second["id"]
+        assert job_status(str(spool), document_key="contract-42")["id"] == first["id"]
+        assert job_status(str(spool), job_id="../jobs/x") is None and job_status(str(spool), document_key="other") is None
+
+        counts = work(str(spool), concurrency=2, once=True, poll_interval=0.05)
+        assert counts["done"] == 2 and counts["failed"] == counts["retrying"] == 0
+        job = job_status(str(spool), document_key="contract-42")
+        assert job["state"] == "done" and job["attempts"] == 1 and job["report"]["input_sha256"]
+        assert (spool / "results" / f"{first['id']}.pdf").read_bytes() == form_pdf.read_bytes()
+        assert not (spool / "jobs" / f"{first['id']}.pdf").exists()
+        assert Path(status_path(str(spool), "contract-42")).read_text() == (spool / "jobs" / f"{first['id']}.json").read_text()
+
+    def test_worker_retries_with_backoff_and_skips_locked_jobs(self, tmp_path: Path) -> None:
+        import fcntl
+        import os
+
+        from process_queue import enqueue, job_status, work
+
+        script = tmp_path / "flaky.py"
+        script.write_text(
+            "import argparse, json, os, sys\n"
+            "ap = argparse.ArgumentParser()\n"
+            "ap.add_argument('--input'); ap.add_argument('--output'); ap.add_argument('--document-key')\n"
+            "args = ap.parse_args()\n"
+            "data = open(args.input, 'rb').read()\n"
+            "if data.startswith(b'bad'):\n"
+            "    print(json.dumps({'error': 'Invalid PDF'}), file=sys.stderr); sys.exit(2)\n"
+            "marker = args.input + '.seen'\n"
+            "if not os.path.exists(marker):\n"
+            "    open(marker, 'w').close(); sys.exit(1)\n"
+            "open(args.output, 'wb').write(data)\n"
+        )
+        spool = tmp_path / "spool"
+        (tmp_path / "ok.pdf").write_bytes(b"%PDF-1.4 ok")
+        (tmp_path / "bad.pdf").write_bytes(b"bad")
+        flaky = enqueue(str(spool), str(tmp_path / "ok.pdf"), "flaky")
+        bad = enqueue(str(spool), str(tmp_path / "bad.pdf"), "bad")
+        locked = enqueue(str(spool), str(tmp_path / "ok.pdf"), "locked")
+        fd = os.open(str(spool / "jobs" / f"{locked['id']}.lock"), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            counts = work(str(spool), concurrency=1, once=True, poll_interval=0.05, backoff=0, script=str(script))
+        finally:
+            os.close(fd)
+        assert counts == {"done": 1, "retrying": 1, "failed": 1, "purged": 0}
+        flaky_job = job_status(str(spool), job_id=flaky["id"])
+        assert flaky_job["state"] == "done" and flaky_job["attempts"] == 2 and flaky_job["error"] is None
+        bad_job = job_status(str(spool), document_key="bad")
+        assert bad_job["state"] == "failed" and bad_job["attempts"] == 1 and bad_job["error"] == "Invalid PDF"
+        assert job_status(str(spool), document_key="locked")["state"] == "queued"
+
+        slow = enqueue(str(spool), str(tmp_path / "ok.pdf"), "slow")
+        work(str(spool), once=True, poll_interval=0.05, backoff=60, max_attempts=3, script=str(script))
+        slow_job = job_status(str(spool), job_id=slow["id"])
+        assert slow_job["state"] == "retrying" and slow_job["notBefore"] > slow_job["updatedAt"] + 59
+
+
 class TestMinimalPdfBytes:
     """Tests for _minimal_pdf_bytes helper."""
 
@@ -656,6 +2586,69 @@ class TestExtractHelpers:
             assert out[1]["id"].startswith("A@")
 
 
+class TestAcroformCore:
+    """Tests for the shared __slots__ model in acroform_core.py."""
+
+    def test_field_descriptor_behaves_like_mapping_and_serializes(self) -> None:
+        from acroform_core import FIELD_KEYS, FieldDescriptor, json_default
+
+        values = ("A", [1.0, 2.0, 3.0, 4.0], 2.0, 2.0, "Tx", "v", 1, "Widget", "A", 11.0, None, 4)
+        fd = FieldDescriptor(*values)
+        as_dict = dict(zip(FIELD_KEYS, values))
+        assert fd == as_dict
+        assert fd["fieldName"] == "A" and "rect" in fd and len(fd) == 12
+        assert not hasattr(fd, "__dict__")
+        assert json.loads(json.dumps([fd], default=json_default)) == [as_dict]
+        with pytest.raises(KeyError):
+            fd["missing"]
+
+    def test_field_patch_normalizes_aliases_once(self) -> None:
+        from acroform_core import FieldPatch
+
+        p = FieldPatch({
+            "field_id": "Name@2-3",
+            "field_name": " Name ",
+            "rect": ["1", 2, 3, 4],
+            "default_value": 5,
+            "font_size": 14,
+            "font_family": "courier",
+            "max_len": "8",
+            "controlType": "checkbox",
+            "create_if_missing": True,
+        })
+        assert p.field_id == "Name@2-3"
+        assert p.page_idx == (2, 3)
+        assert p.field_name == "Name"
+        assert p.rect == [1.0, 2.0, 3.0, 4.0]
+        assert p.default_value == "5"
+        assert p.da == "0 0 0 rg /Courier 14.0 Tf"
+        assert p.max_len == 8
+        assert p.field_type == "/Btn"
+        assert p.create_if_missing is True
+        assert not hasattr(p, "__dict__")
+
+    def test_field_patch_invalid_values_become_none(self) -> None:
+        from acroform_core import FieldPatch
+
+        p = FieldPatch({"fieldId": "pX-NaN", "rect": ["x", 1, 2, 3], "maxLen": "x", "fontSize": "abc", "page": "?"})
+        assert p.page_idx is None
+        assert p.rect is None
+        assert p.max_len is None
+        assert p.da is None
+        assert p.page == 0
+        assert FieldPatch({"fieldId": "p1-0", "defaultValue": None}).default_value is None
+
+    def test_load_patches_skips_non_list_and_non_objects(self, tmp_path: Path) -> None:
+        from acroform_core import load_patches
+
+        path = tmp_path / "p.json"
+        path.write_text('{"not": "list"}')
+        assert load_patches(path) == []
+        path.write_text('[1, "x", {"fieldId": "p1-0", "hidden": true}]')
+        patches = load_patches(path)
+        assert len(patches) == 1 and patches[0].hidden is True
+
+
 class TestApplyPatchHelpers:
     """Unit tests for helper functions in apply_acroform_patches.py."""
 
@@ -0,0 +1,181 @@
+<?php
+
+declare(strict_types=1);
+
+namespace Nowo\PdfSignableBundle\AcroForm;
+
+use RuntimeException;
+use Throwable;
+
+use function is_array;
+use function is_dir;
+use function is_string;
+use function sprintf;
+use function strlen;
+
+use const JSON_THROW_ON_ERROR;
+use const JSON_UNESCAPED_SLASHES;
+use const JSON_UNESCAPED_UNICODE;
+
+/**
+ * Spool-directory job queue for the process script (acroform.process_queue_dir).
+ *
+ * The bundle side of .scripts/process_queue.py: POST /acroform/process writes a job here and returns,
+ * the worker (process_queue.py work) runs the process script and records the outcome, and
+ * /acroform/process/status reads the state (GET) or takes the result (POST). Layout (see process_queue.py for the
+ * full format):
+ *
+ * - jobs/<id>.pdf and jobs/<id>.json: input PDF and job state ("queued", "running", "retrying", "done", "failed")
+ * - results/<id>.pdf: processed PDF once the job is done
+ * - status/<sha256(document key)>.json: state of the latest job for a document key
+ *
+ * Files are written to a temporary name and renamed, so the worker never sees a partial job.
+ *
+ * @internal
+ */
+final class ProcessQueue
+{
+    /** Job ids: 13-digit epoch milliseconds, dash, 12 hex digits (they sort in queue order). */
+    public const JOB_ID_PATTERN = '/^\d{13}-[0-9a-f]{12}$/';
+
+    public function __construct(
+        private readonly string $directory,
+    ) {
+    }
+
+    /**
+     * Adds a job for the given PDF bytes.
+     *
+     * @param string $pdfContents Input PDF
+     * @param string|null $documentKey Passed to the process script as --document-key; enables the status lookup by key
+     *
+     * @throws RuntimeException When the spool cannot be written
+     *
+     * @return array<string, mixed> The queued job
+     */
+    public function enqueue(string $pdfContents, ?string $documentKey): array
+    {
+        foreach (['jobs', 'results', 'status'] as $sub) {
+            $dir = $this->directory . '/' . $sub;
+            if (!is_dir($dir) && !@mkdir($dir, 0o775, true) && !is_dir($dir)) {
+                throw new RuntimeException('Cannot create process queue directory ' . $dir);
+            }
+        }
+        $id  = sprintf('%013d-%s', (int) floor(microtime(true) * 1000), bin2hex(random_bytes(6)));
+        $now = round(microtime(true), 3);
+        $job = [
+            'version'     => 1,
+            'id'          => $id,
+            'documentKey' => $documentKey,
+            'state'       => 'queued',
+            'attempts'    => 0,
+            'createdAt'   => $now,
+            'updatedAt'   => $now,
+            'notBefore'   => 0,
+            'error'       => null,
+            'report'      => null,
+        ];
+        // Input first: the worker only looks at jobs/*.json
+        $this->writeAtomic($this->directory . '/jobs/' . $id . '.pdf', $pdfContents);
+        $json = json_encode($job, JSON_THROW_ON_ERROR | JSON_UNESCAPED_SLASHES | JSON_UNESCAPED_UNICODE);
+        $this->writeAtomic($this->directory . '/jobs/' . $id . '.json', $json);
+        if ($documentKey !== null) {
+            $this->writeAtomic($this->statusPath($documentKey), $json);
+        }
+
+        return $job;
+    }
+
+    /**
+     * Returns the job with the given id, or the latest job for the document key; null when there is none.
+     *
+     * @return array<string, mixed>|null
+     */
+    public function find(?string $documentKey, ?string $jobId = null): ?array
+    {
+        if ($jobId !== null) {
+            return preg_match(self::JOB_ID_PATTERN, $jobId) === 1 ? $this->readJson($this->directory . '/jobs/' . $jobId . '.json') : null;
+        }
+
+        return $documentKey !== null ? $this->readJson($this->statusPath($documentKey)) : null;
+    }
+
+    /**
+     * Whether the processed PDF of the job is waiting to be taken.
+     */
+    public function hasResult(string $jobId): bool
+    {
+        return preg_match(self::JOB_ID_PATTERN, $jobId) === 1 && is_file($this->resultPath($jobId));
+    }
+
+    /**
+     * Hands the processed PDF of a done job to $consumer; returns false when there is none (not done or already taken).
+     *
+     * The result is renamed before it is read, so concurrent takers cannot both get it. It is deleted only once
+     * $consumer returns; when $consumer throws, it is renamed back so a later call can deliver it again.
+     *
+     * @param callable(string): void $consumer Receives the PDF bytes
+     *
+     * @throws Throwable Whatever $consumer throws
+     */
+    public function takeResult(string $jobId, callable $consumer): bool
+    {
+        if (preg_match(self::JOB_ID_PATTERN, $jobId) !== 1) {
+            return false;
+        }
+        $result  = $this->resultPath($jobId);
+        $claimed = $result . '.' . bin2hex(random_bytes(4)) . '.taken';
+        if (!@rename($result, $claimed)) {
+            return false;
+        }
+        $contents = file_get_contents($claimed);
+        if ($contents === false) {
+            @rename($claimed, $result);
+
+            return false;
+        }
+        try {
+            $consumer($contents);
+        } catch (Throwable $e) {
+            @rename($claimed, $result);
+
+            throw $e;
+        }
+        @unlink($claimed);
+
+        return true;
+    }
+
+    private function resultPath(string $jobId): string
+    {
+        return $this->directory . '/results/' . $jobId . '.pdf';
+    }
+
+    private function statusPath(string $documentKey): string
+    {
+        return $this->directory . '/status/' . hash('sha256', $documentKey) . '.json';
+    }
+
+    /**
+     * @return array<string, mixed>|null
+     */
+    private function readJson(string $path): ?array
+    {
+        $contents = is_file($path) ? @file_get_contents($path) : false;
+        if (!is_string($contents)) {
+            return null;
+        }
+        $data = json_decode($contents, true);
+
+        return is_array($data) ? $data : null;
+    }
+
+    private function writeAtomic(string $path, string $contents): void
+    {
+        $tmp = $path . '.' . getmypid() . '.tmp';
+        if (@file_put_contents($tmp, $contents) !== strlen($contents) || !@rename($tmp, $path)) {
+            @unlink($tmp);
+            throw new RuntimeException('Cannot write ' . $path);
+        }
+    }
+}
@@ -10,6 +10,7 @@ use Nowo\PdfSignableBundle\AcroForm\AcroFormFieldPatch;
 use Nowo\PdfSignableBundle\AcroForm\AcroFormOverrides;
 use Nowo\PdfSignableBundle\AcroForm\Exception\AcroFormEditorException;
 use Nowo\PdfSignableBundle\AcroForm\PdfAcroFormEditorInterface;
+use Nowo\PdfSignableBundle\AcroForm\ProcessQueue;
 use Nowo\PdfSignableBundle\AcroForm\PythonProcessEnv;
 use Nowo\PdfSignableBundle\AcroForm\Storage\AcroFormOverridesStorageInterface;
 use Nowo\PdfSignableBundle\Event\AcroFormApplyRequestEvent;
@@ -49,7 +50,9 @@ use const FILTER_VALIDATE_URL;
  * - POST /acroform/overrides/load    – Load overrides and optionally fields (from body or Python extractor)
  * - POST /acroform/fields/extract    – Extract AcroForm field descriptors from a PDF (Python script)
  * - POST /acroform/apply             – Apply patches to a PDF and return the modified PDF (event or editor)
- * - POST /acroform/process          – Run process script on modified PDF and dispatch event
+ * - POST /acroform/process          – Run process script on modified PDF and dispatch event (or queue it)
+ * - GET  /acroform/process/status   – State of a queued process job
+ * - POST /acroform/process/status   – Takes the result of a done job and dispatches the event
  *
  * All routes return 404 when acroform.enabled is false.
  * Apply returns 501 (Not Implemented) when allow_pdf_modify is false or no listener/editor sets the modified PDF.
@@ -87,6 +90,7 @@ final class AcroFormOverridesController extends AbstractController
      * @param float $httpTimeout HTTP timeout for external PDF fetches
      * @param float $processTimeout Process timeout for fields extract / apply scripts
      * @param float $processScriptTimeout Process timeout for process_script
+     * @param string|null $processQueueDir Spool directory; when set, process queues a job for .scripts/process_queue.py instead of running the script
      */
     public function __construct(
         #[Autowire(param: 'nowo_pdf_signable.acroform.enabled')]
@@ -120,6 +124,8 @@ final class AcroFormOverridesController extends AbstractController
         private readonly ?HttpClientInterface $httpClient = null,
         private readonly ?Closure $createTempFile = null,
         private readonly ?Closure $writeFile = null,
+        #[Autowire(param: 'nowo_pdf_signable.acroform.process_queue_dir')]
+        private readonly ?string $processQueueDir = null,
     ) {
     }
 
@@ -564,10 +570,14 @@ final class AcroFormOverridesController extends AbstractController
      * Body: pdf_content (base64, required), document_key (optional, passed to script as --document-key).
      * The script is invoked with --input <temp PDF path> and --output <temp path>; it must write the
      * processed PDF to the output path. Then ACROFORM_MODIFIED_PDF_PROCESSED is dispatched with the result.
+     * With acroform.process_queue_dir set, the PDF is queued for the .scripts/process_queue.py worker instead
+     * and the response is 202; poll GET /acroform/process/status, then POST to it once the job is done to take the
+     * result (that dispatches the event).
      *
      * @param Request $request Request body with pdf_content (base64), optional document_key
      *
-     * @return Response 200 JSON { success: true, document_key?: string }, or application/pdf if Accept header requests it
+     * @return Response 200 JSON { success: true, document_key?: string }, or application/pdf if Accept header requests it;
+     *                  202 JSON { queued: true, job_id, document_key, state } in queue mode
      */
     #[Route('/acroform/process', name: 'nowo_pdf_signable_acroform_process', methods: ['POST'])]
     public function process(Request $request): Response
@@ -598,6 +608,26 @@ final class AcroFormOverridesController extends AbstractController
             $documentKey = null;
         }
 
+        $queueDir = trim((string) $this->processQueueDir);
+        if ($queueDir !== '') {
+            try {
+                $job = (new ProcessQueue($queueDir))->enqueue($decoded, $documentKey);
+            } catch (RuntimeException $e) {
+                if ($this->logger instanceof LoggerInterface) {
+                    $this->logger->error('AcroForm process: cannot queue job', ['error' => $e->getMessage()]);
+                }
+
+                return new JsonResponse(['error' => 'Failed to queue process job'], Response::HTTP_INTERNAL_SERVER_ERROR);
+            }
+
+            return new JsonResponse([
+                'queued'       => true,
+                'job_id'       => $job['id'],
+                'document_key' => $documentKey,
+                'state'        => $job['state'],
+            ], Response::HTTP_ACCEPTED);
+        }
+
         $tmpInput  = $this->createTempFile('pdf_process_in_');
         $tmpOutput = $this->createTempFile('pdf_process_out_');
         if ($tmpInput === false || $tmpOutput === false) {
@@ -668,6 +698,74 @@ final class AcroFormOverridesController extends AbstractController
         }
     }
 
+    /**
+     * Returns the state of a queued process job (acroform.process_queue_dir) by document_key or job_id.
+     *
+     * State is queued, running, retrying, done or failed (see .scripts/process_queue.py). GET only reads the
+     * state. POST (CSRF-protected) on a done job takes the processed PDF and dispatches ACROFORM_MODIFIED_PDF_PROCESSED
+     * with it (the event's request is then this request); with Accept: application/pdf it also returns the PDF. The
+     * result is deleted only after the dispatch succeeds, so a failing listener leaves it for the next POST.
+     *
+     * @param Request $request Query document_key (latest job for the key) or job_id
+     *
+     * @return Response 200 JSON { job_id, document_key, state, attempts, error, result_ready, result_delivered }, 400 without document_key/job_id, 403 invalid CSRF (POST), 404 unknown job
+     */
+    #[Route('/acroform/process/status', name: 'nowo_pdf_signable_acroform_process_status', methods: ['GET', 'POST'])]
+    public function processStatus(Request $request): Response
+    {
+        $queueDir = trim((string) $this->processQueueDir);
+        if (!$this->enabled || $queueDir === '') {
+            return new Response('', Response::HTTP_NOT_FOUND);
+        }
+        $take = $request->isMethod('POST');
+        if ($take && ($csrfDeny = $this->denyUnlessValidCsrf($request)) instanceof JsonResponse) {
+            return $csrfDeny;
+        }
+        $jobId       = $request->query->get('job_id');
+        $jobId       = is_string($jobId) && $jobId !== '' ? $jobId : null;
+        $documentKey = trim((string) $request->query->get('document_key', ''));
+        if ($jobId === null && ($documentKey === '' || strlen($documentKey) > self::DOCUMENT_KEY_MAX_LENGTH)) {
+            return new JsonResponse(['error' => 'document_key or job_id required'], Response::HTTP_BAD_REQUEST);
+        }
+
+        $queue = new ProcessQueue($queueDir);
+        $job   = $queue->find($documentKey !== '' ? $documentKey : null, $jobId);
+        if ($job === null) {
+            return new JsonResponse(['error' => 'Not found'], Response::HTTP_NOT_FOUND);
+        }
+        $id    = is_string($job['id'] ?? null) ? $job['id'] : '';
+        $key   = is_string($job['documentKey'] ?? null) ? $job['documentKey'] : null;
+        $state = $job['state'] ?? null;
+
+        $processedPdf = null;
+        if ($take && $state === 'done') {
+            $queue->takeResult($id, function (string $contents) use (&$processedPdf, $key, $request): void {
+                $this->eventDispatcher->dispatch(
+                    new AcroFormModifiedPdfProcessedEvent($contents, $key, $request),
+                    PdfSignableEvents::ACROFORM_MODIFIED_PDF_PROCESSED,
+                );
+                $processedPdf = $contents;
+            });
+        }
+        if ($processedPdf !== null && str_contains((string) $request->headers->get('Accept', ''), 'application/pdf')) {
+            return new Response($processedPdf, Response::HTTP_OK, [
+                'Content-Type'        => 'application/pdf',
+                'Content-Disposition' => 'inline; filename="processed.pdf"',
+            ]);
+        }
+        $resultReady = $state === 'done' && $queue->hasResult($id);
+
+        return new JsonResponse([
+            'job_id'           => $id,
+            'document_key'     => $key,
+            'state'            => $state,
+            'attempts'         => $job['attempts'] ?? 0,
+            'error'            => $job['error'] ?? null,
+            'result_ready'     => $resultReady,
+            'result_delivered' => $state === 'done' && !$resultReady,
+        ]);
+    }
+
     /**
      * Rejects mutating requests without a valid CSRF token (fail-closed).
      *
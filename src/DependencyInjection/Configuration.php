@@ -195,6 +195,10 @@ final class Configuration implements ConfigurationInterface
                             ->info('Executable used to run the process_script (e.g. python3, python, or /usr/bin/python3). Used only when process_script is set.')
                             ->defaultValue('python3')
                         ->end()
+                        ->scalarNode('process_queue_dir')
+                            ->info('Optional spool directory for a process job queue. When set, POST /acroform/process queues the PDF and returns 202 instead of running process_script in the request; run .scripts/process_queue.py work --spool <dir> as a worker and poll GET /acroform/process/status and POST to it once the job is done (that takes the result and dispatches the event).')
+                            ->defaultNull()
+                        ->end()
                         ->scalarNode('default_profile')
                             ->info('Default profile when form option config is not set (e.g. "default"). Resolved from acroform.profiles[name]. Legacy key: default_config_alias.')
                             ->defaultValue('default')
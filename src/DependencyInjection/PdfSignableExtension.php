@@ -78,6 +78,7 @@ final class PdfSignableExtension extends Extension implements PrependExtensionIn
         $container->setParameter(Configuration::ALIAS . '.acroform.apply_script_command', $acroform['apply_script_command'] ?? 'python3');
         $container->setParameter(Configuration::ALIAS . '.acroform.process_script', $acroform['process_script'] ?? null);
         $container->setParameter(Configuration::ALIAS . '.acroform.process_script_command', $acroform['process_script_command'] ?? 'python3');
+        $container->setParameter(Configuration::ALIAS . '.acroform.process_queue_dir', $acroform['process_queue_dir'] ?? null);
         $acroformDefault  = $acroform['default_profile'] ?? 'default';
         $acroformProfiles = $acroform['profiles'] ?? [];
         $container->setParameter(Configuration::ALIAS . '.acroform.default_profile', $acroformDefault);
@@ -9,9 +9,11 @@ use InvalidArgumentException;
 use Nowo\PdfSignableBundle\AcroForm\AcroFormOverrides;
 use Nowo\PdfSignableBundle\AcroForm\Exception\AcroFormEditorException;
 use Nowo\PdfSignableBundle\AcroForm\PdfAcroFormEditorInterface;
+use Nowo\PdfSignableBundle\AcroForm\ProcessQueue;
 use Nowo\PdfSignableBundle\AcroForm\Storage\AcroFormOverridesStorageInterface;
 use Nowo\PdfSignableBundle\Controller\AcroFormOverridesController;
 use Nowo\PdfSignableBundle\Event\AcroFormApplyRequestEvent;
+use Nowo\PdfSignableBundle\Event\AcroFormModifiedPdfProcessedEvent;
 use Nowo\PdfSignableBundle\Proxy\ProxyUrlValidator;
 use PHPUnit\Framework\MockObject\MockObject;
 use PHPUnit\Framework\TestCase;
@@ -108,6 +110,7 @@ final class AcroFormOverridesControllerTest extends TestCase
         ?HttpClientInterface $httpClient = null,
         ?Closure $createTempFile = null,
         ?Closure $writeFile = null,
+        ?string $processQueueDir = null,
     ): AcroFormOverridesController {
         $storage ??= $this->createMock(AcroFormOverridesStorageInterface::class);
         /** @var EventDispatcherInterface&MockObject $dispatcher */
@@ -138,12 +141,24 @@ final class AcroFormOverridesControllerTest extends TestCase
             $httpClient,
             $createTempFile,
             $writeFile,
+            $processQueueDir,
         );
         $controller->setContainer($this->createContainerWithCsrf());
 
         return $controller;
     }
 
+    private function removeDirectory(string $dir): void
+    {
+        foreach (glob($dir . '/*/*') ?: [] as $file) {
+            @unlink($file);
+        }
+        foreach (glob($dir . '/*') ?: [] as $sub) {
+            @rmdir($sub);
+        }
+        @rmdir($dir);
+    }
+
     public function testGetOverridesWhenDisabledReturns404(): void
     {
         $controller = $this->createController(enabled: false);
@@ -1424,6 +1439,143 @@ final class AcroFormOverridesControllerTest extends TestCase
         }
     }
 
+    /** With process_queue_dir set, process writes a job to the spool and returns 202 without running the script. */
+    public function testProcessWithQueueDirQueuesJobAndReturns202(): void
+    {
+        $script   = sys_get_temp_dir() . '/pdfsignable_process_queued_' . getmypid() . '.py';
+        $queueDir = sys_get_temp_dir() . '/pdfsignable_process_queue_' . getmypid() . '_' . bin2hex(random_bytes(4));
+        file_put_contents($script, "import sys\nsys.exit(1)\n");
+        try {
+            $controller = $this->createController(processScript: $script, processQueueDir: $queueDir);
+            $request    = Request::create('/pdf-signable/acroform/process', 'POST', [], [], [], [
+                'CONTENT_TYPE'      => 'application/json',
+                'HTTP_X_CSRF_TOKEN' => self::VALID_CSRF_TOKEN,
+            ], json_encode(['pdf_content' => base64_encode('%PDF-1.4 queued'), 'document_key' => 'doc-q1'], JSON_THROW_ON_ERROR));
+
+            $response = $controller->process($request);
+
+            self::assertSame(Response::HTTP_ACCEPTED, $response->getStatusCode(), (string) $response->getContent());
+            $data = json_decode((string) $response->getContent(), true, 512, JSON_THROW_ON_ERROR);
+            self::assertTrue($data['queued']);
+            self::assertSame('doc-q1', $data['document_key']);
+            self::assertSame('queued', $data['state']);
+            self::assertMatchesRegularExpression(ProcessQueue::JOB_ID_PATTERN, $data['job_id']);
+            self::assertSame('%PDF-1.4 queued', file_get_contents($queueDir . '/jobs/' . $data['job_id'] . '.pdf'));
+            $job = json_decode((string) file_get_contents($queueDir . '/jobs/' . $data['job_id'] . '.json'), true, 512, JSON_THROW_ON_ERROR);
+            self::assertSame(['queued', 0, 'doc-q1'], [$job['state'], $job['attempts'], $job['documentKey']]);
+            self::assertFileExists($queueDir . '/status/' . hash('sha256', 'doc-q1') . '.json');
+        } finally {
+            @unlink($script);
+            $this->removeDirectory($queueDir);
+        }
+    }
+
+    /** The first status poll that finds the job done dispatches the processed event with the result; later polls do not. */
+    public function testProcessStatusDispatchesEventOnceWhenJobIsDone(): void
+    {
+        $queueDir = sys_get_temp_dir() . '/pdfsignable_process_status_' . getmypid() . '_' . bin2hex(random_bytes(4));
+        try {
+            $job = $this->writeDoneJob($queueDir, 'doc-q2');
+
+            $dispatched = [];
+            $dispatcher = $this->createMock(EventDispatcherInterface::class);
+            $dispatcher->method('dispatch')->willReturnCallback(static function (object $event) use (&$dispatched): object {
+                $dispatched[] = $event;
+
+                return $event;
+            });
+            $controller = $this->createController(eventDispatcher: $dispatcher, processQueueDir: $queueDir);
+            $url        = '/pdf-signable/acroform/process/status';
+
+            // A plain GET (prefetch, second tab) only reports the state
+            $polled = $controller->processStatus(Request::create($url, 'GET', ['document_key' => 'doc-q2']));
+            self::assertSame(Response::HTTP_OK, $polled->getStatusCode());
+            $data = json_decode((string) $polled->getContent(), true, 512, JSON_THROW_ON_ERROR);
+            self::assertSame([$job['id'], 'doc-q2', 'done', 1, true, false], [$data['job_id'], $data['document_key'], $data['state'], $data['attempts'], $data['result_ready'], $data['result_delivered']]);
+            self::assertCount(0, $dispatched);
+
+            self::assertSame(Response::HTTP_FORBIDDEN, $controller->processStatus(Request::create($url . '?document_key=doc-q2', 'POST'))->getStatusCode());
+            self::assertCount(0, $dispatched);
+
+            $first  = $controller->processStatus($this->withCsrf(Request::create($url . '?document_key=doc-q2', 'POST')));
+            $second = $controller->processStatus($this->withCsrf(Request::create($url . '?job_id=' . $job['id'], 'POST')));
+
+            self::assertSame(Response::HTTP_OK, $first->getStatusCode());
+            $data = json_decode((string) $first->getContent(), true, 512, JSON_THROW_ON_ERROR);
+            self::assertSame([false, true], [$data['result_ready'], $data['result_delivered']]);
+            self::assertSame(Response::HTTP_OK, $second->getStatusCode());
+            self::assertCount(1, $dispatched);
+            self::assertInstanceOf(AcroFormModifiedPdfProcessedEvent::class, $dispatched[0]);
+            self::assertSame('%PDF-1.4 processed', $dispatched[0]->getProcessedPdfContents());
+            self::assertSame('doc-q2', $dispatched[0]->getDocumentKey());
+        } finally {
+            $this->removeDirectory($queueDir);
+        }
+    }
+
+    public function testProcessStatusKeepsResultWhenListenerThrows(): void
+    {
+        $queueDir = sys_get_temp_dir() . '/pdfsignable_process_status_' . getmypid() . '_' . bin2hex(random_bytes(4));
+        try {
+            $job   = $this->writeDoneJob($queueDir, 'doc-q4');
+            $calls = 0;
+
+            $dispatcher = $this->createMock(EventDispatcherInterface::class);
+            $dispatcher->method('dispatch')->willReturnCallback(static function (object $event) use (&$calls): object {
+                if (++$calls === 1) {
+                    throw new RuntimeException('storage down');
+                }
+
+                return $event;
+            });
+            $controller = $this->createController(eventDispatcher: $dispatcher, processQueueDir: $queueDir);
+            $request    = fn (): Request => $this->withCsrf(Request::create('/pdf-signable/acroform/process/status?job_id=' . $job['id'], 'POST'));
+
+            try {
+                $controller->processStatus($request());
+                self::fail('The listener exception should propagate');
+            } catch (RuntimeException $e) {
+                self::assertSame('storage down', $e->getMessage());
+            }
+            self::assertFileExists($queueDir . '/results/' . $job['id'] . '.pdf');
+
+            $data = json_decode((string) $controller->processStatus($request())->getContent(), true, 512, JSON_THROW_ON_ERROR);
+            self::assertSame([false, true], [$data['result_ready'], $data['result_delivered']]);
+            self::assertSame(2, $calls);
+            self::assertFileDoesNotExist($queueDir . '/results/' . $job['id'] . '.pdf');
+        } finally {
+            $this->removeDirectory($queueDir);
+        }
+    }
+
+    /**
+     * Enqueues a job and leaves what the worker (.scripts/process_queue.py) writes for a finished one.
+     *
+     * @return array<string, mixed>
+     */
+    private function writeDoneJob(string $queueDir, string $documentKey): array
+    {
+        $job = (new ProcessQueue($queueDir))->enqueue('%PDF-1.4 in', $documentKey);
+        file_put_contents($queueDir . '/results/' . $job['id'] . '.pdf', '%PDF-1.4 processed');
+        $done = json_encode(['state' => 'done', 'attempts' => 1] + $job, JSON_THROW_ON_ERROR);
+        file_put_contents($queueDir . '/jobs/' . $job['id'] . '.json', $done);
+        file_put_contents($queueDir . '/status/' . hash('sha256', $documentKey) . '.json', $done);
+
+        return $job;
+    }
+
+    public function testProcessStatusWithoutQueueReturns404AndValidatesLookup(): void
+    {
+        $request = Request::create('/pdf-signable/acroform/process/status', 'GET', ['document_key' => 'doc-q3']);
+        self::assertSame(Response::HTTP_NOT_FOUND, $this->createController()->processStatus($request)->getStatusCode());
+
+        $queueDir   = sys_get_temp_dir() . '/pdfsignable_process_status_none_' . getmypid();
+        $controller = $this->createController(processQueueDir: $queueDir);
+        self::assertSame(Response::HTTP_BAD_REQUEST, $controller->processStatus(Request::create('/pdf-signable/acroform/process/status', 'GET'))->getStatusCode());
+        self::assertSame(Response::HTTP_NOT_FOUND, $controller->processStatus($request)->getStatusCode());
+        self::assertSame(Response::HTTP_NOT_FOUND, $controller->processStatus(Request::create('/pdf-signable/acroform/process/status', 'GET', ['job_id' => '../../etc/passwd']))->getStatusCode());
+    }
+
     public function testLoadOverridesWithExtractorScriptFailureSetsExtractorErrorMessage(): void
     {
         $script = sys_get_temp_dir() . '/pdfsignable_load_extract_fail_' . getmypid() . '.py';
@@ -113,6 +113,7 @@ final class PdfSignableExtensionTest extends TestCase
 
         self::assertSame('python3', $container->getParameter('nowo_pdf_signable.acroform.apply_script_command'));
         self::assertSame('python3', $container->getParameter('nowo_pdf_signable.acroform.process_script_command'));
+        self::assertNull($container->getParameter('nowo_pdf_signable.acroform.process_queue_dir'));
         self::assertSame(12.0, $container->getParameter('nowo_pdf_signable.acroform.min_field_width'));
         self::assertSame(12.0, $container->getParameter('nowo_pdf_signable.acroform.min_field_height'));
 